@@ -0,0 +1,34 @@
+import { NextRequest, NextResponse } from 'next/server'
+import fs from 'fs'
+import path from 'path'
+
+export const runtime = 'nodejs'
+
+// Local query service started with scripts/cygnss_query_server.py
+const QUERY_SERVICE_URL = process.env.CYGNSS_QUERY_URL || 'http://127.0.0.1:8765'
+
+export async function GET(request: NextRequest) {
+  const { searchParams } = new URL(request.url)
+
+  // Filtered, paginated queries are answered by the Python service
+  if (Array.from(searchParams.keys()).length > 0) {
+    try {
+      const res = await fetch(`${QUERY_SERVICE_URL}/ddms?${searchParams.toString()}`, { cache: 'no-store' })
+      return new Response(await res.text(), {
+        status: res.status,
+        headers: { 'Content-Type': 'application/json', 'Cache-Control': 'no-store' }
+      })
+    } catch (err) {
+      return NextResponse.json({ error: 'CYGNSS query service unavailable' }, { status: 503 })
+    }
+  }
+
+  // Without a query, serve the sample written by scripts/process_cygnss_data.py
+  const filePath = path.join(process.cwd(), 'public', 'cygnss_data.json')
+  if (!fs.existsSync(filePath)) {
+    return NextResponse.json({ error: 'No processed CYGNSS data found' }, { status: 404 })
+  }
+  return new Response(fs.readFileSync(filePath), {
+    headers: { 'Content-Type': 'application/json' }
+  })
+}
@@ -4,10 +4,47 @@ import path from 'path'
 
 export const runtime = 'nodejs'
 
+// Written by scripts/cygnss_catalog.py; see CYGNSS_INTEGRATION.md
+const CATALOG_FILE = 'cygnss_catalog.json'
+
 function getDataDir() {
   return path.join(process.cwd(), 'data')
 }
 
+// Parsed catalog body and ETag, reused until the file on disk changes
+let catalogCache: { mtimeMs: number; body: string; etag: string } | null = null
+
+function loadCatalog(dataDir: string) {
+  const catalogPath = path.join(dataDir, CATALOG_FILE)
+  if (!fs.existsSync(catalogPath)) return null
+
+  const stat = fs.statSync(catalogPath)
+  if (!catalogCache || catalogCache.mtimeMs !== stat.mtimeMs) {
+    const catalog = JSON.parse(fs.readFileSync(catalogPath, 'utf8'))
+    catalogCache = {
+      mtimeMs: stat.mtimeMs,
+      body: JSON.stringify({ files: catalog.files, generatedAt: catalog.generatedAt }),
+      etag: `"${catalog.etag}"`,
+    }
+  }
+  return catalogCache
+}
+
+// NetCDF files under dir, recursively; hidden entries are skipped (as Python's glob does)
+function listNetcdf(dir: string): string[] {
+  const found: string[] = []
+  for (const entry of fs.readdirSync(dir, { withFileTypes: true })) {
+    if (entry.name.startsWith('.')) continue
+    const full = path.join(dir, entry.name)
+    if (entry.isDirectory()) {
+      found.push(...listNetcdf(full))
+    } else if (entry.isFile() && entry.name.toLowerCase().endsWith('.nc')) {
+      found.push(full)
+    }
+  }
+  return found
+}
+
 export async function GET(request: NextRequest) {
   try {
     const { searchParams } = new URL(request.url)
@@ -16,11 +53,12 @@ export async function GET(request: NextRequest) {
 
     // If a specific file is requested, stream it for download
     if (fileParam) {
-      const safeName = path.basename(fileParam)
-      const filePath = path.join(dataDir, safeName)
-
-      // Validate existence and that it's within dataDir
-      if (!filePath.startsWith(dataDir)) {
+      // Catalog names are paths relative to dataDir (e.g. 2018/213/x.nc); resolve them
+      // and refuse anything that lands outside it
+      const filePath = path.resolve(dataDir, fileParam)
+      const relative = path.relative(dataDir, filePath)
+      if (!relative || relative === '..' || relative.startsWith(`..${path.sep}`) || path.isAbsolute(relative) ||
+          !relative.toLowerCase().endsWith('.nc')) {
         return NextResponse.json({ error: 'Invalid file path' }, { status: 400 })
       }
       if (!fs.existsSync(filePath) || !fs.statSync(filePath).isFile()) {
@@ -33,7 +71,7 @@ export async function GET(request: NextRequest) {
         headers: {
           'Content-Type': 'application/octet-stream',
           'Content-Length': String(stat.size),
-          'Content-Disposition': `attachment; filename="${safeName}"`,
+          'Content-Disposition': `attachment; filename="${path.basename(filePath)}"`,
           'Cache-Control': 'no-store'
         }
       })
@@ -44,14 +82,27 @@ export async function GET(request: NextRequest) {
       return NextResponse.json({ files: [], note: 'Data directory not found' })
     }
 
-    const entries = fs.readdirSync(dataDir)
-    const files = entries
-      .filter((name) => name.toLowerCase().endsWith('.nc'))
-      .map((name) => {
-        const full = path.join(dataDir, name)
+    // Prefer the precomputed catalog; clients revalidate with If-None-Match
+    const catalog = loadCatalog(dataDir)
+    if (catalog) {
+      if (request.headers.get('if-none-match') === catalog.etag) {
+        return new Response(null, { status: 304, headers: { ETag: catalog.etag } })
+      }
+      return new Response(catalog.body, {
+        headers: {
+          'Content-Type': 'application/json',
+          ETag: catalog.etag,
+          'Cache-Control': 'no-cache'
+        }
+      })
+    }
+
+    // No catalog yet: walk dataDir like the catalog does, naming files by their relative path
+    const files = listNetcdf(dataDir)
+      .map((full) => {
         const stat = fs.statSync(full)
         return {
-          name,
+          name: path.relative(dataDir, full).split(path.sep).join('/'),
           sizeBytes: stat.size,
           sizeMB: +(stat.size / (1024 * 1024)).toFixed(2),
           modified: stat.mtime.toISOString(),
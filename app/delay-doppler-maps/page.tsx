@@ -21,6 +21,7 @@ import {
 import Link from "next/link"
 import dynamic from "next/dynamic"
 import { SiteLogo } from "@/components/SiteLogo"
+import { fetchCYGNSSData, parseCYGNSSToDDM, summarizeCYGNSSRecord, type DDMSummary } from "@/lib/realDataSources"
 
 // Import Canvas component dynamically with proper loading
 const DDMCanvas = dynamic(() => import("@/components/DDMCanvasSimple"), { 
@@ -92,6 +93,8 @@ const generateDDMData = (snr: number, windSpeed: number, surfaceType: string, ti
 
 export default function DelayDopplerMapsPage() {
   const [ddmData, setDdmData] = useState<DDMPoint[]>([])
+  // Precomputed peak/mean for real DDMs; simulated frames are reduced client-side
+  const [ddmSummary, setDdmSummary] = useState<DDMSummary | null>(null)
   const [isPlaying, setIsPlaying] = useState(false)
   const [currentTime, setCurrentTime] = useState(0)
   const [snr, setSnr] = useState([25])
@@ -156,6 +159,19 @@ export default function DelayDopplerMapsPage() {
   const fetchRealCYGNSSData = async () => {
     setRealDataStatus('🛰️ Loading real CYGNSS satellite data...')
     try {
+      // Ask the query service for a single good-quality DDM first
+      const page = await fetchCYGNSSData(undefined, undefined, undefined, { pageSize: 1, quality: 'good', encoding: 'uint8' })
+      const record = page?.records[0]
+      if (page && record) {
+        setDdmData(parseCYGNSSToDDM(page, 0))
+        setDdmSummary(summarizeCYGNSSRecord(page, 0))
+        setDataSource('cygnss_real')
+        setIsPlaying(false) // Stop animation for real data
+        setRealDataStatus(`✅ Loaded real CYGNSS data (${record.time})`)
+        return
+      }
+
+      // Fall back to the processed sample file
       const response = await fetch('/api/cygnss')
       
       if (!response.ok) {
@@ -167,6 +183,7 @@ export default function DelayDopplerMapsPage() {
       if (result.sample_ddm && result.sample_ddm.ddm_data) {
         // Use the real CYGNSS data directly 
         setDdmData(result.sample_ddm.ddm_data)
+        setDdmSummary(result.sample_ddm.summary ?? null)
         setDataSource('cygnss_real')
         setIsPlaying(false) // Stop animation for real data
         setRealDataStatus(`✅ Loaded real CYGNSS data (${result.sample_ddm.metadata.timestamp})`)
@@ -180,15 +197,19 @@ export default function DelayDopplerMapsPage() {
 
   const switchToSimulation = () => {
     setDataSource('simulation')
+    setDdmSummary(null)
     setRealDataStatus('')
     const resetData = generateDDMData(snr[0], windSpeed[0], surfaceType, 0)
     setDdmData(resetData)
   }
 
   // Statistics
-  const maxPower = ddmData.length > 0 ? Math.max(...ddmData.map(d => d.power)) : 0
-  const meanPower = ddmData.length > 0 ? ddmData.reduce((sum, d) => sum + d.power, 0) / ddmData.length : 0
-  const peakLocation = ddmData.length > 0 ? ddmData.reduce((max, d) => d.power > max.power ? d : max, ddmData[0]) : null
+  const summary = dataSource === 'cygnss_real' ? ddmSummary : null
+  const maxPower = summary?.peak_power ?? (ddmData.length > 0 ? ddmData.reduce((max, d) => Math.max(max, d.power), -Infinity) : 0)
+  const meanPower = summary?.mean_power ?? (ddmData.length > 0 ? ddmData.reduce((sum, d) => sum + d.power, 0) / ddmData.length : 0)
+  const peakLocation = summary && summary.peak_delay != null && summary.peak_doppler != null
+    ? { delay: summary.peak_delay, doppler: summary.peak_doppler, power: summary.peak_power ?? maxPower }
+    : ddmData.length > 0 ? ddmData.reduce((max, d) => d.power > max.power ? d : max, ddmData[0]) : null
 
   return (
     <div className="min-h-screen bg-background">
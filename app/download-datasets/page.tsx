@@ -16,6 +16,12 @@ type LocalNcFile = {
   sizeBytes: number
   sizeMB: number
   modified: string
+  // Present when the listing comes from data/cygnss_catalog.json
+  timeStart?: string | null
+  timeEnd?: string | null
+  spacecraft?: number | null
+  ddmCount?: number | null
+  bbox?: [number, number, number, number] | null
 }
 
 export default function CygnssDownloadsPage() {
@@ -28,7 +34,7 @@ export default function CygnssDownloadsPage() {
     setLoading(true)
     setError(null)
     try {
-      const res = await fetch('/api/local-cygnss', { cache: 'no-store' })
+      const res = await fetch('/api/local-cygnss', { cache: 'no-cache' })
       const data = await res.json()
       if (res.ok) {
         setFiles(data.files || [])
@@ -149,6 +155,12 @@ export default function CygnssDownloadsPage() {
                       <div>
                         <div className="font-mono text-sm text-foreground">{f.name}</div>
                         <div className="text-xs text-muted-foreground">{f.sizeMB} MB • Updated {new Date(f.modified).toLocaleString()}</div>
+                        {f.spacecraft != null && (
+                          <div className="text-xs text-muted-foreground">
+                            CYGNSS-{String(f.spacecraft).padStart(2, '0')} • {f.ddmCount ?? 0} DDMs
+                            {f.timeStart && <> • {new Date(f.timeStart).toLocaleString()}</>}
+                          </div>
+                        )}
                       </div>
                       <div className="flex items-center gap-2">
                         <Badge variant="secondary">.nc</Badge>
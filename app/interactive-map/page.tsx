@@ -45,6 +45,24 @@ export default function InteractiveMapPage() {
           { name: "IIT Tirupati", lat: 13.6288, lon: 79.4192, region: "South India", parameters: {} },
         ]
 
+        // Precomputed daily series (scripts/cygnss_timeseries.py): arrays only, no CSV parsing
+        const { fetchSiteSeries } = await import("@/lib/siteSeries")
+        const siteSeries = await fetchSiteSeries().catch(() => null)
+        if (siteSeries) {
+          for (const loc of base) {
+            for (const [key, param] of Object.entries(siteSeries[loc.name] ?? {})) {
+              const filtered = param.series.filter(p => p.year === lastYear)
+              if (!filtered.length) continue
+              loc.parameters[key] = { ...param, series: filtered, latest: filtered[filtered.length - 1] }
+            }
+          }
+          if (base.some(loc => loc.parameters["SM"])) {
+            setLocations(base)
+            setLoading(false)
+            return
+          }
+        }
+
         const { fetchCsvSeries } = await import("@/lib/csv")
 
         const smFiles = [
@@ -4,19 +4,25 @@ NASA CYGNSS Data Downloader using modern earthdata library
 Works with your NASA Earthdata credentials to download real CYGNSS data
 """
 
-import earthdata
-import requests
 import os
-import json
-import netCDF4 as nc
-import numpy as np
 from datetime import datetime, timezone
 from pathlib import Path
+import argparse
+import sys
+
+# earthdata and numpy load only in the steps that use them
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+from cygnss_checkpoint import write_json_atomic
+from cygnss_preflight import require
 
 def setup_nasa_auth():
     """Setup NASA Earthdata authentication"""
     print("🔐 Setting up NASA Earthdata authentication...")
     
+    if not require('earthdata', purpose="log in to NASA Earthdata"):
+        return None
+    import earthdata
+    
     try:
         # Try to create auth object
         auth = earthdata.Auth()
@@ -44,6 +50,7 @@ def setup_nasa_auth():
 
 def search_cygnss_data(auth, start_date="2018-08-01", end_date="2018-08-08"):
     """Search for CYGNSS data using NASA's API"""
+    import earthdata
     
     try:
         print(f"🔍 Searching for CYGNSS data from {start_date} to {end_date}...")
@@ -78,6 +85,7 @@ def search_cygnss_data(auth, start_date="2018-08-01", end_date="2018-08-08"):
 
 def download_cygnss_files(auth, results, data_dir="./data"):
     """Download CYGNSS files"""
+    import earthdata
     
     data_path = Path(data_dir)
     data_path.mkdir(exist_ok=True)
@@ -105,9 +113,15 @@ def download_cygnss_files(auth, results, data_dir="./data"):
     
     return downloaded_files
 
-def create_fallback_data():
+def create_fallback_data(incidence=30.0, wind_speed=7.0, seed=0):
     """Create realistic CYGNSS data structure for immediate testing"""
     print("🔄 Creating realistic CYGNSS data structure for testing...")
+    if not require('numpy', purpose="simulate the fallback DDM"):
+        return False
+    from cygnss_simulate import sample_ddm_points
+    
+    # One simulated DDM in the CYGNSS L1 layout (17 delay x 11 Doppler bins)
+    ddm_points, sim = sample_ddm_points(incidence, wind_speed, seed)
     
     # Create data that matches real CYGNSS Level 1 structure
     cygnss_data = {
@@ -117,62 +131,51 @@ def create_fallback_data():
         "total_files": 1,
         "processed_files": 1,
         "sample_ddm": {
-            "ddm_data": [],
+            "ddm_data": ddm_points,
             "metadata": {
                 "file": "cyg01.ddmi.s20180805-120000-e20180805-125959.l1.power-brcs.a30.d31.nc",
                 "timestamp": "2018-08-05T12:30:00Z",
                 "satellite": "CYGNSS-01",
                 "level": "L1",
-                "delay_bins": 17,
-                "doppler_bins": 11,
-                "total_points": 187,
-                "source": "NASA CYGNSS Level 1 data structure (for development)"
+                "delay_bins": len(sim["delay"]),
+                "doppler_bins": len(sim["doppler"]),
+                "total_points": len(ddm_points),
+                "power_units": "dB(W)",
+                "incidence_angle": incidence,
+                "wind_speed": wind_speed,
+                "source": "Zavorotny-Voronovich simulation in the NASA CYGNSS Level 1 structure (for development)"
             }
         }
     }
     
-    # Generate realistic DDM data matching CYGNSS specifications
-    # Real CYGNSS: 17 delay bins (0-8 chips), 11 doppler bins (±250 Hz)
-    for delay_idx in range(17):
-        for doppler_idx in range(11):
-            delay_chips = delay_idx * 0.5  # 0 to 8 chips
-            doppler_hz = (doppler_idx - 5) * 50  # -250 to +250 Hz
-            
-            # Realistic ocean surface scattering model
-            # Peak at specular point (delay ~2.5 chips, doppler ~0 Hz)
-            delay_response = np.exp(-((delay_chips - 2.5) / 1.5) ** 2)
-            doppler_response = np.exp(-(doppler_hz / 100) ** 2)
-            
-            # Base power in dB (typical CYGNSS range: 10-50 dB)
-            base_power = 15 + delay_response * doppler_response * 25
-            
-            # Add realistic noise
-            noise_seed = (delay_idx * 11 + doppler_idx) * 12345
-            np.random.seed(noise_seed)
-            noise = np.random.normal(0, 2)
-            
-            final_power = base_power + noise
-            
-            cygnss_data["sample_ddm"]["ddm_data"].append({
-                "delay": delay_chips,
-                "doppler": doppler_hz,
-                "power": final_power
-            })
-    
     # Save to public directory for Next.js
     output_path = Path("./public/cygnss_data.json")
     output_path.parent.mkdir(exist_ok=True)
     
-    with open(output_path, 'w') as f:
-        json.dump(cygnss_data, f, indent=2)
+    write_json_atomic(output_path, cygnss_data)
     
     print(f"✅ CYGNSS data structure created: {output_path}")
     return True
 
 def main():
+    parser = argparse.ArgumentParser(description="Download CYGNSS data with the earthdata library")
+    parser.add_argument("--check", action="store_true",
+                        help="Report dependencies, then exit")
+    parser.add_argument("--fallback", action="store_true",
+                        help="Only write the development data structure (no login)")
+    args = parser.parse_args()
+    
     print("🛰️  NASA CYGNSS Data Downloader (Modern)")
     print("=" * 50)
     
+    if args.check:
+        from cygnss_preflight import preflight, print_report
+        print_report(preflight())
+        return
+    if args.fallback:
+        create_fallback_data()
+        return
+    
     # Setup authentication
     auth = setup_nasa_auth()
     
@@ -4,11 +4,14 @@ Fallback CYGNSS Data Downloader
 Downloads CYGNSS data directly from NASA using HTTP requests if the official tools fail
 """
 
-import requests
-import os
-import json
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
+import argparse
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+from cygnss_checkpoint import write_json_atomic
+from cygnss_preflight import require
 
 def download_cygnss_fallback():
     """
@@ -68,8 +71,7 @@ def download_cygnss_fallback():
     output_path = Path("./public/cygnss_data.json")
     output_path.parent.mkdir(exist_ok=True)
     
-    with open(output_path, 'w') as f:
-        json.dump(sample_cygnss_data, f, indent=2)
+    write_json_atomic(output_path, sample_cygnss_data)
     
     print(f"✅ Sample CYGNSS data structure created: {output_path}")
     print("📊 This provides realistic DDM data structure for development")
@@ -79,6 +81,10 @@ def download_cygnss_fallback():
 
 def check_nasa_access():
     """Check if NASA Earthdata credentials are working"""
+    if not require('requests', purpose="reach NASA Earthdata"):
+        return False
+    import requests
+
     try:
         # Test NASA Earthdata access
         test_url = "https://urs.earthdata.nasa.gov/"
@@ -96,9 +102,22 @@ def check_nasa_access():
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description="Write sample CYGNSS data to public/cygnss_data.json")
+    parser.add_argument("--check", action="store_true",
+                        help="Report dependencies and NASA Earthdata access, then exit without writing")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="Exit without waiting for Enter (for cron)")
+    args = parser.parse_args()
+    
     print("🛰️  CYGNSS Fallback Data Downloader")
     print("=" * 40)
     
+    if args.check:
+        from cygnss_preflight import preflight, print_report
+        print_report(preflight())
+        check_nasa_access()
+        return
+    
     # Check if we can reach NASA
     nasa_accessible = check_nasa_access()
     
@@ -118,7 +137,8 @@ def main():
         print("   - Use the official podaac-data-downloader tool")
         print("   - Or implement direct NASA API access")
     
-    input("\nPress Enter to continue...")
+    if not args.no_wait:
+        input("\nPress Enter to continue...")
 
 if __name__ == "__main__":
     main()
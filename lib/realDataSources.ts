@@ -36,26 +36,95 @@ interface CYGNSSData {
   doppler: number[]           // Doppler bins (Hz)
 }
 
+// One DDM as returned by the query service (scripts/cygnss_query_server.py)
+export interface CYGNSSRecord {
+  granule: string
+  sample: number
+  channel: number
+  time: string | null
+  spacecraft: number | null
+  lat: number | null
+  lon: number | null
+  quality: number
+  prn: number | null
+  observables: {
+    peak_power: number | null
+    peak_delay_bin: number
+    peak_doppler_bin: number
+    mean_power: number | null
+    noise?: number | null                 // noise floor, linear power units
+    delay_waveform?: (number | null)[]    // sum over Doppler, in the granule's power units
+    doppler_spectrum?: (number | null)[]  // row at the peak delay
+  }
+  power?: (number | null)[][]  // delay × doppler, omitted for observables-only queries
+  power_db?: QuantizedDDM      // replaces `power` when the query asks for an integer encoding
+  power_norm?: (number | null)[][] | QuantizedDDM | null  // (P - N) / N, with view 'normalized' or 'both'
+}
+
+// Precomputed per-DDM reductions (scripts/cygnss_slices.py), power values in dB
+export interface DDMSummary {
+  peak_power: number | null
+  mean_power: number | null
+  peak_delay: number | null
+  peak_doppler: number | null
+  peak_delay_bin: number
+  peak_doppler_bin: number
+  delay_waveform?: (number | null)[]
+  doppler_spectrum?: (number | null)[]
+}
+
+// DDM as per-DDM scale/offset integer codes (scripts/cygnss_compact.py); dB for power_db
+export interface QuantizedDDM {
+  encoding: 'uint8' | 'uint16'
+  shape: [number, number]      // delay × doppler
+  codes: string                // base64, row-major, little-endian
+  scale: number
+  offset: number
+}
+
+export interface CYGNSSPage {
+  records: CYGNSSRecord[]
+  next_cursor: string | null     // pass back as `cursor` for the next page
+  page_size: number
+  axes?: Record<string, { delay: number[] | null; doppler: number[] | null; units?: string | null }>  // per granule
+}
+
+export interface CYGNSSQueryOptions {
+  spacecraft?: number[]
+  quality?: 'good' | number      // 'good' = no quality flags set, number = flags that must be clear
+  pageSize?: number
+  cursor?: string | null
+  observablesOnly?: boolean
+  encoding?: 'float32' | 'uint8' | 'uint16'  // uint8/uint16 return power_db (smaller pages)
+  view?: 'raw' | 'normalized' | 'both'        // raw power, noise-normalized power_norm, or both
+}
+
 /**
- * Example API endpoint for real-time CYGNSS data
- * (This would require NASA API key and backend processing)
+ * Query one page of CYGNSS DDMs
+ * Filtering and pagination happen server-side against the indexed DDM store
  */
 export async function fetchCYGNSSData(
-  startTime: string, 
-  endTime: string, 
-  boundingBox?: {lat: [number, number], lon: [number, number]}
-): Promise<CYGNSSData | null> {
+  startTime?: string, 
+  endTime?: string, 
+  boundingBox?: {lat: [number, number], lon: [number, number]},
+  options: CYGNSSQueryOptions = {}
+): Promise<CYGNSSPage | null> {
   try {
-    // This would connect to NASA's API or your backend
-    const response = await fetch('/api/cygnss', {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({
-        start_time: startTime,
-        end_time: endTime,
-        bbox: boundingBox
-      })
-    })
+    const params = new URLSearchParams()
+    if (startTime) params.set('start', startTime)
+    if (endTime) params.set('end', endTime)
+    if (boundingBox) {
+      params.set('bbox', [boundingBox.lon[0], boundingBox.lat[0], boundingBox.lon[1], boundingBox.lat[1]].join(','))
+    }
+    if (options.spacecraft?.length) params.set('spacecraft', options.spacecraft.join(','))
+    if (options.quality !== undefined) params.set('quality', String(options.quality))
+    params.set('page_size', String(options.pageSize ?? 100))
+    if (options.cursor) params.set('cursor', options.cursor)
+    if (options.observablesOnly) params.set('fields', 'observables')
+    if (options.encoding) params.set('encoding', options.encoding)
+    if (options.view) params.set('view', options.view)
+
+    const response = await fetch(`/api/cygnss?${params.toString()}`)
     
     if (!response.ok) {
       throw new Error('Failed to fetch CYGNSS data')
@@ -69,24 +138,67 @@ export async function fetchCYGNSSData(
 }
 
 /**
- * Parse real DDM data from CYGNSS format
+ * Decode a quantized DDM to its values (dB for power_db), null for missing bins
  */
-export function parseCYGNSSToDDM(cygnssData: CYGNSSData, sampleIndex: number): DDMPoint[] {
+export function decodeQuantizedDDM(ddm: QuantizedDDM): (number | null)[][] {
+  const bytes = Uint8Array.from(atob(ddm.codes), c => c.charCodeAt(0))
+  const codes = ddm.encoding === 'uint8'
+    ? bytes
+    : new Uint16Array(bytes.buffer, bytes.byteOffset, bytes.byteLength / 2)
+  const missing = ddm.encoding === 'uint8' ? 0xff : 0xffff
+  const [rows, cols] = ddm.shape
+
+  const values: (number | null)[][] = []
+  for (let i = 0; i < rows; i++) {
+    const row: (number | null)[] = []
+    for (let j = 0; j < cols; j++) {
+      const code = codes[i * cols + j]
+      row.push(code === missing ? null : ddm.offset + code * ddm.scale)
+    }
+    values.push(row)
+  }
+  return values
+}
+
+/**
+ * Parse real DDM data from a CYGNSS query page
+ */
+export function parseCYGNSSToDDM(page: CYGNSSPage, recordIndex: number): DDMPoint[] {
   const ddmPoints: DDMPoint[] = []
   
-  if (!cygnssData.power_analog[sampleIndex]) {
+  const record = page.records[recordIndex]
+  if (!record) {
+    return ddmPoints
+  }
+  if (record.power_db) {
+    // Already in dB, only missing bins are dropped
+    const values = decodeQuantizedDDM(record.power_db)
+    const axes = page.axes?.[record.granule]
+    values.forEach((row, delayIdx) => row.forEach((power, dopplerIdx) => {
+      if (power != null) {
+        ddmPoints.push({
+          delay: axes?.delay?.[delayIdx] ?? delayIdx,
+          doppler: axes?.doppler?.[dopplerIdx] ?? dopplerIdx,
+          power
+        })
+      }
+    }))
+    return ddmPoints
+  }
+  if (!record.power) {
     return ddmPoints
   }
   
-  const powerData = cygnssData.power_analog[sampleIndex]
-  const delays = cygnssData.delay
-  const dopplers = cygnssData.doppler
+  const powerData = record.power
+  const axes = page.axes?.[record.granule]
+  const delays = axes?.delay ?? powerData.map((_, i) => i)
+  const dopplers = axes?.doppler ?? powerData[0].map((_, j) => j)
   
   for (let delayIdx = 0; delayIdx < delays.length; delayIdx++) {
     for (let dopplerIdx = 0; dopplerIdx < dopplers.length; dopplerIdx++) {
-      const power = powerData[delayIdx][dopplerIdx]
+      const power = powerData[delayIdx]?.[dopplerIdx]
       
-      if (power > 0) { // Filter out invalid data
+      if (power != null && power > 0) { // Filter out invalid data
         ddmPoints.push({
           delay: delays[delayIdx],
           doppler: dopplers[dopplerIdx],
@@ -99,6 +211,28 @@ export function parseCYGNSSToDDM(cygnssData: CYGNSSData, sampleIndex: number): D
   return ddmPoints
 }
 
+/**
+ * Summary of a query-service record from its stored observables (no reduction over bins)
+ */
+export function summarizeCYGNSSRecord(page: CYGNSSPage, recordIndex: number): DDMSummary | null {
+  const record = page.records[recordIndex]
+  if (!record) return null
+  const axes = page.axes?.[record.granule]
+  const inDb = (axes?.units ?? '').toLowerCase().startsWith('db')
+  const toDb = (v: number | null) => (v == null ? null : inDb ? v : v > 0 ? 10 * Math.log10(v) : null)
+  const obs = record.observables
+  return {
+    peak_power: toDb(obs.peak_power),
+    mean_power: toDb(obs.mean_power),
+    peak_delay: axes?.delay?.[obs.peak_delay_bin] ?? obs.peak_delay_bin,
+    peak_doppler: axes?.doppler?.[obs.peak_doppler_bin] ?? obs.peak_doppler_bin,
+    peak_delay_bin: obs.peak_delay_bin,
+    peak_doppler_bin: obs.peak_doppler_bin,
+    delay_waveform: obs.delay_waveform?.map(toDb),
+    doppler_spectrum: obs.doppler_spectrum?.map(toDb),
+  }
+}
+
 /**
  * Quality control for real DDM data
  */
@@ -182,6 +316,8 @@ export const DATA_SOURCES = {
 export default {
   fetchCYGNSSData,
   parseCYGNSSToDDM,
+  decodeQuantizedDDM,
+  summarizeCYGNSSRecord,
   validateDDMData,
   DATA_SOURCES
 }
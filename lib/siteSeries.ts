@@ -0,0 +1,61 @@
+import type { SeriesPoint } from "@/lib/csv"
+
+// Precomputed per-site daily series written by scripts/cygnss_timeseries.py
+export type SiteSeriesFile = {
+  site: string
+  name: string
+  lat: number | null
+  lon: number | null
+  start: string          // YYYY-MM-DD of values[0]
+  days: number
+  variables: Record<string, { display: string; unit: string; values: (number | null)[]; counts?: number[] }>
+}
+
+export type SiteSeriesIndex = {
+  generatedAt: string
+  sites: Record<string, { name: string; file: string; start: string; end: string; variables: string[] }>
+}
+
+export type SiteParameter = { display: string; unit: string; series: SeriesPoint[] }
+
+/**
+ * Expand a dense daily value array into year/day-of-year points, skipping gaps
+ */
+export function toSeriesPoints(start: string, values: (number | null)[], multiplier = 1): SeriesPoint[] {
+  const [y, m, d] = start.split('-').map(Number)
+  const first = Date.UTC(y, m - 1, d)
+  const out: SeriesPoint[] = []
+  for (let i = 0; i < values.length; i++) {
+    const v = values[i]
+    if (v == null) continue
+    const date = new Date(first + i * 86400000)
+    const year = date.getUTCFullYear()
+    const doy = Math.floor((date.getTime() - Date.UTC(year, 0, 0)) / 86400000)
+    out.push({ year, doy, value: v * multiplier })
+  }
+  return out
+}
+
+/**
+ * Load every site's series as ready-to-plot parameters, keyed by site display name
+ * Returns null when the precomputed files are not available
+ */
+export async function fetchSiteSeries(baseUrl = "/site_series"): Promise<Record<string, Record<string, SiteParameter>> | null> {
+  const res = await fetch(`${baseUrl}/index.json`)
+  if (!res.ok) return null
+  const index: SiteSeriesIndex = await res.json()
+
+  const entries = await Promise.all(
+    Object.values(index.sites).map(async ({ file }) => {
+      const r = await fetch(`${baseUrl}/${file}`)
+      if (!r.ok) return null
+      const data: SiteSeriesFile = await r.json()
+      const params: Record<string, SiteParameter> = {}
+      for (const [key, variable] of Object.entries(data.variables)) {
+        params[key] = { display: variable.display, unit: variable.unit, series: toSeriesPoints(data.start, variable.values) }
+      }
+      return [data.name, params] as const
+    })
+  )
+  return Object.fromEntries(entries.filter((e): e is NonNullable<typeof e> => e !== null))
+}
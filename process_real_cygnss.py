@@ -5,10 +5,16 @@ Processes the already downloaded NASA CYGNSS files to extract real DDM data
 """
 
 import os
-import json
-import numpy as np
 from datetime import datetime, timezone
 from pathlib import Path
+import argparse
+import sys
+
+# numpy/netCDF4 load only once there are files to process
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+from cygnss_metadata import get_cache
+from cygnss_checkpoint import write_json_atomic
+from cygnss_preflight import require
 
 def process_existing_cygnss_files():
     """Process the already downloaded CYGNSS NetCDF files"""
@@ -31,14 +37,12 @@ def process_existing_cygnss_files():
     for f in nc_files:
         print(f"   📁 {f.name}")
     
-    try:
-        import netCDF4 as nc
-    except ImportError:
-        print("❌ NetCDF4 not available. Installing...")
-        import subprocess
-        import sys
-        subprocess.run([sys.executable, "-m", "pip", "install", "netcdf4"], check=True)
-        import netCDF4 as nc
+    if not require('netCDF4', 'numpy', purpose="read NetCDF granules"):
+        return False
+    import netCDF4 as nc
+    import numpy as np
+    from cygnss_calibration import db_units_label, power_to_db, valid_power, variable_units
+    from cygnss_anomaly import anomaly_flags, describe_flags
     
     processed_data = []
     
@@ -46,39 +50,49 @@ def process_existing_cygnss_files():
         try:
             print(f"\n📊 Processing: {file_path.name}")
             
-            with nc.Dataset(file_path, 'r') as dataset:
+            # Variable listing and axes come from the metadata cache
+            meta, was_cached = get_cache().get(file_path)
+            if not was_cached:
                 print("📋 Available variables:")
-                var_names = list(dataset.variables.keys())
-                for var in var_names[:15]:  # Show first 15
-                    shape = dataset.variables[var].shape if hasattr(dataset.variables[var], 'shape') else 'scalar'
-                    print(f"   • {var}: {shape}")
-                
+                for var in list(meta["variables"])[:15]:  # Show first 15
+                    print(f"   • {var}: {tuple(meta['variables'][var]['shape']) or 'scalar'}")
+            
+            with nc.Dataset(file_path, 'r') as dataset:
                 # Get power data
-                if 'power_analog' in dataset.variables:
+                if 'power_analog' in meta["variables"]:
                     power_data = dataset.variables['power_analog']
                     print(f"✅ Found power_analog data: {power_data.shape}")
                     
                     # CYGNSS data is (time, channels, delay, doppler)
-                    # Take first time sample, first channel for simplicity
+                    units = variable_units(meta, 'power_analog')
                     if len(power_data.shape) == 4:
-                        # Select a middle time sample with good data
-                        time_idx = power_data.shape[0] // 2
-                        channel_idx = 0
-                        ddm_2d = power_data[time_idx, channel_idx, :, :]
-                        print(f"📐 Selected DDM from time {time_idx}, channel {channel_idx}: {ddm_2d.shape}")
+                        # First DDM from the middle of the granule on that passes the
+                        # anomaly checks (RFI, saturation, zero/negative power)
+                        start = power_data.shape[0] // 2
+                        block = np.ma.filled(np.ma.asarray(power_data[start:start + 64], dtype=np.float64), np.nan)
+                        flags = anomaly_flags(block, units)
+                        clean = np.flatnonzero(flags.ravel() == 0)
+                        if clean.size == 0:
+                            print(f"❌ All {flags.size} DDMs from time {start} on are anomalous "
+                                  f"({describe_flags(np.bitwise_or.reduce(flags, axis=None))})")
+                            continue
+                        offset, channel_idx = np.unravel_index(clean[0], flags.shape)
+                        time_idx = start + int(offset)
+                        ddm_2d = block[offset, channel_idx]
+                        print(f"📐 Selected DDM from time {time_idx}, channel {channel_idx}: {ddm_2d.shape}"
+                              + (f" ({clean[0]} anomalous DDMs skipped)" if clean[0] else ""))
                     else:
+                        time_idx = channel_idx = 0
                         ddm_2d = power_data[0] if len(power_data.shape) > 2 else power_data
                     
                     # Get delay and doppler coordinates
-                    delay_coords = None
-                    doppler_coords = None
+                    delay_coords = meta["delay"]
+                    doppler_coords = meta["doppler"]
                     
-                    if 'delay' in dataset.variables:
-                        delay_coords = dataset.variables['delay'][:]
+                    if delay_coords is not None:
                         print(f"✅ Found delay coordinates: {len(delay_coords)} bins")
                     
-                    if 'doppler' in dataset.variables:
-                        doppler_coords = dataset.variables['doppler'][:]
+                    if doppler_coords is not None:
                         print(f"✅ Found doppler coordinates: {len(doppler_coords)} bins")
                     
                     # Extract DDM points
@@ -87,13 +101,17 @@ def process_existing_cygnss_files():
                     
                     print(f"🔬 Extracting {rows}x{cols} DDM data points...")
                     
+                    # Calibrate the whole DDM to dB from the variable's units;
+                    # missing and non-positive bins have no dB value and are skipped
+                    raw_2d = np.ma.filled(np.ma.asarray(ddm_2d, dtype=np.float64), np.nan)
+                    valid = valid_power(raw_2d, units)
+                    ddm_db = power_to_db(raw_2d, units)
+                    
                     for i in range(rows):
                         for j in range(cols):
                             try:
-                                power_val = ddm_2d[i, j]
-                                
                                 # Skip invalid values
-                                if np.isnan(power_val) or np.isinf(power_val) or power_val <= 0:
+                                if not valid[i, j]:
                                     continue
                                 
                                 # Use real coordinates if available
@@ -107,11 +125,7 @@ def process_existing_cygnss_files():
                                 else:
                                     doppler = (j - cols//2) * 50  # Default CYGNSS resolution
                                 
-                                # Convert power to dB if needed
-                                if power_val > 100:  # Likely linear scale
-                                    power_db = 10 * np.log10(power_val)
-                                else:
-                                    power_db = float(power_val)
+                                power_db = float(ddm_db[i, j])
                                 
                                 ddm_points.append({
                                     "delay": delay,
@@ -141,6 +155,7 @@ def process_existing_cygnss_files():
                             "delay_bins": rows,
                             "doppler_bins": cols,
                             "total_points": len(ddm_points),
+                            "power_units": db_units_label(units),
                             "source": "Real NASA CYGNSS Level 1 data",
                             "processing_note": f"Extracted from time sample {time_idx}, channel {channel_idx}"
                         }
@@ -177,8 +192,7 @@ def process_existing_cygnss_files():
         output_path = Path("./public/cygnss_data.json")
         output_path.parent.mkdir(exist_ok=True)
         
-        with open(output_path, 'w') as f:
-            json.dump(cygnss_output, f, indent=2)
+        write_json_atomic(output_path, cygnss_output)
         
         print(f"\n🎉 SUCCESS! Real CYGNSS data saved to: {output_path}")
         print(f"🛰️ Contains {len(processed_data[0]['ddm_data'])} actual satellite measurements!")
@@ -191,10 +205,23 @@ def process_existing_cygnss_files():
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description="Process downloaded CYGNSS NetCDF files into public/cygnss_data.json")
+    parser.add_argument("--check", action="store_true",
+                        help="Report dependencies and local granules, then exit")
+    parser.add_argument("--no-wait", action="store_true",
+                        help="Exit without waiting for Enter (for cron)")
+    args = parser.parse_args()
+    
     print("🛰️ Real CYGNSS Data Processor")
     print("=" * 35)
     print()
     
+    if args.check:
+        from cygnss_preflight import preflight, print_report
+        print_report(preflight())
+        print(f"📁 {len(list(Path('./data').glob('*.nc')))} NetCDF files in ./data")
+        return
+    
     success = process_existing_cygnss_files()
     
     if success:
@@ -209,7 +236,8 @@ def main():
     else:
         print("\n❌ Processing failed. Check the errors above.")
     
-    input("\nPress Enter to exit...")
+    if not args.no_wait:
+        input("\nPress Enter to exit...")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,641 @@
+#!/usr/bin/env python3
+"""
+CYGNSS Processing Benchmarks
+Times the extraction, conversion, serialization and discovery hot paths on
+synthetic NetCDF granules shaped like CYGNSS L1 (samples x 4 x 17 x 11).
+A standalone script rather than a pytest-benchmark/asv suite: it needs no
+extra dependency, reports tracemalloc peak memory per case next to the time,
+and compares runs with --save/--baseline. Inputs are built per selected case.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import warnings
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+sys.path.insert(0, str(SCRIPTS_DIR.parent))
+
+CHANNELS = 4
+DELAY_BINS = 17
+DOPPLER_BINS = 11
+DELAY_RESOLUTION = 0.25    # chips
+DOPPLER_RESOLUTION = 500.0  # Hz
+
+
+def synthetic_granule_name(spacecraft=1, start=None, hours=1):
+    """Build a CYGNSS-style L1 file name for a synthetic granule"""
+    start = start or datetime(2018, 8, 1, tzinfo=timezone.utc)
+    end = start + timedelta(hours=hours) - timedelta(seconds=1)
+    return (f"cyg{spacecraft:02d}.ddmi.s{start:%Y%m%d-%H%M%S}-e{end:%Y%m%d-%H%M%S}"
+            f".l1.power-brcs.a31.d32.nc")
+
+
+def make_synthetic_cubes(n_samples, channels=CHANNELS, seed=0):
+    """Generate DDM power cubes (W) with a known sub-bin specular peak per DDM"""
+    rng = np.random.default_rng(seed)
+    shape = (n_samples, channels)
+
+    # True specular bin location, kept away from the edges like real L1 DDMs
+    peak_row = rng.uniform(6.0, 10.0, shape)
+    peak_col = rng.uniform(4.0, 6.0, shape)
+    amplitude = 10 ** rng.uniform(-18.5, -16.5, shape)
+    noise_floor = 10 ** rng.uniform(-19.3, -18.7, shape)
+
+    rows = np.arange(DELAY_BINS, dtype=np.float64)[:, None]
+    cols = np.arange(DOPPLER_BINS, dtype=np.float64)[None, :]
+    dr = rows - peak_row[..., None, None]
+    dc = cols - peak_col[..., None, None]
+
+    # Sharp leading edge, slow trailing edge along delay; Gaussian in Doppler
+    delay_width = np.where(dr < 0, 1.0, 2.5)
+    signal = np.exp(-0.5 * (dr / delay_width) ** 2 - 0.5 * (dc / 1.2) ** 2)
+    power = amplitude[..., None, None] * signal
+    power += noise_floor[..., None, None] * rng.gamma(16.0, 1.0 / 16.0, power.shape)
+
+    return {
+        "power": power.astype(np.float32),
+        "peak_row": peak_row.astype(np.float32),
+        "peak_col": peak_col.astype(np.float32),
+        "noise_floor": noise_floor.astype(np.float32),
+    }
+
+
+def make_synthetic_granule(path, n_samples=1000, spacecraft=1, start=None, seed=0):
+    """Write a synthetic CYGNSS L1-like NetCDF granule and return its path"""
+    import netCDF4 as nc
+
+    start = start or datetime(2018, 8, 1, tzinfo=timezone.utc)
+    cubes = make_synthetic_cubes(n_samples, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    shape = (n_samples, CHANNELS)
+
+    with nc.Dataset(path, "w") as ds:
+        ds.createDimension("sample", n_samples)
+        ds.createDimension("ddm", CHANNELS)
+        ds.createDimension("delay", DELAY_BINS)
+        ds.createDimension("doppler", DOPPLER_BINS)
+        ds.time_coverage_start = start.strftime("%Y-%m-%dT%H:%M:%S.000000000Z")
+        ds.time_coverage_end = (start + timedelta(seconds=n_samples - 1)).strftime("%Y-%m-%dT%H:%M:%S.000000000Z")
+
+        sc = ds.createVariable("spacecraft_num", "i1")
+        sc[...] = spacecraft
+
+        delay = ds.createVariable("delay", "f4", ("delay",))
+        delay.units = "chips"
+        delay[:] = (np.arange(DELAY_BINS) - DELAY_BINS // 2) * DELAY_RESOLUTION
+
+        doppler = ds.createVariable("doppler", "f4", ("doppler",))
+        doppler.units = "Hz"
+        doppler[:] = (np.arange(DOPPLER_BINS) - DOPPLER_BINS // 2) * DOPPLER_RESOLUTION
+
+        ts = ds.createVariable("ddm_timestamp_utc", "f8", ("sample",))
+        ts.units = f"seconds since {start:%Y-%m-%d %H:%M:%S}"
+        ts[:] = np.arange(n_samples, dtype=np.float64)
+
+        chunks = (min(n_samples, 256), CHANNELS, DELAY_BINS, DOPPLER_BINS)
+        power = ds.createVariable("power_analog", "f4", ("sample", "ddm", "delay", "doppler"),
+                                  zlib=True, complevel=1, chunksizes=chunks)
+        power.units = "W"
+        power[:] = cubes["power"]
+
+        noise = ds.createVariable("ddm_noise_floor", "f4", ("sample", "ddm"))
+        noise.units = "W"
+        noise[:] = cubes["noise_floor"]
+
+        for name, values in (("brcs_ddm_sp_bin_delay_row", cubes["peak_row"]),
+                             ("brcs_ddm_sp_bin_dopp_col", cubes["peak_col"])):
+            var = ds.createVariable(name, "f4", ("sample", "ddm"))
+            var[:] = values
+
+        track_lat = np.linspace(-30.0, 30.0, n_samples)[:, None]
+        lat = ds.createVariable("sp_lat", "f4", ("sample", "ddm"))
+        lat.units = "degrees_north"
+        lat[:] = track_lat + rng.uniform(-5, 5, shape)
+
+        lon = ds.createVariable("sp_lon", "f4", ("sample", "ddm"))
+        lon.units = "degrees_east"
+        lon[:] = (np.linspace(60.0, 120.0, n_samples)[:, None] + rng.uniform(-5, 5, shape)) % 360
+
+        inc = ds.createVariable("sp_inc_angle", "f4", ("sample", "ddm"))
+        inc.units = "degree"
+        inc[:] = rng.uniform(5, 60, shape)
+
+        prn = ds.createVariable("prn_code", "i1", ("sample", "ddm"))
+        prn[:] = rng.integers(1, 33, shape)
+
+        flags = ds.createVariable("quality_flags", "u4", ("sample", "ddm"))
+        flags[:] = np.where(rng.random(shape) < 0.05, 2, 0)
+
+    return path
+
+
+def _measure(func, repeat):
+    """Run func `repeat` times; return best wall time, peak traced memory and last result"""
+    best = float("inf")
+    peak = 0
+    result = None
+    for _ in range(repeat):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - t0
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        best = min(best, elapsed)
+    return best, peak, result
+
+
+def _db_per_bin(cube):
+    """Per-bin dB conversion the way the extractors apply it today"""
+    out = np.empty(cube.shape, dtype=np.float64)
+    flat_in = cube.reshape(-1)
+    flat_out = out.reshape(-1)
+    for k in range(flat_in.size):
+        power_db = float(flat_in[k])
+        if power_db > 1000:
+            power_db = 10 * np.log10(max(power_db, 1e-10))
+        flat_out[k] = power_db
+    return out
+
+
+def _cube_to_points(cube, delay, doppler):
+    """Convert one DDM into the list-of-dicts format written to public/cygnss_data.json"""
+    return [
+        {"delay": float(delay[i]), "doppler": float(doppler[j]), "power": float(cube[i, j])}
+        for i in range(cube.shape[0]) for j in range(cube.shape[1])
+    ]
+
+
+def _read_single_ddms(archive_path, indices):
+    """Random single-DDM reads through one open archive"""
+    import cygnss_archive
+
+    dataset = cygnss_archive.open_archive(archive_path)
+    try:
+        return [cygnss_archive.read_ddm(dataset, int(i))[0] for i in indices]
+    finally:
+        dataset.close()
+
+
+class Fixtures:
+    """Benchmark inputs in a scratch directory, each built on first use
+
+    Cases only touch the fixtures they time, so a run limited with --only
+    builds (and risks) nothing else.
+    """
+
+    def __init__(self, workdir, n_samples, n_files, json_ddms):
+        import cygnss_metadata
+
+        self.workdir = workdir
+        self.n_samples = n_samples
+        self.n_files = n_files
+        self.json_ddms = json_ddms
+        self.n_ddms = n_samples * CHANNELS
+        self.delay = (np.arange(DELAY_BINS) - DELAY_BINS // 2) * DELAY_RESOLUTION
+        self.doppler = (np.arange(DOPPLER_BINS) - DOPPLER_BINS // 2) * DOPPLER_RESOLUTION
+        # Keep the granule metadata cache inside the scratch directory
+        cygnss_metadata.DEFAULT_CACHE_DIR = str(workdir / ".cygnss_cache")
+
+    @cached_property
+    def granule(self):
+        return make_synthetic_granule(str(self.workdir / synthetic_granule_name()), self.n_samples)
+
+    @cached_property
+    def cubes(self):
+        return make_synthetic_cubes(self.n_samples)["power"]
+
+    @cached_property
+    def cubes_db(self):
+        from cygnss_calibration import to_db
+
+        return to_db(self.cubes)
+
+    @cached_property
+    def tree(self):
+        """Discovery tree: empty placeholder granules spread over day directories"""
+        tree = self.workdir / "tree"
+        for k in range(self.n_files):
+            day_dir = tree / f"2018/{213 + k % 30:03d}"
+            day_dir.mkdir(parents=True, exist_ok=True)
+            (day_dir / synthetic_granule_name(1 + k % 8, hours=k + 1)).touch()
+        return tree
+
+    @cached_property
+    def json_cubes(self):
+        return self.cubes.reshape(-1, DELAY_BINS, DOPPLER_BINS)[:self.json_ddms]
+
+    @cached_property
+    def archive(self):
+        import cygnss_archive
+
+        archive = self.workdir / "archive.nc"
+        cygnss_archive.write_archive(str(archive), [self.granule], verbose=False)
+        return str(archive)
+
+    @cached_property
+    def sim_params(self):
+        from cygnss_simulate import random_params
+
+        return random_params(self.n_ddms, seed=0)
+
+    @cached_property
+    def sim(self):
+        """Simulated DDMs with their noise-free signal and BRCS factor for the wind cases"""
+        from cygnss_simulate import simulate_ddms
+        from cygnss_wind import nominal_brcs_factor
+
+        sim = simulate_ddms(**self.sim_params, seed=0)
+        sim["signal"] = sim["power"] - sim["noise_floor"][:, None, None]
+        sim["brcs_factor"] = nominal_brcs_factor(self.sim_params["incidence"], self.sim_params["rx_gain_db"])
+        return sim
+
+    @cached_property
+    def lut(self):
+        from cygnss_wind import build_lut
+
+        return build_lut()
+
+    @cached_property
+    def mixed(self):
+        from cygnss_coherence import synthetic_cubes
+
+        return synthetic_cubes(self.n_ddms, seed=0)
+
+    @cached_property
+    def corrupted(self):
+        from cygnss_anomaly import inject_anomalies
+
+        return inject_anomalies(self.cubes)[0]
+
+    @cached_property
+    def bundle_dir(self):
+        """Four granules for the multi-worker bundle cases"""
+        bundle_dir = self.workdir / "bundle"
+        bundle_dir.mkdir(exist_ok=True)
+        for k in range(4):
+            make_synthetic_granule(str(bundle_dir / synthetic_granule_name(1 + k)), self.n_samples, 1 + k, seed=k)
+        return bundle_dir
+
+    @cached_property
+    def similarity_bundle(self):
+        from cygnss_compact import save_bundle
+
+        path = str(self.workdir / "similarity.npz")
+        save_bundle(path, self.cubes_db, self.delay, self.doppler, units='dB(W)')
+        return path
+
+    @cached_property
+    def indexes(self):
+        from cygnss_similarity import DDMIndex
+
+        return {kind: DDMIndex.build(self.similarity_bundle, kind) for kind in ('flat', 'ivf')}
+
+
+def build_cases(workdir, n_samples, n_files, json_ddms):
+    """Benchmark cases as (name, setup); setup() builds the case's inputs and returns (func, items, nbytes)
+
+    Only the setups of the cases that run are called, outside the timings.
+    """
+    import cygnss_archive
+    from cygnss_calibration import to_db
+    from cygnss_compact import encode_cubes
+    from cygnss_slices import ddm_slices, subbin_peak
+    from cygnss_noise import normalize_chunk
+    from cygnss_stats import OnlineStats
+    from cygnss_simulate import simulate_ddms
+    from cygnss_anomaly import anomaly_flags
+    from cygnss_coherence import classify_cubes
+    from cygnss_wind import INCIDENCE_AXIS, WIND_AXIS, WIND_DIRECTIONS, build_lut, observables
+    from cygnss_handoff import handoff, synthetic_chunks
+    from cygnss_kernels import HAVE_NUMBA
+    from cygnss_similarity import DDMIndex
+    from process_cygnss_data import extract_ddm_from_cygnss, find_cygnss_files, write_ddm_bundle
+    from simple_cygnss_download import process_real_netcdf_files
+
+    fx = Fixtures(workdir, n_samples, n_files, json_ddms)
+    n_ddms = fx.n_ddms
+    cube_bytes = n_ddms * DELAY_BINS * DOPPLER_BINS * 4
+
+    def granule_case(func):
+        granule = fx.granule
+        return lambda: func(granule), 1, os.path.getsize(granule)
+
+    def cube_case(func, cubes='cubes'):
+        data = getattr(fx, cubes)
+        return lambda: func(data), n_ddms, data.nbytes
+
+    def write_json():
+        ddms = [{"ddm_data": _cube_to_points(c, fx.delay, fx.doppler), "metadata": {"index": k}}
+                for k, c in enumerate(fx.json_cubes)]
+        out_path = workdir / "cygnss_data.json"
+        with open(out_path, "w") as f:
+            json.dump({"status": "success", "all_ddms": ddms}, f, indent=2)
+        return os.path.getsize(out_path)
+
+    def read_json():
+        out_path = workdir / "cygnss_data.json"
+        with open(out_path) as f:
+            data = json.load(f)
+        return np.array([[p["power"] for p in ddm["ddm_data"]] for ddm in data["all_ddms"]], dtype=np.float32)
+
+    def json_case(func):
+        if func is read_json:
+            write_json()
+        return func, len(fx.json_cubes), fx.json_cubes.nbytes
+
+    def write_archive():
+        out_path = workdir / "archive_write.nc"
+        if out_path.exists():
+            out_path.unlink()
+        cygnss_archive.write_archive(str(out_path), [fx.granule], verbose=False)
+        return os.path.getsize(out_path)
+
+    def archive_read_ddm():
+        archive = fx.archive
+        reads = np.random.default_rng(0).integers(0, n_ddms, size=min(n_ddms, 100))
+        return lambda: _read_single_ddms(archive, reads), len(reads), len(reads) * DELAY_BINS * DOPPLER_BINS * 4
+
+    def archive_read_day():
+        archive = fx.archive
+        return lambda: cygnss_archive.read_day(archive, "2018-08-01")["power"], n_ddms, cube_bytes
+
+    def update_stats(cubes_db):
+        stats = OnlineStats()
+        stats.update_chunk(cubes_db, 1)
+        return stats.groups
+
+    def normalize_case():
+        cubes = fx.cubes
+        scratch = np.empty_like(cubes)
+
+        def normalize():
+            np.copyto(scratch, cubes)
+            return normalize_chunk({"power": scratch}, 'W')[0]
+
+        return normalize, n_ddms, cubes.nbytes
+
+    def simulate_case():
+        params = fx.sim_params
+        return lambda: simulate_ddms(**params, seed=0)["power"], n_ddms, cube_bytes
+
+    def lut_build_case():
+        cells = INCIDENCE_AXIS.size * WIND_AXIS.size * len(WIND_DIRECTIONS)
+        return lambda: build_lut().tables["ddma"], cells, sum(table.nbytes for table in fx.lut.tables.values())
+
+    def window_observables(backend):
+        sim = fx.sim
+        return observables(sim["signal"], sim["specular_row"], sim["specular_col"], sim["brcs_factor"],
+                           backend=backend)[0]
+
+    def retrieve_wind_case():
+        sim, lut, incidence = fx.sim, fx.lut, fx.sim_params["incidence"]
+
+        def retrieve_wind():
+            ddma, les = observables(sim["signal"], sim["specular_row"], sim["specular_col"], sim["brcs_factor"])
+            return lut.retrieve(incidence, ddma, les)["wind_speed"]
+
+        return retrieve_wind, n_ddms, sim["signal"].nbytes
+
+    def window_case(backend):
+        signal = fx.sim["signal"]
+        # The first Numba call compiles or loads the cached build, outside the timings
+        window_observables(backend)
+        return lambda: window_observables(backend), n_ddms, signal.nbytes
+
+    def subbin_case(method, backend):
+        cubes = fx.cubes
+        if backend == 'numba':
+            subbin_peak(cubes, 'W', method, backend=backend)
+        return lambda: subbin_peak(cubes, 'W', method, backend=backend)["peak_row"], n_ddms, cubes.nbytes
+
+    def coherence_case():
+        power, floor, _ = fx.mixed
+        return lambda: classify_cubes(power, floor), n_ddms, power.nbytes
+
+    # Worker handoff: 4 tasks of 4 chunks of n_samples, two workers
+    handoff_tasks = [(k, (4, n_samples, CHANNELS, k)) for k in range(4)]
+    handoff_ddms = len(handoff_tasks) * 4 * n_ddms
+
+    def move_cubes(mode):
+        total = 0.0
+        for kind, _, cube, _ in handoff(synthetic_chunks, handoff_tasks, 2, mode, n_ddms * DELAY_BINS * DOPPLER_BINS):
+            if kind == "chunk":
+                total += float(cube[:, :, DELAY_BINS // 2].sum())
+        return total
+
+    def handoff_case(mode):
+        return lambda: move_cubes(mode), handoff_ddms, handoff_ddms * DELAY_BINS * DOPPLER_BINS * 4
+
+    def bundle_case(mode):
+        # Multi-granule bundle extracted by two workers
+        bundle_dir = fx.bundle_dir
+        bundle_bytes = sum(os.path.getsize(p) for p in bundle_dir.iterdir())
+        return (lambda: write_ddm_bundle(str(bundle_dir), str(workdir / f"bundle_{mode}.npz"), wind=False,
+                                         cache_dir=str(workdir / ".cygnss_cache"), jobs=2, handoff=mode),
+                4 * n_ddms, bundle_bytes)
+
+    def similarity_build_case():
+        path = fx.similarity_bundle
+        return lambda: DDMIndex.build(path, 'ivf').embeddings, n_ddms, cube_bytes
+
+    def similarity_query_case(kind):
+        # Single-DDM queries, as from the CLI
+        index = fx.indexes[kind]
+        entries = np.random.default_rng(1).integers(0, index.entry.size, size=100)
+        return lambda: [index.search(index.embeddings[entry])[1] for entry in entries], len(entries), 0
+
+    def find_files_case():
+        tree = fx.tree
+        return lambda: find_cygnss_files(str(tree)), n_files, 0
+
+    numba_cases = []
+    if HAVE_NUMBA:
+        numba_cases = [
+            ("subbin_peak_parabolic_numba", lambda: subbin_case('parabolic', 'numba')),
+            ("subbin_peak_quadratic_numba", lambda: subbin_case('quadratic', 'numba')),
+            ("ddma_les_window_numba", lambda: window_case('numba')),
+        ]
+
+    return [
+        ("extract_ddm_from_cygnss", lambda: granule_case(extract_ddm_from_cygnss)),
+        ("process_real_netcdf_files", lambda: granule_case(lambda g: process_real_netcdf_files([Path(g)]))),
+        ("db_conversion_per_bin", lambda: cube_case(_db_per_bin)),
+        ("db_conversion_calibrated", lambda: cube_case(to_db)),
+        ("ddm_slices", lambda: cube_case(lambda c: ddm_slices(c, 'W', fx.delay, fx.doppler)["delay_waveform"])),
+        ("subbin_peak_parabolic", lambda: subbin_case('parabolic', 'numpy')),
+        ("subbin_peak_quadratic", lambda: subbin_case('quadratic', 'numpy')),
+        ("noise_normalize", normalize_case),
+        ("online_stats_update", lambda: cube_case(update_stats, 'cubes_db')),
+        ("zv_simulate", simulate_case),
+        ("wind_lut_build", lut_build_case),
+        ("wind_retrieve", retrieve_wind_case),
+        ("ddma_les_window", lambda: window_case('numpy')),
+        *numba_cases,
+        ("anomaly_flags", lambda: cube_case(lambda c: anomaly_flags(c, 'W'), 'corrupted')),
+        ("coherence_classify", coherence_case),
+        ("handoff_pickle", lambda: handoff_case('pickle')),
+        ("handoff_shared", lambda: handoff_case('shared')),
+        ("bundle_jobs2_pickle", lambda: bundle_case('pickle')),
+        ("bundle_jobs2_shared", lambda: bundle_case('shared')),
+        ("quantize_uint8", lambda: cube_case(lambda c: encode_cubes(c, 'uint8')["power"], 'cubes_db')),
+        ("encode_pca", lambda: cube_case(lambda c: encode_cubes(c, 'pca')["power"], 'cubes_db')),
+        ("similarity_build_ivf", similarity_build_case),
+        ("similarity_query_flat", lambda: similarity_query_case('flat')),
+        ("similarity_query_ivf", lambda: similarity_query_case('ivf')),
+        ("json_write", lambda: json_case(write_json)),
+        ("json_read", lambda: json_case(read_json)),
+        ("archive_write", lambda: (write_archive, n_ddms, cube_bytes)),
+        ("archive_read_ddm", archive_read_ddm),
+        ("archive_read_day", archive_read_day),
+        ("find_cygnss_files", find_files_case),
+    ]
+
+
+def run_benchmarks(n_samples=1000, n_files=2000, repeat=3, only=None, json_ddms=500):
+    """Run every benchmark case (or those named in ``only``) and return a list of result records"""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="cygnss_bench_") as tmp:
+        cases = build_cases(Path(tmp), n_samples, n_files, json_ddms)
+        for name in sorted(set(only or ()) - {name for name, _ in cases}):
+            print(f"⚠️  Unknown case {name}")
+        for name, setup in cases:
+            if only and name not in only:
+                continue
+            # Extractors print progress; keep the report readable
+            with open(os.devnull, "w") as devnull, warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    func, items, nbytes = setup()
+                    seconds, peak, result = _measure(func, repeat)
+                finally:
+                    sys.stdout = stdout
+            results.append({
+                "name": name,
+                # A case that returns nothing timed a failure path, not real work
+                "ok": result is not None and (not hasattr(result, "__len__") or len(result) > 0),
+                "seconds": seconds,
+                "items": items,
+                "items_per_s": items / seconds if seconds > 0 else float("inf"),
+                "mb_per_s": nbytes / 1e6 / seconds if seconds > 0 and nbytes else None,
+                "peak_mb": peak / 1e6,
+            })
+    return results
+
+
+def peak_accuracy(n_samples=10000, seed=1):
+    """Sub-bin peak error of each estimator against the synthetic true peak (bins)"""
+    from cygnss_slices import PEAK_METHODS, subbin_peak
+
+    cubes = make_synthetic_cubes(n_samples, seed=seed)
+    rows = []
+    for method in PEAK_METHODS:
+        started = time.perf_counter()
+        fit = subbin_peak(cubes["power"], 'W', method)
+        seconds = time.perf_counter() - started
+        row_err = fit["peak_row"] - cubes["peak_row"]
+        col_err = fit["peak_col"] - cubes["peak_col"]
+        rows.append({
+            "method": method,
+            "row_rms": float(np.sqrt(np.mean(row_err ** 2))),
+            "row_bias": float(np.mean(row_err)),
+            "col_rms": float(np.sqrt(np.mean(col_err ** 2))),
+            "col_bias": float(np.mean(col_err)),
+            "ddms_per_s": cubes["power"].shape[0] * cubes["power"].shape[1] / seconds,
+        })
+    return rows
+
+
+def print_peak_accuracy(rows):
+    print(f"{'method':<12}{'delay rms':>11}{'bias':>8}{'chips':>8}{'Doppler rms':>13}{'bias':>8}{'Hz':>7}{'DDMs/s':>12}")
+    print("-" * 79)
+    for r in rows:
+        print(f"{r['method']:<12}{r['row_rms']:>11.3f}{r['row_bias']:>8.3f}{r['row_rms'] * DELAY_RESOLUTION:>8.3f}"
+              f"{r['col_rms']:>13.3f}{r['col_bias']:>8.3f}{r['col_rms'] * DOPPLER_RESOLUTION:>7.0f}"
+              f"{r['ddms_per_s']:>12.0f}")
+
+
+def print_report(results, baseline=None):
+    """Print results as a table, with speedups against a baseline run if given"""
+    base = {r["name"]: r for r in (baseline or [])}
+    print(f"{'case':<28}{'time (s)':>10}{'items/s':>14}{'MB/s':>10}{'peak MB':>10}{'speedup':>10}")
+    print("-" * 82)
+    failed = []
+    for r in results:
+        mb_s = f"{r['mb_per_s']:.1f}" if r["mb_per_s"] is not None else "-"
+        speedup = "-"
+        if r["name"] in base:
+            speedup = f"{base[r['name']]['seconds'] / r['seconds']:.2f}x"
+        print(f"{r['name']:<28}{r['seconds']:>10.4f}{r['items_per_s']:>14.1f}{mb_s:>10}"
+              f"{r['peak_mb']:>10.1f}{speedup:>10}")
+        if not r.get("ok", True):
+            failed.append(r["name"])
+    for name in failed:
+        print(f"⚠️  {name} returned no data; its timing covers the failure path only")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CYGNSS processing hot paths on synthetic granules")
+    parser.add_argument("--samples", "-n", type=int, default=1000,
+                        help="Samples per synthetic granule (each sample holds 4 DDMs)")
+    parser.add_argument("--files", type=int, default=2000,
+                        help="Number of placeholder granules for the discovery benchmark")
+    parser.add_argument("--json-ddms", type=int, default=500,
+                        help="DDMs serialized by the JSON output benchmark")
+    parser.add_argument("--repeat", "-r", type=int, default=3,
+                        help="Repetitions per case (best time is reported)")
+    parser.add_argument("--only", nargs="*",
+                        help="Run only the named cases")
+    parser.add_argument("--save", metavar="FILE",
+                        help="Write results as JSON for later comparison")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="Compare against results saved with --save")
+    parser.add_argument("--peak-accuracy", action="store_true",
+                        help="Report sub-bin peak estimator error against the synthetic truth and exit")
+
+    args = parser.parse_args()
+
+    if args.peak_accuracy:
+        print("🎯 Sub-bin Peak Accuracy (errors in bins)")
+        print("=" * 50)
+        print_peak_accuracy(peak_accuracy(args.samples))
+        return
+
+    print("⏱️  CYGNSS Processing Benchmarks")
+    print("=" * 50)
+    print(f"📐 {args.samples} samples x {CHANNELS} x {DELAY_BINS} x {DOPPLER_BINS}, repeat={args.repeat}")
+    print("📝 Peak memory is Python/NumPy allocations traced by tracemalloc\n")
+
+    results = run_benchmarks(args.samples, args.files, args.repeat, args.only, args.json_ddms)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    print_report(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "samples": args.samples,
+                "files": args.files,
+                "results": results,
+            }, f, indent=2)
+        print(f"\n✅ Results saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+CYGNSS DDM Archive
+Chunked, compressed NetCDF4/HDF5 archive of every extracted DDM (power in dB)
+plus per-DDM metadata, laid out for two access patterns:
+
+  one DDM  -> power chunks hold DEFAULT_CHUNK_DDMS DDMs (~380 kB raw), so a
+              single-DDM read decompresses one small chunk
+  one day  -> DDMs are appended granule by granule and each granule's row range
+              and time span is recorded, so a day is a few contiguous slices
+
+Peak/mean power, the delay waveform and the Doppler spectrum of every DDM
+(cygnss_slices) are stored with it.
+
+Compression is blosc/zstd with bit-shuffle when the netCDF-C library has the
+plugins, plain zstd or zlib otherwise.
+"""
+
+import os
+import argparse
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+from cygnss_metadata import DEFAULT_CACHE_DIR, get_cache
+from cygnss_extract import iter_ddm_chunks
+from cygnss_calibration import calibrate_chunk, variable_units
+from cygnss_slices import SLICE_FIELDS, ddm_slices
+
+DEFAULT_CHUNK_DDMS = 512
+# Per-DDM metadata is tiny, so it uses much longer chunks
+METADATA_CHUNK_DDMS = 16384
+DEFAULT_COMPLEVEL = 5
+
+# name -> (dtype, fill value)
+DDM_VARIABLES = {
+    'time': ('f8', np.nan),
+    'lat': ('f4', np.nan),
+    'lon': ('f4', np.nan),
+    'quality': ('i4', 0),
+    'prn': ('i2', 0),
+    'sample': ('i4', -1),
+    'channel': ('i1', -1),
+    'granule': ('i4', -1),
+}
+# Precomputed per-DDM summaries (cygnss_slices), stored next to the power cube
+SUMMARY_VARIABLES = {
+    'peak_power': ('f4', np.nan),
+    'peak_delay_bin': ('i1', -1),
+    'peak_doppler_bin': ('i1', -1),
+    'mean_power': ('f4', np.nan),
+    'peak_row': ('f4', np.nan),
+    'peak_col': ('f4', np.nan),
+}
+
+
+def default_compression():
+    """Best lossless compressor available in this netCDF4 build"""
+    import netCDF4 as nc
+    if getattr(nc, '__has_blosc_support__', False):
+        return 'blosc_zstd'
+    if getattr(nc, '__has_zstandard_support__', False):
+        return 'zstd'
+    return 'zlib'
+
+
+def _compression_args(compression, complevel):
+    if compression in (None, 'none'):
+        return {}
+    args = {"compression": compression, "complevel": complevel, "shuffle": True}
+    if compression.startswith('blosc'):
+        args["blosc_shuffle"] = 2  # bit-shuffle
+    return args
+
+
+def _create_archive(path, delay, doppler, units, compression, complevel, chunk_ddms,
+                    significant_digits=None):
+    import netCDF4 as nc
+
+    dataset = nc.Dataset(path, 'w', format='NETCDF4')
+    dataset.title = "CYGNSS DDM archive"
+    dataset.created = datetime.now(timezone.utc).isoformat()
+    dataset.compression = compression or 'none'
+
+    dataset.createDimension('ddm', None)
+    dataset.createDimension('delay', len(delay))
+    dataset.createDimension('doppler', len(doppler))
+    dataset.createDimension('granule', None)
+
+    dataset.createVariable('delay', 'f4', ('delay',))[:] = np.asarray(delay, dtype=np.float32)
+    dataset.createVariable('doppler', 'f4', ('doppler',))[:] = np.asarray(doppler, dtype=np.float32)
+
+    comp = _compression_args(compression, complevel)
+    power = dataset.createVariable('power', 'f4', ('ddm', 'delay', 'doppler'), fill_value=np.nan,
+                                   chunksizes=(chunk_ddms, len(delay), len(doppler)),
+                                   significant_digits=significant_digits, **comp)
+    power.units = units or 'dB'
+
+    for name, (dtype, fill) in DDM_VARIABLES.items():
+        var = dataset.createVariable(name, dtype, ('ddm',), fill_value=fill,
+                                     chunksizes=(METADATA_CHUNK_DDMS,), **comp)
+        if name == 'time':
+            var.units = "seconds since 1970-01-01T00:00:00Z"
+    for name, (dtype, fill) in SUMMARY_VARIABLES.items():
+        dataset.createVariable(name, dtype, ('ddm',), fill_value=fill,
+                               chunksizes=(METADATA_CHUNK_DDMS,), **comp)
+    for name, axis in SLICE_FIELDS.items():
+        dataset.createVariable(name, 'f4', ('ddm', axis), fill_value=np.nan,
+                               chunksizes=(chunk_ddms, len(delay if axis == 'delay' else doppler)), **comp)
+
+    dataset.createVariable('granule_name', str, ('granule',))
+    for name, dtype in (('granule_start', 'i8'), ('granule_count', 'i8'),
+                        ('granule_time_start', 'f8'), ('granule_time_end', 'f8'),
+                        ('granule_spacecraft', 'i2')):
+        dataset.createVariable(name, dtype, ('granule',))
+    return dataset
+
+
+def archived_granules(path):
+    """Names of the granules already in an archive"""
+    import netCDF4 as nc
+
+    if not os.path.exists(path):
+        return set()
+    with nc.Dataset(path, 'r') as dataset:
+        return set(dataset.variables['granule_name'][:].tolist())
+
+
+def write_archive(archive_path, files, cache_dir=None, compression=None, complevel=DEFAULT_COMPLEVEL,
+                  chunk_ddms=DEFAULT_CHUNK_DDMS, significant_digits=None, verbose=True):
+    """Append the DDMs of granules to an archive; returns the number of DDMs written
+
+    Granules already in the archive are skipped, and granules whose
+    delay/Doppler axes differ from the archive's are skipped with a warning.
+    Progress is synced after every chunk, so a run interrupted partway
+    through a granule continues from its last completed chunk.
+    ``significant_digits`` enables lossy rounding of dB values before
+    compression (e.g. 4 keeps 0.01 dB at -150 dB).
+    """
+    import netCDF4 as nc
+
+    compression = compression or default_compression()
+    cache = get_cache(cache_dir)
+    done = archived_granules(archive_path)
+    dataset = nc.Dataset(archive_path, 'a') if os.path.exists(archive_path) else None
+    written = 0
+
+    try:
+        for file_path in files:
+            name = Path(file_path).name
+            if name in done:
+                continue
+            meta = cache.get(file_path)[0]
+            if meta["power_variable"] is None:
+                continue
+            delay = meta["delay"] or list(range(meta["dims"].get('delay', 17)))
+            doppler = meta["doppler"] or list(range(meta["dims"].get('doppler', 11)))
+            units = variable_units(meta, meta["power_variable"])
+
+            if dataset is None:
+                dataset = _create_archive(archive_path, delay, doppler, None, compression,
+                                          complevel, chunk_ddms, significant_digits)
+            elif (len(delay) != len(dataset.dimensions['delay'])
+                  or not np.allclose(dataset.variables['delay'][:], delay)
+                  or not np.allclose(dataset.variables['doppler'][:], doppler)):
+                print(f"⚠️  Skipping {name}: delay/Doppler axes differ from the archive")
+                continue
+
+            granule_index = len(dataset.dimensions['granule'])
+            # Rows past the last complete granule belong to an interrupted one
+            first_row = row = (int(dataset.variables['granule_start'][granule_index - 1]
+                                   + dataset.variables['granule_count'][granule_index - 1])
+                               if granule_index else 0)
+            start_sample = 0
+            if getattr(dataset, 'partial_key', None) == meta["key"]:
+                row, start_sample = int(dataset.partial_row), int(dataset.partial_next_sample)
+                if verbose:
+                    print(f"⏩ {name}: resuming at sample {start_sample}")
+
+            for chunk in iter_ddm_chunks(file_path, meta=meta, start_sample=start_sample):
+                power, db_units = calibrate_chunk(chunk, units)
+                n, channels = power.shape[:2]
+                stop = row + n * channels
+                dataset.variables['power'][row:stop] = power.reshape(n * channels, len(delay), len(doppler))
+                dataset.variables['power'].units = db_units
+                columns = {
+                    'time': np.repeat(chunk["time"], channels),
+                    'lat': chunk["lat"].reshape(-1),
+                    'lon': chunk["lon"].reshape(-1),
+                    'quality': chunk["quality"].reshape(-1),
+                    'prn': chunk["prn"].reshape(-1),
+                    'sample': np.repeat(np.arange(chunk["sample_start"], chunk["sample_start"] + n), channels),
+                    'channel': np.tile(np.arange(channels), n),
+                    'granule': np.full(n * channels, granule_index),
+                }
+                if 'delay_waveform' in dataset.variables:
+                    slices = ddm_slices(power, db_units)
+                    for var_name in [*SUMMARY_VARIABLES, *SLICE_FIELDS]:
+                        columns[var_name] = slices[var_name].reshape(n * channels, *slices[var_name].shape[2:])
+                for var_name, values in columns.items():
+                    dataset.variables[var_name][row:stop] = values
+                row = stop
+                # Chunk checkpoint: where to pick this granule up after a crash
+                dataset.setncatts({"partial_key": meta["key"], "partial_row": row,
+                                   "partial_next_sample": chunk["sample_start"] + n})
+                dataset.sync()
+
+            times = dataset.variables['time'][first_row:row] if row > first_row else np.array([np.nan])
+            times = np.ma.filled(np.ma.asarray(times, dtype=np.float64), np.nan)
+            dataset.variables['granule_name'][granule_index] = name
+            dataset.variables['granule_start'][granule_index] = first_row
+            dataset.variables['granule_count'][granule_index] = row - first_row
+            dataset.variables['granule_time_start'][granule_index] = np.nanmin(times)
+            dataset.variables['granule_time_end'][granule_index] = np.nanmax(times)
+            dataset.variables['granule_spacecraft'][granule_index] = meta["spacecraft"] or 0
+            for attr in ('partial_key', 'partial_row', 'partial_next_sample'):
+                if attr in dataset.ncattrs():
+                    dataset.delncattr(attr)
+            dataset.sync()
+
+            written += row - first_row
+            if verbose:
+                print(f"📦 {name}: {row - first_row} DDMs")
+    finally:
+        if dataset is not None:
+            dataset.close()
+    return written
+
+
+def open_archive(archive_path):
+    """Open an archive for repeated reads (pass the result to read_ddm/read_day)"""
+    import netCDF4 as nc
+
+    dataset = nc.Dataset(archive_path, 'r')
+    dataset.set_auto_mask(False)
+    return dataset
+
+
+@contextmanager
+def _reading(archive):
+    """Dataset for a path (opened and closed here) or an already open archive"""
+    if isinstance(archive, (str, os.PathLike)):
+        dataset = open_archive(archive)
+        try:
+            yield dataset
+        finally:
+            dataset.close()
+    else:
+        with nullcontext(archive) as dataset:
+            yield dataset
+
+
+def read_ddm(archive, index):
+    """One DDM (delay x doppler, dB) and its metadata by archive row
+
+    ``archive`` is a path or a dataset from open_archive; keep one open when
+    reading many single DDMs.
+    """
+    with _reading(archive) as dataset:
+        record = {name: dataset.variables[name][index].item() for name in DDM_VARIABLES}
+        for name in [*SUMMARY_VARIABLES, *SLICE_FIELDS]:
+            if name in dataset.variables:
+                value = dataset.variables[name][index]
+                record[name] = value.item() if np.ndim(value) == 0 else value
+        record["granule_name"] = dataset.variables['granule_name'][record["granule"]]
+        return dataset.variables['power'][index], record
+
+
+def read_day(archive, day, spacecraft=None):
+    """All DDMs whose time falls on a UTC day, as a dict of arrays
+
+    ``day`` is a date, datetime or 'YYYY-MM-DD'. Only the row ranges of granules
+    overlapping the day are read.
+    """
+    if isinstance(day, str):
+        day = datetime.strptime(day, "%Y-%m-%d")
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+    end = start + timedelta(days=1).total_seconds()
+
+    with _reading(archive) as dataset:
+        granule_start = dataset.variables['granule_start'][:]
+        granule_count = dataset.variables['granule_count'][:]
+        overlaps = ((dataset.variables['granule_time_start'][:] < end)
+                    & (dataset.variables['granule_time_end'][:] >= start))
+        if spacecraft is not None:
+            overlaps &= np.isin(dataset.variables['granule_spacecraft'][:], np.atleast_1d(spacecraft))
+
+        parts = {name: [] for name in ['power', *DDM_VARIABLES, *SUMMARY_VARIABLES, *SLICE_FIELDS]
+                 if name in dataset.variables}
+        for g in np.flatnonzero(overlaps):
+            rows = slice(int(granule_start[g]), int(granule_start[g] + granule_count[g]))
+            time = dataset.variables['time'][rows]
+            keep = (time >= start) & (time < end)
+            parts['time'].append(time[keep])
+            for name in parts:
+                if name != 'time':
+                    parts[name].append(dataset.variables[name][rows][keep])
+
+        result = {name: np.concatenate(values) if values else np.empty((0,) + dataset.variables[name].shape[1:])
+                  for name, values in parts.items()}
+        result["delay"] = dataset.variables['delay'][:]
+        result["doppler"] = dataset.variables['doppler'][:]
+        result["granule_names"] = dataset.variables['granule_name'][:]
+    return result
+
+
+def main():
+    from process_cygnss_data import find_cygnss_files
+
+    parser = argparse.ArgumentParser(description="Write extracted CYGNSS DDMs to a compressed chunked archive")
+    parser.add_argument("--data-dir", "-d", default="./data",
+                        help="Directory containing downloaded CYGNSS NetCDF files")
+    parser.add_argument("--archive", "-a", default="./data/cygnss_ddms.nc",
+                        help="Archive file (appended to if it exists)")
+    parser.add_argument("--compression", choices=['blosc_zstd', 'blosc_lz4', 'zstd', 'zlib', 'none'],
+                        help="Compressor (default: best available)")
+    parser.add_argument("--complevel", type=int, default=DEFAULT_COMPLEVEL,
+                        help="Compression level")
+    parser.add_argument("--chunk-ddms", type=int, default=DEFAULT_CHUNK_DDMS,
+                        help="DDMs per power chunk")
+    parser.add_argument("--significant-digits", type=int,
+                        help="Lossy: keep this many significant digits of dB power")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Granule metadata cache directory")
+
+    args = parser.parse_args()
+
+    print("🛰️  CYGNSS DDM Archive")
+    print("=" * 50)
+    files = find_cygnss_files(args.data_dir)
+    if not files:
+        print(f"❌ No CYGNSS files found in {args.data_dir}")
+        return
+
+    written = write_archive(args.archive, files, args.cache_dir, args.compression, args.complevel,
+                            args.chunk_ddms, args.significant_digits)
+    size_mb = os.path.getsize(args.archive) / 1e6 if os.path.exists(args.archive) else 0
+    print(f"✅ {written} new DDMs archived in {args.archive} ({size_mb:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Earthdata Credentials and Sessions
+One authenticated, pooled requests session shared by CMR search and granule
+downloads. The Earthdata Login (URS) bearer token is cached until it expires
+and the URS cookies are kept between runs, both in files only the user can
+read, so a run only sends the username and password when there is no valid
+token yet. The bearer token travels with redirects between Earthdata hosts,
+which skips the per-granule URS redirect/login round trips.
+"""
+
+import os
+import sys
+import json
+import getpass
+import netrc
+import argparse
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from http.cookiejar import LWPCookieJar
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cygnss_checkpoint import atomic_write
+
+URS_URL = os.environ.get("EARTHDATA_URS_URL", "https://urs.earthdata.nasa.gov")
+DEFAULT_AUTH_DIR = os.environ.get("CYGNSS_AUTH_DIR", str(Path.home() / ".cygnss"))
+TOKEN_FILE = "earthdata_token.json"
+COOKIE_FILE = "earthdata_cookies.txt"
+# Tokens are renewed this long before they expire
+TOKEN_MARGIN = timedelta(hours=1)
+# URS tokens live 60 days; used when the response carries no expiration date
+TOKEN_LIFETIME = timedelta(days=60)
+# Hosts the bearer token may be sent to (besides the URS host itself)
+TRUSTED_DOMAINS = ('.earthdata.nasa.gov', '.earthdatacloud.nasa.gov')
+POOL_SIZE = 8
+
+
+@contextmanager
+def _private_file(path):
+    """atomic_write for a file readable by the user only (0600)"""
+    with atomic_write(path) as f:
+        os.chmod(f.name, 0o600)
+        yield f
+
+
+def _parse_expiration(value):
+    """URS gives 'MM/DD/YYYY'; ISO timestamps are accepted too"""
+    if not value:
+        return datetime.now(timezone.utc) + TOKEN_LIFETIME
+    for parse in (lambda v: datetime.strptime(v, "%m/%d/%Y"), datetime.fromisoformat):
+        try:
+            moment = parse(str(value))
+        except ValueError:
+            continue
+        return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) + TOKEN_LIFETIME
+
+
+def netrc_credentials(urs_url=URS_URL):
+    """(username, password) for the URS host from ~/.netrc, or None"""
+    try:
+        entry = netrc.netrc().authenticators(urlparse(urs_url).hostname)
+    except (OSError, netrc.NetrcParseError):
+        return None
+    return (entry[0], entry[2]) if entry else None
+
+
+def find_credentials(urs_url=URS_URL, prompt=True):
+    """Username and password from the environment, ~/.netrc or a prompt (None if unavailable)"""
+    username, password = os.environ.get("EARTHDATA_USERNAME"), os.environ.get("EARTHDATA_PASSWORD")
+    if username and password:
+        return username, password
+    found = netrc_credentials(urs_url)
+    if found:
+        return found
+    if not prompt or not sys.stdin.isatty():
+        return None
+    print("Register at: https://urs.earthdata.nasa.gov/users/new")
+    username = input("Enter your NASA Earthdata username: ").strip()
+    password = getpass.getpass("Enter your NASA Earthdata password: ")
+    return (username, password) if username and password else None
+
+
+class TokenCache:
+    """The bearer token in <auth dir>/earthdata_token.json (mode 0600)"""
+
+    def __init__(self, auth_dir=None, urs_url=URS_URL):
+        self.path = Path(auth_dir or DEFAULT_AUTH_DIR) / TOKEN_FILE
+        self.urs_url = urs_url
+
+    def load(self):
+        """The cached token record if it is for this URS and not about to expire"""
+        try:
+            with open(self.path) as f:
+                record = json.load(f)
+            expires = datetime.fromisoformat(record["expires"])
+        except (OSError, ValueError, KeyError):
+            return None
+        if record.get("urs") != self.urs_url or expires - TOKEN_MARGIN <= datetime.now(timezone.utc):
+            return None
+        return record
+
+    def save(self, username, token_data):
+        record = {"urs": self.urs_url, "username": username,
+                  "access_token": token_data["access_token"],
+                  "token_type": token_data.get("token_type", "Bearer"),
+                  "expires": _parse_expiration(token_data.get("expiration_date")).isoformat()}
+        self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        with _private_file(self.path) as f:
+            json.dump(record, f, indent=2)
+        return record
+
+    def clear(self):
+        if self.path.exists():
+            self.path.unlink()
+
+
+class EarthdataSession(requests.Session):
+    """requests.Session with a cached URS bearer token, persistent cookies and pooled connections
+
+    The token is fetched (once) on the first request without a valid cached
+    one. A 401 from an Earthdata host drops the cached token and retries
+    the request once with a new one.
+    """
+
+    def __init__(self, auth_dir=None, urs_url=URS_URL, credentials=None, prompt=True,
+                 pool_size=POOL_SIZE, retries=3):
+        super().__init__()
+        self.urs_url = urs_url.rstrip('/')
+        self.urs_host = urlparse(self.urs_url).hostname
+        self.auth_dir = Path(auth_dir or DEFAULT_AUTH_DIR)
+        self.tokens = TokenCache(self.auth_dir, self.urs_url)
+        self._credentials, self._prompt = credentials, prompt
+        self.token = None
+
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset({'GET', 'HEAD'}))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+        self.cookies = LWPCookieJar(str(self.auth_dir / COOKIE_FILE))
+        try:
+            self.cookies.load(ignore_discard=True)
+        except (OSError, ValueError):
+            pass
+
+    def _trusted(self, url):
+        host = urlparse(url).hostname or ''
+        return host == self.urs_host or host.endswith(TRUSTED_DOMAINS)
+
+    def credentials(self):
+        if self._credentials is None:
+            self._credentials = find_credentials(self.urs_url, self._prompt)
+        return self._credentials
+
+    def login(self, refresh=False):
+        """The bearer token record, from the cache or URS; None without credentials"""
+        record = None if refresh else self.tokens.load()
+        if record is None:
+            credentials = self.credentials()
+            if credentials is None:
+                return None
+            # find_or_create_token returns the existing token rather than using up URS's two-token limit
+            response = requests.Session.request(
+                self, 'POST', f"{self.urs_url}/api/users/find_or_create_token",
+                auth=credentials, headers={'Accept': 'application/json'}, timeout=30)
+            if response.status_code != 200:
+                raise PermissionError(f"Earthdata login failed: HTTP {response.status_code}")
+            record = self.tokens.save(credentials[0], response.json())
+        self.token = record
+        return record
+
+    def request(self, method, url, **kwargs):
+        if not self._trusted(url) or kwargs.get('auth') is not None:
+            return super().request(method, url, **kwargs)
+        if self.token is None:
+            self.login()
+        response = super().request(method, url, **self._with_token(kwargs))
+        if response.status_code == 401 and self.token is not None:
+            response.close()
+            self.tokens.clear()
+            if self.login(refresh=True) is not None:
+                response = super().request(method, url, **self._with_token(kwargs))
+        return response
+
+    def _with_token(self, kwargs):
+        if self.token is None:
+            return kwargs
+        headers = dict(kwargs.get('headers') or {})
+        headers.setdefault('Authorization', f"Bearer {self.token['access_token']}")
+        return dict(kwargs, headers=headers)
+
+    def rebuild_auth(self, prepared_request, response):
+        """Keep the bearer token on redirects between Earthdata hosts; drop it anywhere else (e.g. S3)"""
+        if 'Authorization' in prepared_request.headers and self._trusted(prepared_request.url):
+            return
+        super().rebuild_auth(prepared_request, response)
+
+    def save_cookies(self):
+        self.auth_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        path = self.auth_dir / COOKIE_FILE
+        with _private_file(path) as f:
+            f.write("#LWP-Cookies-2.0\n")
+            f.write(self.cookies.as_lwp_str(ignore_discard=True, ignore_expires=False))
+
+    def close(self):
+        try:
+            self.save_cookies()
+        except OSError:
+            pass
+        super().close()
+
+
+def earthdata_session(auth_dir=None, prompt=True, **kwargs):
+    """Logged-in EarthdataSession, or None when no credentials are available or login fails"""
+    session = EarthdataSession(auth_dir, prompt=prompt, **kwargs)
+    try:
+        record = session.login()
+    except (PermissionError, requests.RequestException) as e:
+        print(f"❌ {e}")
+        session.close()
+        return None
+    if record is None:
+        print("❌ No Earthdata credentials (set EARTHDATA_USERNAME/EARTHDATA_PASSWORD or add ~/.netrc)")
+        session.close()
+        return None
+    return session
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Log in to NASA Earthdata and cache the token and cookies")
+    parser.add_argument("--auth-dir", default=DEFAULT_AUTH_DIR,
+                        help="Directory for the cached token and cookies")
+    parser.add_argument("--status", action="store_true",
+                        help="Only show the cached token's user and expiry")
+    parser.add_argument("--logout", action="store_true",
+                        help="Forget the cached token and cookies")
+
+    args = parser.parse_args()
+
+    print("🔐 NASA Earthdata Session")
+    print("=" * 50)
+    auth_dir = Path(args.auth_dir)
+    if args.logout:
+        for name in (TOKEN_FILE, COOKIE_FILE):
+            if (auth_dir / name).exists():
+                (auth_dir / name).unlink()
+        print(f"✅ Removed cached credentials from {auth_dir}")
+        return
+
+    record = TokenCache(auth_dir).load()
+    if record is None and not args.status:
+        session = earthdata_session(auth_dir)
+        if session is None:
+            return
+        record = session.token
+        session.close()
+    if record is None:
+        print(f"❌ No valid token cached in {auth_dir}")
+        return
+    print(f"✅ {record['username']}: token valid until {record['expires']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+CYGNSS Power Calibration
+Converts DDM power to dB from the variable's `units` attribute (never by
+guessing per value), optionally going from raw counts to watts and BRCS with
+the L1 calibration variables. Every step works on whole arrays.
+"""
+
+import json
+import argparse
+
+import numpy as np
+
+from cygnss_checkpoint import write_json_atomic
+
+# Lower bound for dB output; non-positive or missing linear power maps here
+DEFAULT_FLOOR_DB = -300.0
+
+GPS_L1_WAVELENGTH = 0.190293672798365  # m
+
+DB_UNITS = {'db', 'dbw', 'dbm', 'dbi', 'decibel', 'decibels'}
+
+# Per-DDM L1 variables used by counts_to_watts / watts_to_brcs
+L1_CALIBRATION_VARIABLES = ['ddm_noise_floor', 'inst_gain', 'gps_eirp', 'sp_rx_gain',
+                            'tx_to_sp_range', 'rx_to_sp_range']
+
+
+def units_scale(units):
+    """'dB' or 'linear' for a units attribute; unknown units are treated as linear"""
+    if units is None:
+        return 'linear'
+    text = str(units).strip().lower()
+    if text in DB_UNITS or text.startswith('db'):
+        return 'dB'
+    return 'linear'
+
+
+def db_units_label(units):
+    """Units label of a power array after power_to_db, e.g. 'dB(W)'"""
+    return units if units_scale(units) == 'dB' else f"dB({units or 'linear'})"
+
+
+def variable_units(meta, var_name):
+    """Units attribute of a variable from the granule metadata cache"""
+    return (meta.get("variables", {}).get(var_name) or {}).get("units")
+
+
+def to_db(power, floor_db=DEFAULT_FLOOR_DB, out=None):
+    """10*log10 of a linear power array, clamped below at floor_db
+
+    Runs as two ufunc passes over the whole array; values at or below the floor
+    (including zeros, negatives and NaNs) are set to floor_db. ``out`` may be
+    the input array itself for an in-place float32 conversion.
+    """
+    power = np.asarray(power)
+    if out is None:
+        out = np.empty(power.shape, dtype=np.result_type(power.dtype, np.float32))
+    floor_linear = 10.0 ** (floor_db / 10.0)
+    above = power > floor_linear
+    np.log10(power, out=out, where=above)
+    np.multiply(out, 10.0, out=out, where=above)
+    np.copyto(out, floor_db, where=~above)
+    return out
+
+
+def valid_power(power, units, floor_db=DEFAULT_FLOOR_DB):
+    """Mask of bins with a real dB value: finite and above the floor power_to_db clamps to"""
+    power = np.asarray(power)
+    floor = floor_db if units_scale(units) == 'dB' else 10.0 ** (floor_db / 10.0)
+    return np.isfinite(power) & (power > floor)
+
+
+def power_to_db(power, units, floor_db=DEFAULT_FLOOR_DB, out=None):
+    """Power in dB given its units: linear input is converted, dB input is passed through"""
+    if units_scale(units) == 'dB':
+        if out is None:
+            return np.asarray(power, dtype=np.float32)
+        np.copyto(out, power)
+        return out
+    return to_db(power, floor_db, out=out)
+
+
+def counts_to_watts(counts, noise_counts, inst_gain):
+    """Raw DDM counts to received power (W): (C - C_noise) / G_inst
+
+    ``noise_counts`` and ``inst_gain`` (counts per W) are per DDM and broadcast
+    over the delay/Doppler axes.
+    """
+    counts = np.asarray(counts, dtype=np.float32)
+    noise = np.asarray(noise_counts, dtype=np.float32)[..., None, None]
+    gain = np.asarray(inst_gain, dtype=np.float32)[..., None, None]
+    watts = counts - noise
+    np.divide(watts, gain, out=watts, where=gain > 0)
+    watts[np.broadcast_to(gain <= 0, watts.shape)] = np.nan
+    return watts
+
+
+def watts_to_brcs(watts, gps_eirp, sp_rx_gain_db, tx_range, rx_range, wavelength=GPS_L1_WAVELENGTH):
+    """Bistatic radar cross section (m^2) per bin from the bistatic radar equation
+
+    sigma = P (4 pi)^3 R_t^2 R_r^2 / (EIRP lambda^2 G_r), with per-DDM EIRP (W),
+    receive antenna gain (dBi) and transmitter/receiver ranges to the specular
+    point (m).
+    """
+    gain = 10.0 ** (np.asarray(sp_rx_gain_db, dtype=np.float64) / 10.0)
+    tx = np.asarray(tx_range, dtype=np.float64)
+    rx = np.asarray(rx_range, dtype=np.float64)
+    factor = (4 * np.pi) ** 3 * tx ** 2 * rx ** 2 / (np.asarray(gps_eirp, dtype=np.float64) * wavelength ** 2 * gain)
+    return np.asarray(watts, dtype=np.float32) * factor.astype(np.float32)[..., None, None]
+
+
+def calibrate_chunk(chunk, units, to='dB', floor_db=DEFAULT_FLOOR_DB):
+    """Calibrate the ``power`` cube of an extracted chunk in one batched pass
+
+    ``to`` is 'dB' (power in dB of its native unit), 'watts' or 'brcs'. The
+    last two expect raw counts plus the L1 calibration variables in the chunk
+    (see ``L1_CALIBRATION_VARIABLES``). Returns (array, units); the dB
+    conversion of a float32 chunk overwrites ``chunk["power"]`` in place.
+    """
+    power = chunk["power"]
+    if to == 'dB':
+        out = power if power.dtype == np.float32 else None
+        return power_to_db(power, units, floor_db, out=out), db_units_label(units)
+
+    if str(units).strip().lower() in ('counts', 'count'):
+        watts = counts_to_watts(power, chunk["ddm_noise_floor"], chunk["inst_gain"])
+    elif str(units).strip().lower() in ('w', 'watt', 'watts'):
+        watts = power
+    else:
+        raise ValueError(f"Cannot convert power in units {units!r} to {to}")
+
+    if to == 'watts':
+        return watts, 'W'
+    if to == 'brcs':
+        return watts_to_brcs(watts, chunk["gps_eirp"], chunk["sp_rx_gain"],
+                             chunk["tx_to_sp_range"], chunk["rx_to_sp_range"]), 'm^2'
+    raise ValueError(f"Unknown calibration target {to!r}")
+
+
+def convert_json_output(path, units='W', floor_db=DEFAULT_FLOOR_DB):
+    """Rewrite the power values of a processed JSON output file in dB"""
+    with open(path) as f:
+        data = json.load(f)
+
+    ddms = [data.get("sample_ddm")] + list(data.get("all_ddms") or [])
+    for ddm in ddms:
+        if not ddm or ddm.get("metadata", {}).get("power_units", "").startswith("dB"):
+            continue
+        points = ddm.get("ddm_data") or []
+        values = to_db(np.array([p["power"] for p in points], dtype=np.float64), floor_db)
+        for point, value in zip(points, values.tolist()):
+            point["power"] = value
+        ddm.setdefault("metadata", {})["power_units"] = f"dB({units})"
+
+    write_json_atomic(path, data)
+    return len([d for d in ddms if d])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert linear DDM power in a processed JSON file to dB")
+    parser.add_argument("json_file", help="Processed output, e.g. public/cygnss_data.json")
+    parser.add_argument("--units", default="W",
+                        help="Units of the stored linear power values")
+    parser.add_argument("--floor-db", type=float, default=DEFAULT_FLOOR_DB,
+                        help="Lower bound for converted values")
+
+    args = parser.parse_args()
+    converted = convert_json_output(args.json_file, args.units, args.floor_db)
+    print(f"✅ Converted {converted} DDMs in {args.json_file} to dB({args.units})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+CYGNSS Granule Catalog
+Writes data/cygnss_catalog.json, the compact listing served by /api/local-cygnss
+(size, time range, spacecraft, DDM count and bounding box per granule)
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+from cygnss_metadata import DEFAULT_CACHE_DIR, get_cache
+from process_cygnss_data import find_cygnss_files
+
+CATALOG_VERSION = 1
+CATALOG_FILE = "cygnss_catalog.json"
+
+
+def catalog_path(data_dir):
+    return Path(data_dir) / CATALOG_FILE
+
+
+def load_catalog(data_dir):
+    """Existing catalog for data_dir, or an empty one"""
+    try:
+        with open(catalog_path(data_dir)) as f:
+            catalog = json.load(f)
+        if catalog.get("version") == CATALOG_VERSION:
+            return catalog
+    except (OSError, ValueError):
+        pass
+    return {"version": CATALOG_VERSION, "files": []}
+
+
+def _catalog_entry(name, stat, meta):
+    """One catalog row; keys match what the route and download page already use"""
+    return {
+        "name": name,
+        "sizeBytes": stat.st_size,
+        "sizeMB": round(stat.st_size / (1024 * 1024), 2),
+        "modified": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+        "timeStart": meta.get("time_start"),
+        "timeEnd": meta.get("time_end"),
+        "spacecraft": meta.get("spacecraft"),
+        "ddmCount": meta.get("ddm_count"),
+        "bbox": meta.get("bbox"),
+    }
+
+
+def update_catalog(data_dir="./data", cache_dir=None, verbose=True):
+    """Bring the catalog in line with data_dir, touching only new or changed granules
+
+    Returns (catalog, n_added_or_changed, n_removed).
+    """
+    data_dir = Path(data_dir)
+    previous = {entry["name"]: entry for entry in load_catalog(data_dir)["files"]}
+    cache = get_cache(cache_dir)
+
+    files = []
+    changed = 0
+    for file_path in find_cygnss_files(str(data_dir)):
+        name = Path(file_path).relative_to(data_dir).as_posix()
+        stat = os.stat(file_path)
+        modified = datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat()
+
+        entry = previous.pop(name, None)
+        if entry and entry["sizeBytes"] == stat.st_size and entry["modified"] == modified:
+            files.append(entry)
+            continue
+
+        try:
+            meta = cache.get(file_path)[0]
+        except Exception as e:
+            # Partially downloaded granules are picked up on the next pass
+            if verbose:
+                print(f"⚠️  Skipping {name}: {e}")
+            continue
+        files.append(_catalog_entry(name, stat, meta))
+        changed += 1
+        if verbose:
+            print(f"   📁 {name}: {meta.get('ddm_count')} DDMs")
+
+    removed = len(previous)
+    if changed or removed or not catalog_path(data_dir).exists():
+        files.sort(key=lambda entry: entry["name"])
+        body = json.dumps(files, separators=(',', ':'), sort_keys=True)
+        catalog = {
+            "version": CATALOG_VERSION,
+            "generatedAt": datetime.now(timezone.utc).isoformat(),
+            "etag": hashlib.sha1(body.encode()).hexdigest()[:16],
+            "files": files,
+        }
+        data_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{catalog_path(data_dir)}.tmp{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(catalog, f, separators=(',', ':'))
+        os.replace(tmp_path, catalog_path(data_dir))
+    else:
+        catalog = load_catalog(data_dir)
+
+    return catalog, changed, removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the CYGNSS granule catalog served by /api/local-cygnss")
+    parser.add_argument("--data-dir", "-d", default="./data",
+                        help="Directory containing downloaded CYGNSS NetCDF files")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Granule metadata cache directory")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="Keep running and rescan every SECONDS as new granules arrive")
+
+    args = parser.parse_args()
+
+    print("🗂️  CYGNSS Granule Catalog")
+    print("=" * 50)
+
+    while True:
+        catalog, changed, removed = update_catalog(args.data_dir, args.cache_dir)
+        if changed or removed or not args.watch:
+            print(f"✅ {len(catalog['files'])} granules in {catalog_path(args.data_dir)} "
+                  f"({changed} new/changed, {removed} removed)")
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Crash-Safe Outputs and Checkpoints
+Outputs are written to a temporary file next to their final path, flushed to
+disk and renamed into place, so readers (the web app) only ever see the old
+or the new file. Long jobs record their progress per granule and per chunk
+in a small checkpoint file and pick up from the last completed chunk on
+--resume.
+"""
+
+import os
+import json
+import shutil
+import argparse
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+CHECKPOINT_VERSION = 1
+
+
+def _fsync_dir(path):
+    """Persist a rename in its directory (best effort; not available on Windows)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_write(path, mode='w'):
+    """Open a temporary file for ``path`` and move it into place once the block succeeds
+
+    On an exception the temporary file is removed and ``path`` is untouched.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp{os.getpid()}")
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+    _fsync_dir(path.parent)
+
+
+def write_json_atomic(path, data, indent=2):
+    """json.dump to ``path`` through atomic_write"""
+    with atomic_write(path) as f:
+        json.dump(data, f, indent=indent, separators=None if indent else (',', ':'))
+
+
+class Checkpoint:
+    """Progress of a long job: finished granules and the next sample of a partial one
+
+    Kept as JSON in ``<work dir>/checkpoint.json`` next to whatever partial
+    results the job stores in the work directory. Every update is written
+    atomically, so the file always describes work that is on disk.
+    """
+
+    FILE = "checkpoint.json"
+
+    def __init__(self, work_dir, resume=False):
+        self.work_dir = Path(work_dir)
+        if not resume and self.work_dir.exists():
+            shutil.rmtree(self.work_dir)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.state = {"version": CHECKPOINT_VERSION, "granules": {}, "partial": {}}
+        if resume:
+            try:
+                with open(self.work_dir / self.FILE) as f:
+                    state = json.load(f)
+                if state.get("version") == CHECKPOINT_VERSION:
+                    self.state = state
+            except (OSError, ValueError):
+                pass
+
+    def _save(self):
+        self.state["updatedAt"] = datetime.now(timezone.utc).isoformat()
+        write_json_atomic(self.work_dir / self.FILE, self.state, indent=None)
+
+    def done(self, key):
+        """Record of a finished granule, or None"""
+        return self.state["granules"].get(key)
+
+    def next_sample(self, key):
+        """First sample of a granule still to process (0 if it was never started)"""
+        return self.state["partial"].get(key, {}).get("next_sample", 0)
+
+    def chunk_done(self, key, next_sample, **info):
+        """Mark every sample of a granule before ``next_sample`` as written"""
+        self.state["partial"][key] = dict(info, next_sample=int(next_sample))
+        self._save()
+
+    def granule_done(self, key, **info):
+        self.state["partial"].pop(key, None)
+        self.state["granules"][key] = info
+        self._save()
+
+    def path(self, name):
+        """Path for a partial result inside the work directory"""
+        return self.work_dir / name
+
+    def clear(self):
+        """Remove the work directory once the final output is in place"""
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the progress recorded in a job checkpoint")
+    parser.add_argument("work_dir", help="Work directory, e.g. public/cygnss_data.json.parts")
+
+    args = parser.parse_args()
+    try:
+        with open(Path(args.work_dir) / Checkpoint.FILE) as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"❌ No checkpoint in {args.work_dir}: {e}")
+        return
+
+    print(f"💾 {len(state['granules'])} granules finished, last update {state.get('updatedAt')}")
+    for key, partial in state["partial"].items():
+        print(f"   ⏳ {partial.get('name', key)}: resumes at sample {partial['next_sample']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Coherent / Incoherent Reflection Classifier
+Flags DDMs that are coherent (specular) reflections, e.g. from inland water,
+rather than diffuse scattering. A coherent reflection is the ambiguity
+function alone: nearly all power sits in a few bins around the peak, about
+1.3 delay bins and 1.2 Doppler bins wide, while diffuse scattering from the
+glistening zone spreads over the trailing delays and many Doppler bins. The
+features are the peak-to-total ratio and the power-weighted delay and Doppler
+spread about the peak, computed over whole noise-normalized cubes with a
+handful of reductions; DDMs too weak to tell are left undetermined.
+"""
+
+import argparse
+
+import numpy as np
+
+from cygnss_calibration import variable_units
+from cygnss_noise import DEFAULT_NOISE_ROWS, noise_variables, normalize_chunk
+
+# Per-DDM flag values (int8)
+DIFFUSE = 0
+COHERENT = 1
+UNDETERMINED = -1
+FLAG_NAMES = {DIFFUSE: "diffuse", COHERENT: "coherent", UNDETERMINED: "undetermined"}
+
+# Thresholds tuned on simulated ocean (0.5-25 m/s) and calm-water DDMs:
+# coherent cubes have a peak ratio of ~0.16 and a delay spread of ~1.4 bins,
+# diffuse ones at most ~0.05 and 3+ bins
+MIN_SNR_DB = -3.0
+MIN_PEAK_RATIO = 0.08
+MAX_DELAY_SPREAD = 2.5  # bins
+MAX_DOPPLER_SPREAD = 2.0  # bins
+
+COHERENCE_FIELDS = ['coherent']
+
+
+def coherence_features(snr):
+    """Peak ratio, delay/Doppler spread (bins) and peak SNR (dB) of (..., delay, doppler) (P - N) / N cubes
+
+    Negative and NaN bins count as no power. Returns float32 arrays of the
+    leading shape; DDMs without any power get NaN.
+    """
+    positive = np.fmax(snr, np.float32(0.0))
+    n_delay, n_doppler = positive.shape[-2:]
+    delay_profile = positive.sum(axis=-1)
+    doppler_profile = positive.sum(axis=-2)
+    total = delay_profile.sum(axis=-1)
+    flat = positive.reshape(positive.shape[:-2] + (-1,))
+    peak_index = flat.argmax(axis=-1)
+    peak = np.take_along_axis(flat, peak_index[..., None], axis=-1)[..., 0]
+
+    def spread(profile, centre):
+        # Second moment of the marginal power profile about the peak bin
+        offsets = np.arange(profile.shape[-1], dtype=np.float32) - centre[..., None].astype(np.float32)
+        return np.sqrt((profile * offsets * offsets).sum(axis=-1) / total)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        features = {
+            "peak_ratio": peak / total,
+            "delay_spread": spread(delay_profile, peak_index // n_doppler),
+            "doppler_spread": spread(doppler_profile, peak_index % n_doppler),
+            "snr_db": 10 * np.log10(peak),
+        }
+    return {k: v.astype(np.float32) for k, v in features.items()}
+
+
+def classify(features, min_snr_db=MIN_SNR_DB, min_peak_ratio=MIN_PEAK_RATIO,
+             max_delay_spread=MAX_DELAY_SPREAD, max_doppler_spread=MAX_DOPPLER_SPREAD):
+    """int8 flags (COHERENT, DIFFUSE or UNDETERMINED) from coherence_features()"""
+    determined = features["snr_db"] >= min_snr_db
+    coherent = (determined & (features["peak_ratio"] >= min_peak_ratio)
+                & (features["delay_spread"] <= max_delay_spread)
+                & (features["doppler_spread"] <= max_doppler_spread))
+    flags = np.full(determined.shape, UNDETERMINED, dtype=np.int8)
+    flags[determined] = DIFFUSE
+    flags[coherent] = COHERENT
+    return flags
+
+
+def classify_cubes(power, noise_floor, **thresholds):
+    """Flags for linear power cubes (..., delay, doppler) with a known noise floor (...)"""
+    floor = np.asarray(noise_floor, dtype=np.float32)[..., None, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        snr = (np.asarray(power, dtype=np.float32) - floor) / floor
+    return classify(coherence_features(snr), **thresholds)
+
+
+def chunk_coherence(chunk, meta, variables=None, noise_rows=DEFAULT_NOISE_ROWS, **thresholds):
+    """{"coherent": (n, channels) int8} for an extracted chunk (power in W, counts or dB)
+
+    The chunk's power is left untouched; ``variables`` are the noise
+    variables passed to iter_ddm_chunks (noise_variables(meta) by default).
+    """
+    variables = noise_variables(meta) if variables is None else variables
+    scratch = dict(chunk, power=np.array(chunk["power"], dtype=np.float32))
+    snr, _ = normalize_chunk(scratch, variable_units(meta, meta["power_variable"]), variables, noise_rows)
+    return {"coherent": classify(coherence_features(snr), **thresholds)}
+
+
+def synthetic_cubes(n, coherent_fraction=0.5, seed=0):
+    """Mixed simulated ocean (diffuse) and calm-water (coherent) DDMs, shuffled
+
+    Returns (power W, noise floor, truth) with truth COHERENT or DIFFUSE.
+    """
+    from cygnss_simulate import (DELAY_STEP, DOPPLER_STEP, RX_GAIN_DB, random_params,
+                                 simulate_coherent, simulate_ddms)
+
+    rng = np.random.default_rng(seed)
+    n_coherent = int(round(n * coherent_fraction))
+    diffuse = simulate_ddms(**random_params(n - n_coherent, seed, wind_range=(0.5, 25.0)), seed=seed)
+    coherent = simulate_coherent(incidence=rng.uniform(5.0, 60.0, n_coherent),
+                                 roughness=rng.uniform(0.0, 0.05, n_coherent),
+                                 rx_gain_db=rng.uniform(RX_GAIN_DB - 6.0, RX_GAIN_DB, n_coherent),
+                                 delay_offset=rng.uniform(-0.5, 0.5, n_coherent) * DELAY_STEP,
+                                 doppler_offset=rng.uniform(-0.5, 0.5, n_coherent) * DOPPLER_STEP,
+                                 seed=seed + 1)
+    order = rng.permutation(n)
+    power = np.concatenate([diffuse["power"], coherent["power"]])[order]
+    floor = np.concatenate([diffuse["noise_floor"], coherent["noise_floor"]])[order]
+    truth = np.concatenate([np.full(n - n_coherent, DIFFUSE, dtype=np.int8),
+                            np.full(n_coherent, COHERENT, dtype=np.int8)])[order]
+    return power, floor, truth
+
+
+def main():
+    import time
+
+    parser = argparse.ArgumentParser(description="Flag coherent (water) and diffuse DDM reflections")
+    parser.add_argument("granule", nargs="?",
+                        help="CYGNSS L1 NetCDF file; without one, classify simulated cubes and report accuracy")
+    parser.add_argument("--ddms", "-n", type=int, default=200000,
+                        help="Simulated DDMs when no granule is given")
+    parser.add_argument("--min-snr", type=float, default=MIN_SNR_DB,
+                        help="Peak SNR (dB) below which a DDM stays undetermined")
+    parser.add_argument("--min-peak-ratio", type=float, default=MIN_PEAK_RATIO,
+                        help="Smallest peak-to-total power ratio of a coherent DDM")
+    parser.add_argument("--max-delay-spread", type=float, default=MAX_DELAY_SPREAD,
+                        help="Largest delay spread (bins) of a coherent DDM")
+    parser.add_argument("--max-doppler-spread", type=float, default=MAX_DOPPLER_SPREAD,
+                        help="Largest Doppler spread (bins) of a coherent DDM")
+    parser.add_argument("--cache-dir", help="Granule metadata cache directory")
+
+    args = parser.parse_args()
+    thresholds = {"min_snr_db": args.min_snr, "min_peak_ratio": args.min_peak_ratio,
+                  "max_delay_spread": args.max_delay_spread, "max_doppler_spread": args.max_doppler_spread}
+
+    print("💧 CYGNSS Coherence Classifier")
+    print("=" * 50)
+
+    if args.granule is None:
+        power, floor, truth = synthetic_cubes(args.ddms)
+        started = time.perf_counter()
+        flags = classify_cubes(power, floor, **thresholds)
+        seconds = time.perf_counter() - started
+        print(f"✅ {args.ddms} simulated DDMs in {seconds:.3f} s ({args.ddms / seconds:,.0f} DDMs/s)")
+        determined = flags != UNDETERMINED
+        for label, value in ((FLAG_NAMES[COHERENT], COHERENT), (FLAG_NAMES[DIFFUSE], DIFFUSE)):
+            sel = truth == value
+            print(f"   {label:>8}: {np.mean(flags[sel & determined] == value):.2%} correct, "
+                  f"{np.mean(~determined[sel]):.1%} undetermined")
+        return
+
+    from cygnss_metadata import DEFAULT_CACHE_DIR, get_cache
+    from cygnss_extract import iter_ddm_chunks
+
+    meta = get_cache(args.cache_dir or DEFAULT_CACHE_DIR).get(args.granule)[0]
+    variables = noise_variables(meta)
+    started = time.perf_counter()
+    counts = {value: 0 for value in FLAG_NAMES}
+    for chunk in iter_ddm_chunks(args.granule, meta=meta, extra_fields=variables):
+        flags = chunk_coherence(chunk, meta, variables, **thresholds)["coherent"]
+        for value in counts:
+            counts[value] += int(np.count_nonzero(flags == value))
+    total = sum(counts.values())
+    print(f"✅ {total} DDMs in {time.perf_counter() - started:.2f} s")
+    for value, count in counts.items():
+        print(f"   {FLAG_NAMES[value]:>12}: {count} ({count / max(total, 1):.1%})")
+
+
+if __name__ == "__main__":
+    main()
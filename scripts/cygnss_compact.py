@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Compact DDM Representation
+float32 cubes by default, optional float16, per-DDM scale/offset quantization
+to uint8/uint16 or a lossy PCA basis, with the delay/Doppler axes stored once
+per bundle
+
+Error bounds (x = stored value, x' = decoded value):
+  float32       |x - x'| <= 2**-24 * |x|      (~6e-8 relative, vs float64 input)
+  float16       |x - x'| <= 2**-11 * |x|      (~4.9e-4 relative; only for dB data,
+                                               linear watts underflow float16)
+  uint8/uint16  |x - x'| <= scale / 2, scale = (max - min) / (2**bits - 2)
+                per DDM; e.g. a 60 dB range in uint8 is within 0.12 dB
+  pca           no per-bin bound: each DDM keeps PCA_COMPONENTS float16
+                coefficients of a basis fitted to the bundle (dB relative to
+                its noise floor); 0.13 dB RMS, 0.34 dB 99th percentile on
+                simulated DDMs (`python scripts/cygnss_similarity.py error`)
+The top code of the integer encodings is reserved for missing (NaN) bins; the
+pca encoding keeps only DDMs that are missing entirely and fills partial gaps.
+
+Memory per 17x11 DDM: ~40 kB as list-of-dicts, 748 B float32, 374 B float16,
+187 B uint8 (+8 B scale/offset), 32 B pca (+4 B noise floor).
+"""
+
+import json
+import argparse
+import warnings
+
+import numpy as np
+
+from cygnss_checkpoint import atomic_write
+from cygnss_noise import DEFAULT_NOISE_ROWS
+
+ENCODINGS = ('float32', 'float16', 'uint16', 'uint8', 'pca')
+# Components kept by the pca encoding and the similarity index (cygnss_similarity.py)
+PCA_COMPONENTS = 16
+# DDMs the PCA basis is fitted on; a random sample of the bundle, so the SVD cost stays flat
+PCA_SAMPLE = 20000
+
+_FLOAT16_MAX = float(np.finfo(np.float16).max)
+_FLOAT16_TINY = float(np.finfo(np.float16).tiny)
+
+
+def quantize(cubes, dtype=np.uint8):
+    """Per-DDM linear quantization of (..., delay, doppler) cubes
+
+    Returns (codes, scale, offset) with value ~= offset + codes * scale.
+    Scale and offset are float32 with the cube's leading shape.
+    """
+    dtype = np.dtype(dtype)
+    cubes = np.asarray(cubes, dtype=np.float32)
+    missing_code = np.iinfo(dtype).max
+    levels = missing_code - 1
+
+    finite = np.isfinite(cubes)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore'):
+        # DDMs with no finite bin get NaN here (All-NaN slice) and are all missing codes
+        warnings.simplefilter('ignore', RuntimeWarning)
+        offset = np.nanmin(np.where(finite, cubes, np.nan), axis=(-2, -1))
+        top = np.nanmax(np.where(finite, cubes, np.nan), axis=(-2, -1))
+    offset = np.nan_to_num(offset, nan=0.0).astype(np.float32)
+    scale = (np.nan_to_num(top, nan=0.0) - offset) / levels
+    scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+
+    work = cubes - offset[..., None, None]
+    np.divide(work, scale[..., None, None], out=work)
+    np.rint(work, out=work)
+    np.clip(work, 0, levels, out=work)
+    work[~finite] = missing_code
+    return work.astype(dtype), scale, offset
+
+
+def dequantize(codes, scale, offset):
+    """Inverse of quantize; reserved codes decode to NaN"""
+    missing_code = np.iinfo(codes.dtype).max
+    values = codes.astype(np.float32)
+    np.multiply(values, np.asarray(scale, dtype=np.float32)[..., None, None], out=values)
+    np.add(values, np.asarray(offset, dtype=np.float32)[..., None, None], out=values)
+    values[codes == missing_code] = np.nan
+    return values
+
+
+def quantization_error_bound(scale):
+    """Largest absolute decoding error for each quantized DDM"""
+    return np.asarray(scale) / 2
+
+
+def pca_rows(cubes, noise_rows=DEFAULT_NOISE_ROWS):
+    """Flat float32 rows (m, delay * doppler) of dB cubes relative to their noise floor, and the floor (m,)
+
+    The floor is the median of a DDM's leading noise rows. Missing bins are
+    set to the floor (0); DDMs with no finite noise bin get a NaN floor.
+    """
+    cubes = np.asarray(cubes, dtype=np.float32)
+    rows = cubes.reshape(-1, cubes.shape[-2] * cubes.shape[-1])
+    # Median of the finite noise bins: NaN sorts last, so a sort and a per-row count
+    # give it several times faster than np.nanmedian
+    ordered = np.sort(rows[:, :noise_rows * cubes.shape[-1]], axis=-1)
+    count = np.count_nonzero(~np.isnan(ordered), axis=-1)
+    low = np.take_along_axis(ordered, (np.maximum(count - 1, 0) // 2)[:, None], axis=-1)[:, 0]
+    high = np.take_along_axis(ordered, (count // 2)[:, None], axis=-1)[:, 0]
+    floor = np.where(count > 0, 0.5 * (low + high), np.nan).astype(np.float32)
+    rows = rows - floor[:, None]
+    np.nan_to_num(rows, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return rows, floor
+
+
+def fit_basis(rows, components=PCA_COMPONENTS, sample=PCA_SAMPLE, seed=0):
+    """PCA of (m, d) rows on a random sample; returns (mean (d,), basis (components, d), explained)
+
+    The basis is the leading eigenvectors of the sample's float64 covariance,
+    the same as the right singular vectors of the centred sample but >10x
+    faster for d = 187. ``explained`` is the share of the variance each
+    component holds. Components are signed so their largest element is
+    positive, which makes the basis reproducible.
+    """
+    rows = np.asarray(rows, dtype=np.float32)
+    if rows.shape[0] > sample:
+        picked = np.random.default_rng(seed).choice(rows.shape[0], sample, replace=False)
+        rows = rows[np.sort(picked)]
+    mean = rows.mean(axis=0, dtype=np.float64) if rows.shape[0] else np.zeros(rows.shape[1])
+    basis = np.zeros((components, rows.shape[1]))
+    explained = np.zeros(components)
+    if rows.shape[0] > 1:
+        centred = (rows - mean.astype(np.float32)).astype(np.float64)
+        variance, vectors = np.linalg.eigh(centred.T @ centred)
+        variance, vectors = np.maximum(variance[::-1], 0), vectors[:, ::-1].T
+        kept = min(components, rows.shape[0] - 1, vectors.shape[0])
+        basis[:kept] = vectors[:kept]
+        explained[:kept] = variance[:kept] / max(variance.sum(), np.finfo(float).tiny)
+    largest = np.abs(basis).argmax(axis=1)
+    basis *= np.where(basis[np.arange(components), largest] < 0, -1.0, 1.0)[:, None]
+    return mean.astype(np.float32), basis.astype(np.float32), explained.astype(np.float32)
+
+
+def project(rows, mean, basis):
+    """(m, components) float32 coefficients of (m, d) rows
+
+    Computed as rows @ basis.T minus the projected mean, so the rows are not
+    copied to centre them.
+    """
+    basis = np.asarray(basis, dtype=np.float32).reshape(len(basis), -1)
+    coefficients = np.asarray(rows, dtype=np.float32) @ basis.T
+    coefficients -= np.asarray(mean, dtype=np.float32).ravel() @ basis.T
+    return coefficients
+
+
+def reconstruct(coefficients, mean, basis, floor):
+    """float32 (..., delay, doppler) dB cubes from (..., components) coefficients and their noise floor (...)
+
+    ``mean`` has the (delay, doppler) cube shape; a NaN floor gives a NaN DDM.
+    """
+    mean = np.asarray(mean, dtype=np.float32)
+    basis = np.asarray(basis, dtype=np.float32).reshape(len(basis), -1)
+    coefficients = np.asarray(coefficients, dtype=np.float32)
+    values = coefficients @ basis
+    values += mean.ravel()
+    values += np.asarray(floor, dtype=np.float32)[..., None]
+    return values.reshape(coefficients.shape[:-1] + mean.shape)
+
+
+def encode_cubes(cubes, encoding='float32'):
+    """Encode cubes as a dict of arrays ready for np.savez / transport"""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding {encoding!r}; choose one of {', '.join(ENCODINGS)}")
+    if encoding in ('float32', 'float16'):
+        cubes = np.asarray(cubes, dtype=np.float32)
+        if encoding == 'float16':
+            magnitude = np.abs(cubes[np.isfinite(cubes) & (cubes != 0)])
+            if magnitude.size and (magnitude.max() > _FLOAT16_MAX or magnitude.min() < _FLOAT16_TINY):
+                raise ValueError("Values are outside the float16 range; convert to dB first")
+        return {"encoding": encoding, "power": cubes.astype(encoding, copy=False)}
+
+    if encoding == 'pca':
+        # Lossy: for dB cubes, whose noise floor and shape the basis describes
+        shape = np.shape(cubes)
+        rows, floor = pca_rows(cubes)
+        valid = np.isfinite(floor)
+        mean, basis, _ = fit_basis(rows[valid])
+        coefficients = project(rows, mean, basis)
+        coefficients[~valid] = 0
+        return {"encoding": encoding, "power": coefficients.reshape(shape[:-2] + (-1,)).astype(np.float16),
+                "offset": floor.reshape(shape[:-2]), "mean": mean.reshape(shape[-2:]),
+                "basis": basis.reshape((-1,) + shape[-2:])}
+
+    codes, scale, offset = quantize(cubes, encoding)
+    return {"encoding": encoding, "power": codes, "scale": scale, "offset": offset}
+
+
+def decode_cubes(encoded):
+    """float32 cubes back from encode_cubes output"""
+    encoding = str(encoded["encoding"])
+    if encoding in ('float32', 'float16'):
+        return np.asarray(encoded["power"], dtype=np.float32)
+    if encoding == 'pca':
+        return reconstruct(encoded["power"], encoded["mean"], encoded["basis"], encoded["offset"])
+    return dequantize(encoded["power"], encoded["scale"], encoded["offset"])
+
+
+def save_bundle(path, cubes, delay, doppler, encoding='float32', units=None, **fields):
+    """Write DDM cubes, shared axes and per-DDM fields to a single .npz file (atomically)"""
+    encoded = encode_cubes(cubes, encoding)
+    arrays = {k: v for k, v in encoded.items() if k != "encoding"}
+    arrays.update({f"field_{name}": np.asarray(values) for name, values in fields.items()})
+    header = {"encoding": encoding, "units": units, "shape": list(np.shape(cubes))}
+    with atomic_write(path, 'wb') as f:
+        np.savez(f, delay=np.asarray(delay, dtype=np.float32), doppler=np.asarray(doppler, dtype=np.float32),
+                 header=np.frombuffer(json.dumps(header).encode(), dtype=np.uint8), **arrays)
+
+
+def load_bundle(path, decode=True):
+    """Read a bundle written by save_bundle
+
+    Returns a dict with ``power`` (decoded float32 unless decode=False),
+    ``delay``, ``doppler``, ``encoding``, ``units`` and the per-DDM fields.
+    """
+    with np.load(path) as data:
+        header = json.loads(data["header"].tobytes().decode())
+        bundle = {
+            "encoding": header["encoding"],
+            "units": header["units"],
+            "delay": data["delay"],
+            "doppler": data["doppler"],
+        }
+        encoded = {"encoding": header["encoding"], "power": data["power"]}
+        for key in ("scale", "offset", "mean", "basis"):
+            if key in data:
+                encoded[key] = data[key]
+                bundle[key] = data[key]
+        bundle["power"] = decode_cubes(encoded) if decode else data["power"]
+        for key in data.files:
+            if key.startswith("field_"):
+                bundle[key[len("field_"):]] = data[key]
+    return bundle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a compact DDM bundle")
+    parser.add_argument("bundle", help=".npz bundle written by process_cygnss_data.py --bundle")
+
+    args = parser.parse_args()
+    bundle = load_bundle(args.bundle, decode=False)
+    n_ddms = int(np.prod(bundle["power"].shape[:-1 if bundle["encoding"] == 'pca' else -2]))
+
+    print(f"📦 {args.bundle}: {n_ddms} DDMs, encoding {bundle['encoding']}, units {bundle['units']}")
+    print(f"📐 {len(bundle['delay'])} delay x {len(bundle['doppler'])} Doppler bins, "
+          f"{bundle['power'].nbytes / max(n_ddms, 1):.0f} bytes per DDM")
+    if "scale" in bundle:
+        bound = quantization_error_bound(bundle["scale"])
+        print(f"🎯 Quantization error bound: median {np.median(bound):.4g}, max {np.max(bound):.4g}")
+    if "basis" in bundle:
+        print(f"🧩 PCA basis of {len(bundle['basis'])} components (lossy; see cygnss_similarity.py error)")
+
+
+if __name__ == "__main__":
+    main()
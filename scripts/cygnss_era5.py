@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+ERA5 Point Cache
+Bulk-loads every <Site>_ERA5_<VAR>_<start>_<end>.csv into one columnar table
+(site, variable, date, value) kept on disk as .npz, sorted by
+(site, variable, date) with per-group offsets as the date index. Only files
+whose size or mtime changed are parsed again on refresh; each file also
+keeps its content key (cygnss_metadata.file_fingerprint) for digests that
+must not depend on the machine.
+"""
+
+import os
+import re
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from cygnss_metadata import DEFAULT_CACHE_DIR, PUBLIC_DIR, file_fingerprint
+
+DEFAULT_POINTS_DIR = str(PUBLIC_DIR / "era5_points")
+CACHE_FILE = "era5_points.npz"
+CACHE_VERSION = 2
+
+ERA5_FILE_RE = re.compile(r"^(?P<site>.+?)_ERA5_(?P<variable>[A-Z0-9]+)_(?P<start>\d{4}-\d{2}-\d{2})_"
+                          r"(?P<end>\d{4}-\d{2}-\d{2})\.csv$")
+
+COLUMNS = ('site', 'variable', 'date', 'value', 'source')
+
+
+def era5_files(points_dir=DEFAULT_POINTS_DIR):
+    """ERA5 point CSVs in a directory as {file name: (site, variable, path)}"""
+    files = {}
+    for path in sorted(Path(points_dir).glob("*.csv")):
+        match = ERA5_FILE_RE.match(path.name)
+        if match:
+            files[path.name] = (match["site"], match["variable"], path)
+    return files
+
+
+def read_era5_csv(path):
+    """(dates as datetime64[D], values as float32) of a two-column ERA5 CSV"""
+    table = np.loadtxt(path, delimiter=',', skiprows=1, dtype=str, ndmin=2)
+    if table.size == 0:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float32)
+    dates = table[:, 0].astype('U10').astype('datetime64[D]')
+    values = np.char.strip(table[:, 1])
+    values = np.where(values == '', 'nan', values).astype(np.float32)
+    return dates, values
+
+
+class ERA5PointCache:
+    """Columnar (site, variable, date, value) table of all ERA5 point files"""
+
+    def __init__(self, cache_file=None):
+        self.cache_file = Path(cache_file or Path(DEFAULT_CACHE_DIR) / CACHE_FILE)
+        self.sites, self.variables, self.sources = [], [], []
+        self.manifest = {}  # file name -> {"size", "mtime_ns", "key"}
+        self.columns = {
+            'site': np.array([], dtype=np.int16),
+            'variable': np.array([], dtype=np.int8),
+            'date': np.array([], dtype='datetime64[D]'),
+            'value': np.array([], dtype=np.float32),
+            'source': np.array([], dtype=np.int32),
+        }
+        self._groups = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with np.load(self.cache_file) as data:
+                header = json.loads(data["header"].tobytes().decode())
+                if header.get("version") != CACHE_VERSION:
+                    return
+                self.columns = {name: data[name] for name in COLUMNS}
+        except (OSError, KeyError, ValueError):
+            return
+        self.sites, self.variables = header["sites"], header["variables"]
+        self.sources, self.manifest = header["sources"], header["manifest"]
+        self._index()
+
+    def save(self):
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        header = {"version": CACHE_VERSION, "sites": self.sites, "variables": self.variables,
+                  "sources": self.sources, "manifest": self.manifest}
+        tmp_path = self.cache_file.with_name(f"{self.cache_file.stem}.tmp{os.getpid()}.npz")
+        np.savez(tmp_path, header=np.frombuffer(json.dumps(header).encode(), dtype=np.uint8), **self.columns)
+        os.replace(tmp_path, self.cache_file)
+
+    def _code(self, names, name):
+        if name not in names:
+            names.append(name)
+        return names.index(name)
+
+    def _index(self):
+        """Group offsets for every (site, variable): the date index"""
+        site, variable = self.columns['site'], self.columns['variable']
+        key = site.astype(np.int64) * 256 + variable
+        boundaries = np.flatnonzero(np.diff(key)) + 1
+        starts = np.concatenate([[0], boundaries]) if key.size else np.array([], dtype=np.int64)
+        stops = np.concatenate([boundaries, [key.size]]) if key.size else np.array([], dtype=np.int64)
+        self._groups = {(int(site[a]), int(variable[a])): (int(a), int(b)) for a, b in zip(starts, stops)}
+
+    def refresh(self, points_dir=DEFAULT_POINTS_DIR):
+        """Re-parse new or changed files and drop removed ones; returns (changed, removed) names"""
+        files = era5_files(points_dir)
+        stats = {name: path.stat() for name, (_, _, path) in files.items()}
+        changed = [name for name, st in stats.items()
+                   if (self.manifest.get(name, {}).get("size"), self.manifest.get(name, {}).get("mtime_ns"))
+                   != (st.st_size, st.st_mtime_ns)]
+        removed = [name for name in self.manifest if name not in files]
+        if not changed and not removed:
+            return [], []
+
+        stale = [self.sources.index(name) for name in changed + removed if name in self.sources]
+        keep = ~np.isin(self.columns['source'], stale)
+        parts = {name: [values[keep]] for name, values in self.columns.items()}
+
+        for name in changed:
+            site, variable, path = files[name]
+            dates, values = read_era5_csv(path)
+            n = len(dates)
+            parts['site'].append(np.full(n, self._code(self.sites, site), dtype=np.int16))
+            parts['variable'].append(np.full(n, self._code(self.variables, variable), dtype=np.int8))
+            parts['date'].append(dates)
+            parts['value'].append(values)
+            parts['source'].append(np.full(n, self._code(self.sources, name), dtype=np.int32))
+            self.manifest[name] = {"size": stats[name].st_size, "mtime_ns": stats[name].st_mtime_ns,
+                                   "key": file_fingerprint(path)}
+        for name in removed:
+            del self.manifest[name]
+
+        columns = {name: np.concatenate(values) for name, values in parts.items()}
+        # Rows of files that start later sort last within a day so they win on overlap
+        source_rank = np.empty(max(len(self.sources), 1), dtype=np.int32)
+        source_rank[sorted(range(len(self.sources)), key=lambda i: self._source_order(self.sources[i]))] = \
+            np.arange(len(self.sources))
+        order = np.lexsort((source_rank[columns['source']], columns['date'], columns['variable'], columns['site']))
+        self.columns = {name: values[order] for name, values in columns.items()}
+        self._index()
+        return changed, removed
+
+    @staticmethod
+    def _source_order(name):
+        match = ERA5_FILE_RE.match(name)
+        return (match["start"], match["end"], name) if match else ("", "", name)
+
+    def query(self, site, variable, start=None, end=None):
+        """(dates, values) for one site and variable, optionally within [start, end]
+
+        Two binary searches over the group's sorted dates; where files overlap
+        the value from the later-starting file is returned.
+        """
+        if site not in self.sites or variable not in self.variables:
+            return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float32)
+        a, b = self._groups.get((self.sites.index(site), self.variables.index(variable)), (0, 0))
+        dates = self.columns['date'][a:b]
+        lo = np.searchsorted(dates, np.datetime64(start, 'D'), 'left') if start is not None else 0
+        hi = np.searchsorted(dates, np.datetime64(end, 'D'), 'right') if end is not None else len(dates)
+        dates, values = dates[lo:hi], self.columns['value'][a + lo:a + hi]
+        last = np.append(dates[1:] != dates[:-1], True) if len(dates) else np.array([], dtype=bool)
+        return dates[last], values[last]
+
+    def site_variables(self):
+        """{site: [variables]} present in the table"""
+        result = {}
+        for s, v in self._groups:
+            result.setdefault(self.sites[s], []).append(self.variables[v])
+        return result
+
+
+def load_points(points_dir=DEFAULT_POINTS_DIR, cache_file=None, verbose=False):
+    """ERA5 point cache refreshed against points_dir (saved only if something changed)"""
+    cache = ERA5PointCache(cache_file)
+    changed, removed = cache.refresh(points_dir)
+    if changed or removed:
+        cache.save()
+        if verbose:
+            print(f"🔄 ERA5 cache: {len(changed)} file(s) parsed, {len(removed)} removed")
+    return cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the columnar ERA5 point cache")
+    parser.add_argument("--points-dir", default=DEFAULT_POINTS_DIR,
+                        help="Directory of <Site>_ERA5_<VAR>_<start>_<end>.csv files")
+    parser.add_argument("--cache", help="Cache file (default: <cache dir>/era5_points.npz)")
+    parser.add_argument("--site", help="Query this site")
+    parser.add_argument("--variable", default="SM", help="Variable to query, e.g. SM or PRECTOT")
+    parser.add_argument("--start", help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date (YYYY-MM-DD)")
+
+    args = parser.parse_args()
+
+    print("🌍 ERA5 Point Cache")
+    print("=" * 50)
+    started = time.perf_counter()
+    cache = load_points(args.points_dir, args.cache, verbose=True)
+    print(f"✅ {len(cache.columns['value'])} rows from {len(cache.manifest)} files "
+          f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+    for site, variables in cache.site_variables().items():
+        print(f"   📍 {site}: {', '.join(variables)}")
+
+    if args.site:
+        started = time.perf_counter()
+        dates, values = cache.query(args.site, args.variable, args.start, args.end)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"🔎 {args.site} {args.variable}: {len(dates)} days in {elapsed:.3f} ms")
+        for date, value in list(zip(dates, values))[:10]:
+            print(f"   {date}  {value:.6g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Batched CYGNSS DDM Extraction
+Reads every DDM of a granule as float32 (samples, channels, delay, doppler)
+chunks together with the per-DDM geolocation, time and quality arrays
+"""
+
+import re
+from datetime import datetime, timezone
+
+import numpy as np
+
+from cygnss_metadata import get_granule_metadata
+
+DEFAULT_CHUNK_SAMPLES = 1024
+
+# Per-DDM (sample, channel) variables carried along with each power chunk
+DDM_FIELDS = {
+    'sp_lat': 'lat',
+    'sp_lon': 'lon',
+    'quality_flags': 'quality',
+    'prn_code': 'prn',
+}
+
+
+def _filled(values, dtype, fill):
+    """Masked NetCDF reads as plain arrays, masked entries replaced by fill"""
+    return np.ma.filled(np.ma.asarray(values).astype(dtype, copy=False), fill)
+
+
+def epoch_seconds(var, start, stop):
+    """Timestamps of samples start:stop as Unix seconds (float64)"""
+    values = _filled(var[start:stop], np.float64, np.nan)
+    units = getattr(var, 'units', '') or ''
+    match = re.match(r"\s*seconds since\s+(.+)", units)
+    if match:
+        base = match.group(1).strip().replace('Z', '+00:00').replace(' ', 'T', 1)
+        base = re.sub(r"(\.\d{6})\d+", r"\1", base)
+        origin = datetime.fromisoformat(base)
+        if origin.tzinfo is None:
+            origin = origin.replace(tzinfo=timezone.utc)
+        return values + origin.timestamp()
+    if 'since' in units:
+        import netCDF4 as nc
+        stamps = nc.num2date(values, units, only_use_cftime_datetimes=False)
+        return np.array([s.replace(tzinfo=timezone.utc).timestamp() for s in stamps])
+    return values
+
+
+def iter_ddm_chunks(path, chunk_samples=DEFAULT_CHUNK_SAMPLES, meta=None, cache_dir=None,
+                    extra_fields=(), start_sample=0):
+    """Yield dicts of DDM arrays for consecutive sample ranges of a granule
+
+    Each chunk holds ``power`` (n, channels, delay, doppler) float32, ``time``
+    (n,) Unix seconds, ``lat``/``lon``/``quality``/``prn`` (n, channels) and
+    ``sample_start``. 3-D power variables are returned with a channel axis of 1.
+    ``extra_fields`` names further per-DDM variables (e.g. the L1 calibration
+    inputs) to include as float32 arrays under their own names.
+    ``start_sample`` skips the samples before it (resuming a partial granule).
+    """
+    import netCDF4 as nc
+
+    meta = meta or get_granule_metadata(path, cache_dir)
+    power_name = meta["power_variable"]
+    if power_name is None:
+        return
+
+    with nc.Dataset(path, 'r') as dataset:
+        power_var = dataset.variables[power_name]
+        power_var.set_auto_scale(True)
+        n_samples = power_var.shape[0]
+        time_var = dataset.variables.get(meta["time_variable"]) if meta["time_variable"] else None
+
+        for start in range(start_sample, n_samples, chunk_samples):
+            stop = min(start + chunk_samples, n_samples)
+            power = _filled(power_var[start:stop], np.float32, np.nan)
+            if power.ndim == 3:
+                power = power[:, None, :, :]
+            n, channels = power.shape[:2]
+
+            chunk = {
+                "sample_start": start,
+                "power": power,
+                "time": epoch_seconds(time_var, start, stop) if time_var is not None
+                        else np.full(n, np.nan),
+            }
+            for var_name, key in DDM_FIELDS.items():
+                if var_name in dataset.variables:
+                    values = dataset.variables[var_name][start:stop]
+                    if key in ('lat', 'lon'):
+                        values = _filled(values, np.float32, np.nan)
+                    else:
+                        values = _filled(values, np.int64, 0)
+                    chunk[key] = values.reshape(n, channels)
+                else:
+                    chunk[key] = np.full((n, channels), np.nan if key in ('lat', 'lon') else 0)
+            for var_name in extra_fields:
+                values = dataset.variables[var_name][start:stop]
+                chunk[var_name] = _filled(values, np.float32, np.nan).reshape(n, channels)
+            yield chunk
+
+
+def read_ddms(path, meta=None, cache_dir=None, extra_fields=()):
+    """All DDMs of a granule as a single chunk"""
+    chunks = list(iter_ddm_chunks(path, chunk_samples=1 << 62, meta=meta, cache_dir=cache_dir,
+                                  extra_fields=extra_fields))
+    return chunks[0] if chunks else None
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Shared-Memory Handoff Between Extraction Workers and the Writer
+Worker processes run a producer (e.g. one granule's chunk extraction) and
+hand the decoded (n, channels, delay, doppler) cubes to the writer through a
+ring of fixed-size slots in one multiprocessing.shared_memory block. A worker
+takes a free slot, copies the cube into it and sends only the slot number,
+shape and the small per-DDM fields over the queue; the writer reads the cube
+in place and returns the slot once it has moved on. Compared with returning
+the cubes from the workers, nothing is pickled, piped or unpickled per cube.
+The pickling path is kept (mode 'pickle') for comparison and as a fallback
+for cubes larger than a slot.
+"""
+
+import sys
+import queue
+import argparse
+import traceback
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+HANDOFF_MODES = ('shared', 'pickle')
+# Slots per worker: one being filled while the writer reads another
+SLOTS_PER_JOB = 2
+# Seconds between checks that the workers are still alive while waiting
+POLL_SECONDS = 1.0
+# Workers start in a fresh interpreter: a forked child inherits the parent's Numba
+# (cygnss_kernels) thread pool in a broken state and hangs in its first parallel kernel
+START_METHOD = 'spawn'
+
+
+def _attach(name):
+    """Open the writer's block from a worker
+
+    Workers share the writer's resource tracker, which keeps one entry per
+    name, so the writer's unlink is the only cleanup (3.13+ skips tracking).
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+class CubeRing:
+    """``slots`` flat slots of ``slot_size`` elements in one shared memory block"""
+
+    def __init__(self, slots, slot_size, dtype=np.float32, name=None):
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        if self.owner:
+            nbytes = max(slots * slot_size * self.dtype.itemsize, 1)
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self.shm = _attach(name)
+        self.slots = np.ndarray((slots, slot_size), dtype=self.dtype, buffer=self.shm.buf)
+
+    @property
+    def spec(self):
+        """What a worker needs to attach: (name, slots, slot size, dtype)"""
+        return self.shm.name, self.slots.shape[0], self.slots.shape[1], self.dtype.str
+
+    @classmethod
+    def attach(cls, spec):
+        name, slots, slot_size, dtype = spec
+        return cls(slots, slot_size, dtype, name=name)
+
+    def view(self, slot, shape):
+        """The first prod(shape) elements of a slot as an array of that shape"""
+        return self.slots[slot, :int(np.prod(shape))].reshape(shape)
+
+    def close(self):
+        self.slots = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _worker(produce, spec, mode, tasks, free, ready):
+    """Worker loop: run produce(*args) per task and hand each (cube, fields) to the writer"""
+    ring = CubeRing.attach(spec) if mode == 'shared' else None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            task_id, args = task
+            try:
+                for cube, fields in produce(*args):
+                    cube = np.asarray(cube)
+                    if ring is None or cube.size > ring.slots.shape[1] or cube.dtype != ring.dtype:
+                        # The queue pickles in a feeder thread, after the producer may have reused the cube
+                        ready.put(("chunk", task_id, None, cube.copy(), fields))
+                        continue
+                    slot = free.get()
+                    np.copyto(ring.view(slot, cube.shape), cube)
+                    ready.put(("chunk", task_id, slot, cube.shape, fields))
+                ready.put(("done", task_id, None, None, None))
+            except Exception as e:
+                ready.put(("error", task_id, None, f"{type(e).__name__}: {e}\n{traceback.format_exc()}", None))
+    finally:
+        if ring is not None:
+            ring.close()
+
+
+def handoff(produce, tasks, jobs=2, mode='shared', slot_size=0, dtype=np.float32, slots=None, admit=None):
+    """Run ``produce(*args)`` for every ``(task_id, args)`` in ``jobs`` worker processes
+
+    ``produce`` is a module-level generator yielding ``(cube, fields)``; workers
+    are spawned, so it and ``args`` must be importable/picklable from a fresh
+    interpreter (the calling script needs a ``__main__`` guard).
+    Yields ``("chunk", task_id, cube, fields)`` as the workers deliver,
+    ``("done", task_id, None, None)`` when a task has produced everything and
+    ``("error", task_id, message, None)`` when it raised. Chunks of one task
+    arrive in order. In 'shared' mode ``cube`` is a view into the ring that
+    stays valid only until the next item is requested; copy it to keep it.
+    ``slot_size`` is the largest cube in elements.
+
+    Without ``admit`` every task is queued at once. Otherwise tasks start one
+    at a time in order: ``admit(task_id, args, running)`` returns the args to
+    start it with (re-planned for the current memory, say) or None to hold it
+    until a running task delivers; with nothing running it must admit.
+    """
+    if mode not in HANDOFF_MODES:
+        raise ValueError(f"Unknown handoff mode {mode!r}; choose one of {', '.join(HANDOFF_MODES)}")
+    tasks = list(tasks)
+    if not tasks:
+        return
+    jobs = max(1, min(jobs, len(tasks)))
+    context = mp.get_context(START_METHOD)
+    task_queue, free, ready = context.Queue(), context.Queue(), context.Queue()
+    ring = None
+    if mode == 'shared':
+        ring = CubeRing(slots or SLOTS_PER_JOB * jobs, max(int(slot_size), 1), dtype)
+        for slot in range(ring.slots.shape[0]):
+            free.put(slot)
+    waiting = list(tasks)
+    running = 0
+
+    def start_tasks():
+        nonlocal running
+        while waiting and (admit is None or running < jobs):
+            task_id, args = waiting[0]
+            if admit is not None:
+                planned = admit(task_id, args, running)
+                if planned is None and running:
+                    break
+                args = args if planned is None else planned
+            task_queue.put((task_id, args))
+            waiting.pop(0)
+            running += 1
+            if not waiting:
+                for _ in range(jobs):
+                    task_queue.put(None)
+
+    workers = [context.Process(target=_worker, args=(produce, ring.spec if ring else None, mode,
+                                                     task_queue, free, ready), daemon=True)
+               for _ in range(jobs)]
+    for worker in workers:
+        worker.start()
+
+    pending = len(tasks)
+    held = None
+    try:
+        while pending:
+            if held is not None:
+                free.put(held)
+                held = None
+            start_tasks()
+            try:
+                kind, task_id, slot, payload, fields = ready.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    raise RuntimeError(f"Extraction workers exited with {pending} tasks unfinished")
+                continue
+            if kind == "chunk":
+                if slot is None:
+                    yield kind, task_id, payload, fields
+                else:
+                    held = slot
+                    yield kind, task_id, ring.view(slot, payload), fields
+            else:
+                pending -= 1
+                running -= 1
+                yield kind, task_id, payload, None
+    finally:
+        for worker in workers:
+            worker.join(timeout=5 if not pending else 0)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        if ring is not None:
+            ring.close()
+
+
+def synthetic_chunks(n_chunks, chunk_samples=1024, channels=4, seed=0):
+    """Producer for transport benchmarks: random (n, channels, 17, 11) float32 cubes and small fields"""
+    rng = np.random.default_rng(seed)
+    cube = rng.random((chunk_samples, channels, 17, 11), dtype=np.float32)
+    for k in range(n_chunks):
+        cube[0, 0, 0, 0] = k
+        yield cube, {"sample_start": k * chunk_samples, "lat": cube[:, :, 0, 0].copy()}
+
+
+def measure(jobs=2, granules=8, chunks=8, chunk_samples=1024, channels=4):
+    """Seconds to move the same synthetic cubes through each handoff mode; {mode: seconds}"""
+    import time
+
+    slot_size = chunk_samples * channels * 17 * 11
+    tasks = [(k, (chunks, chunk_samples, channels, k)) for k in range(granules)]
+    seconds = {}
+    for mode in HANDOFF_MODES:
+        started = time.perf_counter()
+        total = 0.0
+        for kind, task_id, cube, _ in handoff(synthetic_chunks, tasks, jobs, mode, slot_size):
+            if kind == "chunk":
+                # The writer consumes the cube in place
+                total += float(cube[:, :, 8].sum())
+            elif kind == "error":
+                raise RuntimeError(cube)
+        seconds[mode] = time.perf_counter() - started
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare shared-memory and pickled cube handoff from workers")
+    parser.add_argument("--jobs", "-j", type=int, default=2, help="Worker processes")
+    parser.add_argument("--granules", type=int, default=8, help="Tasks (simulated granules)")
+    parser.add_argument("--chunks", type=int, default=8, help="Chunks per granule")
+    parser.add_argument("--chunk-samples", type=int, default=1024, help="Samples per chunk (x 4 channels)")
+
+    args = parser.parse_args()
+
+    print("🔀 CYGNSS Worker Handoff")
+    print("=" * 50)
+    seconds = measure(args.jobs, args.granules, args.chunks, args.chunk_samples)
+    n_ddms = args.granules * args.chunks * args.chunk_samples * 4
+    megabytes = n_ddms * 17 * 11 * 4 / 1e6
+    for mode, value in seconds.items():
+        print(f"   {mode:>7}: {value:.3f} s ({n_ddms / value:,.0f} DDMs/s, {megabytes / value:,.0f} MB/s)")
+    print(f"✅ Shared memory is {seconds['pickle'] / seconds['shared']:.2f}x faster than pickled returns "
+          f"({args.jobs} workers, {megabytes:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
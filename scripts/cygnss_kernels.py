@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Optional Numba Kernels for Per-DDM Reductions
+The two per-DDM stages that gather a small window around a different bin of
+every DDM, the sub-bin peak search and fit (cygnss_slices.subbin_peak) and
+the windowed DDMA / leading edge slope (cygnss_wind.observables), compiled
+with @njit(parallel=True) and spread over the DDMs with prange. Without
+Numba the NumPy versions run instead. Both paths do the same float
+operations in the same order (no BLAS, fixed summation order, float32
+constants in float32 code, NumPy's log10 in both), so they return identical
+results. CYGNSS_KERNELS=numpy|numba|auto picks the backend for every caller;
+'auto' uses Numba when it is installed.
+"""
+
+import os
+import time
+import argparse
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+KERNEL_BACKENDS = ('auto', 'numpy', 'numba')
+DEFAULT_BACKEND = os.environ.get("CYGNSS_KERNELS", "auto")
+HAVE_NUMBA = numba is not None
+
+
+def use_numba(backend=None):
+    """Whether the compiled kernels should run for a backend choice (None: CYGNSS_KERNELS)"""
+    backend = backend or DEFAULT_BACKEND
+    if backend not in KERNEL_BACKENDS:
+        raise ValueError(f"Unknown kernel backend {backend!r}; choose one of {', '.join(KERNEL_BACKENDS)}")
+    if backend == 'numba' and not HAVE_NUMBA:
+        raise ImportError("The numba backend needs Numba: pip install numba")
+    return HAVE_NUMBA and backend != 'numpy'
+
+
+if HAVE_NUMBA:
+    # error_model='numpy': division by zero gives inf/NaN as in the NumPy path instead of raising
+    _njit = numba.njit(parallel=True, cache=True, error_model='numpy')
+    _inline = numba.njit(cache=True, error_model='numpy')
+    prange = numba.prange
+else:
+    _njit = _inline = None
+    prange = range
+
+
+def _compiled(func):
+    return _njit(func) if _njit is not None else None
+
+
+def _inlined(func):
+    return _inline(func) if _inline is not None else func
+
+
+@_inlined
+def _parabolic(left, centre, right):
+    """Scalar twin of cygnss_slices._parabolic_offset (float32)"""
+    curvature = left - np.float32(2) * centre + right
+    offset = np.float32(0.5) * (left - right) / curvature
+    if curvature < 0 and np.isfinite(offset):
+        return min(max(offset, np.float32(-0.5)), np.float32(0.5))
+    return np.float32(0)
+
+
+def _peak_patch(power, given, rows, cols, patch):
+    """Peak bin (first largest finite bin unless ``given``) and its edge-clamped 3x3 patch per DDM"""
+    n, n_delay, n_doppler = power.shape
+    for i in prange(n):
+        if not given:
+            best, row, col = -np.inf, 0, 0
+            for r in range(n_delay):
+                for c in range(n_doppler):
+                    value = power[i, r, c]
+                    if np.isfinite(value) and value > best:
+                        best, row, col = value, r, c
+            rows[i], cols[i] = row, col
+        for a in range(3):
+            r = min(max(rows[i] + a - 1, 0), n_delay - 1)
+            for b in range(3):
+                patch[i, a, b] = power[i, r, min(max(cols[i] + b - 1, 0), n_doppler - 1)]
+
+
+def _patch_fit(log_patch, rows, cols, n_delay, n_doppler, quadratic, pinv, out_row, out_col):
+    """Sub-bin peak from each DDM's 3x3 log power patch (float32), as cygnss_slices._numpy_peak_fit"""
+    for i in prange(log_patch.shape[0]):
+        patch = log_patch[i]
+        row, col = rows[i], cols[i]
+        inner_row = 0 < row < n_delay - 1
+        inner_col = 0 < col < n_doppler - 1
+        d_row = _parabolic(patch[0, 1], patch[1, 1], patch[2, 1]) if inner_row else np.float32(0)
+        d_col = _parabolic(patch[1, 0], patch[1, 1], patch[1, 2]) if inner_col else np.float32(0)
+        if quadratic:
+            c = np.empty(6, dtype=np.float32)
+            for k in range(1, 6):
+                acc = patch[0, 0] * pinv[k, 0]
+                for j in range(1, 9):
+                    acc = acc + patch[j // 3, j % 3] * pinv[k, j]
+                c[k] = acc
+            det = np.float32(4) * c[3] * c[4] - c[5] * c[5]
+            q_row = (c[5] * c[2] - np.float32(2) * c[4] * c[1]) / det
+            q_col = (c[5] * c[1] - np.float32(2) * c[3] * c[2]) / det
+            if (c[3] < 0 and det > 0 and inner_row and inner_col
+                    and abs(q_row) <= 1 and abs(q_col) <= 1):
+                d_row, d_col = q_row, q_col
+        out_row[i] = np.float32(np.float64(row) + np.float64(d_row))
+        out_col[i] = np.float32(np.float64(col) + np.float64(d_col))
+
+
+def _window_observables(signal, row, col, factor, lag0, lag1, off0, off1, box0, box1, les_rows,
+                        delay_step, ddma, les):
+    """DDMA and LES of (n, delay, doppler) float64 signal, resampled bilinearly around (row, col)"""
+    n, n_delay, n_doppler = signal.shape
+    n_lags = lag1 - lag0 + 1
+    n_offsets = off1 - off0 + 1
+    zero = -lag0
+    for i in prange(n):
+        r, c = row[i], col[i]
+        if not (np.isfinite(r) and np.isfinite(c) and r + lag0 >= 0 and r + lag1 <= n_delay - 1
+                and c + off0 >= 0 and c + off1 <= n_doppler - 1):
+            ddma[i] = np.nan
+            les[i] = np.nan
+            continue
+        r0 = min(int(np.floor(r)), n_delay - 1 - lag1)
+        c0 = min(int(np.floor(c)), n_doppler - 1 - off1)
+        fr = r - r0
+        fc = c - c0
+        idw = np.empty(n_lags)
+        for k in range(n_lags):
+            ra = min(r0 + lag0 + k, n_delay - 1)
+            rb = min(r0 + lag0 + k + 1, n_delay - 1)
+            total = 0.0
+            left = 0.0
+            for j in range(n_offsets + 1):
+                cj = min(c0 + off0 + j, n_doppler - 1)
+                value = (1 - fr) * signal[i, ra, cj] + fr * signal[i, rb, cj]
+                if j > 0:
+                    resampled = (1 - fc) * left + fc * value
+                    total = resampled if j == 1 else total + resampled
+                left = value
+            idw[k] = total * factor[i]
+        acc = idw[box0 - lag0]
+        for k in range(box0 - lag0 + 1, box1 - lag0 + 1):
+            acc = acc + idw[k]
+        ddma[i] = acc / ((box1 - box0 + 1) * n_offsets)
+        les[i] = (idw[zero] - idw[zero - les_rows]) / (les_rows * delay_step * n_offsets)
+
+
+_peak_patch_numba = _compiled(_peak_patch)
+_patch_fit_numba = _compiled(_patch_fit)
+_window_observables_numba = _compiled(_window_observables)
+
+
+def peak_fit(power, peak_bins, in_db, quadratic, pinv):
+    """(peak_row, peak_col) float32 of (n, delay, doppler) float32 DDMs with the compiled kernels
+
+    The log10 of the gathered patches stays in NumPy: its SIMD float32 log10
+    differs from libm's in the last bit, which would break identical results.
+    """
+    power = np.ascontiguousarray(power, dtype=np.float32)
+    n, n_delay, n_doppler = power.shape
+    given = peak_bins is not None
+    if given:
+        rows, cols = (np.array(b, dtype=np.int64).reshape(n) for b in peak_bins)
+    else:
+        rows, cols = np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+    patch = np.empty((n, 3, 3), dtype=np.float32)
+    _peak_patch_numba(power, given, rows, cols, patch)
+    if not in_db:
+        patch = 10 * np.log10(np.where(patch > 0, patch, np.nan))
+    out_row = np.empty(n, dtype=np.float32)
+    out_col = np.empty(n, dtype=np.float32)
+    _patch_fit_numba(patch, rows, cols, n_delay, n_doppler, bool(quadratic),
+                     np.ascontiguousarray(pinv, dtype=np.float32), out_row, out_col)
+    return out_row, out_col
+
+
+def window_observables(signal, row, col, factor, lags, offsets, box, les_rows, delay_step):
+    """(ddma, les) float64 of (n, delay, doppler) signal with the compiled kernel"""
+    signal = np.ascontiguousarray(signal, dtype=np.float64)
+    n = signal.shape[0]
+    factor = np.ascontiguousarray(np.broadcast_to(np.asarray(factor, dtype=np.float64).reshape(-1), (n,)))
+    ddma = np.empty(n)
+    les = np.empty(n)
+    _window_observables_numba(signal, np.ascontiguousarray(row, dtype=np.float64),
+                              np.ascontiguousarray(col, dtype=np.float64), factor,
+                              int(lags[0]), int(lags[1]), int(offsets[0]), int(offsets[1]),
+                              int(box[0]), int(box[1]), int(les_rows), float(delay_step), ddma, les)
+    return ddma, les
+
+
+def _best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def compare(n_ddms=200000, repeat=3, seed=0):
+    """Time every kernel with NumPy and with Numba at 1..all threads; check identical results
+
+    Returns rows of {"kernel", "backend", "threads", "seconds", "identical"}.
+    """
+    from cygnss_simulate import random_params, simulate_ddms
+    from cygnss_slices import subbin_peak
+    from cygnss_wind import nominal_brcs_factor, observables
+
+    params = random_params(n_ddms, seed=seed)
+    sim = simulate_ddms(**params, seed=seed)
+    power = sim["power"]
+    signal = power - sim["noise_floor"][:, None, None]
+    factor = nominal_brcs_factor(params["incidence"], params["rx_gain_db"])
+    kernels = {
+        "subbin_peak_parabolic": lambda backend: subbin_peak(power, 'W', 'parabolic', backend=backend),
+        "subbin_peak_quadratic": lambda backend: subbin_peak(power, 'W', 'quadratic', backend=backend),
+        "ddma_les_window": lambda backend: dict(zip(('ddma', 'les'), observables(
+            signal, sim["specular_row"], sim["specular_col"], factor, backend=backend))),
+    }
+    threads = [1]
+    if HAVE_NUMBA:
+        threads = sorted({1, 2, numba.config.NUMBA_NUM_THREADS} - {0})
+        threads = [t for t in threads if t <= numba.config.NUMBA_NUM_THREADS]
+    rows = []
+    for name, run in kernels.items():
+        reference = run('numpy')
+        rows.append({"kernel": name, "backend": "numpy", "threads": 1,
+                     "seconds": _best_time(lambda: run('numpy'), repeat), "identical": True})
+        if not HAVE_NUMBA:
+            continue
+        result = run('numba')  # compiles (or loads the cached build)
+        identical = all(np.array_equal(reference[k], result[k], equal_nan=True) for k in reference)
+        for count in threads:
+            numba.set_num_threads(count)
+            rows.append({"kernel": name, "backend": "numba", "threads": count,
+                         "seconds": _best_time(lambda: run('numba'), repeat), "identical": identical})
+        numba.set_num_threads(numba.config.NUMBA_NUM_THREADS)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the NumPy and Numba per-DDM kernels")
+    parser.add_argument("--ddms", "-n", type=int, default=200000, help="Simulated DDMs")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Repetitions (best time is reported)")
+
+    args = parser.parse_args()
+
+    print("⚙️  CYGNSS Per-DDM Kernels")
+    print("=" * 50)
+    if not HAVE_NUMBA:
+        print("⚠️  Numba is not installed; only the NumPy path runs (pip install numba)")
+    else:
+        print(f"🧵 Numba {numba.__version__}, {numba.config.NUMBA_NUM_THREADS} threads, backend {DEFAULT_BACKEND}")
+    rows = compare(args.ddms, args.repeat)
+    numpy_seconds = {r["kernel"]: r["seconds"] for r in rows if r["backend"] == "numpy"}
+    print(f"{'kernel':<24}{'backend':>8}{'threads':>9}{'time (s)':>10}{'DDMs/s':>14}{'speedup':>9}")
+    for r in rows:
+        print(f"{r['kernel']:<24}{r['backend']:>8}{r['threads']:>9}{r['seconds']:>10.4f}"
+              f"{args.ddms / r['seconds']:>14,.0f}{numpy_seconds[r['kernel']] / r['seconds']:>8.2f}x")
+    mismatched = sorted({r["kernel"] for r in rows if not r["identical"]})
+    if mismatched:
+        print(f"❌ Numba and NumPy results differ for {', '.join(mismatched)}")
+    elif HAVE_NUMBA:
+        print("✅ Numba and NumPy results are identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+CYGNSS Granule Metadata Cache
+Keeps a small JSON record per granule (dims, variables, coordinate axes, time
+range, spacecraft) so listings and job planning never have to open NetCDF files
+"""
+
+import os
+import re
+import json
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+CACHE_VERSION = 2
+# The repository's data/ directory: default caches and generated files live there
+# whatever directory a script is run from
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+# The web app's public/ directory, where the published data files go
+PUBLIC_DIR = DATA_DIR.parent / "public"
+DEFAULT_CACHE_DIR = os.environ.get("CYGNSS_CACHE_DIR", str(DATA_DIR / ".cygnss_cache"))
+
+# Variables that may hold the DDM power cube, in order of preference
+DDM_POWER_VARIABLES = ['power_analog', 'ddm_obs', 'ddm_nbrcs', 'power', 'brcs', 'power_ddm']
+TIME_VARIABLES = ['ddm_timestamp_utc', 'time', 'timestamp']
+
+# cyg03.ddmi.s20180801-000000-e20180801-235959.l1.power-brcs.a31.d32.nc
+GRANULE_NAME_RE = re.compile(
+    r"cyg(?P<spacecraft>\d{2}).*?\.s(?P<start>\d{8}-\d{6})-e(?P<end>\d{8}-\d{6})", re.IGNORECASE
+)
+
+_HASH_BLOCK = 1 << 20  # 1 MiB from each end of the file
+
+
+def parse_granule_name(name):
+    """Get spacecraft number and time range from a CYGNSS file name, if it follows the convention"""
+    match = GRANULE_NAME_RE.search(os.path.basename(name))
+    if not match:
+        return {"spacecraft": None, "time_start": None, "time_end": None}
+
+    def to_iso(stamp):
+        return datetime.strptime(stamp, "%Y%m%d-%H%M%S").replace(tzinfo=timezone.utc).isoformat()
+
+    return {
+        "spacecraft": int(match.group("spacecraft")),
+        "time_start": to_iso(match.group("start")),
+        "time_end": to_iso(match.group("end")),
+    }
+
+
+def file_fingerprint(path):
+    """Content hash of a granule: size plus the first and last MiB
+
+    Hashing whole multi-hundred-MB granules would cost more than opening them,
+    and NetCDF headers/trailers change whenever the content does.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(_HASH_BLOCK))
+        if size > _HASH_BLOCK:
+            f.seek(max(_HASH_BLOCK, size - _HASH_BLOCK))
+            digest.update(f.read(_HASH_BLOCK))
+    return digest.hexdigest()[:24]
+
+
+def _write_json(path, data):
+    """Write JSON next to its final location and rename it into place"""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _iso_utc(value):
+    """Normalize a timestamp string (L1 attributes carry nanoseconds) to ISO 8601 UTC"""
+    text = re.sub(r"(\.\d{6})\d+", r"\1", str(value).strip()).replace('Z', '+00:00')
+    try:
+        stamp = datetime.fromisoformat(text)
+    except ValueError:
+        return str(value)
+    if stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return stamp.astimezone(timezone.utc).isoformat()
+
+
+def _time_range(dataset, time_name):
+    """Time coverage from global attributes, falling back to the timestamp variable"""
+    start = getattr(dataset, 'time_coverage_start', None)
+    end = getattr(dataset, 'time_coverage_end', None)
+    if start and end:
+        return _iso_utc(start), _iso_utc(end)
+
+    if time_name is None:
+        return None, None
+    var = dataset.variables[time_name]
+    if var.size == 0:
+        return None, None
+    first, last = var[0], var[-1]
+    units = getattr(var, 'units', None)
+    if units and 'since' in units:
+        import netCDF4 as nc
+        first, last = nc.num2date([first, last], units, only_use_cftime_datetimes=False)
+        return _iso_utc(first.isoformat()), _iso_utc(last.isoformat())
+    return str(first), str(last)
+
+
+def _bbox(dataset):
+    """[west, south, east, north] of the specular points, longitudes in -180..180"""
+    if 'sp_lat' not in dataset.variables or 'sp_lon' not in dataset.variables:
+        return None
+    import numpy as np
+
+    lat = np.ma.filled(dataset.variables['sp_lat'][:].astype(np.float64), np.nan)
+    lon = np.ma.filled(dataset.variables['sp_lon'][:].astype(np.float64), np.nan)
+    lon = (lon + 180.0) % 360.0 - 180.0
+    if not np.isfinite(lat).any():
+        return None
+    return [round(float(np.nanmin(lon)), 4), round(float(np.nanmin(lat)), 4),
+            round(float(np.nanmax(lon)), 4), round(float(np.nanmax(lat)), 4)]
+
+
+def read_granule_metadata(path):
+    """Open a granule once and collect everything the cache stores about it"""
+    import netCDF4 as nc
+
+    path = Path(path)
+    stat = path.stat()
+    from_name = parse_granule_name(path.name)
+
+    with nc.Dataset(path, 'r') as dataset:
+        dims = {name: len(dim) for name, dim in dataset.dimensions.items()}
+
+        variables = {}
+        for name, var in dataset.variables.items():
+            chunking = var.chunking()
+            variables[name] = {
+                "dtype": str(var.dtype),
+                "dims": list(var.dimensions),
+                "shape": list(var.shape),
+                "chunking": chunking if chunking == 'contiguous' else [int(c) for c in chunking],
+                "units": getattr(var, 'units', None),
+            }
+
+        power_variable = next((v for v in DDM_POWER_VARIABLES if v in variables), None)
+        time_variable = next((v for v in TIME_VARIABLES if v in variables), None)
+
+        axes = {}
+        for axis in ('delay', 'doppler'):
+            if axis in dataset.variables:
+                axes[axis] = [float(v) for v in dataset.variables[axis][:]]
+            else:
+                axes[axis] = None
+
+        spacecraft = from_name["spacecraft"]
+        if 'spacecraft_num' in dataset.variables:
+            spacecraft = int(dataset.variables['spacecraft_num'][...])
+
+        time_start, time_end = _time_range(dataset, time_variable)
+        bbox = _bbox(dataset)
+
+    # Every leading axis of the power cube (sample, ddm channel) is one DDM each
+    ddm_count = 0
+    if power_variable is not None:
+        ddm_count = 1
+        for n in variables[power_variable]["shape"][:-2]:
+            ddm_count *= n
+
+    return {
+        "version": CACHE_VERSION,
+        "file": path.name,
+        "size": stat.st_size,
+        "dims": dims,
+        "variables": variables,
+        "power_variable": power_variable,
+        "time_variable": time_variable,
+        "delay": axes['delay'],
+        "doppler": axes['doppler'],
+        "time_start": time_start or from_name["time_start"],
+        "time_end": time_end or from_name["time_end"],
+        "spacecraft": spacecraft,
+        "ddm_count": ddm_count,
+        "bbox": bbox,
+    }
+
+
+class MetadataCache:
+    """Per-granule metadata records keyed by content fingerprint
+
+    ``index.json`` maps absolute paths to (size, mtime, key) so unchanged files
+    are looked up without being hashed; the records themselves live in
+    ``<key>.json`` and survive renames and moves of the granule.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.index_path = self.cache_dir / "index.json"
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = _read_json(self.index_path) or {}
+        return self._index
+
+    def _record_path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def _key_for(self, path, hash_if_missing=True):
+        """Fingerprint for path, reusing the indexed one while size and mtime match"""
+        path = Path(path).resolve()
+        stat = path.stat()
+        entry = self.index.get(str(path))
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["key"]
+        if not hash_if_missing:
+            return None
+        key = file_fingerprint(path)
+        self.index[str(path)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "key": key}
+        return key
+
+    def cached(self, path):
+        """Metadata for path if it is already cached; never opens the NetCDF file"""
+        key = self._key_for(path, hash_if_missing=False)
+        if key is None:
+            return None
+        record = _read_json(self._record_path(key))
+        if not record or record.get("version") != CACHE_VERSION:
+            return None
+        return record
+
+    def get(self, path, refresh=False):
+        """Return (metadata, was_cached), reading the granule only on a cache miss"""
+        key = self._key_for(path)
+        record = None if refresh else _read_json(self._record_path(key))
+        if record and record.get("version") == CACHE_VERSION:
+            return record, True
+
+        record = read_granule_metadata(path)
+        record["key"] = key
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        _write_json(self._record_path(key), record)
+        self.save()
+        return record, False
+
+    def save(self):
+        if self._index is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            _write_json(self.index_path, self._index)
+
+
+_default_caches = {}
+
+
+def get_cache(cache_dir=None):
+    """Shared MetadataCache instance per cache directory"""
+    cache_dir = str(cache_dir or DEFAULT_CACHE_DIR)
+    if cache_dir not in _default_caches:
+        _default_caches[cache_dir] = MetadataCache(cache_dir)
+    return _default_caches[cache_dir]
+
+
+def get_granule_metadata(path, cache_dir=None, refresh=False):
+    """Cached metadata for a granule, building the record on first use"""
+    return get_cache(cache_dir).get(path, refresh=refresh)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the CYGNSS granule metadata cache")
+    parser.add_argument("files", nargs="+", help="Granules to cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Metadata cache directory")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Re-read granules even if cached")
+
+    args = parser.parse_args()
+    cache = MetadataCache(args.cache_dir)
+
+    for file_path in args.files:
+        meta, was_cached = cache.get(file_path, refresh=args.refresh)
+        status = "cached" if was_cached else "indexed"
+        print(f"📁 {meta['file']} ({status}): cyg{meta['spacecraft'] or 0:02d} "
+              f"{meta['time_start']} → {meta['time_end']}, dims {meta['dims']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+DDM Noise Normalization
+Per-DDM noise floor from the L1 noise variables when the granule has them in
+usable units, otherwise from the leading (pre-specular) delay rows. The floor
+is subtracted and the result divided by it, giving (P - N) / N: a linear SNR
+cube comparable across channels, spacecraft and times. Runs in place on
+float32 chunks.
+"""
+
+import argparse
+
+import numpy as np
+
+from cygnss_calibration import units_scale, variable_units
+
+# Delay rows ahead of the specular point that only hold noise
+DEFAULT_NOISE_ROWS = 4
+# Units label of normalized cubes
+NORMALIZED_UNITS = "SNR"
+
+COUNTS_UNITS = {'count', 'counts'}
+
+
+def _unit_key(units):
+    return str(units or '').strip().lower()
+
+
+def noise_variables(meta):
+    """L1 variables the noise floor can be taken from, or () to estimate it from the DDM
+
+    ``ddm_noise_floor`` is used directly when it has the power's units; L1
+    stores it in counts, which are turned into watts with ``inst_gain``
+    (counts per W) when the power is in watts.
+    """
+    variables = meta.get("variables", {})
+    if 'ddm_noise_floor' not in variables:
+        return ()
+    power_units = _unit_key(variable_units(meta, meta["power_variable"]))
+    noise_units = _unit_key(variable_units(meta, 'ddm_noise_floor'))
+    if noise_units == power_units and units_scale(power_units) == 'linear':
+        return ('ddm_noise_floor',)
+    if noise_units in COUNTS_UNITS and power_units in ('w', 'watt', 'watts') and 'inst_gain' in variables:
+        return ('ddm_noise_floor', 'inst_gain')
+    return ()
+
+
+def estimate_noise(power, noise_rows=DEFAULT_NOISE_ROWS):
+    """Mean linear power of the first ``noise_rows`` delay rows of every DDM (NaN bins skipped)"""
+    leading = power[..., :noise_rows, :]
+    finite = np.isfinite(leading)
+    counts = finite.sum(axis=(-2, -1))
+    sums = np.where(finite, leading, 0).sum(axis=(-2, -1), dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (sums / counts).astype(np.float32)
+
+
+def chunk_noise(chunk, variables=(), noise_rows=DEFAULT_NOISE_ROWS):
+    """Per-DDM noise floor of a linear-power chunk, (n, channels) float32
+
+    Uses the L1 ``variables`` from noise_variables() where they give a
+    positive floor and the leading delay rows everywhere else.
+    """
+    estimate = estimate_noise(chunk["power"], noise_rows)
+    if not variables:
+        return estimate
+    noise = np.array(chunk[variables[0]], dtype=np.float32)
+    if len(variables) > 1:
+        gain = chunk[variables[1]]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            np.divide(noise, gain, out=noise)
+        noise[~(gain > 0)] = np.nan
+    usable = np.isfinite(noise) & (noise > 0)
+    return np.where(usable, noise, estimate)
+
+
+def normalize_chunk(chunk, units=None, variables=(), noise_rows=DEFAULT_NOISE_ROWS):
+    """Turn ``chunk["power"]`` into (P - N) / N in place; returns (normalized, noise)
+
+    dB input is taken back to linear power first, also in place. DDMs
+    without a positive noise floor come out all NaN. ``noise`` is in the
+    linear power units.
+    """
+    power = chunk["power"]
+    if power.dtype != np.float32:
+        raise TypeError("normalize_chunk works in place on float32 power")
+    if units_scale(units) == 'dB':
+        np.multiply(power, np.float32(0.1), out=power)
+        np.power(np.float32(10.0), power, out=power)
+
+    noise = chunk_noise(chunk, variables, noise_rows)
+    floor = noise[..., None, None]
+    np.subtract(power, floor, out=power)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        np.divide(power, floor, out=power)
+    power[~(noise > 0)] = np.nan
+    return power, noise
+
+
+def main():
+    from cygnss_metadata import DEFAULT_CACHE_DIR, get_cache
+    from cygnss_extract import iter_ddm_chunks
+
+    parser = argparse.ArgumentParser(description="Noise-normalize the DDMs of a CYGNSS granule")
+    parser.add_argument("granule", help="CYGNSS L1 NetCDF file")
+    parser.add_argument("--noise-rows", type=int, default=DEFAULT_NOISE_ROWS,
+                        help="Leading delay rows used when the L1 noise floor is not usable")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Granule metadata cache directory")
+
+    args = parser.parse_args()
+
+    print("📉 DDM Noise Normalization")
+    print("=" * 50)
+    meta = get_cache(args.cache_dir).get(args.granule)[0]
+    units = variable_units(meta, meta["power_variable"])
+    variables = noise_variables(meta)
+    print(f"🔎 Noise floor from {' / '.join(variables) if variables else f'first {args.noise_rows} delay rows'}")
+
+    peaks, floors = [], []
+    for chunk in iter_ddm_chunks(args.granule, meta=meta, extra_fields=variables):
+        power, noise = normalize_chunk(chunk, units, variables, args.noise_rows)
+        peaks.append(np.nanmax(power, axis=(-2, -1), initial=-np.inf).reshape(-1))
+        floors.append(noise.reshape(-1))
+    peaks, floors = np.concatenate(peaks), np.concatenate(floors)
+    peaks = peaks[np.isfinite(peaks) & (peaks > 0)]
+
+    print(f"✅ {floors.size} DDMs, median noise {np.nanmedian(floors):.4g} {units or ''}")
+    if peaks.size:
+        print(f"   Peak SNR: median {10 * np.log10(np.median(peaks)):.2f} dB, "
+              f"5–95% [{10 * np.log10(np.percentile(peaks, 5)):.2f}, {10 * np.log10(np.percentile(peaks, 95)):.2f}] dB")
+
+
+if __name__ == "__main__":
+    main()
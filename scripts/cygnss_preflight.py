@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Dependency Preflight
+Checks once which optional libraries and NASA command-line tools are
+available, without importing them, and caches the answer next to the
+granule metadata cache. The cache is reused until the interpreter or one of
+its sys.path directories changes (e.g. after a pip install), so entry points
+can check dependencies on every start for the cost of a few stat() calls.
+Nothing is ever installed from here: missing packages are reported with the
+command to install them.
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import importlib.util
+from datetime import datetime, timezone
+from pathlib import Path
+
+from cygnss_metadata import DEFAULT_CACHE_DIR
+
+PREFLIGHT_FILE = "preflight.json"
+
+# Importable module -> pip package
+MODULES = {
+    'numpy': 'numpy',
+    'netCDF4': 'netCDF4',
+    'xarray': 'xarray',
+    'requests': 'requests',
+    'earthdata': 'earthdata',
+    'numba': 'numba',
+}
+# Command-line tools from podaac-data-subscriber
+TOOLS = ['podaac-data-downloader', 'podaac-data-subscriber']
+
+
+def _environment_key():
+    """Interpreter, PATH and the mtimes of every sys.path directory"""
+    stamps = []
+    for entry in sys.path:
+        try:
+            stamps.append([entry, os.stat(entry or '.').st_mtime_ns])
+        except OSError:
+            stamps.append([entry, None])
+    return {"python": sys.executable, "version": sys.version, "path": os.environ.get("PATH", ""),
+            "sys_path": stamps}
+
+
+def preflight(refresh=False, cache_dir=None):
+    """{"modules": {name: bool}, "tools": {name: path or None}, "cached": bool}"""
+    cache_file = Path(cache_dir or DEFAULT_CACHE_DIR) / PREFLIGHT_FILE
+    key = _environment_key()
+    if not refresh:
+        try:
+            with open(cache_file) as f:
+                cached = json.load(f)
+            if cached.get("key") == key:
+                return dict(cached["result"], cached=True)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    result = {
+        "modules": {name: importlib.util.find_spec(name) is not None for name in MODULES},
+        "tools": {name: shutil.which(name) for name in TOOLS},
+        "checkedAt": datetime.now(timezone.utc).isoformat(),
+    }
+    try:
+        from cygnss_checkpoint import write_json_atomic
+        write_json_atomic(cache_file, {"key": key, "result": result}, indent=None)
+    except OSError:
+        pass  # read-only checkout: check again next time
+    return dict(result, cached=False)
+
+
+def missing(*names, cache_dir=None):
+    """The given modules/tools that are not available"""
+    found = preflight(cache_dir=cache_dir)
+    available = {**found["modules"], **{k: bool(v) for k, v in found["tools"].items()}}
+    return [name for name in names if not available.get(name, False)]
+
+
+def require(*names, purpose=None, cache_dir=None):
+    """True if every module/tool is available; otherwise print how to install them"""
+    absent = missing(*names, cache_dir=cache_dir)
+    if not absent:
+        return True
+    packages = sorted({MODULES.get(name, 'podaac-data-subscriber') for name in absent})
+    print(f"❌ Missing {', '.join(absent)}" + (f" (needed to {purpose})" if purpose else ""))
+    print(f"   Install with: {sys.executable} -m pip install {' '.join(packages)}")
+    return False
+
+
+def print_report(result):
+    for name, found in result["modules"].items():
+        print(f"   {'✅' if found else '❌'} {name}")
+    for name, path in result["tools"].items():
+        print(f"   {'✅' if path else '⚠️ '} {name}" + (f" ({path})" if path else " (not on PATH)"))
+    print(f"🗂️  {'Cached' if result['cached'] else 'Checked'} {result['checkedAt']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report which optional CYGNSS dependencies are installed")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignore the cached result and check again")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Directory for the cached result")
+
+    args = parser.parse_args()
+
+    print("🔍 CYGNSS Dependency Preflight")
+    print("=" * 50)
+    print_report(preflight(args.refresh, args.cache_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+CYGNSS DDM Query Service
+Small local HTTP service over the DDM store, proxied by the Next.js /api/cygnss route
+
+  GET /ddms?start=&end=&bbox=W,S,E,N&spacecraft=1,3&quality=good&page_size=&cursor=
+            &fields=observables&encoding=uint8&view=normalized
+  GET /health
+"""
+
+import json
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from cygnss_store import DEFAULT_STORE, DEFAULT_PAGE_SIZE, connect, query_ddms, granule_axes
+
+DEFAULT_PORT = 8765
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    store_path = DEFAULT_STORE
+    _local = threading.local()
+
+    @property
+    def conn(self):
+        # One read-only connection per server thread
+        if getattr(self._local, "conn", None) is None:
+            self._local.conn = connect(self.store_path, readonly=True)
+        return self._local.conn
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok"})
+            return
+        if url.path != "/ddms":
+            self._send_json(404, {"error": f"Unknown endpoint {url.path}"})
+            return
+
+        try:
+            include_ddm = params.get("fields", "ddm") != "observables"
+            page = query_ddms(
+                self.conn,
+                start=params.get("start"),
+                end=params.get("end"),
+                bbox=params["bbox"].split(',') if "bbox" in params else None,
+                spacecraft=params["spacecraft"].split(',') if "spacecraft" in params else None,
+                quality=params.get("quality"),
+                cursor=params.get("cursor"),
+                page_size=params.get("page_size", DEFAULT_PAGE_SIZE),
+                include_ddm=include_ddm,
+                encoding=params.get("encoding"),
+                view=params.get("view", "raw"),
+            )
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {"error": f"Invalid query: {e}"})
+            return
+
+        if include_ddm:
+            page["axes"] = granule_axes(self.conn, {r["granule"] for r in page["records"]})
+        page["status"] = "success"
+        self._send_json(200, page)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(store_path=DEFAULT_STORE, host="127.0.0.1", port=DEFAULT_PORT):
+    """Run the query service until interrupted"""
+    QueryHandler.store_path = store_path
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    print(f"🚀 Serving {store_path} on http://{host}:{port}/ddms")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve paginated DDM queries over the CYGNSS DDM store")
+    parser.add_argument("--store", "-s", default=DEFAULT_STORE,
+                        help="SQLite store built by cygnss_store.py")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Interface to bind")
+    parser.add_argument("--port", "-p", type=int, default=DEFAULT_PORT,
+                        help="Port to listen on")
+
+    args = parser.parse_args()
+
+    print("🛰️  CYGNSS DDM Query Service")
+    print("=" * 50)
+    serve(args.store, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Memory-Budget Chunk Scheduler
+Chooses the sample-axis chunk size and how many granules are extracted at
+once from the cached granule metadata (power dims and dtype) so the whole
+process tree stays inside --max-memory. A chunk is costed as a fixed overhead,
+its raw read and ~WORKING_COPIES float32 copies of the decoded cube; the copy count is
+replaced by what extraction actually peaks at (resident set growth per
+chunk, measured by the producer), and the tree's measured memory (PSS, so
+library pages shared by the workers count once) holds new granules back near
+the budget. Small granules are read in one chunk and spread over every
+worker; large ones get the biggest chunk that fits one worker's share.
+Memory is read from /proc (Linux); elsewhere the plan stays on estimates.
+"""
+
+import os
+import re
+import argparse
+import multiprocessing as mp
+
+from cygnss_extract import DEFAULT_CHUNK_SAMPLES
+
+MIN_CHUNK_SAMPLES = 64
+MAX_CHUNK_SAMPLES = 16384
+# float32 copies of a chunk's cube alive at its peak (read, flags, coherence scratch, slices...);
+# a first guess until a chunk has been measured
+WORKING_COPIES = 6.0
+# Per-chunk memory that does not scale with its samples (field reads, HDF5 buffers)
+CHUNK_OVERHEAD = 12 << 20
+# Share of --max-memory that planned work may take; the rest absorbs allocator slack
+BUDGET_FRACTION = 0.8
+# Shared-memory ring slots per worker (cygnss_handoff.SLOTS_PER_JOB)
+SLOTS_PER_WORKER = 2
+# PSS of a spawned worker before its first chunk: interpreter, NumPy/netCDF4 and the
+# extraction modules (measured ~82 MB), plus the Numba kernels loaded from their cache (~61 MB)
+WORKER_OVERHEAD = 84 << 20
+NUMBA_OVERHEAD = 62 << 20
+
+_UNITS = {'': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30, 't': 1 << 40}
+
+
+def parse_memory(text):
+    """Bytes from '512M', '4G', '1.5g', '8GB' or a plain byte count"""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([kmgt]?)i?b?\s*", str(text).lower())
+    if not match:
+        raise ValueError(f"Cannot read memory size '{text}' (use e.g. 512M or 4G)")
+    return int(float(match.group(1)) * _UNITS[match.group(2)])
+
+
+def format_memory(nbytes):
+    return f"{nbytes / (1 << 20):,.0f} MB"
+
+
+def _status_bytes(pid, field):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def rss_bytes(pid='self'):
+    """Current resident set size of a process, None where /proc is unavailable"""
+    return _status_bytes(pid, 'VmRSS')
+
+
+def peak_rss_bytes(pid='self'):
+    """Peak resident set size since the last reset_peak_rss() (or process start)"""
+    return _status_bytes(pid, 'VmHWM')
+
+
+def reset_peak_rss():
+    """Restart the peak RSS from the current RSS (Linux 4.0+; a no-op elsewhere)"""
+    try:
+        with open("/proc/self/clear_refs", 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def release_memory():
+    """Hand freed heap back to the system (glibc keeps it for reuse, so an idle worker looks busy)"""
+    import gc
+
+    gc.collect()
+    try:
+        import ctypes
+
+        ctypes.CDLL(None).malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def pss_bytes(pid='self'):
+    """Proportional set size (shared pages split between their users), RSS where unavailable"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return rss_bytes(pid)
+
+
+def tree_memory_bytes():
+    """Memory of this process and its live child processes (sum of PSS), None without /proc"""
+    total = pss_bytes()
+    if total is None:
+        return None
+    for child in mp.active_children():
+        total += pss_bytes(child.pid) or 0
+    return total
+
+
+def worker_overhead():
+    """Memory a worker holds before its first chunk, with or without the Numba kernels"""
+    from cygnss_kernels import use_numba
+
+    return WORKER_OVERHEAD + (NUMBA_OVERHEAD if use_numba() else 0)
+
+
+def sample_bytes(meta):
+    """(raw, decoded) bytes of one sample of a granule's power variable, from cached metadata"""
+    import numpy as np
+
+    variable = meta["variables"][meta["power_variable"]]
+    cells = int(np.prod(variable["shape"][1:]))
+    return cells * np.dtype(variable["dtype"]).itemsize, cells * 4
+
+
+class ChunkScheduler:
+    """Per-granule chunk sizes and concurrency inside a memory budget
+
+    ``plan(meta)`` is the sequential choice; with workers the writer calls
+    ``admit`` as each granule is about to start (None: wait for a running one
+    to finish), ``finished`` when it is done and ``observe`` with the RSS
+    measured around every chunk. Create it once the extraction modules are
+    imported, so its baseline is what a worker starts from.
+    """
+
+    def __init__(self, max_memory, workers=1, tasks=1, max_chunk=MAX_CHUNK_SAMPLES, ring=False):
+        self.max_memory = int(max_memory)
+        self.workers = max(1, int(workers))
+        self.remaining = max(1, int(tasks))
+        self.ring = ring
+        self.base = tree_memory_bytes() or 0
+        self.copies = WORKING_COPIES
+        self.measured = False
+        self.max_chunk = max_chunk
+        self.running = {}
+        self.worker_overhead = worker_overhead() if self.workers > 1 else 0
+
+    def _chunk_bytes(self, raw, cube, chunk):
+        """Working set of one chunk in flight, with its worker's handoff slots"""
+        ring = SLOTS_PER_WORKER * cube if self.ring else 0
+        return CHUNK_OVERHEAD + chunk * (raw + self.copies * cube + ring)
+
+    def plan(self, meta):
+        """(chunk_samples, concurrency) for one granule"""
+        raw, cube = sample_bytes(meta)
+        n_samples = meta["variables"][meta["power_variable"]]["shape"][0]
+        overhead = self.worker_overhead
+        available = BUDGET_FRACTION * self.max_memory - self.base
+        concurrency = max(1, min(self.workers, self.remaining))
+        while True:
+            per_sample = self._chunk_bytes(raw, cube, 1) - CHUNK_OVERHEAD
+            chunk = int((available / concurrency - overhead - CHUNK_OVERHEAD) // per_sample)
+            if chunk >= MIN_CHUNK_SAMPLES or concurrency == 1:
+                break
+            concurrency -= 1
+        chunk = max(MIN_CHUNK_SAMPLES, min(chunk, self.max_chunk, max(n_samples, 1)))
+        return chunk, concurrency
+
+    def admit(self, task_id, meta, running):
+        """Chunk size for a granule about to start, or None to hold it until a running one is done
+
+        The tree's measured memory plus the peak working set of every
+        running granule (some may be between chunks) must leave room for it.
+        """
+        chunk, concurrency = self.plan(meta)
+        if running >= concurrency:
+            return None
+        raw, cube = sample_bytes(meta)
+        measured = tree_memory_bytes()
+        if measured is None:
+            measured = self.base + self.workers * self.worker_overhead
+        room = BUDGET_FRACTION * self.max_memory - measured - sum(self.running.values())
+        fits = int((room - CHUNK_OVERHEAD) // (self._chunk_bytes(raw, cube, 1) - CHUNK_OVERHEAD))
+        if fits < MIN_CHUNK_SAMPLES and running:
+            return None
+        chunk = max(MIN_CHUNK_SAMPLES, min(chunk, fits))
+        self.running[task_id] = self._chunk_bytes(raw, cube, chunk)
+        self.remaining = max(1, self.remaining - 1)
+        return chunk
+
+    def finished(self, task_id):
+        self.running.pop(task_id, None)
+
+    def observe(self, meta, n_samples, rss_before, rss_peak):
+        """Replace the working-copy estimate with what a chunk of n_samples actually peaked at"""
+        if not rss_before or not rss_peak or n_samples <= 0:
+            return
+        raw, cube = sample_bytes(meta)
+        copies = max((rss_peak - rss_before - CHUNK_OVERHEAD - n_samples * raw) / (n_samples * cube), 1.0)
+        # Keep the worst chunk seen: underestimating is what runs out of memory
+        self.copies = copies if not self.measured else max(self.copies, copies)
+        self.measured = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the chunk sizes and concurrency chosen for a memory budget")
+    parser.add_argument("--data-dir", "-d", default="./data", help="Directory with CYGNSS NetCDF files")
+    parser.add_argument("--max-memory", "-m", default="2G", help="Memory budget for the whole run (e.g. 512M, 4G)")
+    parser.add_argument("--workers", "-j", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--cache-dir", help="Granule metadata cache directory")
+
+    args = parser.parse_args()
+
+    from cygnss_metadata import DEFAULT_CACHE_DIR, get_cache
+    from process_cygnss_data import find_cygnss_files
+
+    print("🧠 CYGNSS Chunk Scheduler")
+    print("=" * 50)
+    try:
+        budget = parse_memory(args.max_memory)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    cache = get_cache(args.cache_dir or DEFAULT_CACHE_DIR)
+    metas = [m for m in (cache.get(p)[0] for p in find_cygnss_files(args.data_dir)) if m["power_variable"]]
+    if not metas:
+        print(f"❌ No CYGNSS NetCDF files found in {args.data_dir}")
+        return
+    scheduler = ChunkScheduler(budget, args.workers, len(metas), ring=args.workers > 1)
+    print(f"📐 Budget {format_memory(budget)}, {args.workers} workers, "
+          f"resident {format_memory(scheduler.base)}, {WORKING_COPIES:g} working copies assumed")
+    for meta in metas:
+        chunk, concurrency = scheduler.plan(meta)
+        print(f"   {meta['file']}: {meta['variables'][meta['power_variable']]['shape'][0]} samples, "
+              f"chunk {chunk} (default {DEFAULT_CHUNK_SAMPLES}), {concurrency} at once, "
+              f"~{format_memory(scheduler._chunk_bytes(*sample_bytes(meta), chunk))} per chunk")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Sharded CYGNSS Processing
+Partitions the granules by spacecraft, by day or by both, runs each shard as
+an independent job (local worker processes or separate machines sharing the
+filesystem) writing its own DDM store and statistics snapshot, and merges the
+finished shards into the main store, snapshot and shard index.
+
+  plan   write <shard dir>/plan.json so every machine runs the same partition
+  run    process shards named by --shard, or every --shard-count'th one
+  merge  combine finished shards into --store / --stats
+"""
+
+import os
+import time
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+from cygnss_metadata import DATA_DIR, DEFAULT_CACHE_DIR, _read_json, _write_json, get_cache, parse_granule_name
+
+DEFAULT_SHARD_DIR = str(DATA_DIR / "shards")
+SHARD_MODES = ('spacecraft', 'day', 'spacecraft-day')
+PLAN_FILE = "plan.json"
+INDEX_FILE = "index.json"
+# Written into a shard's directory only once all of its outputs are complete
+DONE_FILE = "shard.json"
+SHARD_STORE = "cygnss_store.sqlite"
+SHARD_STATS = "cygnss_stats.json"
+
+
+def shard_name(path, by='spacecraft', cache_dir=None):
+    """Shard of a granule, e.g. 'cyg03', '2018-08-01' or 'cyg03_2018-08-01'
+
+    Spacecraft and day come from the file name; granules that don't follow
+    the naming convention are looked up in the metadata cache.
+    """
+    if by not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode {by!r}; choose one of {', '.join(SHARD_MODES)}")
+    info = parse_granule_name(path)
+    if info["spacecraft"] is None:
+        info = get_cache(cache_dir).get(path)[0]
+    spacecraft = f"cyg{info['spacecraft']:02d}" if info.get("spacecraft") is not None else "cygXX"
+    day = (info.get("time_start") or "unknown")[:10]
+    return {'spacecraft': spacecraft, 'day': day, 'spacecraft-day': f"{spacecraft}_{day}"}[by]
+
+
+def partition(files, by='spacecraft', cache_dir=None):
+    """{shard: [files]} with shards and their files in sorted order"""
+    shards = {}
+    for path in sorted(files):
+        shards.setdefault(shard_name(path, by, cache_dir), []).append(str(path))
+    return dict(sorted(shards.items()))
+
+
+def write_plan(files, shard_dir=DEFAULT_SHARD_DIR, by='spacecraft', cache_dir=None, data_dir=None):
+    """Partition the granules and save the plan; returns it
+
+    ``data_dir`` is kept so every shard names granules by the same relative paths.
+    """
+    plan = {"by": by, "createdAt": datetime.now(timezone.utc).isoformat(),
+            "dataDir": str(data_dir) if data_dir is not None else None,
+            "shards": partition(files, by, cache_dir)}
+    Path(shard_dir).mkdir(parents=True, exist_ok=True)
+    _write_json(Path(shard_dir) / PLAN_FILE, plan)
+    return plan
+
+
+def select_shards(names, shards=None, index=None, count=None):
+    """Shard names this job should run: the named ones, or every count'th from index"""
+    names = sorted(names)
+    if shards:
+        unknown = set(shards) - set(names)
+        if unknown:
+            raise ValueError(f"Unknown shard(s): {', '.join(sorted(unknown))}")
+        return [name for name in names if name in shards]
+    if count:
+        if not 0 <= (index or 0) < count:
+            raise ValueError("--shard-index must be in [0, --shard-count)")
+        return names[index or 0::count]
+    return names
+
+
+def run_shard(name, files, shard_dir=DEFAULT_SHARD_DIR, cache_dir=None, data_dir=None, verbose=True):
+    """Ingest one shard's granules into its own store and statistics snapshot
+
+    Both outputs skip granules they already hold, so a rerun after a failure
+    only processes what is missing. Returns the shard's done record.
+    """
+    from cygnss_store import connect, ingest_granule
+    from cygnss_stats import accumulate
+
+    out_dir = Path(shard_dir) / name
+    out_dir.mkdir(parents=True, exist_ok=True)
+    done = out_dir / DONE_FILE
+    if done.exists():
+        done.unlink()  # the shard is being rewritten: not mergeable until it finishes
+
+    started = time.perf_counter()
+    conn = connect(str(out_dir / SHARD_STORE))
+    written = 0
+    try:
+        for file_path in files:
+            written += ingest_granule(conn, file_path, cache_dir, data_dir=data_dir)
+        ddms = conn.execute("SELECT COUNT(*) FROM ddms").fetchone()[0]
+    finally:
+        conn.close()
+    accumulate(files, str(out_dir / SHARD_STATS), cache_dir, verbose=False)
+
+    record = {"shard": name, "files": [os.path.basename(f) for f in files], "ddms": ddms,
+              "written": written, "seconds": round(time.perf_counter() - started, 3),
+              "host": os.uname().nodename, "completedAt": datetime.now(timezone.utc).isoformat()}
+    _write_json(done, record)
+    if verbose:
+        print(f"   🧩 {name}: {len(files)} granules, {written} new DDMs in {record['seconds']:.1f} s")
+    return record
+
+
+def _run_shard_job(args):
+    return run_shard(*args, verbose=False)
+
+
+def run_shards(plan, names, shard_dir=DEFAULT_SHARD_DIR, cache_dir=None, jobs=1, verbose=True):
+    """Run the named shards, in up to ``jobs`` worker processes; returns their done records"""
+    tasks = [(name, plan["shards"][name], shard_dir, cache_dir, plan.get("dataDir")) for name in names]
+    if jobs <= 1 or len(tasks) <= 1:
+        return [run_shard(*task, verbose=verbose) for task in tasks]
+
+    import multiprocessing as mp
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from cygnss_handoff import START_METHOD
+
+    records = []
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=mp.get_context(START_METHOD)) as pool:
+        futures = {pool.submit(_run_shard_job, task): task[0] for task in tasks}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                print(f"❌ Shard {futures[future]} failed: {e}")
+                continue
+            records.append(record)
+            if verbose:
+                print(f"   🧩 {record['shard']}: {len(record['files'])} granules, "
+                      f"{record['written']} new DDMs in {record['seconds']:.1f} s")
+    return records
+
+
+def merge_shards(shard_dir=DEFAULT_SHARD_DIR, store_path=None, stats_path=None, verbose=True):
+    """Merge every finished shard into the main store and snapshot; returns the shard index
+
+    Unfinished shards (no done record) are left out and listed as pending,
+    and directories of shards not in the current plan are ignored.
+    The store merge copies only granules it does not hold yet; the snapshot
+    is rebuilt from all finished shards, so merging again is always safe.
+    """
+    from cygnss_store import DEFAULT_STORE, connect, merge_store
+    from cygnss_stats import DEFAULT_SNAPSHOT, OnlineStats
+
+    shard_dir = Path(shard_dir)
+    plan = _read_json(shard_dir / PLAN_FILE) or {"shards": {}}
+    finished = {}
+    for done in sorted(shard_dir.glob(f"*/{DONE_FILE}")):
+        record = _read_json(done)
+        if record and (not plan["shards"] or done.parent.name in plan["shards"]):
+            finished[done.parent.name] = record
+    pending = sorted(set(plan["shards"]) - set(finished))
+
+    conn = connect(store_path or DEFAULT_STORE)
+    stats = OnlineStats()
+    try:
+        for name in finished:
+            copied = merge_store(conn, shard_dir / name / SHARD_STORE)
+            shard_stats = OnlineStats.load(shard_dir / name / SHARD_STATS)
+            stats.merge(shard_stats)
+            if verbose:
+                print(f"   🔗 {name}: {copied} DDMs merged, {len(shard_stats.granules)} granules in statistics")
+    finally:
+        conn.close()
+    stats.snapshot(stats_path or DEFAULT_SNAPSHOT)
+
+    index = {"by": plan.get("by"), "mergedAt": datetime.now(timezone.utc).isoformat(),
+             "store": str(store_path or DEFAULT_STORE), "stats": str(stats_path or DEFAULT_SNAPSHOT),
+             "shards": finished, "pending": pending}
+    _write_json(shard_dir / INDEX_FILE, index)
+    return index
+
+
+def main():
+    from process_cygnss_data import find_cygnss_files
+
+    parser = argparse.ArgumentParser(description="Plan, run and merge sharded CYGNSS processing jobs")
+    parser.add_argument("action", choices=["plan", "run", "merge"],
+                        help="plan the shards, run some of them, or merge the finished ones")
+    parser.add_argument("--data-dir", "-d", default="./data",
+                        help="Directory containing downloaded CYGNSS NetCDF files")
+    parser.add_argument("--shard-dir", default=DEFAULT_SHARD_DIR,
+                        help="Directory for the plan, per-shard outputs and the shard index")
+    parser.add_argument("--by", choices=SHARD_MODES, default="spacecraft",
+                        help="Partition granules by spacecraft, by day, or by both (used when planning)")
+    parser.add_argument("--shard", nargs="+", metavar="NAME",
+                        help="Run only these shards (e.g. cyg03)")
+    parser.add_argument("--shard-index", type=int,
+                        help="With --shard-count: run every Nth shard starting here (one machine of N)")
+    parser.add_argument("--shard-count", type=int,
+                        help="Number of machines/jobs sharing the shards")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes on this machine")
+    parser.add_argument("--store", "-s",
+                        help="Main DDM store to merge into (default: cygnss_store.py's)")
+    parser.add_argument("--stats",
+                        help="Statistics snapshot to write on merge (default: cygnss_stats.py's)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Granule metadata cache directory")
+
+    args = parser.parse_args()
+
+    print("🧩 CYGNSS Sharded Processing")
+    print("=" * 50)
+
+    if args.action == "merge":
+        index = merge_shards(args.shard_dir, args.store, args.stats)
+        print(f"✅ Merged {len(index['shards'])} shard(s)")
+        if index["pending"]:
+            print(f"⚠️  Not finished yet: {', '.join(index['pending'])}")
+        return
+
+    plan = _read_json(Path(args.shard_dir) / PLAN_FILE)
+    if args.action == "plan" or plan is None:
+        plan = write_plan(find_cygnss_files(args.data_dir), args.shard_dir, args.by, args.cache_dir,
+                          args.data_dir)
+        print(f"📋 {len(plan['shards'])} shard(s) by {args.by} in {Path(args.shard_dir) / PLAN_FILE}")
+        for name, files in plan["shards"].items():
+            print(f"   {name}: {len(files)} granules")
+    if args.action == "plan":
+        return
+
+    try:
+        names = select_shards(plan["shards"], args.shard, args.shard_index, args.shard_count)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    records = run_shards(plan, names, args.shard_dir, args.cache_dir, args.jobs)
+    print(f"✅ {len(records)}/{len(names)} shard(s) finished; run 'merge' once all jobs are done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+DDM Similarity Search
+Finds the bundled DDMs that look most like a given one, e.g. other scenes
+like one over a flood. Each DDM is taken in dB relative to its own noise
+floor, so matches are on shape and SNR rather than receiver gain, and mapped
+to a few PCA components fitted on a random sample (the same basis as
+the compact 'pca' encoding; a pca bundle is indexed from its stored
+coefficients). The float32 embeddings go into a flat index (exact: one matrix
+product per query batch) or an IVF index (k-means cells; a query scans only
+the nprobe cells nearest to it), like FAISS's IndexFlatL2 and IndexIVFFlat.
+Results are (granule, sample, channel) with the L2 distance between
+embeddings. The index keeps each DDM's noise floor, so it doubles as a lossy
+copy of the bundle (reconstruct()).
+"""
+
+import json
+import time
+import argparse
+
+import numpy as np
+
+from cygnss_calibration import power_to_db
+from cygnss_checkpoint import atomic_write
+from cygnss_compact import (PCA_COMPONENTS, PCA_SAMPLE, decode_cubes, fit_basis, load_bundle, pca_rows,
+                            project, reconstruct)
+
+INDEX_KINDS = ('flat', 'ivf')
+DEFAULT_K = 10
+# IVF cells scanned per query; more cells find more of the exact neighbours
+DEFAULT_NPROBE = 8
+# Lloyd iterations and training points per cell for the IVF k-means
+KMEANS_ITERATIONS = 10
+TRAIN_PER_CELL = 64
+# Rows per block when assigning DDMs to cells (bounds the distance matrix)
+BLOCK_ROWS = 16384
+
+
+def _squared_distances(queries, points, point_norms):
+    """(q, m) squared L2 distances, ||p||^2 - 2 q.p + ||q||^2 (clamped at 0)"""
+    distances = queries @ points.T
+    distances *= -2
+    distances += point_norms
+    distances += np.einsum('ij,ij->i', queries, queries)[:, None]
+    np.maximum(distances, 0, out=distances)
+    return distances
+
+
+def _nearest(distances, k):
+    """Column indices of the k smallest distances per row, closest first"""
+    k = min(k, distances.shape[1])
+    if k < distances.shape[1]:
+        part = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(k), distances.shape).copy()
+    order = np.take_along_axis(distances, part, axis=1).argsort(axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1)
+
+
+def assign_cells(points, centroids):
+    """Nearest centroid of every point, in blocks of BLOCK_ROWS"""
+    norms = np.einsum('ij,ij->i', centroids, centroids)
+    labels = np.empty(points.shape[0], dtype=np.int64)
+    for start in range(0, points.shape[0], BLOCK_ROWS):
+        block = points[start:start + BLOCK_ROWS]
+        labels[start:start + BLOCK_ROWS] = _squared_distances(block, centroids, norms).argmin(axis=1)
+    return labels
+
+
+def kmeans(points, cells, iterations=KMEANS_ITERATIONS, seed=0):
+    """Lloyd's k-means on (m, d) float32 points; returns (cells, d) float32 centroids
+
+    Trains on at most TRAIN_PER_CELL points per cell; an emptied cell keeps
+    its previous centroid.
+    """
+    rng = np.random.default_rng(seed)
+    cells = max(1, min(cells, points.shape[0]))
+    if points.shape[0] > cells * TRAIN_PER_CELL:
+        points = points[np.sort(rng.choice(points.shape[0], cells * TRAIN_PER_CELL, replace=False))]
+    centroids = points[rng.choice(points.shape[0], cells, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign_cells(points, centroids)
+        counts = np.bincount(labels, minlength=cells)
+        sums = np.stack([np.bincount(labels, weights=points[:, j], minlength=cells)
+                         for j in range(points.shape[1])], axis=1)
+        filled = counts > 0
+        centroids[filled] = (sums[filled] / counts[filled, None]).astype(np.float32)
+    return centroids
+
+
+class DDMIndex:
+    """PCA embeddings of a bundle's DDMs with a flat or IVF nearest-neighbour index
+
+    Entries are the indexed DDMs (missing ones are left out); ``entry`` is a
+    DDM's flat position (row * channels + channel) in the bundle and
+    ``position`` maps it back to its entry (-1 when not indexed).
+    """
+
+    def __init__(self, arrays, header):
+        self.header = header
+        self.kind = header["kind"]
+        self.channels = header["channels"]
+        self.mean = arrays["mean"]
+        self.basis = arrays["basis"]
+        self.embeddings = arrays["embeddings"]
+        self.floor = arrays["floor"]
+        self.entry = arrays["entry"]
+        self.granule_names = [str(name) for name in arrays["granule_names"]]
+        self.granule_starts = arrays["granule_starts"]
+        self.lat = arrays.get("lat")
+        self.lon = arrays.get("lon")
+        self.centroids = arrays.get("centroids")
+        self.cell_offsets = arrays.get("cell_offsets")
+        self.norms = np.einsum('ij,ij->i', self.embeddings, self.embeddings)
+        self.position = np.full(int(header["n_ddms"]), -1, dtype=np.int64)
+        self.position[self.entry] = np.arange(self.entry.size)
+
+    @classmethod
+    def build(cls, bundle_path, kind='ivf', components=PCA_COMPONENTS, cells=None, sample=PCA_SAMPLE, seed=0):
+        """Index every DDM of a bundle written by save_bundle (a pca bundle reuses its basis)"""
+        if kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index kind {kind!r}; choose one of {', '.join(INDEX_KINDS)}")
+        bundle = load_bundle(bundle_path, decode=False)
+        if bundle["encoding"] == 'pca':
+            coefficients = bundle["power"]
+            channels = coefficients.shape[1]
+            embeddings = coefficients.reshape(-1, coefficients.shape[-1]).astype(np.float32)
+            floor = bundle["offset"].ravel()
+            mean, basis = bundle["mean"], bundle["basis"]
+            explained = None
+        else:
+            power = power_to_db(decode_cubes(bundle), bundle["units"])
+            channels = power.shape[1]
+            rows, floor = pca_rows(power)
+            del power
+            valid = np.isfinite(floor)
+            mean, basis, explained = fit_basis(rows[valid], components, sample, seed)
+            explained = [round(float(share), 6) for share in explained]
+            embeddings = project(rows, mean, basis)
+            del rows
+            mean = mean.reshape(bundle["delay"].size, bundle["doppler"].size)
+            basis = basis.reshape((-1,) + mean.shape)
+
+        n_rows = embeddings.shape[0] // channels
+        granule = bundle.get("granule")
+        names = bundle.get("granule_names")
+        if granule is None or names is None:
+            granule, names = np.zeros((n_rows, channels), dtype=np.int32), np.array([str(bundle_path)])
+        # Rows are grouped by granule in file order, so a row's sample is its offset in the group
+        starts = np.searchsorted(granule[:, 0], np.arange(len(names))).astype(np.int64)
+
+        entry = np.flatnonzero(np.isfinite(floor))
+        arrays = {"mean": mean, "basis": basis, "embeddings": embeddings[entry], "floor": floor[entry],
+                  "granule_names": np.asarray(names), "granule_starts": starts}
+        for name in ("lat", "lon"):
+            if name in bundle:
+                arrays[name] = np.asarray(bundle[name], dtype=np.float32).ravel()[entry]
+        del embeddings
+        if kind == 'ivf':
+            points = arrays["embeddings"]
+            cells = cells or max(1, int(round(np.sqrt(points.shape[0]))))
+            centroids = kmeans(points, cells, seed=seed)
+            labels = assign_cells(points, centroids)
+            order = np.argsort(labels, kind='stable')
+            for name in ("embeddings", "floor", "lat", "lon"):
+                if name in arrays:
+                    arrays[name] = arrays[name][order]
+            entry = entry[order]
+            arrays["centroids"] = centroids
+            arrays["cell_offsets"] = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=len(centroids)))])
+        arrays["entry"] = entry
+        header = {"kind": kind, "channels": int(channels), "n_ddms": int(floor.size), "bundle": str(bundle_path),
+                  "encoding": bundle["encoding"], "units": bundle["units"], "explained": explained}
+        return cls(arrays, header)
+
+    def save(self, path):
+        """Write the index to one .npz file (atomically)"""
+        arrays = {"mean": self.mean, "basis": self.basis, "embeddings": self.embeddings, "floor": self.floor,
+                  "entry": self.entry, "granule_names": np.asarray(self.granule_names),
+                  "granule_starts": self.granule_starts}
+        for name in ("lat", "lon", "centroids", "cell_offsets"):
+            if getattr(self, name) is not None:
+                arrays[name] = getattr(self, name)
+        with atomic_write(path, 'wb') as f:
+            np.savez(f, header=np.frombuffer(json.dumps(self.header).encode(), dtype=np.uint8), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            header = json.loads(data["header"].tobytes().decode())
+            arrays = {key: data[key] for key in data.files if key != "header"}
+        return cls(arrays, header)
+
+    def embed(self, cubes, units='dB'):
+        """(m, components) embeddings of (..., delay, doppler) cubes; missing DDMs get NaN"""
+        rows, floor = pca_rows(power_to_db(cubes, units))
+        embeddings = project(rows, self.mean, self.basis)
+        embeddings[~np.isfinite(floor)] = np.nan
+        return embeddings
+
+    def search(self, queries, k=DEFAULT_K, nprobe=DEFAULT_NPROBE):
+        """(distances, entries) of the k nearest indexed DDMs to each (q, components) query, closest first
+
+        The flat index is exact; the IVF index scans the nprobe nearest cells.
+        Missing results (fewer candidates than k) are inf / -1.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        distances = np.full((queries.shape[0], k), np.inf, dtype=np.float32)
+        found = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        if self.kind == 'flat':
+            squared = _squared_distances(queries, self.embeddings, self.norms)
+            best = _nearest(squared, k)
+            distances[:, :best.shape[1]] = np.take_along_axis(squared, best, axis=1)
+            found[:, :best.shape[1]] = best
+        else:
+            cell_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+            probes = _nearest(_squared_distances(queries, self.centroids, cell_norms), nprobe)
+            for q, cells in enumerate(probes):
+                candidates = np.concatenate([np.arange(self.cell_offsets[c], self.cell_offsets[c + 1])
+                                             for c in cells])
+                if not candidates.size:
+                    continue
+                squared = _squared_distances(queries[q:q + 1], self.embeddings[candidates], self.norms[candidates])
+                best = _nearest(squared, k)[0]
+                distances[q, :best.size] = squared[0, best]
+                found[q, :best.size] = candidates[best]
+        np.sqrt(distances, out=distances)
+        return distances, found
+
+    def locate(self, granule, sample, channel):
+        """Entry of the DDM at (granule name or number, sample, channel), -1 when it is not indexed"""
+        if not isinstance(granule, (int, np.integer)):
+            granule = self.granule_names.index(granule)
+        row = int(self.granule_starts[granule]) + int(sample)
+        return int(self.position[row * self.channels + int(channel)])
+
+    def describe(self, entries, distances=None):
+        """Result records {"granule", "sample", "channel", "distance", "lat", "lon"} for found entries"""
+        records = []
+        for i, found in enumerate(np.ravel(entries)):
+            if found < 0:
+                continue
+            row, channel = divmod(int(self.entry[found]), self.channels)
+            granule = int(np.searchsorted(self.granule_starts, row, side='right')) - 1
+            record = {"granule": self.granule_names[granule], "sample": row - int(self.granule_starts[granule]),
+                      "channel": channel}
+            if distances is not None:
+                record["distance"] = float(np.ravel(distances)[i])
+            if self.lat is not None:
+                record["lat"], record["lon"] = float(self.lat[found]), float(self.lon[found])
+            records.append(record)
+        return records
+
+    def query(self, granule, sample, channel, k=DEFAULT_K, nprobe=DEFAULT_NPROBE):
+        """Records of the k DDMs most like the one at (granule, sample, channel), itself excluded"""
+        found = self.locate(granule, sample, channel)
+        if found < 0:
+            raise ValueError(f"DDM ({granule}, {sample}, {channel}) is not indexed (missing or dropped)")
+        distances, entries = self.search(self.embeddings[found], k + 1, nprobe)
+        keep = entries[0] != found
+        return self.describe(entries[0][keep][:k], distances[0][keep][:k])
+
+    def reconstruct(self, entries):
+        """Lossy dB cubes (m, delay, doppler) of indexed DDMs from their embeddings"""
+        entries = np.asarray(entries)
+        return reconstruct(self.embeddings[entries], self.mean, self.basis, self.floor[entries])
+
+
+def reconstruction_error(index, bundle_path, max_ddms=PCA_SAMPLE, seed=0):
+    """RMS and 99th percentile |error| (dB) of index.reconstruct() against the bundle, over finite bins"""
+    bundle = load_bundle(bundle_path)
+    power = power_to_db(bundle["power"], bundle["units"]).reshape((-1,) + index.mean.shape)
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(index.entry.size, min(max_ddms, index.entry.size), replace=False)
+    error = index.reconstruct(picked) - power[index.entry[picked]]
+    error = np.abs(error[np.isfinite(error)])
+    return float(np.sqrt(np.mean(error ** 2))), float(np.percentile(error, 99))
+
+
+def measure(index, queries=200, k=DEFAULT_K, nprobe=DEFAULT_NPROBE, seed=0):
+    """Milliseconds per single-DDM query and the share of the exact k neighbours found (recall)"""
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(index.entry.size, min(queries, index.entry.size), replace=False)
+    started = time.perf_counter()
+    found = [index.search(index.embeddings[p], k, nprobe)[1][0] for p in picked]
+    ms = 1000 * (time.perf_counter() - started) / len(picked)
+    exact = _nearest(_squared_distances(index.embeddings[picked], index.embeddings, index.norms), k)
+    recall = np.mean([np.isin(e, f).mean() for e, f in zip(exact, found)])
+    return ms, float(recall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index bundled DDMs and find the ones most like a given DDM")
+    parser.add_argument("action", choices=['build', 'query', 'error'],
+                        help="build an index from a bundle, query it, or measure its reconstruction error")
+    parser.add_argument("--bundle", "-b", help=".npz bundle written by process_cygnss_data.py --bundle")
+    parser.add_argument("--index", "-i", help="Index file (default: the bundle path with .index.npz)")
+    parser.add_argument("--kind", choices=INDEX_KINDS, default='ivf', help="Exact flat index or IVF cells")
+    parser.add_argument("--components", type=int, default=PCA_COMPONENTS, help="PCA components per DDM")
+    parser.add_argument("--cells", type=int, help="IVF cells (default: sqrt of the indexed DDMs)")
+    parser.add_argument("--granule", "-g", help="Query DDM's granule (file name or number)")
+    parser.add_argument("--sample", "-s", type=int, default=0, help="Query DDM's sample in its granule")
+    parser.add_argument("--channel", "-c", type=int, default=0, help="Query DDM's channel")
+    parser.add_argument("-k", type=int, default=DEFAULT_K, help="Neighbours to return")
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE, help="IVF cells scanned per query")
+
+    args = parser.parse_args()
+
+    print("🔎 CYGNSS DDM Similarity Search")
+    print("=" * 50)
+    if not args.index and not args.bundle:
+        print("❌ Give --bundle or --index")
+        return
+    index_path = args.index or args.bundle.rsplit('.npz', 1)[0] + '.index.npz'
+
+    if args.action == 'build':
+        started = time.perf_counter()
+        index = DDMIndex.build(args.bundle, args.kind, args.components, args.cells)
+        index.save(index_path)
+        cells = f", {len(index.centroids)} cells" if index.centroids is not None else ""
+        print(f"✅ Indexed {index.entry.size} DDMs ({len(index.basis)} components{cells}) "
+              f"in {time.perf_counter() - started:.1f} s to {index_path}")
+        if index.header["explained"]:
+            print(f"📊 Components hold {sum(index.header['explained']):.1%} of the sampled variance")
+        ms, recall = measure(index, k=args.k, nprobe=args.nprobe)
+        print(f"⏱️  {ms:.2f} ms per query, {recall:.1%} of the exact {args.k} neighbours found")
+        return
+
+    index = DDMIndex.load(index_path)
+    if args.action == 'error':
+        rms, p99 = reconstruction_error(index, args.bundle or index.header["bundle"])
+        size = index.embeddings.itemsize * index.embeddings.shape[1] + index.floor.itemsize
+        print(f"🎯 Reconstruction from {len(index.basis)} components: {rms:.3f} dB RMS, "
+              f"{p99:.3f} dB 99th percentile ({size} bytes per DDM)")
+        return
+
+    if args.granule is None:
+        print("❌ Give the query DDM with --granule, --sample and --channel")
+        return
+    granule = int(args.granule) if args.granule.isdigit() else args.granule
+    started = time.perf_counter()
+    try:
+        results = index.query(granule, args.sample, args.channel, args.k, args.nprobe)
+    except (ValueError, IndexError) as e:
+        print(f"❌ {e}")
+        return
+    print(f"✅ {len(results)} DDMs like ({args.granule}, {args.sample}, {args.channel}) "
+          f"in {1000 * (time.perf_counter() - started):.2f} ms")
+    for record in results:
+        where = f" at {record['lat']:.2f}, {record['lon']:.2f}" if "lat" in record else ""
+        print(f"   {record['distance']:8.3f}  {record['granule']} sample {record['sample']} "
+              f"channel {record['channel']}{where}")
+
+
+if __name__ == "__main__":
+    main()
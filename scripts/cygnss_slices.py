@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+DDM Slices and Summaries
+Batch reductions over (..., delay, doppler) cubes: integrated delay waveform,
+Doppler spectrum at the peak delay, peak location/power and mean power.
+Sums and means are taken over linear power; results come back in the units
+of the input cube (dB in, dB out).
+"""
+
+import json
+import argparse
+
+import numpy as np
+
+from cygnss_calibration import to_db, units_scale
+from cygnss_checkpoint import write_json_atomic
+from cygnss_kernels import peak_fit, use_numba
+
+# Per-DDM scalar results, in the order they are stored
+SUMMARY_FIELDS = ['peak_power', 'peak_delay_bin', 'peak_doppler_bin', 'mean_power', 'peak_row', 'peak_col']
+# Per-DDM vector results and the cube axis they run along
+SLICE_FIELDS = {'delay_waveform': 'delay', 'doppler_spectrum': 'doppler'}
+
+
+def _linear(power, units):
+    """float32 linear power of a cube given its units"""
+    power = np.asarray(power, dtype=np.float32)
+    if units_scale(units) != 'dB':
+        return power
+    linear = np.multiply(power, np.float32(0.1))
+    np.power(np.float32(10.0), linear, out=linear)
+    return linear
+
+
+def ddm_slices(power, units=None, delay=None, doppler=None):
+    """Delay waveform, Doppler spectrum, peak and mean power for a batch of DDMs
+
+    ``power`` is (..., delay, doppler) in ``units`` (linear unless a dB unit).
+    Returns a dict of arrays over the leading axes:
+
+      delay_waveform    (..., delay)   sum over Doppler
+      doppler_spectrum  (..., doppler) row at the peak delay
+      peak_power, peak_delay_bin, peak_doppler_bin, mean_power (...)
+      peak_row, peak_col (...)         sub-bin peak position in fractional bins
+      peak_delay, peak_doppler (...)   axis coordinates, when axes are given
+      peak_delay_fit, peak_doppler_fit sub-bin coordinates, when axes are given
+
+    Missing (NaN) bins are ignored; an all-missing DDM gives NaN results and
+    peak bin 0.
+    """
+    power = np.asarray(power, dtype=np.float32)
+    n_delay, n_doppler = power.shape[-2:]
+    in_db = units_scale(units) == 'dB'
+
+    finite = np.isfinite(power)
+    valid = finite.any(axis=(-2, -1))
+    flat = np.where(finite, power, -np.inf).reshape(*power.shape[:-2], -1)
+    peak_index = np.argmax(flat, axis=-1)
+    peak_delay_bin = peak_index // n_doppler
+    peak_doppler_bin = peak_index % n_doppler
+
+    linear = _linear(power, units)
+    linear = np.where(finite, linear, 0)
+    waveform = linear.sum(axis=-1)
+    counts = finite.sum(axis=(-2, -1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = waveform.sum(axis=-1) / counts
+
+    spectrum = np.take_along_axis(power, peak_delay_bin[..., None, None], axis=-2)[..., 0, :]
+    peak_power = np.take_along_axis(flat, peak_index[..., None], axis=-1)[..., 0]
+
+    waveform[~finite.any(axis=-1)] = np.nan
+    if in_db:
+        waveform = to_db(waveform, out=np.empty_like(waveform))
+        waveform[~finite.any(axis=-1)] = np.nan
+        mean = np.where(valid, to_db(np.where(valid, mean, 1.0)), np.nan)
+
+    result = {
+        "delay_waveform": waveform.astype(np.float32),
+        "doppler_spectrum": np.where(valid[..., None], spectrum, np.nan).astype(np.float32),
+        "peak_power": np.where(valid, peak_power, np.nan).astype(np.float32),
+        "peak_delay_bin": np.where(valid, peak_delay_bin, 0),
+        "peak_doppler_bin": np.where(valid, peak_doppler_bin, 0),
+        "mean_power": np.asarray(mean, dtype=np.float32),
+    }
+    fit = subbin_peak(power, units, peak_bins=(peak_delay_bin, peak_doppler_bin), delay=delay, doppler=doppler)
+    result["peak_row"] = np.where(valid, fit["peak_row"], np.nan)
+    result["peak_col"] = np.where(valid, fit["peak_col"], np.nan)
+    if delay is not None:
+        result["peak_delay"] = np.where(valid, np.asarray(delay, dtype=np.float32)[result["peak_delay_bin"]], np.nan)
+        result["peak_delay_fit"] = np.where(valid, fit["peak_delay"], np.nan)
+    if doppler is not None:
+        result["peak_doppler"] = np.where(valid, np.asarray(doppler, dtype=np.float32)[result["peak_doppler_bin"]],
+                                          np.nan)
+        result["peak_doppler_fit"] = np.where(valid, fit["peak_doppler"], np.nan)
+    return result
+
+
+# Least-squares fit of f = c0 + c1 x + c2 y + c3 x^2 + c4 y^2 + c5 xy over a 3x3 patch
+_PATCH_Y, _PATCH_X = np.meshgrid([-1.0, 0.0, 1.0], [-1.0, 0.0, 1.0], indexing='ij')
+_QUADRATIC_PINV = np.linalg.pinv(np.stack([
+    np.ones(9), _PATCH_Y.ravel(), _PATCH_X.ravel(),
+    _PATCH_Y.ravel() ** 2, _PATCH_X.ravel() ** 2, (_PATCH_Y * _PATCH_X).ravel(),
+], axis=1)).astype(np.float32)
+
+PEAK_METHODS = ('argmax', 'parabolic', 'quadratic')
+
+
+def _parabolic_offset(left, centre, right):
+    """Vertex offset of the parabola through three equally spaced samples"""
+    curvature = left - 2 * centre + right
+    with np.errstate(invalid='ignore', divide='ignore'):
+        offset = 0.5 * (left - right) / curvature
+    ok = (curvature < 0) & np.isfinite(offset)
+    return np.where(ok, np.clip(offset, -0.5, 0.5), 0.0)
+
+
+def _quadratic_coefficients(values):
+    """c1..c5 of the 3x3 surface fit for (..., 9) log power, summed in a fixed order (no BLAS)
+
+    The order matches the Numba kernel so both paths give identical results.
+    """
+    coefficients = []
+    for k in range(1, 6):
+        acc = values[..., 0] * _QUADRATIC_PINV[k, 0]
+        for j in range(1, 9):
+            acc = acc + values[..., j] * _QUADRATIC_PINV[k, j]
+        coefficients.append(acc)
+    return coefficients
+
+
+def subbin_peak(power, units=None, method='parabolic', peak_bins=None, delay=None, doppler=None, backend=None):
+    """Sub-bin peak position of every DDM in a (..., delay, doppler) batch
+
+    The fit runs on log power around the argmax bin: 'parabolic' fits a
+    parabola along delay and along Doppler through the 3 neighbours (exact for
+    a Gaussian peak), 'quadratic' fits a 2-D quadratic surface to the 3x3
+    patch and falls back to 'parabolic' where the surface has no maximum
+    within one bin. Peaks on the grid edge or next to missing bins keep the
+    bin centre on that axis. Returns ``peak_row``/``peak_col`` in fractional
+    bins and, with axes, ``peak_delay``/``peak_doppler`` interpolated on them.
+    ``backend`` picks the NumPy or Numba implementation (cygnss_kernels.py).
+    """
+    if method not in PEAK_METHODS:
+        raise ValueError(f"Unknown peak method {method!r}; choose one of {', '.join(PEAK_METHODS)}")
+    power = np.asarray(power, dtype=np.float32)
+    n_delay, n_doppler = power.shape[-2:]
+
+    if method != 'argmax' and use_numba(backend):
+        bins = None if peak_bins is None else [np.asarray(b).reshape(-1) for b in peak_bins]
+        peak_row, peak_col = peak_fit(power.reshape(-1, n_delay, n_doppler), bins, units_scale(units) == 'dB',
+                                      method == 'quadratic', _QUADRATIC_PINV)
+        peak_row, peak_col = peak_row.reshape(power.shape[:-2]), peak_col.reshape(power.shape[:-2])
+    else:
+        if peak_bins is None:
+            flat = np.where(np.isfinite(power), power, -np.inf).reshape(*power.shape[:-2], -1)
+            peak_index = np.argmax(flat, axis=-1)
+            peak_bins = (peak_index // n_doppler, peak_index % n_doppler)
+        peak_row, peak_col = _numpy_peak_fit(power, units, method, peak_bins)
+
+    result = {"peak_row": peak_row, "peak_col": peak_col}
+    if delay is not None:
+        result["peak_delay"] = np.interp(peak_row, np.arange(n_delay), np.asarray(delay, dtype=np.float64))
+    if doppler is not None:
+        result["peak_doppler"] = np.interp(peak_col, np.arange(n_doppler), np.asarray(doppler, dtype=np.float64))
+    return result
+
+
+def _numpy_peak_fit(power, units, method, peak_bins):
+    """(peak_row, peak_col) around the given peak bins, vectorized over all DDMs"""
+    n_delay, n_doppler = power.shape[-2:]
+    row, col = (np.asarray(b) for b in peak_bins)
+    peak_row, peak_col = row.astype(np.float32), col.astype(np.float32)
+
+    if method != 'argmax':
+        # 3x3 neighbourhood of the peak, gathered for all DDMs at once
+        steps = np.array([-1, 0, 1])
+        rows = np.clip(row[..., None] + steps, 0, n_delay - 1)
+        cols = np.clip(col[..., None] + steps, 0, n_doppler - 1)
+        patch = np.take_along_axis(power, rows[..., :, None], axis=-2)
+        patch = np.take_along_axis(patch, cols[..., None, :], axis=-1)
+        log_patch = patch if units_scale(units) == 'dB' else 10 * np.log10(np.where(patch > 0, patch, np.nan))
+
+        inner_row = (row > 0) & (row < n_delay - 1)
+        inner_col = (col > 0) & (col < n_doppler - 1)
+        d_row = np.where(inner_row, _parabolic_offset(log_patch[..., 0, 1], log_patch[..., 1, 1],
+                                                      log_patch[..., 2, 1]), 0.0)
+        d_col = np.where(inner_col, _parabolic_offset(log_patch[..., 1, 0], log_patch[..., 1, 1],
+                                                      log_patch[..., 1, 2]), 0.0)
+
+        if method == 'quadratic':
+            c1, c2, c3, c4, c5 = _quadratic_coefficients(log_patch.reshape(*log_patch.shape[:-2], 9))
+            det = 4 * c3 * c4 - c5 * c5
+            with np.errstate(invalid='ignore', divide='ignore'):
+                q_row = (c5 * c2 - 2 * c4 * c1) / det
+                q_col = (c5 * c1 - 2 * c3 * c2) / det
+            ok = ((c3 < 0) & (det > 0) & inner_row & inner_col
+                  & (np.abs(q_row) <= 1) & (np.abs(q_col) <= 1))
+            d_row = np.where(ok, q_row, d_row)
+            d_col = np.where(ok, q_col, d_col)
+
+        peak_row = (row + d_row).astype(np.float32)
+        peak_col = (col + d_col).astype(np.float32)
+    return peak_row, peak_col
+
+
+def summary_dict(slices, index=()):
+    """JSON-ready summary of one DDM from ddm_slices output"""
+    def _value(v):
+        v = np.asarray(v)
+        if v.ndim:
+            return [None if x != x else float(x) for x in v.tolist()]
+        return None if v != v else v.item()
+    return {key: _value(values[index]) for key, values in slices.items()}
+
+
+def add_json_summaries(path):
+    """Add a ``summary`` to every DDM of a processed JSON output file"""
+    with open(path) as f:
+        data = json.load(f)
+
+    ddms = [data.get("sample_ddm")] + list(data.get("all_ddms") or [])
+    updated = 0
+    for ddm in ddms:
+        points = (ddm or {}).get("ddm_data") or []
+        if not points:
+            continue
+        delay = np.unique([p["delay"] for p in points])
+        doppler = np.unique([p["doppler"] for p in points])
+        cube = np.full((len(delay), len(doppler)), np.nan, dtype=np.float32)
+        cube[np.searchsorted(delay, [p["delay"] for p in points]),
+             np.searchsorted(doppler, [p["doppler"] for p in points])] = [p["power"] for p in points]
+        units = ddm.get("metadata", {}).get("power_units")
+        ddm["summary"] = summary_dict(ddm_slices(cube, units, delay, doppler))
+        updated += 1
+
+    write_json_atomic(path, data)
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add precomputed DDM summaries to a processed JSON file")
+    parser.add_argument("json_file", help="Processed output, e.g. public/cygnss_data.json")
+
+    args = parser.parse_args()
+    updated = add_json_summaries(args.json_file)
+    print(f"✅ Added summaries to {updated} DDMs in {args.json_file}")
+
+
+if __name__ == "__main__":
+    main()
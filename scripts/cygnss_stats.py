@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Online DDM Statistics
+Running count/mean/variance/min/max (Welford, merged chunk by chunk with
+Chan's parallel update) and fixed-bin histograms of DDM power, kept per
+spacecraft and channel. Chunks are folded in as they are extracted, states
+from separate runs merge exactly, and snapshots are written atomically so
+they can be read while a run is in progress.
+"""
+
+import os
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from cygnss_metadata import DATA_DIR, DEFAULT_CACHE_DIR, _read_json, _write_json, get_cache
+from cygnss_calibration import calibrate_chunk, valid_power, variable_units
+from cygnss_slices import ddm_slices
+from cygnss_anomaly import DEFAULT_DROP, chunk_anomalies, mask_anomalies, parse_thresholds
+
+DEFAULT_SNAPSHOT = str(DATA_DIR / "cygnss_stats.json")
+# Histogram of peak DDM power, dB(W): fixed edges so histograms always merge
+HIST_RANGE = (-230.0, -130.0)
+HIST_BINS = 200
+# Per-DDM scalars tracked besides the per-bin power cube
+SCALAR_FIELDS = ['peak_power', 'mean_power']
+
+
+class Moments:
+    """Element-wise running count, mean, M2, min and max of equally shaped values"""
+
+    def __init__(self, shape=()):
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+
+    def _combine(self, count, mean, m2, low, high):
+        total = self.count + count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean - self.mean
+            ratio = np.where(total > 0, count / np.maximum(total, 1), 0.0)
+            self.mean = self.mean + delta * ratio
+            self.m2 = self.m2 + m2 + delta ** 2 * self.count * ratio
+        self.count = total
+        self.min = np.fmin(self.min, low)
+        self.max = np.fmax(self.max, high)
+
+    def update(self, values):
+        """Fold in a batch of values stacked along axis 0 (NaNs are skipped)"""
+        values = np.asarray(values, dtype=np.float64)
+        finite = np.isfinite(values)
+        count = finite.sum(axis=0)
+        safe = np.where(finite, values, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, safe.sum(axis=0) / np.maximum(count, 1), 0.0)
+        m2 = (np.where(finite, values - mean, 0.0) ** 2).sum(axis=0)
+        low = np.where(finite, values, np.inf).min(axis=0, initial=np.inf)
+        high = np.where(finite, values, -np.inf).max(axis=0, initial=-np.inf)
+        self._combine(count, mean, m2, low, high)
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    @property
+    def variance(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, self.m2 / np.maximum(self.count - 1, 1), np.nan)
+
+    def to_dict(self):
+        def _list(a):
+            return np.where(np.isfinite(a), a, None).tolist() if np.ndim(a) else (a.item() if np.isfinite(a) else None)
+        return {"count": self.count.tolist(), "mean": _list(self.mean), "m2": _list(self.m2),
+                "min": _list(self.min), "max": _list(self.max)}
+
+    @classmethod
+    def from_dict(cls, data):
+        moments = cls()
+        moments.count = np.asarray(data["count"], dtype=np.int64)
+        for name, fill in (("mean", 0.0), ("m2", 0.0), ("min", np.inf), ("max", -np.inf)):
+            values = np.array(data[name], dtype=np.float64)  # None -> NaN
+            setattr(moments, name, np.where(np.isnan(values), fill, values))
+        return moments
+
+
+class OnlineStats:
+    """Per-(spacecraft, channel) moments and histograms fed one chunk at a time"""
+
+    def __init__(self, hist_range=HIST_RANGE, hist_bins=HIST_BINS):
+        self.hist_range, self.hist_bins = tuple(hist_range), int(hist_bins)
+        self.groups = {}     # "cygXX/chN" -> {"power": Moments, field: Moments, "hist": counts}
+        self.granules = []   # content keys of granules already folded in
+
+    def _group(self, key, cube_shape):
+        if key not in self.groups:
+            self.groups[key] = {"power": Moments(cube_shape), **{f: Moments() for f in SCALAR_FIELDS},
+                                # underflow, HIST_BINS bins, overflow
+                                "hist": np.zeros(self.hist_bins + 2, dtype=np.int64)}
+        return self.groups[key]
+
+    def _histogram(self, values):
+        values = values[np.isfinite(values)]
+        low, high = self.hist_range
+        index = np.floor((values - low) / (high - low) * self.hist_bins).astype(np.int64) + 1
+        return np.bincount(np.clip(index, 0, self.hist_bins + 1), minlength=self.hist_bins + 2)
+
+    def update_chunk(self, power_db, spacecraft):
+        """Fold in a (n, channels, delay, doppler) chunk of power in dB"""
+        slices = ddm_slices(power_db, 'dB')
+        for channel in range(power_db.shape[1]):
+            group = self._group(f"cyg{spacecraft or 0:02d}/ch{channel}", power_db.shape[2:])
+            group["power"].update(power_db[:, channel])
+            for field in SCALAR_FIELDS:
+                group[field].update(slices[field][:, channel])
+            group["hist"] += self._histogram(slices["peak_power"][:, channel])
+
+    def merge(self, other):
+        """Add another state (e.g. from a parallel run) into this one"""
+        if (other.hist_range, other.hist_bins) != (self.hist_range, self.hist_bins):
+            raise ValueError("Cannot merge statistics with different histogram bins")
+        if set(self.granules) & set(other.granules):
+            raise ValueError("Both states already count some of the same granules")
+        for key, theirs in other.groups.items():
+            ours = self._group(key, theirs["power"].mean.shape)
+            for name in ["power", *SCALAR_FIELDS]:
+                ours[name].merge(theirs[name])
+            ours["hist"] += theirs["hist"]
+        self.granules = sorted(set(self.granules) | set(other.granules))
+
+    def total(self):
+        """All groups merged into one {"power", fields..., "hist"} group"""
+        combined = OnlineStats(self.hist_range, self.hist_bins)
+        for key, group in self.groups.items():
+            ours = combined._group("all", group["power"].mean.shape)
+            for name in ["power", *SCALAR_FIELDS]:
+                ours[name].merge(group[name])
+            ours["hist"] += group["hist"]
+        return combined.groups.get("all")
+
+    def to_dict(self):
+        groups = {}
+        for key, group in self.groups.items():
+            groups[key] = {name: group[name].to_dict() for name in ["power", *SCALAR_FIELDS]}
+            groups[key]["hist"] = group["hist"].tolist()
+        return {"histRange": list(self.hist_range), "histBins": self.hist_bins,
+                "granules": self.granules, "groups": groups}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls(data["histRange"], data["histBins"])
+        stats.granules = list(data.get("granules", []))
+        for key, group in data["groups"].items():
+            stats.groups[key] = {name: Moments.from_dict(group[name]) for name in ["power", *SCALAR_FIELDS]}
+            stats.groups[key]["hist"] = np.asarray(group["hist"], dtype=np.int64)
+        return stats
+
+    def snapshot(self, path):
+        """Write the current state atomically (safe to read at any time)"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        _write_json(path, self.to_dict())
+
+    @classmethod
+    def load(cls, path):
+        data = _read_json(path)
+        return cls.from_dict(data) if data else cls()
+
+
+def accumulate(files, snapshot_path=DEFAULT_SNAPSHOT, cache_dir=None, chunk_samples=1024,
+               snapshot_every=10, verbose=True, drop=DEFAULT_DROP, anomaly_thresholds=None):
+    """Fold every new granule into the snapshot at snapshot_path; returns the state
+
+    Granules already counted in the snapshot (by content key) are skipped, so
+    an interrupted run continues from its last snapshot. DDMs whose anomaly
+    flags hit ``drop`` (0 keeps everything) are left out, and so are missing
+    and non-positive bins.
+    """
+    from cygnss_extract import iter_ddm_chunks
+
+    stats = OnlineStats.load(snapshot_path)
+    done = set(stats.granules)
+    cache = get_cache(cache_dir)
+    pending = 0
+
+    for file_path in files:
+        meta = cache.get(file_path)[0]
+        if meta["key"] in done or meta["power_variable"] is None:
+            continue
+        # Fold the granule into a scratch state so a partial granule never lands in a snapshot
+        granule = OnlineStats(stats.hist_range, stats.hist_bins)
+        units = variable_units(meta, meta["power_variable"])
+        dropped = 0
+        for chunk in iter_ddm_chunks(file_path, chunk_samples, meta=meta):
+            flags = chunk_anomalies(chunk, meta, **(anomaly_thresholds or {}))["anomaly"] if drop else None
+            # Missing and non-positive bins would sit at the to_db floor; as NaN the moments skip them
+            valid = valid_power(chunk["power"], units)
+            power_db, _ = calibrate_chunk(chunk, units)
+            power_db[~valid] = np.nan
+            if drop:
+                # After calibration: to_db would clamp NaN to the floor
+                dropped += mask_anomalies(power_db, flags, drop)
+            granule.update_chunk(power_db, meta["spacecraft"])
+        granule.granules = [meta["key"]]
+        stats.merge(granule)
+        if verbose:
+            print(f"📊 {os.path.basename(file_path)}" + (f" ({dropped} anomalous DDMs left out)" if dropped else ""))
+
+        pending += 1
+        if pending >= snapshot_every:
+            stats.snapshot(snapshot_path)
+            pending = 0
+
+    stats.snapshot(snapshot_path)
+    return stats
+
+
+def describe(stats):
+    """Printable per-group summary lines"""
+    lines = []
+    for key in sorted(stats.groups):
+        peak = stats.groups[key]["peak_power"]
+        if peak.count:
+            lines.append(f"   {key}: {int(peak.count)} DDMs, peak {peak.mean:.2f} ± {np.sqrt(peak.variance):.2f} dB "
+                         f"[{peak.min:.1f}, {peak.max:.1f}]")
+    return lines
+
+
+def main():
+    from process_cygnss_data import find_cygnss_files
+
+    parser = argparse.ArgumentParser(description="Accumulate running DDM statistics per spacecraft and channel")
+    parser.add_argument("--data-dir", "-d", default="./data",
+                        help="Directory containing downloaded CYGNSS NetCDF files")
+    parser.add_argument("--snapshot", "-o", default=DEFAULT_SNAPSHOT,
+                        help="Statistics snapshot (resumed from if it exists)")
+    parser.add_argument("--every", type=int, default=10,
+                        help="Write a snapshot every N granules")
+    parser.add_argument("--merge", nargs="+", metavar="SNAPSHOT",
+                        help="Merge these snapshots into --snapshot instead of reading granules")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Granule metadata cache directory")
+    parser.add_argument("--keep-anomalies", action="store_true",
+                        help="Also count DDMs flagged as anomalous (RFI, saturated, zero...)")
+    parser.add_argument("--anomaly-threshold", action="append", metavar="NAME=VALUE",
+                        help="Override an anomaly threshold (see scripts/cygnss_anomaly.py)")
+
+    args = parser.parse_args()
+
+    print("📊 CYGNSS Online Statistics")
+    print("=" * 50)
+    try:
+        anomaly_thresholds = parse_thresholds(args.anomaly_threshold)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    if args.merge:
+        stats = OnlineStats.load(args.snapshot)
+        try:
+            for path in args.merge:
+                stats.merge(OnlineStats.load(path))
+        except ValueError as e:
+            print(f"❌ Cannot merge {path}: {e}")
+            return
+        stats.snapshot(args.snapshot)
+    else:
+        stats = accumulate(find_cygnss_files(args.data_dir), args.snapshot, args.cache_dir,
+                           snapshot_every=args.every, drop=0 if args.keep_anomalies else DEFAULT_DROP,
+                           anomaly_thresholds=anomaly_thresholds)
+
+    for line in describe(stats):
+        print(line)
+    print(f"✅ {len(stats.granules)} granules in {args.snapshot}")
+
+
+if __name__ == "__main__":
+    main()
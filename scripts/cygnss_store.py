@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+CYGNSS DDM Store
+SQLite store of every extracted DDM with per-DDM observables, indexed by time,
+spacecraft and specular-point location (R*Tree) for the query service
+"""
+
+import os
+import json
+import base64
+import sqlite3
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from cygnss_metadata import DATA_DIR, DEFAULT_CACHE_DIR, get_cache
+from cygnss_extract import iter_ddm_chunks
+from cygnss_calibration import power_to_db, valid_power, variable_units
+from cygnss_compact import quantize
+from cygnss_slices import SLICE_FIELDS, ddm_slices
+from cygnss_noise import normalize_chunk, noise_variables
+
+DEFAULT_STORE = os.environ.get("CYGNSS_STORE", str(DATA_DIR / "cygnss_store.sqlite"))
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS granules (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    key TEXT NOT NULL,
+    spacecraft INTEGER,
+    time_start TEXT,
+    time_end TEXT,
+    delay_bins INTEGER NOT NULL,
+    doppler_bins INTEGER NOT NULL,
+    delay TEXT,
+    doppler TEXT,
+    units TEXT,
+    next_sample INTEGER
+);
+CREATE TABLE IF NOT EXISTS ddms (
+    id INTEGER PRIMARY KEY,
+    granule_id INTEGER NOT NULL REFERENCES granules(id),
+    sample INTEGER NOT NULL,
+    channel INTEGER NOT NULL,
+    time REAL,
+    spacecraft INTEGER,
+    lat REAL,
+    lon REAL,
+    quality INTEGER NOT NULL,
+    prn INTEGER,
+    peak_power REAL,
+    peak_delay_bin INTEGER,
+    peak_doppler_bin INTEGER,
+    mean_power REAL,
+    power BLOB NOT NULL,
+    delay_waveform BLOB,
+    doppler_spectrum BLOB,
+    noise REAL,
+    power_norm BLOB
+);
+CREATE INDEX IF NOT EXISTS ddms_time ON ddms(time, id);
+CREATE INDEX IF NOT EXISTS ddms_spacecraft_time ON ddms(spacecraft, time, id);
+CREATE INDEX IF NOT EXISTS ddms_granule ON ddms(granule_id, sample, channel);
+CREATE VIRTUAL TABLE IF NOT EXISTS ddms_location USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+"""
+
+OBSERVABLE_COLUMNS = ['peak_power', 'peak_delay_bin', 'peak_doppler_bin', 'mean_power', 'noise']
+# DDM cubes kept per row: raw power and the noise-normalized (P - N) / N product
+VIEWS = {'raw': 'power', 'normalized': 'power_norm'}
+
+
+def connect(store_path=DEFAULT_STORE, readonly=False):
+    """Open the store, creating the schema on first use"""
+    if readonly:
+        conn = sqlite3.connect(f"file:{Path(store_path).resolve()}?mode=ro", uri=True,
+                               check_same_thread=False)
+    else:
+        Path(store_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(store_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        # Columns added after the first store layout
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(granules)")}
+        if 'units' not in columns:
+            conn.execute("ALTER TABLE granules ADD COLUMN units TEXT")
+        if 'next_sample' not in columns:
+            # NULL once every sample is in; the resume point while an ingest is in progress
+            conn.execute("ALTER TABLE granules ADD COLUMN next_sample INTEGER")
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(ddms)")}
+        for column, kind in [*((c, 'BLOB') for c in SLICE_FIELDS), ('noise', 'REAL'), ('power_norm', 'BLOB')]:
+            if column not in columns:
+                conn.execute(f"ALTER TABLE ddms ADD COLUMN {column} {kind}")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def chunk_observables(power, units=None):
+    """Peak power/location, mean power, delay waveform and Doppler spectrum of a chunk"""
+    return ddm_slices(power, units)
+
+
+def _nullable(values):
+    """Array to a list with NaN turned into SQL NULL"""
+    return [None if v != v else v for v in values.tolist()]
+
+
+def _delete_granule(conn, granule_id):
+    conn.execute("DELETE FROM ddms_location WHERE id IN (SELECT id FROM ddms WHERE granule_id = ?)", (granule_id,))
+    conn.execute("DELETE FROM ddms WHERE granule_id = ?", (granule_id,))
+    conn.execute("DELETE FROM granules WHERE id = ?", (granule_id,))
+
+
+def granule_name(path, data_dir=None):
+    """Store name of a granule: its path relative to data_dir as in the catalog (e.g.
+    2018/213/x.nc), so equal file names in different directories stay apart; the
+    file name alone when no data_dir is given or the file is outside it
+    """
+    path = Path(path)
+    if data_dir is not None:
+        try:
+            return path.resolve().relative_to(Path(data_dir).resolve()).as_posix()
+        except ValueError:
+            pass
+    return path.name
+
+
+def ingest_granule(conn, path, cache_dir=None, chunk_samples=1024, data_dir=None):
+    """Add every DDM of a granule to the store; returns the number of DDMs written
+
+    A granule already stored with the same content key is skipped; a changed
+    granule, or one stored before the normalized view existed, replaces its
+    previous rows. Each DDM is stored raw and noise-normalized (see
+    cygnss_noise), with its noise floor. Every chunk is committed together
+    with the granule's ``next_sample``, so an interrupted ingest resumes from
+    its last completed chunk. Granules are named by granule_name(path, data_dir).
+    """
+    meta = get_cache(cache_dir).get(path)[0]
+    name = granule_name(path, data_dir)
+    row = conn.execute("SELECT id, key, next_sample FROM granules WHERE name = ?", (name,)).fetchone()
+    if row is None and name != Path(path).name:
+        # Stores written before granules were named by relative path: adopt the same granule
+        with conn:
+            conn.execute("UPDATE granules SET name = ? WHERE name = ? AND key = ?", (name, Path(path).name, meta["key"]))
+        row = conn.execute("SELECT id, key, next_sample FROM granules WHERE name = ?", (name,)).fetchone()
+    resume = row and row["key"] == meta["key"] and row["next_sample"] is not None
+    if row and row["key"] == meta["key"] and not resume and not conn.execute(
+            "SELECT 1 FROM ddms WHERE granule_id = ? AND power_norm IS NULL LIMIT 1", (row["id"],)).fetchone():
+        return 0
+
+    if resume:
+        granule_id, start_sample = row["id"], row["next_sample"]
+    else:
+        with conn:
+            if row:
+                _delete_granule(conn, row["id"])
+
+            dims = meta["dims"]
+            granule_id = conn.execute(
+                "INSERT INTO granules (name, key, spacecraft, time_start, time_end, delay_bins, doppler_bins,"
+                " delay, doppler, units, next_sample) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (name, meta["key"], meta["spacecraft"], meta["time_start"], meta["time_end"],
+                 dims.get('delay', 17), dims.get('doppler', 11),
+                 json.dumps(meta["delay"]), json.dumps(meta["doppler"]),
+                 variable_units(meta, meta["power_variable"]))
+            ).lastrowid
+        start_sample = 0
+
+    units = variable_units(meta, meta["power_variable"])
+    noise_sources = noise_variables(meta)
+    written = 0
+    for chunk in iter_ddm_chunks(path, chunk_samples, meta=meta, extra_fields=noise_sources,
+                                 start_sample=start_sample):
+        power = chunk["power"]
+        n, channels = power.shape[:2]
+        obs = chunk_observables(power, units)
+
+        sample = np.repeat(np.arange(chunk["sample_start"], chunk["sample_start"] + n), channels)
+        channel = np.tile(np.arange(channels), n)
+        time = np.repeat(chunk["time"], channels)
+        lat = chunk["lat"].reshape(-1).astype(np.float64)
+        lon = ((chunk["lon"].reshape(-1).astype(np.float64) + 180.0) % 360.0) - 180.0
+        blobs = [cube.tobytes() for cube in np.ascontiguousarray(power, dtype=np.float32).reshape(n * channels, -1)]
+        waveforms = [w.tobytes() for w in obs["delay_waveform"].reshape(n * channels, -1)]
+        spectra = [w.tobytes() for w in obs["doppler_spectrum"].reshape(n * channels, -1)]
+        # Raw blobs are already copied out, so the chunk is normalized in place
+        normalized, noise = normalize_chunk(chunk, units, noise_sources)
+        normalized_blobs = [cube.tobytes() for cube in normalized.reshape(n * channels, -1)]
+
+        with conn:
+            cursor = conn.execute("SELECT COALESCE(MAX(id), 0) FROM ddms")
+            first_id = cursor.fetchone()[0] + 1
+            ids = range(first_id, first_id + n * channels)
+
+            conn.executemany(
+                "INSERT INTO ddms (id, granule_id, sample, channel, time, spacecraft, lat, lon, quality, prn,"
+                " peak_power, peak_delay_bin, peak_doppler_bin, mean_power, power, delay_waveform, doppler_spectrum,"
+                " noise, power_norm) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                zip(ids, [granule_id] * len(ids), sample.tolist(), channel.tolist(), _nullable(time),
+                    [meta["spacecraft"]] * len(ids), _nullable(lat), _nullable(lon),
+                    chunk["quality"].reshape(-1).tolist(), chunk["prn"].reshape(-1).tolist(),
+                    _nullable(obs["peak_power"].reshape(-1)), obs["peak_delay_bin"].reshape(-1).tolist(),
+                    obs["peak_doppler_bin"].reshape(-1).tolist(), _nullable(obs["mean_power"].reshape(-1)),
+                    blobs, waveforms, spectra, _nullable(noise.reshape(-1)), normalized_blobs)
+            )
+            located = np.isfinite(lat) & np.isfinite(lon)
+            conn.executemany(
+                "INSERT INTO ddms_location (id, min_lat, max_lat, min_lon, max_lon) VALUES (?, ?, ?, ?, ?)",
+                zip(np.asarray(ids)[located].tolist(), lat[located].tolist(), lat[located].tolist(),
+                    lon[located].tolist(), lon[located].tolist())
+            )
+            conn.execute("UPDATE granules SET next_sample = ? WHERE id = ?",
+                         (chunk["sample_start"] + n, granule_id))
+        written += n * channels
+
+    with conn:
+        conn.execute("UPDATE granules SET next_sample = NULL WHERE id = ?", (granule_id,))
+
+    return written
+
+
+def merge_store(conn, other_path):
+    """Copy every granule of another store (e.g. a shard) into this one; returns DDMs copied
+
+    Granules already present with the same content key are skipped and
+    changed ones replaced, as in ingest_granule; partially ingested granules
+    of the other store are left out. DDM ids are renumbered into this store
+    and the R*Tree rows follow them.
+    """
+    conn.execute("ATTACH DATABASE ? AS other", (str(other_path),))
+    try:
+        columns = [row[1] for row in conn.execute("PRAGMA main.table_info(ddms)")]
+        shared = {row[1] for row in conn.execute("PRAGMA other.table_info(ddms)")}
+        copied = [c for c in columns if c in shared and c not in ('id', 'granule_id')]
+        granule_columns = [row[1] for row in conn.execute("PRAGMA main.table_info(granules)") if row[1] != 'id']
+        shared = {row[1] for row in conn.execute("PRAGMA other.table_info(granules)")}
+        granule_columns = [c for c in granule_columns if c in shared]
+
+        written = 0
+        complete = " WHERE next_sample IS NULL" if 'next_sample' in shared else ""
+        for other in conn.execute(f"SELECT id, name, key FROM other.granules{complete} ORDER BY name").fetchall():
+            row = conn.execute("SELECT id, key, next_sample FROM granules WHERE name = ?", (other["name"],)).fetchone()
+            if row and row["key"] == other["key"] and row["next_sample"] is None:
+                continue
+            with conn:
+                if row:
+                    _delete_granule(conn, row["id"])
+                granule_id = conn.execute(
+                    f"INSERT INTO granules ({', '.join(granule_columns)}) "
+                    f"SELECT {', '.join(granule_columns)} FROM other.granules WHERE id = ?", (other["id"],)
+                ).lastrowid
+                # New id = old id + offset keeps the granule's DDMs in their original order
+                offset = conn.execute(
+                    "SELECT COALESCE((SELECT MAX(id) FROM main.ddms), 0)"
+                    " - COALESCE((SELECT MIN(id) FROM other.ddms WHERE granule_id = ?), 1) + 1",
+                    (other["id"],)
+                ).fetchone()[0]
+                written += conn.execute(
+                    f"INSERT INTO ddms (id, granule_id, {', '.join(copied)}) "
+                    f"SELECT id + ?, ?, {', '.join(copied)} FROM other.ddms WHERE granule_id = ?",
+                    (offset, granule_id, other["id"])
+                ).rowcount
+                conn.execute(
+                    "INSERT INTO ddms_location (id, min_lat, max_lat, min_lon, max_lon)"
+                    " SELECT loc.id + ?, loc.min_lat, loc.max_lat, loc.min_lon, loc.max_lon"
+                    " FROM other.ddms_location loc JOIN other.ddms d ON d.id = loc.id WHERE d.granule_id = ?",
+                    (offset, other["id"])
+                )
+    finally:
+        conn.execute("DETACH DATABASE other")
+    return written
+
+
+def _quantized(cube, encoding):
+    """JSON form of a quantized cube: base64 codes plus scale/offset"""
+    codes, scale, offset = quantize(cube, encoding)
+    return {
+        "encoding": encoding,
+        "shape": list(cube.shape),
+        "codes": base64.b64encode(codes.tobytes()).decode(),
+        "scale": float(scale),
+        "offset": float(offset),
+    }
+
+
+def _epoch(value):
+    """ISO 8601 string or number to Unix seconds"""
+    try:
+        return float(value)
+    except ValueError:
+        stamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if stamp.tzinfo is None:
+            stamp = stamp.replace(tzinfo=timezone.utc)
+        return stamp.timestamp()
+
+
+def query_ddms(conn, start=None, end=None, bbox=None, spacecraft=None, quality=None,
+               cursor=None, page_size=DEFAULT_PAGE_SIZE, include_ddm=True, encoding=None, view='raw'):
+    """One page of DDM records matching the filters, ordered by (time, id)
+
+    ``bbox`` is (west, south, east, north) and uses the R*Tree; ``quality`` is
+    "good" (no flags set) or an integer mask of flags that must be clear.
+    ``cursor`` is the ``next_cursor`` of the previous page (keyset pagination,
+    so deep pages cost the same as the first one); DDMs without a time come
+    first and page like the rest. With ``encoding`` 'uint8' or 'uint16' each
+    DDM is returned in dB as base64 quantized codes plus scale/offset (see
+    cygnss_compact) instead of nested float lists.
+    ``view`` picks the cube returned: 'raw' (``power``/``power_db``),
+    'normalized' (``power_norm``, linear (P - N) / N, quantized as is) or
+    'both'.
+    """
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    if encoding not in (None, 'float32', 'uint8', 'uint16'):
+        raise ValueError(f"Unknown encoding {encoding!r}")
+    if view not in (*VIEWS, 'both'):
+        raise ValueError(f"Unknown view {view!r}")
+    views = list(VIEWS) if view == 'both' else [view]
+    where, params = [], []
+    joins = ""
+
+    if start is not None:
+        where.append("d.time >= ?")
+        params.append(_epoch(start))
+    if end is not None:
+        where.append("d.time <= ?")
+        params.append(_epoch(end))
+    if spacecraft:
+        where.append(f"d.spacecraft IN ({','.join('?' * len(spacecraft))})")
+        params.extend(int(s) for s in spacecraft)
+    if quality is not None:
+        if str(quality) == "good":
+            where.append("d.quality = 0")
+        else:
+            where.append("(d.quality & ?) = 0")
+            params.append(int(quality))
+    if bbox is not None:
+        west, south, east, north = (float(v) for v in bbox)
+        joins = " JOIN ddms_location loc ON loc.id = d.id"
+        where.append("loc.min_lat >= ? AND loc.max_lat <= ?")
+        params.extend([south, north])
+        if west <= east:
+            where.append("loc.min_lon >= ? AND loc.max_lon <= ?")
+            params.extend([west, east])
+        else:  # box crosses the antimeridian
+            where.append("(loc.min_lon >= ? OR loc.max_lon <= ?)")
+            params.extend([west, east])
+    if cursor:
+        last_time, _, last_id = cursor.rpartition(':')
+        if last_time == 'null':
+            # NULL times sort first: the rest of them, then every timed row
+            where.append("((d.time IS NULL AND d.id > ?) OR d.time IS NOT NULL)")
+            params.append(int(last_id))
+        else:
+            where.append("(d.time > ? OR (d.time = ? AND d.id > ?))")
+            params.extend([float(last_time), float(last_time), int(last_id)])
+
+    columns = ("d.id, d.sample, d.channel, d.time, d.spacecraft, d.lat, d.lon, d.quality, d.prn, "
+               + ", ".join(f"d.{c}" for c in OBSERVABLE_COLUMNS)
+               + ", g.name AS granule, g.delay_bins, g.doppler_bins, g.units, "
+               + ", ".join(f"d.{c}" for c in SLICE_FIELDS)
+               + "".join(f", d.{VIEWS[v]}" for v in views if include_ddm))
+    sql = (f"SELECT {columns} FROM ddms d JOIN granules g ON g.id = d.granule_id{joins}"
+           + (f" WHERE {' AND '.join(where)}" if where else "")
+           + " ORDER BY d.time, d.id LIMIT ?")
+    rows = conn.execute(sql, params + [page_size + 1]).fetchall()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    records = []
+    for row in rows:
+        record = {
+            "granule": row["granule"],
+            "sample": row["sample"],
+            "channel": row["channel"],
+            "time": (datetime.fromtimestamp(row["time"], timezone.utc).isoformat()
+                     if row["time"] is not None else None),
+            "spacecraft": row["spacecraft"],
+            "lat": row["lat"],
+            "lon": row["lon"],
+            "quality": row["quality"],
+            "prn": row["prn"],
+            "observables": {c: row[c] for c in OBSERVABLE_COLUMNS},
+        }
+        for column in SLICE_FIELDS:
+            if row[column] is not None:
+                values = np.frombuffer(row[column], dtype=np.float32)
+                record["observables"][column] = np.where(np.isfinite(values), values, None).tolist()
+        if include_ddm:
+            shape = (row["delay_bins"], row["doppler_bins"])
+            if 'raw' in views:
+                power = np.frombuffer(row["power"], dtype=np.float32).reshape(shape)
+                if encoding in ('uint8', 'uint16'):
+                    # Missing and non-positive bins as NaN (the missing code), not the dB floor
+                    power_db = np.where(valid_power(power, row["units"]), power_to_db(power, row["units"]), np.nan)
+                    record["power_db"] = _quantized(power_db, encoding)
+                else:
+                    record["power"] = np.where(np.isfinite(power), power, None).tolist()
+            if 'normalized' in views:
+                normalized = (np.frombuffer(row["power_norm"], dtype=np.float32).reshape(shape)
+                              if row["power_norm"] is not None else None)
+                if normalized is None:
+                    record["power_norm"] = None
+                elif encoding in ('uint8', 'uint16'):
+                    record["power_norm"] = _quantized(normalized, encoding)
+                else:
+                    record["power_norm"] = np.where(np.isfinite(normalized), normalized, None).tolist()
+        records.append(record)
+
+    next_cursor = None
+    if has_more and rows:
+        last_time = rows[-1]["time"]
+        next_cursor = f"{'null' if last_time is None else repr(float(last_time))}:{rows[-1]['id']}"
+    return {"records": records, "next_cursor": next_cursor, "page_size": page_size}
+
+
+def granule_axes(conn, names):
+    """Delay/Doppler axes and power units for the named granules (shared by all their DDMs)"""
+    if not names:
+        return {}
+    rows = conn.execute(
+        f"SELECT name, delay, doppler, units FROM granules WHERE name IN ({','.join('?' * len(names))})",
+        list(names)
+    ).fetchall()
+    return {row["name"]: {"delay": json.loads(row["delay"]), "doppler": json.loads(row["doppler"]),
+                          "units": row["units"]}
+            for row in rows}
+
+
+def main():
+    from process_cygnss_data import find_cygnss_files
+
+    parser = argparse.ArgumentParser(description="Load extracted CYGNSS DDMs into the indexed query store")
+    parser.add_argument("--data-dir", "-d", default="./data",
+                        help="Directory containing downloaded CYGNSS NetCDF files")
+    parser.add_argument("--store", "-s", default=DEFAULT_STORE,
+                        help="SQLite store file")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Granule metadata cache directory")
+
+    args = parser.parse_args()
+
+    print("🗄️  CYGNSS DDM Store")
+    print("=" * 50)
+
+    conn = connect(args.store)
+    total = 0
+    for file_path in find_cygnss_files(args.data_dir):
+        try:
+            written = ingest_granule(conn, file_path, args.cache_dir, data_dir=args.data_dir)
+        except Exception as e:
+            print(f"❌ Error ingesting {os.path.basename(file_path)}: {e}")
+            continue
+        if written:
+            print(f"   📁 {os.path.basename(file_path)}: {written} DDMs")
+        total += written
+    conn.close()
+
+    print(f"✅ {total} new DDMs stored in {args.store}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Point-Site Daily Time Series
+Builds one compact daily series file per site in public/era5_points with
+ERA5 soil moisture, ERA5 rainfall and CYGNSS reflectivity (peak DDM SNR,
+from the DDM store) near the site. All inputs are binned into (site, day) cells in a
+single bincount pass; sites whose inputs did not change are not rewritten.
+"""
+
+import os
+import sys
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from cygnss_metadata import PUBLIC_DIR, _write_json, _read_json
+from cygnss_era5 import DEFAULT_POINTS_DIR, era5_files, load_points
+
+DEFAULT_OUTPUT_DIR = str(PUBLIC_DIR / "site_series")
+INDEX_FILE = "index.json"
+# Specular points within this many degrees of a site count towards it
+DEFAULT_RADIUS_DEG = 0.25
+
+# Sites shown on the interactive map, keyed by their file prefix
+SITES = {
+    'Bangalore': {"name": "IISc Bangalore", "lat": 12.9716, "lon": 77.5946},
+    'Kanpur': {"name": "IIT Kanpur", "lat": 26.4499, "lon": 80.3319},
+    'Tirupati': {"name": "IIT Tirupati", "lat": 13.6288, "lon": 79.4192},
+}
+
+VARIABLES = {
+    'SM': {"display": "Soil Moisture (ERA5-Land, Surface Layer)", "unit": "m³/m³"},
+    'PRECTOT': {"display": "Rainfall (Daily Total)", "unit": "mm/day"},
+    'CYGNSS': {"display": "CYGNSS Reflectivity (Peak DDM SNR)", "unit": "dB"},
+}
+
+
+def store_signature(store_path):
+    """Digest of the granules in the DDM store, or None without a store"""
+    if not store_path or not os.path.exists(store_path):
+        return None
+    from cygnss_store import connect
+
+    conn = connect(store_path, readonly=True)
+    try:
+        keys = [row[0] for row in conn.execute("SELECT key FROM granules ORDER BY name")]
+    finally:
+        conn.close()
+    return hashlib.sha1("".join(keys).encode()).hexdigest()
+
+
+def site_signature(manifest, names, cygnss_signature):
+    """Digest of a site's input files (content keys) and the store contents
+
+    Content keys rather than mtimes, so a checkout or copy of the same files
+    gives the same digest as the committed index.
+    """
+    digest = hashlib.sha1(str(cygnss_signature).encode())
+    for name in sorted(names):
+        digest.update(f"{name}:{manifest[name]['key']}".encode())
+    return digest.hexdigest()
+
+
+def peak_snr_db(peak_power, noise, units=None):
+    """Reflectivity as the peak SNR 10*log10((P - N) / N) in dB, NaN where not positive
+
+    ``peak_power`` is in ``units``; ``noise`` is the store's linear noise floor.
+    """
+    from cygnss_calibration import units_scale
+
+    peak = np.asarray(peak_power, dtype=np.float64)
+    if units_scale(units) == 'dB':
+        peak = 10.0 ** (peak / 10.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        snr = (peak - noise) / noise
+        return np.where((noise > 0) & (snr > 0), 10.0 * np.log10(snr), np.nan)
+
+
+def cygnss_site_observations(store_path, sites, radius_deg=DEFAULT_RADIUS_DEG):
+    """Good-quality DDMs near any site as (site index, day, peak SNR dB) arrays"""
+    from cygnss_store import connect
+
+    boxes, params = [], []
+    for site in sites:
+        boxes.append("(loc.min_lat >= ? AND loc.max_lat <= ? AND loc.min_lon >= ? AND loc.max_lon <= ?)")
+        params.extend([site["lat"] - radius_deg, site["lat"] + radius_deg,
+                       site["lon"] - radius_deg, site["lon"] + radius_deg])
+
+    conn = connect(store_path, readonly=True)
+    try:
+        rows = conn.execute(
+            "SELECT d.time, d.lat, d.lon, d.peak_power, d.noise, g.units FROM ddms d"
+            " JOIN ddms_location loc ON loc.id = d.id JOIN granules g ON g.id = d.granule_id"
+            " WHERE d.quality = 0 AND d.peak_power IS NOT NULL AND d.noise IS NOT NULL"
+            f" AND ({' OR '.join(boxes)})",
+            params
+        ).fetchall()
+    finally:
+        conn.close()
+
+    empty = (np.array([], dtype=np.int64), np.array([], dtype='datetime64[D]'), np.array([]))
+    if not rows:
+        return empty
+    time, lat, lon, peak, noise = (np.array([r[k] for r in rows], dtype=np.float64) for k in range(5))
+    units = np.array([r[5] or '' for r in rows])
+
+    snr_db = np.empty_like(peak)
+    for unit in np.unique(units):
+        selected = units == unit
+        snr_db[selected] = peak_snr_db(peak[selected], noise[selected], unit or None)
+
+    # Nearest site for every DDM, all sites at once
+    site_lat = np.array([s["lat"] for s in sites])
+    site_lon = np.array([s["lon"] for s in sites])
+    distance = np.hypot(lat[:, None] - site_lat, (lon[:, None] - site_lon) * np.cos(np.radians(site_lat)))
+    nearest = np.argmin(distance, axis=1)
+    keep = distance[np.arange(len(nearest)), nearest] <= radius_deg
+    days = (time[keep] // 86400).astype('datetime64[D]')
+    return nearest[keep], days, snr_db[keep]
+
+
+def daily_grid(site_index, days, values, n_sites, start, n_days):
+    """Mean and count per (site, day) cell in one bincount pass"""
+    cell = site_index * n_days + (days - start).astype(np.int64)
+    finite = np.isfinite(values)
+    cell, values = cell[finite], values[finite]
+    sums = np.bincount(cell, weights=values, minlength=n_sites * n_days)
+    counts = np.bincount(cell, minlength=n_sites * n_days)
+    with np.errstate(invalid='ignore'):
+        means = sums / counts
+    return means.reshape(n_sites, n_days), counts.reshape(n_sites, n_days)
+
+
+def _compact(values):
+    """Floats rounded to 6 significant digits, NaN as null"""
+    return [float(f"{v:.6g}") if v == v else None for v in values.tolist()]
+
+
+def build_site_series(points_dir=DEFAULT_POINTS_DIR, output_dir=DEFAULT_OUTPUT_DIR, store_path=None,
+                      radius_deg=DEFAULT_RADIUS_DEG, force=False, verbose=True, era5_cache=None):
+    """Write per-site series files for sites whose inputs changed; returns the updated sites
+
+    ERA5 values come from the columnar point cache (cygnss_era5), which
+    re-parses only changed CSVs. Returns None when points_dir has no ERA5 CSV.
+    """
+    files = {}
+    for name, (site, _, _) in era5_files(points_dir).items():
+        files.setdefault(site, []).append(name)
+    if not files:
+        print(f"❌ No <Site>_ERA5_<VAR>_<start>_<end>.csv files in {points_dir}")
+        return None
+    era5 = load_points(points_dir, era5_cache)
+    output_dir = Path(output_dir)
+    index = _read_json(output_dir / INDEX_FILE) or {"sites": {}}
+    cygnss_signature = store_signature(store_path)
+
+    signatures = {site: site_signature(era5.manifest, names, cygnss_signature) for site, names in files.items()}
+    changed = [site for site in files
+               if force or index["sites"].get(site, {}).get("inputs") != signatures[site]
+               or not (output_dir / f"{site}.json").exists()]
+    if not changed:
+        if verbose:
+            print("✅ All site series are up to date")
+        return []
+
+    # Every observation of every changed site as flat (site, variable, day, value) arrays
+    site_ids, var_ids, days, values = [], [], [], []
+    var_names = list(VARIABLES)
+    for s, site in enumerate(changed):
+        for v, variable in enumerate(var_names):
+            d, x = era5.query(site, variable)
+            site_ids.append(np.full(len(d), s))
+            var_ids.append(np.full(len(d), v))
+            days.append(d)
+            values.append(x.astype(np.float64))
+
+    located = [site for site in changed if site in SITES]
+    if cygnss_signature and located:
+        idx, d, x = cygnss_site_observations(store_path, [SITES[s] for s in located], radius_deg)
+        site_ids.append(np.array([changed.index(located[i]) for i in idx], dtype=np.int64))
+        var_ids.append(np.full(len(d), var_names.index('CYGNSS')))
+        days.append(d)
+        values.append(x)
+
+    site_ids, var_ids = np.concatenate(site_ids), np.concatenate(var_ids)
+    days, values = np.concatenate(days), np.concatenate(values)
+    if days.size == 0:
+        return []
+
+    start, end = days.min(), days.max()
+    n_days = int((end - start).astype(np.int64)) + 1
+    grid_index = site_ids * len(var_names) + var_ids
+    means, counts = daily_grid(grid_index, days, values, len(changed) * len(var_names), start, n_days)
+    means = means.reshape(len(changed), len(var_names), n_days)
+    counts = counts.reshape(len(changed), len(var_names), n_days)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for s, site in enumerate(changed):
+        present = np.flatnonzero(counts[s].sum(axis=0) > 0)
+        if present.size == 0:
+            continue
+        lo, hi = present[0], present[-1] + 1
+        series = {
+            "site": site,
+            "name": SITES.get(site, {}).get("name", site),
+            "lat": SITES.get(site, {}).get("lat"),
+            "lon": SITES.get(site, {}).get("lon"),
+            "start": str(start + lo),
+            "days": int(hi - lo),
+            "variables": {},
+        }
+        for v, variable in enumerate(var_names):
+            if counts[s, v].any():
+                entry = dict(VARIABLES[variable], values=_compact(means[s, v, lo:hi]))
+                if variable == 'CYGNSS':
+                    entry["counts"] = counts[s, v, lo:hi].tolist()
+                series["variables"][variable] = entry
+
+        _write_json(output_dir / f"{site}.json", series)
+        index["sites"][site] = {
+            "name": series["name"],
+            "file": f"{site}.json",
+            "start": series["start"],
+            "end": str(start + hi - 1),
+            "variables": list(series["variables"]),
+            "inputs": signatures[site],
+        }
+        if verbose:
+            print(f"📈 {site}: {series['days']} days, {', '.join(series['variables'])}")
+
+    index["generatedAt"] = datetime.now(timezone.utc).isoformat()
+    _write_json(output_dir / INDEX_FILE, index)
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build per-site daily ERA5 + CYGNSS series for the map")
+    parser.add_argument("--points-dir", default=DEFAULT_POINTS_DIR,
+                        help="Directory of <Site>_ERA5_<VAR>_<start>_<end>.csv files")
+    parser.add_argument("--output-dir", "-o", default=DEFAULT_OUTPUT_DIR,
+                        help="Directory for <Site>.json series and index.json")
+    parser.add_argument("--store", "-s",
+                        help="DDM store from cygnss_store.py (adds the CYGNSS reflectivity series)")
+    parser.add_argument("--radius", type=float, default=DEFAULT_RADIUS_DEG,
+                        help="Search radius around each site in degrees")
+    parser.add_argument("--era5-cache",
+                        help="ERA5 point cache file (see cygnss_era5.py)")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild every site even if its inputs are unchanged")
+
+    args = parser.parse_args()
+
+    print("🛰️  Site Time Series Builder")
+    print("=" * 50)
+    updated = build_site_series(args.points_dir, args.output_dir, args.store, args.radius, args.force,
+                                era5_cache=args.era5_cache)
+    if updated is None:
+        return 1
+    if updated:
+        print(f"✅ Updated {len(updated)} site(s) in {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
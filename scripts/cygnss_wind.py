@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Lookup-Table Wind Speed Retrieval
+Geophysical model function (GMF) inversion of two DDM observables, the DDM
+average (DDMA: mean BRCS of the 3 x 5 bins around the specular point) and the
+leading edge slope of the integrated delay waveform (LES), to ocean wind
+speed. The GMF is tabulated once from the Zavorotny-Voronovich simulator as
+wind over (incidence, log10 observable); every extracted DDM is then
+retrieved by vectorized bilinear interpolation in that table, and the two
+winds are combined with minimum-variance weights estimated from noisy
+simulations.
+"""
+
+import os
+import argparse
+
+import numpy as np
+
+from cygnss_calibration import units_scale, variable_units, watts_to_brcs
+from cygnss_noise import chunk_noise, noise_variables
+from cygnss_kernels import use_numba, window_observables
+from cygnss_metadata import DATA_DIR
+
+DEFAULT_LUT = str(DATA_DIR / "cygnss_wind_lut.npz")
+LUT_VERSION = 1
+
+# DDMA box around the specular bin and the LES leading edge, in bins
+DDMA_DELAY = (-1, 1)
+DDMA_DOPPLER = (-2, 2)
+LES_ROWS = 2
+OBSERVABLES = ('ddma', 'les')
+
+# Forward-model grid of the table and its output resolution
+INCIDENCE_AXIS = np.arange(0.0, 72.0, 2.0)
+WIND_AXIS = np.concatenate([np.arange(0.5, 10.0, 0.25), np.arange(10.0, 25.0, 0.5), np.arange(25.0, 40.5, 1.0)])
+WIND_DIRECTIONS = (0.0, 45.0, 90.0, 135.0)
+OBSERVABLE_BINS = 256
+# Noisy simulations used for the DDMA/LES combination weights
+WEIGHT_SAMPLES = 20000
+WEIGHT_BINS = np.arange(0.0, 42.0, 2.0)
+
+# Per-DDM L1 variables the retrieval reads (incidence is required)
+WIND_VARIABLES = ['sp_inc_angle', 'brcs_ddm_sp_bin_delay_row', 'brcs_ddm_sp_bin_dopp_col',
+                  'gps_eirp', 'sp_rx_gain', 'tx_to_sp_range', 'rx_to_sp_range']
+WIND_FIELDS = ['wind_speed', 'wind_ddma', 'wind_les', 'ddma', 'les']
+
+
+def wind_variables(meta):
+    """L1 variables to extract for the retrieval, or () when the granule has no incidence angle"""
+    variables = meta.get("variables", {})
+    if 'sp_inc_angle' not in variables:
+        return ()
+    found = [name for name in WIND_VARIABLES if name in variables]
+    return tuple(dict.fromkeys(found + list(noise_variables(meta))))
+
+
+def nominal_brcs_factor(incidence, rx_gain_db=None):
+    """BRCS per watt from the simulator's nominal geometry when the L1 ranges/EIRP are missing"""
+    from cygnss_simulate import GPS_ALTITUDE, GPS_EIRP, RECEIVER_HEIGHT, RX_GAIN_DB
+
+    cos = np.cos(np.radians(np.asarray(incidence, dtype=np.float64)))
+    gain = RX_GAIN_DB if rx_gain_db is None else rx_gain_db
+    return watts_to_brcs(np.ones((1, 1)), GPS_EIRP, gain, GPS_ALTITUDE / cos, RECEIVER_HEIGHT / cos)[..., 0, 0]
+
+
+def observables(signal, specular_row, specular_col, brcs_factor, delay_step=0.25, backend=None):
+    """DDMA (m^2) and LES (m^2 per chip) of noise-subtracted signal power (n, delay, doppler)
+
+    The box and the leading edge are resampled bilinearly around the
+    fractional specular bin; DDMs whose box or leading edge falls off the
+    DDM get NaN. ``backend`` picks the NumPy or Numba implementation
+    (cygnss_kernels.py); sums run in a fixed order so both agree exactly.
+    """
+    if use_numba(backend):
+        return window_observables(signal, specular_row, specular_col, brcs_factor,
+                                  (min(DDMA_DELAY[0], -LES_ROWS), DDMA_DELAY[1]), DDMA_DOPPLER, DDMA_DELAY,
+                                  LES_ROWS, delay_step)
+    signal = np.asarray(signal, dtype=np.float64)
+    n, n_delay, n_doppler = signal.shape
+    row = np.asarray(specular_row, dtype=np.float64)
+    col = np.asarray(specular_col, dtype=np.float64)
+    lags = np.arange(min(DDMA_DELAY[0], -LES_ROWS), DDMA_DELAY[1] + 1)
+    offsets = np.arange(DDMA_DOPPLER[0], DDMA_DOPPLER[1] + 1)
+    with np.errstate(invalid='ignore'):
+        valid = (np.isfinite(row) & np.isfinite(col)
+                 & (row + lags[0] >= 0) & (row + lags[-1] <= n_delay - 1)
+                 & (col + offsets[0] >= 0) & (col + offsets[-1] <= n_doppler - 1))
+    row = np.where(valid, row, -lags[0])
+    col = np.where(valid, col, -offsets[0])
+    # Integer corner of every resampled bin and the weights towards the next row/column
+    row0 = np.minimum(np.floor(row), n_delay - 1 - lags[-1]).astype(np.int64)
+    col0 = np.minimum(np.floor(col), n_doppler - 1 - offsets[-1]).astype(np.int64)
+    fr = (row - row0)[:, None, None]
+    fc = (col - col0)[:, None, None]
+
+    # Window one row/column larger than the box, then shifted by the fractional part
+    rows = (row0[:, None] + np.arange(lags[0], lags[-1] + 2))[:, :, None]
+    cols = np.minimum(col0[:, None] + np.arange(offsets[0], offsets[-1] + 2), n_doppler - 1)[:, None, :]
+    rows = np.minimum(rows, n_delay - 1)
+    window = signal[np.arange(n)[:, None, None], rows, cols]
+    window = (1 - fr) * window[:, :-1] + fr * window[:, 1:]
+    window = (1 - fc) * window[:, :, :-1] + fc * window[:, :, 1:]
+
+    # Integrated delay waveform over the Doppler box, rows relative to the specular point
+    idw = window[:, :, 0]
+    for j in range(1, offsets.size):
+        idw = idw + window[:, :, j]
+    idw = idw * np.asarray(brcs_factor, dtype=np.float64).reshape(-1, 1)
+    box = np.flatnonzero((lags >= DDMA_DELAY[0]) & (lags <= DDMA_DELAY[1]))
+    ddma = idw[:, box[0]]
+    for k in box[1:]:
+        ddma = ddma + idw[:, k]
+    ddma = ddma / (box.size * offsets.size)
+    zero = int(np.flatnonzero(lags == 0)[0])
+    les = (idw[:, zero] - idw[:, zero - LES_ROWS]) / (LES_ROWS * delay_step * offsets.size)
+    ddma[~valid] = np.nan
+    les[~valid] = np.nan
+    return ddma, les
+
+
+class WindLUT:
+    """Wind (m/s) tabulated over (incidence, log10 observable) for DDMA and LES"""
+
+    def __init__(self, incidence, log_obs, tables, weight_wind, weight_ddma):
+        self.incidence = np.asarray(incidence, dtype=np.float64)
+        self.log_obs = {k: np.asarray(v, dtype=np.float64) for k, v in log_obs.items()}
+        self.tables = {k: np.asarray(v, dtype=np.float32) for k, v in tables.items()}
+        self.weight_wind = np.asarray(weight_wind, dtype=np.float64)
+        self.weight_ddma = np.asarray(weight_ddma, dtype=np.float64)
+
+    def lookup(self, name, incidence, value):
+        """Bilinear interpolation of the table at (incidence, log10 value); values clamp to the table"""
+        axis_i, axis_o, table = self.incidence, self.log_obs[name], self.tables[name]
+        inc = np.asarray(incidence, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            obs = np.log10(np.asarray(value, dtype=np.float64))
+        ok = np.isfinite(inc) & np.isfinite(obs)
+        inc = np.clip(np.where(ok, inc, axis_i[0]), axis_i[0], axis_i[-1])
+        obs = np.clip(np.where(ok, obs, axis_o[0]), axis_o[0], axis_o[-1])
+
+        i = np.clip(np.searchsorted(axis_i, inc, side='right') - 1, 0, axis_i.size - 2)
+        j = np.clip(np.searchsorted(axis_o, obs, side='right') - 1, 0, axis_o.size - 2)
+        ti = (inc - axis_i[i]) / (axis_i[i + 1] - axis_i[i])
+        tj = (obs - axis_o[j]) / (axis_o[j + 1] - axis_o[j])
+        wind = ((1 - ti) * ((1 - tj) * table[i, j] + tj * table[i, j + 1])
+                + ti * ((1 - tj) * table[i + 1, j] + tj * table[i + 1, j + 1]))
+        return np.where(ok, wind, np.nan).astype(np.float32)
+
+    def retrieve(self, incidence, ddma, les):
+        """{"wind_speed", "wind_ddma", "wind_les"} for arrays of DDMs"""
+        wind_ddma = self.lookup('ddma', incidence, ddma)
+        wind_les = self.lookup('les', incidence, les)
+        mean = np.where(np.isfinite(wind_les), 0.5 * (wind_ddma + wind_les), wind_ddma)
+        weight = np.interp(mean, self.weight_wind, self.weight_ddma)
+        wind = np.where(np.isfinite(wind_les), weight * wind_ddma + (1 - weight) * wind_les, wind_ddma)
+        return {"wind_speed": wind.astype(np.float32), "wind_ddma": wind_ddma, "wind_les": wind_les}
+
+    def save(self, path):
+        from cygnss_checkpoint import atomic_write
+
+        arrays = {"version": LUT_VERSION, "incidence": self.incidence,
+                  "weight_wind": self.weight_wind, "weight_ddma": self.weight_ddma}
+        for name in OBSERVABLES:
+            arrays[f"log_{name}"] = self.log_obs[name]
+            arrays[f"table_{name}"] = self.tables[name]
+        with atomic_write(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data["version"]) != LUT_VERSION:
+                raise ValueError(f"{path} is a version {int(data['version'])} table; rebuild it")
+            return cls(data["incidence"], {k: data[f"log_{k}"] for k in OBSERVABLES},
+                       {k: data[f"table_{k}"] for k in OBSERVABLES}, data["weight_wind"], data["weight_ddma"])
+
+
+def _simulated_observables(sim):
+    from cygnss_simulate import GPS_ALTITUDE
+
+    params = sim["params"]
+    cos = np.cos(np.radians(params["incidence"]))
+    factor = watts_to_brcs(np.ones((cos.size, 1, 1)), params["eirp"], params["rx_gain_db"],
+                           GPS_ALTITUDE / cos, params["receiver_height"] / cos)[:, 0, 0]
+    signal = sim["power"] - sim["noise_floor"][:, None, None]
+    return observables(signal, sim["specular_row"], sim["specular_col"], factor, float(np.diff(sim["delay"][:2])[0]))
+
+
+def build_lut(incidence_axis=INCIDENCE_AXIS, wind_axis=WIND_AXIS, bins=OBSERVABLE_BINS,
+              weight_samples=WEIGHT_SAMPLES, seed=0):
+    """Tabulate the GMF with the forward model and invert it; returns a WindLUT
+
+    Observables are simulated without noise on the (incidence, wind) grid,
+    averaged over wind directions, made monotonic in wind and inverted per
+    incidence onto a log10 observable axis.
+    """
+    from cygnss_simulate import random_params, simulate_ddms
+
+    inc, wind, direction = np.meshgrid(incidence_axis, wind_axis, WIND_DIRECTIONS, indexing='ij')
+    sim = simulate_ddms(incidence=inc.ravel(), wind_speed=wind.ravel(), wind_direction=direction.ravel(),
+                        noise=False)
+    forward = {}
+    for name, values in zip(OBSERVABLES, _simulated_observables(sim)):
+        values = values.reshape(inc.shape).mean(axis=2)
+        # Both observables fall with wind; enforce it so every row inverts cleanly
+        forward[name] = np.log10(np.minimum.accumulate(values, axis=1))
+
+    log_obs, tables = {}, {}
+    for name, values in forward.items():
+        axis = np.linspace(values.min(), values.max(), bins)
+        log_obs[name] = axis
+        tables[name] = np.stack([np.interp(axis, row[::-1], wind_axis[::-1]) for row in values])
+
+    # Minimum-variance DDMA/LES weights from noisy simulations, per retrieved wind bin
+    lut = WindLUT(incidence_axis, log_obs, tables, WEIGHT_BINS, np.full(WEIGHT_BINS.size, 0.5))
+    params = random_params(weight_samples, seed, wind_range=(wind_axis[0], wind_axis[-1]),
+                           incidence_range=(incidence_axis[0], incidence_axis[-1]))
+    sim = simulate_ddms(**params, seed=seed)
+    ddma, les = _simulated_observables(sim)
+    truth = params["wind_speed"]
+    err_d = lut.lookup('ddma', params["incidence"], ddma) - truth
+    err_l = lut.lookup('les', params["incidence"], les) - truth
+    weights = []
+    for low, high in zip(WEIGHT_BINS - 1.0, WEIGHT_BINS + 1.0):
+        sel = (truth >= low) & (truth < high) & np.isfinite(err_d) & np.isfinite(err_l)
+        if sel.sum() < 10:
+            weights.append(np.nan)
+            continue
+        var_d, var_l = err_d[sel].var(), err_l[sel].var()
+        cov = np.mean((err_d[sel] - err_d[sel].mean()) * (err_l[sel] - err_l[sel].mean()))
+        denom = var_d + var_l - 2 * cov
+        weights.append(np.clip((var_l - cov) / denom, 0.0, 1.0) if denom > 0 else 0.5)
+    weights = np.array(weights)
+    known = np.isfinite(weights)
+    lut.weight_ddma = np.interp(WEIGHT_BINS, WEIGHT_BINS[known], weights[known]) if known.any() else weights
+    return lut
+
+
+def load_lut(path=DEFAULT_LUT, build=True, verbose=True):
+    """The saved table at path; built and saved first when missing (and build is set)"""
+    if os.path.exists(path):
+        return WindLUT.load(path)
+    if not build:
+        raise FileNotFoundError(f"No wind lookup table at {path}; run scripts/cygnss_wind.py build")
+    if verbose:
+        print(f"🧮 Building wind lookup table {path}...")
+    lut = build_lut()
+    lut.save(path)
+    return lut
+
+
+def chunk_wind(chunk, meta, lut, variables=None):
+    """Wind retrieval for every DDM of an extracted chunk; (n, channels) float32 arrays
+
+    ``chunk`` comes from iter_ddm_chunks with ``extra_fields=wind_variables(meta)``;
+    power may be in W or dB(W). Returns {} when the granule lacks an incidence angle.
+    """
+    variables = wind_variables(meta) if variables is None else variables
+    if 'sp_inc_angle' not in variables:
+        return {}
+    power = np.asarray(chunk["power"], dtype=np.float32)
+    units = variable_units(meta, meta["power_variable"])
+    if units_scale(units) == 'dB':
+        power = np.power(np.float32(10.0), power / np.float32(10.0))
+    n, channels, n_delay, n_doppler = power.shape
+    noise = chunk_noise(dict(chunk, power=power), noise_variables(meta))
+
+    if all(v in chunk for v in ('gps_eirp', 'sp_rx_gain', 'tx_to_sp_range', 'rx_to_sp_range')):
+        factor = watts_to_brcs(np.ones((n, channels, 1, 1)), chunk["gps_eirp"], chunk["sp_rx_gain"],
+                               chunk["tx_to_sp_range"], chunk["rx_to_sp_range"])[..., 0, 0]
+    else:
+        factor = nominal_brcs_factor(chunk["sp_inc_angle"], chunk.get("sp_rx_gain"))
+    if 'brcs_ddm_sp_bin_delay_row' in chunk and 'brcs_ddm_sp_bin_dopp_col' in chunk:
+        row, col = chunk["brcs_ddm_sp_bin_delay_row"], chunk["brcs_ddm_sp_bin_dopp_col"]
+    else:
+        # No specular bin in the granule: use the peak, one row after the specular point
+        flat = np.nan_to_num(power, nan=-np.inf).reshape(n, channels, -1).argmax(axis=-1)
+        row, col = flat // n_doppler - 1, flat % n_doppler
+
+    delay = meta.get("delay")
+    delay_step = float(np.diff(delay[:2])[0]) if delay and len(delay) > 1 else 0.25
+    signal = (power - noise[..., None, None]).reshape(-1, n_delay, n_doppler)
+    ddma, les = observables(signal, np.ravel(row), np.ravel(col), np.ravel(factor), delay_step)
+    result = lut.retrieve(np.ravel(chunk["sp_inc_angle"]), ddma, les)
+    result.update(ddma=ddma.astype(np.float32), les=les.astype(np.float32))
+    return {k: v.reshape(n, channels) for k, v in result.items()}
+
+
+def main():
+    from cygnss_metadata import DEFAULT_CACHE_DIR, get_cache
+    from cygnss_extract import iter_ddm_chunks
+
+    parser = argparse.ArgumentParser(description="Build the wind lookup table or retrieve winds from a granule")
+    parser.add_argument("action", choices=["build", "retrieve"],
+                        help="build the table, or retrieve winds for every DDM of a granule")
+    parser.add_argument("granule", nargs="?", help="CYGNSS L1 NetCDF file (retrieve)")
+    parser.add_argument("--lut", default=DEFAULT_LUT, help="Lookup table file")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Granule metadata cache directory")
+
+    args = parser.parse_args()
+
+    print("🌬️  CYGNSS Wind Retrieval")
+    print("=" * 50)
+
+    if args.action == "build":
+        import time
+        started = time.perf_counter()
+        lut = build_lut()
+        lut.save(args.lut)
+        print(f"✅ {args.lut}: {lut.incidence.size} incidence x {lut.log_obs['ddma'].size} observable bins "
+              f"in {time.perf_counter() - started:.1f} s")
+        return
+
+    if not args.granule:
+        parser.error("retrieve needs a granule")
+    lut = load_lut(args.lut)
+    meta = get_cache(args.cache_dir).get(args.granule)[0]
+    variables = wind_variables(meta)
+    if not variables:
+        print(f"❌ {os.path.basename(args.granule)} has no sp_inc_angle; cannot retrieve winds")
+        return
+    # Simulated granules carry the true wind
+    extra = variables + (('sim_wind_speed',) if 'sim_wind_speed' in meta["variables"] else ())
+    winds, truth = [], []
+    for chunk in iter_ddm_chunks(args.granule, meta=meta, extra_fields=extra):
+        winds.append(chunk_wind(chunk, meta, lut, variables)["wind_speed"].ravel())
+        if 'sim_wind_speed' in chunk:
+            truth.append(chunk["sim_wind_speed"].ravel())
+    winds = np.concatenate(winds)
+    ok = np.isfinite(winds)
+    if not ok.any():
+        print(f"❌ No DDM of {os.path.basename(args.granule)} has its specular box on the DDM")
+        return
+    print(f"✅ {ok.sum()}/{winds.size} DDMs retrieved: median {np.median(winds[ok]):.2f} m/s, "
+          f"5-95% [{np.percentile(winds[ok], 5):.2f}, {np.percentile(winds[ok], 95):.2f}] m/s")
+    if truth:
+        err = winds - np.concatenate(truth)
+        print(f"🎯 Against the simulated truth: bias {np.nanmean(err):+.2f} m/s, "
+              f"RMSE {np.sqrt(np.nanmean(err ** 2)):.2f} m/s")
+
+
+if __name__ == "__main__":
+    main()
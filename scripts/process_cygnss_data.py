@@ -6,20 +6,17 @@ Processes downloaded NetCDF files and creates JSON data for the Next.js app
 
 import os
 import json
-import numpy as np
 from datetime import datetime, timezone
 import argparse
 import glob
 from pathlib import Path
 
-try:
-    import netCDF4 as nc
-    import xarray as xr
-    HAS_NETCDF = True
-except ImportError:
-    HAS_NETCDF = False
-    print("⚠️  Warning: netCDF4 and xarray not installed. Install with:")
-    print("   pip install netCDF4 xarray")
+from cygnss_metadata import DEFAULT_CACHE_DIR, get_cache, get_granule_metadata
+from cygnss_checkpoint import Checkpoint, atomic_write, write_json_atomic
+from cygnss_preflight import require
+
+# numpy, xarray and the calibration/slice helpers are imported by the functions
+# that need them, so --help, --check and find_cygnss_files stay fast
 
 def find_cygnss_files(data_dir):
     """Find all CYGNSS NetCDF files in the data directory"""
@@ -29,52 +26,81 @@ def find_cygnss_files(data_dir):
         f"{data_dir}/**/*cygnss*.nc"
     ]
     
-    files = []
+    files = set()
     for pattern in patterns:
-        files.extend(glob.glob(pattern, recursive=True))
+        files.update(glob.glob(pattern, recursive=True))
     
     return sorted(files)
 
-def extract_ddm_from_cygnss(file_path):
-    """Extract DDM data from a CYGNSS NetCDF file"""
+# Leading samples scanned for a DDM without anomaly flags
+ANOMALY_SCAN_SAMPLES = 64
+
+def extract_ddm_from_cygnss(file_path, cache_dir=None, drop_anomalies=True, anomaly_thresholds=None):
+    """Extract DDM data from a CYGNSS NetCDF file
+
+    The first DDM without anomaly flags (RFI, saturation, zero...) is used;
+    with drop_anomalies off simply the first one.
+    """
+    import numpy as np
+    import xarray as xr
+    from cygnss_anomaly import anomaly_flags, describe_flags
+    from cygnss_calibration import db_units_label, power_to_db, valid_power, variable_units
+    from cygnss_slices import ddm_slices, summary_dict
+
     try:
+        # Variable names, dims and axes come from the metadata cache
+        meta = get_granule_metadata(file_path, cache_dir)
+        if meta["power_variable"] is None:
+            print(f"❌ No DDM data found in {file_path}")
+            return None
+
         with xr.open_dataset(file_path) as ds:
             # CYGNSS L1 data structure
             # DDM is usually in 'power_analog' or 'ddm_obs' variable
-            ddm_vars = ['power_analog', 'ddm_obs', 'ddm_nbrcs', 'power']
-            ddm_data = None
-            
-            for var in ddm_vars:
-                if var in ds.variables:
-                    ddm_data = ds[var]
-                    break
-            
-            if ddm_data is None:
-                print(f"❌ No DDM data found in {file_path}")
-                return None
+            ddm_data = ds[meta["power_variable"]]
             
             # Get dimensions
-            time_vals = ds['ddm_timestamp_utc'].values if 'ddm_timestamp_utc' in ds else ds.dims.get('ddm_obs', [0])
-            delay_bins = ds.dims.get('delay', 17)  # CYGNSS typically has 17 delay bins
-            doppler_bins = ds.dims.get('doppler', 11)  # and 11 doppler bins
+            time_vals = ds['ddm_timestamp_utc'].values if 'ddm_timestamp_utc' in ds else []
+            delay_bins = meta["dims"].get('delay', 17)  # CYGNSS typically has 17 delay bins
+            doppler_bins = meta["dims"].get('doppler', 11)  # and 11 doppler bins
             
-            # Select first observation for simplicity
-            if len(ddm_data.shape) > 2:
-                ddm_sample = ddm_data.isel({list(ddm_data.dims)[0]: 0})
+            units = variable_units(meta, meta["power_variable"])
+            
+            # First observation/channel whose DDM passes the anomaly checks
+            ddm_sample = ddm_data
+            while len(ddm_sample.shape) > 4:
+                ddm_sample = ddm_sample.isel({ddm_sample.dims[0]: 0})
+            if len(ddm_sample.shape) == 4:
+                block = ddm_sample.isel({ddm_sample.dims[0]: slice(0, ANOMALY_SCAN_SAMPLES)}).values
+                flags = anomaly_flags(block, units, **(anomaly_thresholds or {}))
+                clean = np.flatnonzero(flags.ravel() == 0)
+                if drop_anomalies and clean.size == 0:
+                    print(f"❌ First {block.shape[0]} samples of {os.path.basename(file_path)} are all anomalous "
+                          f"({describe_flags(np.bitwise_or.reduce(flags, axis=None))})")
+                    return None
+                sample_idx, channel_idx = np.unravel_index(clean[0] if drop_anomalies else 0, flags.shape)
+                anomaly = describe_flags(flags[sample_idx, channel_idx])
+                ddm_array = block[sample_idx, channel_idx]
             else:
-                ddm_sample = ddm_data
+                while len(ddm_sample.shape) > 2:
+                    ddm_sample = ddm_sample.isel({ddm_sample.dims[0]: 0})
+                sample_idx = channel_idx = 0
+                ddm_array = ddm_sample.values
+                anomaly = describe_flags(anomaly_flags(ddm_array, units, **(anomaly_thresholds or {})))
             
-            # Convert to numpy array
-            ddm_array = ddm_sample.values
+            # Calibrate to dB from the variable's units; missing and non-positive
+            # bins would sit at the dB floor, so they are left out
+            valid = valid_power(ddm_array, units)
+            ddm_array = power_to_db(ddm_array, units)
             
             # Get delay and doppler coordinates
-            if 'delay' in ds.variables:
-                delay_coords = ds['delay'].values
+            if meta["delay"] is not None:
+                delay_coords = np.asarray(meta["delay"])
             else:
                 delay_coords = np.linspace(0, 8, delay_bins)  # chips
                 
-            if 'doppler' in ds.variables:
-                doppler_coords = ds['doppler'].values  
+            if meta["doppler"] is not None:
+                doppler_coords = np.asarray(meta["doppler"])
             else:
                 doppler_coords = np.linspace(-500, 500, doppler_bins)  # Hz
             
@@ -84,26 +110,36 @@ def extract_ddm_from_cygnss(file_path):
                 for j, doppler in enumerate(doppler_coords):
                     if i < ddm_array.shape[0] and j < ddm_array.shape[1]:
                         power = float(ddm_array[i, j])
-                        if not np.isnan(power):
+                        if valid[i, j]:
                             ddm_points.append({
                                 "delay": float(delay),
                                 "doppler": float(doppler), 
                                 "power": power
                             })
             
+            # Precomputed slices so the UI does not reduce the points again
+            slices = ddm_slices(np.where(valid, ddm_array, np.nan), db_units_label(units),
+                                delay_coords, doppler_coords)
+            
             # Extract metadata
             metadata = {
                 "file": os.path.basename(file_path),
-                "timestamp": str(time_vals[0]) if len(time_vals) > 0 else datetime.now(timezone.utc).isoformat(),
+                "timestamp": str(time_vals[sample_idx]) if len(time_vals) > sample_idx else datetime.now(timezone.utc).isoformat(),
                 "satellite": "CYGNSS",
                 "level": "L1",
                 "delay_bins": int(delay_bins),
                 "doppler_bins": int(doppler_bins),
-                "total_points": len(ddm_points)
+                "total_points": len(ddm_points),
+                "power_variable": meta["power_variable"],
+                "power_units": db_units_label(units),
+                "sample_index": int(sample_idx),
+                "channel_index": int(channel_idx),
+                "anomaly": anomaly
             }
             
             return {
                 "ddm_data": ddm_points,
+                "summary": summary_dict(slices),
                 "metadata": metadata
             }
             
@@ -111,11 +147,15 @@ def extract_ddm_from_cygnss(file_path):
         print(f"❌ Error processing {file_path}: {e}")
         return None
 
-def process_cygnss_directory(data_dir, output_file="./public/cygnss_data.json"):
-    """Process all CYGNSS files in directory and create JSON output"""
+def process_cygnss_directory(data_dir, output_file="./public/cygnss_data.json", cache_dir=None, resume=False,
+                             drop_anomalies=True, anomaly_thresholds=None):
+    """Process all CYGNSS files in directory and create JSON output
+
+    Each granule's result is checkpointed under <output>.parts; with resume
+    an interrupted run reuses them. The output is replaced atomically.
+    """
     
-    if not HAS_NETCDF:
-        print("❌ Cannot process NetCDF files without required libraries")
+    if not require('numpy', 'netCDF4', 'xarray', purpose="process NetCDF files"):
         return False
     
     print(f"🔍 Searching for CYGNSS files in {data_dir}...")
@@ -129,12 +169,22 @@ def process_cygnss_directory(data_dir, output_file="./public/cygnss_data.json"):
     
     print(f"✅ Found {len(cygnss_files)} CYGNSS files")
     
+    cache = get_cache(cache_dir)
+    checkpoint = Checkpoint(f"{output_file}.parts", resume)
     processed_data = []
     
     for i, file_path in enumerate(cygnss_files[:5]):  # Process first 5 files
-        print(f"📊 Processing {i+1}/{min(5, len(cygnss_files))}: {os.path.basename(file_path)}")
-        
-        result = extract_ddm_from_cygnss(file_path)
+        key = cache.get(file_path)[0]["key"]
+        if checkpoint.done(key):
+            print(f"⏭️  Resuming {i+1}/{min(5, len(cygnss_files))}: {os.path.basename(file_path)} already processed")
+            with open(checkpoint.path(f"{key}.json")) as f:
+                result = json.load(f)
+        else:
+            print(f"📊 Processing {i+1}/{min(5, len(cygnss_files))}: {os.path.basename(file_path)}")
+            result = extract_ddm_from_cygnss(file_path, cache_dir, drop_anomalies, anomaly_thresholds)
+            if result:
+                write_json_atomic(checkpoint.path(f"{key}.json"), result, indent=None)
+            checkpoint.granule_done(key, name=os.path.basename(file_path), extracted=bool(result))
         if result:
             processed_data.append(result)
     
@@ -153,18 +203,292 @@ def process_cygnss_directory(data_dir, output_file="./public/cygnss_data.json"):
         "all_ddms": processed_data
     }
     
-    # Ensure output directory exists
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    
-    # Write JSON file
-    with open(output_file, 'w') as f:
-        json.dump(output_data, f, indent=2)
+    # Write to a temporary file and rename, so the app never reads a partial file
+    write_json_atomic(output_file, output_data)
+    checkpoint.clear()
     
     print(f"✅ Processed data saved to {output_file}")
     print(f"📈 Sample DDM has {len(processed_data[0]['ddm_data'])} data points")
     
     return True
 
+def _bundle_field_names(wind):
+    """Per-DDM fields stored in a bundle besides the power"""
+    from cygnss_anomaly import ANOMALY_FIELDS
+    from cygnss_coherence import COHERENCE_FIELDS
+    from cygnss_slices import SLICE_FIELDS, SUMMARY_FIELDS
+    from cygnss_wind import WIND_FIELDS
+
+    names = ["time", "lat", "lon", "quality", "prn", *SUMMARY_FIELDS, *SLICE_FIELDS, *ANOMALY_FIELDS,
+             *COHERENCE_FIELDS]
+    return names + WIND_FIELDS if wind else names
+
+_LUTS = {}
+
+def _load_kernels(wind):
+    """Run the Numba kernels once on a blank DDM, so a fresh worker loads them from
+    Numba's cache before its first chunk is measured rather than during it"""
+    import numpy as np
+    from cygnss_kernels import use_numba
+    from cygnss_slices import subbin_peak
+    from cygnss_wind import observables
+
+    if not use_numba():
+        return
+    blank = np.ones((1, 17, 11), dtype=np.float32)
+    subbin_peak(blank, 'W')
+    if wind:
+        observables(blank.astype(np.float64), [8.0], [5.0], [1.0])
+
+
+def bundle_chunks(file_path, meta, start=0, wind_lut=None, drop_anomalies=True, anomaly_thresholds=None,
+                  chunk_samples=None):
+    """Extract one granule for a bundle: yields (power in dB, per-DDM fields) per chunk
+
+    ``fields`` also holds the chunk's ``sample_start`` and the process RSS
+    before and at the peak of the chunk (``rss_before``/``rss_peak``, for the
+    memory scheduler). Runs in the writer or in handoff worker processes
+    (each loads the wind table once).
+    """
+    import numpy as np
+    from cygnss_extract import iter_ddm_chunks
+    from cygnss_calibration import calibrate_chunk, valid_power, variable_units
+    from cygnss_slices import SLICE_FIELDS, SUMMARY_FIELDS, ddm_slices
+    from cygnss_anomaly import DEFAULT_DROP, chunk_anomalies, mask_anomalies
+    from cygnss_coherence import chunk_coherence
+    from cygnss_noise import noise_variables
+    from cygnss_wind import WIND_FIELDS, chunk_wind, load_lut, wind_variables
+    from cygnss_extract import DEFAULT_CHUNK_SAMPLES
+    from cygnss_scheduler import peak_rss_bytes, release_memory, reset_peak_rss, rss_bytes
+
+    lut = None
+    if wind_lut:
+        if wind_lut not in _LUTS:
+            _LUTS[wind_lut] = load_lut(wind_lut, verbose=False)
+        lut = _LUTS[wind_lut]
+    power_units = variable_units(meta, meta["power_variable"])
+    noise = noise_variables(meta)
+    variables = wind_variables(meta) if lut is not None else ()
+    extra = tuple(dict.fromkeys(noise + variables))
+    chunks = iter_ddm_chunks(file_path, chunk_samples or DEFAULT_CHUNK_SAMPLES, meta=meta, extra_fields=extra,
+                             start_sample=start)
+    _load_kernels(lut is not None)
+    while True:
+        reset_peak_rss()
+        rss_before = rss_bytes()
+        chunk = next(chunks, None)
+        if chunk is None:
+            break
+        # Flags and wind first: calibrate_chunk turns the power into dB in place
+        anomalies = chunk_anomalies(chunk, meta, **(anomaly_thresholds or {}))
+        if drop_anomalies:
+            mask_anomalies(chunk["power"], anomalies["anomaly"], DEFAULT_DROP)
+        coherence = chunk_coherence(chunk, meta, noise)
+        winds = chunk_wind(chunk, meta, lut, variables) if lut is not None else {}
+        # Missing, non-positive and dropped bins stay NaN in dB rather than at the
+        # to_db floor, so quantize gives them its missing code
+        valid = valid_power(chunk["power"], power_units)
+        power, units = calibrate_chunk(chunk, power_units)
+        power[~valid] = np.nan
+        n, channels = power.shape[:2]
+        if lut is not None:
+            blank = np.full((n, channels), np.nan, dtype=np.float32)
+            winds = {k: winds.get(k, blank) for k in WIND_FIELDS}
+        fields = {"sample_start": chunk["sample_start"],
+                  "time": np.repeat(chunk["time"][:, None], channels, axis=1)}
+        fields.update({k: chunk[k] for k in ("lat", "lon", "quality", "prn")})
+        slices = ddm_slices(power, units)
+        fields.update({k: slices[k] for k in [*SUMMARY_FIELDS, *SLICE_FIELDS]})
+        fields.update(anomalies)
+        fields.update(coherence)
+        fields.update(winds)
+        fields.update(rss_before=rss_before, rss_peak=peak_rss_bytes())
+        yield power, fields
+    release_memory()
+
+def write_ddm_bundle(data_dir, bundle_file, encoding='float32', cache_dir=None, resume=False,
+                     wind=True, wind_lut=None, drop_anomalies=True, anomaly_thresholds=None,
+                     jobs=1, handoff='shared', max_memory=None):
+    """Write every DDM of every granule to one compact .npz bundle (power in dB)
+
+    Besides the slices every DDM gets its anomaly flag bits (flagged DDMs are
+    stored as NaN with drop_anomalies), a coherent/diffuse reflection flag
+    and, with wind, the retrieved wind speed and DDMA/LES observables.
+    With jobs > 1 granules are extracted in worker processes that hand their
+    cubes to this writer through shared memory (or pickled, handoff='pickle').
+    With max_memory (bytes) the chunk size and how many granules run at once
+    are chosen per granule to stay inside that budget (cygnss_scheduler.py).
+    Every chunk is saved under <bundle>.parts as it arrives and recorded in a
+    checkpoint; with resume an interrupted run continues from the last
+    completed chunk. The bundle itself is replaced atomically at the end.
+    """
+    if not require('numpy', 'netCDF4', purpose="write a DDM bundle"):
+        return False
+    import numpy as np
+    from cygnss_calibration import db_units_label, variable_units
+    from cygnss_compact import save_bundle
+    from cygnss_anomaly import DEFAULT_DROP
+    from cygnss_coherence import COHERENT
+    from cygnss_extract import DEFAULT_CHUNK_SAMPLES
+    from cygnss_wind import DEFAULT_LUT, load_lut
+
+    cygnss_files = find_cygnss_files(data_dir)
+    if not cygnss_files:
+        print(f"❌ No CYGNSS NetCDF files found in {data_dir}")
+        return False
+
+    cache = get_cache(cache_dir)
+    checkpoint = Checkpoint(f"{bundle_file}.parts", resume)
+    field_names = _bundle_field_names(wind)
+    wind_lut = (wind_lut or DEFAULT_LUT) if wind else None
+    if wind_lut:
+        # Built here once, before any worker needs it
+        load_lut(wind_lut)
+    options = {"wind_lut": wind_lut, "drop_anomalies": drop_anomalies, "anomaly_thresholds": anomaly_thresholds}
+    delay = doppler = units = None
+    granules, tasks = {}, []
+    n_dropped, bundle_bytes = 0, 0
+
+    for file_path in cygnss_files:
+        meta = cache.get(file_path)[0]
+        if meta["power_variable"] is None:
+            continue
+        if delay is None:
+            delay, doppler = meta["delay"], meta["doppler"]
+        elif meta["delay"] != delay or meta["doppler"] != doppler:
+            # One bundle shares a single set of axes
+            print(f"⚠️  Skipping {os.path.basename(file_path)}: delay/Doppler axes differ")
+            continue
+
+        name, key = os.path.basename(file_path), meta["key"]
+        dims = meta["variables"][meta["power_variable"]]["shape"]
+        bundle_bytes += 4 * int(np.prod(dims))
+        units = db_units_label(variable_units(meta, meta["power_variable"]))
+        done = checkpoint.done(key)
+        if done:
+            print(f"⏭️  {name} already bundled")
+            granules[key] = {"name": name, "parts": done["parts"]}
+            continue
+
+        start = checkpoint.next_sample(key)
+        parts = list(checkpoint.state["partial"].get(key, {}).get("parts", []))
+        granules[key] = {"name": name, "parts": parts}
+        print(f"📊 Bundling {name}" + (f" from sample {start}" if start else ""))
+        tasks.append((key, (file_path, meta, start)))
+
+    scheduler, chunk_cap = None, DEFAULT_CHUNK_SAMPLES
+    if max_memory and tasks:
+        from cygnss_scheduler import BUDGET_FRACTION, ChunkScheduler, format_memory
+        # Loaded before the baseline is taken: the writer extracts itself when one worker fits
+        import netCDF4  # noqa: F401
+
+        scheduler = ChunkScheduler(max_memory, jobs, len(tasks), ring=jobs > 1 and handoff == 'shared')
+        at_once = max(scheduler.plan(meta)[1] for _, (_, meta, _) in tasks)
+        if at_once < jobs:
+            # Workers the budget cannot keep busy would only hold their interpreter's memory
+            print(f"🧠 Memory budget {format_memory(max_memory)} fits {at_once} worker(s), not {jobs}")
+            jobs = at_once
+        if jobs <= 1 or len(tasks) <= 1:
+            # The writer extracts itself: plan from a baseline with its kernels already loaded
+            _load_kernels(wind_lut is not None)
+        scheduler = ChunkScheduler(max_memory, jobs, len(tasks), ring=jobs > 1 and handoff == 'shared')
+        if scheduler.base > BUDGET_FRACTION * max_memory:
+            print(f"⚠️  The writer alone holds {format_memory(scheduler.base)}, leaving no room in the budget")
+        # The largest planned chunk sizes the handoff slots; later plans only fit inside it
+        chunk_cap = scheduler.max_chunk = max(scheduler.plan(meta)[0] for _, (_, meta, _) in tasks)
+        print(f"🧠 Memory budget {format_memory(max_memory)}: chunks of up to {chunk_cap} samples, "
+              f"up to {max(scheduler.plan(meta)[1] for _, (_, meta, _) in tasks)} granules at once")
+        if 2 * bundle_bytes > max_memory:
+            print(f"⚠️  Assembling the bundle needs about {format_memory(2 * bundle_bytes)}, "
+                  f"more than the budget; split the run into smaller bundles")
+    slot_size = max((chunk_cap * int(np.prod(meta["variables"][meta["power_variable"]]["shape"][1:]))
+                     for _, (_, meta, _) in tasks), default=0)
+
+    def chunk_written(key, power, fields, meta):
+        if scheduler is not None:
+            scheduler.observe(meta, power.shape[0], fields["rss_before"], fields["rss_peak"])
+        granule = granules[key]
+        part = f"{key}_{int(fields['sample_start']):09d}.npz"
+        with atomic_write(checkpoint.path(part), 'wb') as f:
+            np.savez(f, power=power, **{k: fields[k] for k in field_names})
+        granule["parts"].append(part)
+        checkpoint.chunk_done(key, int(fields["sample_start"]) + power.shape[0], name=granule["name"],
+                              parts=granule["parts"])
+        return int(np.count_nonzero(fields["anomaly"] & DEFAULT_DROP)) if drop_anomalies else 0
+
+    if jobs > 1 and len(tasks) > 1:
+        from cygnss_handoff import handoff as run_handoff
+
+        def admit(key, args, running):
+            # Chunk size and go-ahead from the memory left now
+            chunk = scheduler.admit(key, args[1], running)
+            return None if chunk is None else args[:3] + (dict(options, chunk_samples=chunk),)
+
+        metas = {key: args[1] for key, args in tasks}
+        failed = False
+        for kind, key, payload, fields in run_handoff(_bundle_task, [(key, args + (options,)) for key, args in tasks],
+                                                      jobs, handoff, slot_size,
+                                                      admit=admit if scheduler is not None else None):
+            if kind == "chunk":
+                n_dropped += chunk_written(key, payload, fields, metas[key])
+                continue
+            if scheduler is not None:
+                scheduler.finished(key)
+            if kind == "done":
+                checkpoint.granule_done(key, name=granules[key]["name"], parts=granules[key]["parts"])
+            else:
+                print(f"❌ Error bundling {granules[key]['name']}: {payload.splitlines()[0]}")
+                failed = True
+        if failed:
+            # Completed chunks stay in the checkpoint for --resume
+            return False
+    else:
+        for key, (file_path, meta, start) in tasks:
+            chunk = scheduler.plan(meta)[0] if scheduler is not None else None
+            for power, fields in bundle_chunks(file_path, meta, start, chunk_samples=chunk, **options):
+                n_dropped += chunk_written(key, power, fields, meta)
+            checkpoint.granule_done(key, name=granules[key]["name"], parts=granules[key]["parts"])
+
+    # Granules in file order, whatever order the workers finished in
+    names, cubes, fields = [], [], {name: [] for name in [*field_names, "granule"]}
+    for granule in granules.values():
+        index = len(names)
+        names.append(granule["name"])
+        for part in granule["parts"]:
+            with np.load(checkpoint.path(part)) as data:
+                cubes.append(data["power"])
+                for name in field_names:
+                    fields[name].append(data[name])
+                fields["granule"].append(np.full(data["power"].shape[:2], index, dtype=np.int32))
+
+    if not cubes:
+        print("❌ No DDM data extracted from any files")
+        return False
+
+    cubes = np.concatenate(cubes)
+    save_bundle(bundle_file, cubes, delay or [], doppler or [], encoding=encoding, units=units,
+                granule_names=np.array(names), **{k: np.concatenate(v) for k, v in fields.items()})
+    checkpoint.clear()
+
+    n_ddms = cubes.shape[0] * cubes.shape[1]
+    n_flagged = sum(int(np.count_nonzero(flags)) for flags in fields["anomaly"])
+    print(f"🚨 {n_flagged}/{n_ddms} DDMs flagged as anomalous"
+          + (f" ({n_dropped} dropped in this run)" if drop_anomalies else " (kept)"))
+    n_coherent = sum(int(np.count_nonzero(flags == COHERENT)) for flags in fields["coherent"])
+    print(f"💧 {n_coherent}/{n_ddms} DDMs flagged as coherent reflections")
+    if wind_lut:
+        speeds = np.concatenate(fields["wind_speed"])
+        speeds = speeds[np.isfinite(speeds)]
+        if speeds.size:
+            print(f"💨 Retrieved wind for {speeds.size}/{n_ddms} DDMs (median {np.median(speeds):.1f} m/s)")
+    print(f"✅ Wrote {n_ddms} DDMs from {len(names)} granules to {bundle_file} "
+          f"({os.path.getsize(bundle_file) / n_ddms:.0f} bytes per DDM, {encoding})")
+    return True
+
+def _bundle_task(file_path, meta, start, options):
+    """Handoff producer: bundle_chunks with the writer's options"""
+    return bundle_chunks(file_path, meta, start, **options)
+
 def main():
     parser = argparse.ArgumentParser(description="Process CYGNSS NetCDF data for DDM visualization")
     parser.add_argument("--data-dir", "-d", default="./data", 
@@ -173,6 +497,28 @@ def main():
                        help="Output JSON file for Next.js app")
     parser.add_argument("--check", "-c", action="store_true",
                        help="Just check for available files without processing")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                       help="Granule metadata cache directory")
+    parser.add_argument("--bundle", "-b",
+                       help="Also write all DDMs to this compact .npz bundle")
+    parser.add_argument("--encoding", choices=['float32', 'float16', 'uint16', 'uint8', 'pca'], default='float32',
+                       help="Storage encoding for --bundle (see scripts/cygnss_compact.py for error bounds)")
+    parser.add_argument("--resume", action="store_true",
+                       help="Continue an interrupted run from its last checkpointed granule/chunk")
+    parser.add_argument("--wind-lut",
+                       help="Wind lookup table for --bundle (default ./data/cygnss_wind_lut.npz, built if missing)")
+    parser.add_argument("--no-wind", action="store_true",
+                       help="Skip the wind speed retrieval in --bundle")
+    parser.add_argument("--keep-anomalies", action="store_true",
+                       help="Only flag anomalous (RFI, saturated, zero...) DDMs instead of dropping them")
+    parser.add_argument("--anomaly-threshold", action="append", metavar="NAME=VALUE",
+                       help="Override an anomaly threshold (see scripts/cygnss_anomaly.py)")
+    parser.add_argument("--jobs", "--workers", "-j", type=int, default=1,
+                       help="Worker processes extracting granules for --bundle")
+    parser.add_argument("--max-memory", metavar="SIZE",
+                       help="Memory budget for --bundle (e.g. 4G): chunk sizes and concurrency adapt to it")
+    parser.add_argument("--handoff", choices=['shared', 'pickle'], default='shared',
+                       help="How --jobs workers pass cubes to the writer (shared memory or pickled)")
     
     args = parser.parse_args()
     
@@ -182,18 +528,52 @@ def main():
     if args.check:
         files = find_cygnss_files(args.data_dir)
         if files:
+            # Only cached metadata is shown; --check never opens NetCDF files
+            cache = get_cache(args.cache_dir)
             print(f"✅ Found {len(files)} CYGNSS files:")
             for f in files[:10]:  # Show first 10
-                print(f"   📁 {os.path.basename(f)}")
+                meta = cache.cached(f)
+                if meta:
+                    print(f"   📁 {os.path.basename(f)}  🛰️ cyg{meta['spacecraft'] or 0:02d} "
+                          f"{meta['time_start']} → {meta['time_end']}")
+                else:
+                    print(f"   📁 {os.path.basename(f)}")
             if len(files) > 10:
                 print(f"   ... and {len(files) - 10} more files")
+            n_cached = sum(1 for f in files if cache.cached(f))
+            print(f"🗂️  {n_cached}/{len(files)} files have cached metadata")
         else:
             print(f"❌ No CYGNSS files found in {args.data_dir}")
             print("\n💡 To download CYGNSS data, use:")
             print("podaac-data-downloader -c CYGNSS_L1_V3.0 -d ./data --start-date 2018-08-01T00:00:00Z --end-date 2018-08-08T00:00:00Z -e .nc")
         return
     
-    success = process_cygnss_directory(args.data_dir, args.output)
+    anomaly_thresholds = None
+    if args.anomaly_threshold:
+        from cygnss_anomaly import parse_thresholds
+        try:
+            anomaly_thresholds = parse_thresholds(args.anomaly_threshold)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+    
+    max_memory = None
+    if args.max_memory:
+        from cygnss_scheduler import parse_memory
+        try:
+            max_memory = parse_memory(args.max_memory)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+    
+    drop = not args.keep_anomalies
+    success = process_cygnss_directory(args.data_dir, args.output, args.cache_dir, args.resume,
+                                       drop, anomaly_thresholds)
+    if success and args.bundle:
+        success = write_ddm_bundle(args.data_dir, args.bundle, args.encoding, args.cache_dir, args.resume,
+                                   wind=not args.no_wind, wind_lut=args.wind_lut,
+                                   drop_anomalies=drop, anomaly_thresholds=anomaly_thresholds,
+                                   jobs=args.jobs, handoff=args.handoff, max_memory=max_memory)
     
     if success:
         print("\n🎉 Success! Your Next.js app can now use real CYGNSS data.")
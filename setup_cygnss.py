@@ -5,10 +5,14 @@ Handles installation and downloads CYGNSS data using official NASA tools
 """
 
 import subprocess
+import argparse
 import sys
 import os
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+from cygnss_preflight import MODULES, preflight, print_report
+
 def install_package(package_name):
     """Install a Python package using pip"""
     try:
@@ -23,39 +27,36 @@ def install_package(package_name):
         print(f"Error: {e.stderr}")
         return False
 
-def check_and_install_dependencies():
-    """Check and install required packages"""
+def check_and_install_dependencies(install=False, refresh=False):
+    """Check required packages (cached preflight); install missing ones only when asked"""
     print("🔍 Checking dependencies...")
     
-    required_packages = [
-        "requests",
-        "netcdf4", 
-        "xarray",
-        "numpy"
-    ]
-    
-    # Try to install NASA downloader tools
-    nasa_packages = [
-        "podaac-data-subscriber",
-        "podaac-data-downloader"
-    ]
+    required_modules = ["requests", "netCDF4", "xarray", "numpy"]
     
-    success = True
+    found = preflight(refresh=refresh)
+    missing = [name for name in required_modules if not found["modules"][name]]
+    # Both NASA tools come from the podaac-data-subscriber package
+    missing_tools = [name for name, path in found["tools"].items() if not path]
     
-    # Install basic packages first
-    for package in required_packages:
-        try:
-            __import__(package.replace("-", "_"))
-            print(f"✅ {package} already installed")
-        except ImportError:
-            if not install_package(package):
-                success = False
+    for name in required_modules:
+        if name not in missing:
+            print(f"✅ {name} already installed")
+    if not missing and not missing_tools:
+        return True
     
-    # Try NASA packages
-    for package in nasa_packages:
-        if not install_package(package):
-            print(f"⚠️  {package} installation failed - trying manual download")
+    if not install:
+        packages = [MODULES[name] for name in missing] + (["podaac-data-subscriber"] if missing_tools else [])
+        print(f"⚠️  Missing: {', '.join(missing + missing_tools)}")
+        print(f"   Install with: python setup_cygnss.py --install  (or pip install {' '.join(packages)})")
+        return not missing
     
+    success = True
+    for name in missing:
+        if not install_package(MODULES[name]):
+            success = False
+    if missing_tools and not install_package("podaac-data-subscriber"):
+        print("⚠️  podaac-data-subscriber installation failed - trying manual download")
+    preflight(refresh=True)
     return success
 
 def setup_credentials():
@@ -218,12 +219,28 @@ def process_downloaded_data():
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description="Set up NASA credentials, download and process CYGNSS data")
+    parser.add_argument("--check", action="store_true",
+                        help="Report dependencies, credentials and local files, then exit")
+    parser.add_argument("--install", action="store_true",
+                        help="pip install missing dependencies (never done otherwise)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Re-check dependencies instead of using the cached preflight")
+    args = parser.parse_args()
+    
     print("🛰️  NASA CYGNSS Data Downloader Setup")
     print("=" * 50)
     
-    # Step 1: Install dependencies
-    if not check_and_install_dependencies():
-        print("❌ Failed to install some dependencies. You may need to install them manually.")
+    if args.check:
+        print_report(preflight(refresh=args.refresh))
+        netrc_path = Path.home() / ".netrc"
+        print(f"   {'✅' if netrc_path.exists() else '❌'} NASA credentials ({netrc_path})")
+        print(f"📁 {len(list(Path('./data').glob('**/*.nc')))} NetCDF files in ./data")
+        return
+    
+    # Step 1: Check (and with --install, install) dependencies
+    if not check_and_install_dependencies(args.install, args.refresh):
+        print("❌ Some dependencies are missing. You may need to install them manually.")
     
     # Step 2: Setup credentials
     if not setup_credentials():
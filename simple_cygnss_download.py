@@ -4,46 +4,36 @@ Simple NASA CYGNSS Data Access using HTTP requests
 Downloads CYGNSS data directly using NASA's API without external dependencies
 """
 
-import requests
-import json
 import os
-import numpy as np
 from datetime import datetime, timezone
 from pathlib import Path
-import getpass
+import argparse
+import sys
 
-def get_nasa_token():
-    """Get NASA Earthdata authentication token"""
+# Only light modules load at startup; requests/numpy/netCDF4 load in the functions that use them
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+from cygnss_metadata import get_cache
+from cygnss_checkpoint import write_json_atomic
+from cygnss_preflight import require
+
+# Leading samples scanned for a DDM without anomaly flags
+ANOMALY_SCAN_SAMPLES = 64
+
+def get_nasa_session():
+    """Authenticated NASA Earthdata session (cached token and cookies, pooled connections)"""
     print("🔐 NASA Earthdata Authentication")
-    print("Register at: https://urs.earthdata.nasa.gov/users/new")
-    print("")
     
-    username = input("Enter your NASA Earthdata username: ").strip()
-    password = getpass.getpass("Enter your NASA Earthdata password: ")
+    if not require('requests', purpose="talk to NASA Earthdata"):
+        return None
+    from cygnss_auth import earthdata_session
     
-    try:
-        # Get authentication token
-        auth_url = "https://urs.earthdata.nasa.gov/api/users/token"
-        
-        response = requests.post(
-            auth_url,
-            auth=(username, password),
-            headers={'Accept': 'application/json'}
-        )
-        
-        if response.status_code == 200:
-            token_data = response.json()
-            print("✅ Authentication successful!")
-            return token_data.get('access_token'), username, password
-        else:
-            print(f"❌ Authentication failed: {response.status_code}")
-            return None, None, None
-            
-    except Exception as e:
-        print(f"❌ Authentication error: {e}")
-        return None, None, None
+    # Credentials are only asked for (or read from ~/.netrc) when no cached token is valid
+    session = earthdata_session()
+    if session is not None:
+        print(f"✅ Authenticated as {session.token['username']} (token valid until {session.token['expires'][:10]})")
+    return session
 
-def search_cygnss_data_cmr(username, password):
+def search_cygnss_data_cmr(session):
     """Search CYGNSS data using NASA CMR API"""
     
     print("🔍 Searching CYGNSS data using NASA CMR...")
@@ -59,7 +49,7 @@ def search_cygnss_data_cmr(username, password):
     }
     
     try:
-        response = requests.get(cmr_url, params=params)
+        response = session.get(cmr_url, params=params, timeout=60)
         
         if response.status_code == 200:
             data = response.json()
@@ -84,7 +74,7 @@ def search_cygnss_data_cmr(username, password):
         print(f"❌ Search error: {e}")
         return []
 
-def download_real_cygnss_files(granules, username, password):
+def download_real_cygnss_files(granules, session):
     """Download actual CYGNSS NetCDF files from NASA"""
     
     print(f"📥 Downloading {len(granules)} real CYGNSS files...")
@@ -115,9 +105,9 @@ def download_real_cygnss_files(granules, username, password):
             # Download the file
             print(f"🔗 URL: {download_link}")
             
-            response = requests.get(
+            # The session's bearer token follows the URS redirects, so no per-file login
+            response = session.get(
                 download_link,
-                auth=(username, password),
                 stream=True,
                 timeout=300  # 5 minute timeout
             )
@@ -149,16 +139,12 @@ def process_real_netcdf_files(file_paths):
     
     print(f"🔬 Processing {len(file_paths)} real NetCDF files...")
     
-    try:
-        import netCDF4 as nc
-        import numpy as np
-    except ImportError:
-        print("❌ NetCDF4 not available. Installing...")
-        import subprocess
-        import sys
-        subprocess.run([sys.executable, "-m", "pip", "install", "netcdf4"], check=True)
-        import netCDF4 as nc
-        import numpy as np
+    if not require('netCDF4', 'numpy', purpose="read NetCDF granules"):
+        return []
+    import netCDF4 as nc
+    import numpy as np
+    from cygnss_anomaly import anomaly_flags, describe_flags
+    from cygnss_calibration import db_units_label, power_to_db, valid_power, variable_units
     
     all_ddm_data = []
     
@@ -166,72 +152,66 @@ def process_real_netcdf_files(file_paths):
         try:
             print(f"� Processing: {file_path.name}")
             
-            with nc.Dataset(file_path, 'r') as dataset:
-                # Print available variables to debug
+            # Variable names and axes come from the metadata cache
+            meta, was_cached = get_cache().get(file_path)
+            if not was_cached:
+                # Print available variables once, when the granule is first indexed
                 print(f"📋 Variables in {file_path.name}:")
-                for var_name in list(dataset.variables.keys())[:10]:  # Show first 10
+                for var_name in list(meta["variables"])[:10]:  # Show first 10
                     print(f"   - {var_name}")
-                
-                # Look for DDM power data (common CYGNSS variable names)
-                ddm_vars = ['power_analog', 'ddm_obs', 'power', 'brcs', 'power_ddm']
-                power_data = None
-                power_var_name = None
-                
-                for var_name in ddm_vars:
-                    if var_name in dataset.variables:
-                        power_data = dataset.variables[var_name]
-                        power_var_name = var_name
-                        print(f"✅ Found power data: {var_name}")
-                        break
-                
-                if power_data is None:
-                    print(f"❌ No recognized DDM power variable found in {file_path.name}")
-                    continue
+            
+            power_var_name = meta["power_variable"]
+            if power_var_name is None:
+                print(f"❌ No recognized DDM power variable found in {file_path.name}")
+                continue
+            
+            with nc.Dataset(file_path, 'r') as dataset:
+                power_data = dataset.variables[power_var_name]
+                print(f"✅ Found power data: {power_var_name}")
                 
                 # Get dimensions and coordinates
                 print(f"📐 Power data shape: {power_data.shape}")
                 
-                # Extract delay and doppler coordinates if available
-                delay_coord = None
-                doppler_coord = None
-                
-                if 'delay' in dataset.variables:
-                    delay_coord = dataset.variables['delay'][:]
-                if 'doppler' in dataset.variables:
-                    doppler_coord = dataset.variables['doppler'][:]
+                # Delay and doppler coordinates if available
+                delay_coord = meta["delay"]
+                doppler_coord = meta["doppler"]
                 
-                # Get timestamp
-                time_var = None
-                for time_name in ['ddm_timestamp_utc', 'time', 'timestamp']:
-                    if time_name in dataset.variables:
-                        time_var = dataset.variables[time_name]
-                        break
-                
-                # Extract first DDM sample
+                # First DDM that passes the anomaly checks (RFI, saturation, zero/negative power)
                 if len(power_data.shape) >= 2:
-                    # Handle 4D CYGNSS data: (time, channels, delay, doppler)
+                    units = variable_units(meta, power_var_name)
                     if len(power_data.shape) == 4:
+                        # Handle 4D CYGNSS data: (time, channels, delay, doppler)
                         print(f"📊 4D data: {power_data.shape} (time, channels, delay, doppler)")
-                        # Take first time sample, first channel
-                        ddm_2d = power_data[0, 0, :, :]
                     elif len(power_data.shape) == 3:
                         print(f"📊 3D data: {power_data.shape}")
-                        # Take first slice
-                        ddm_2d = power_data[0, :, :]
-                    else:
-                        ddm_2d = power_data[:, :]
+                    block = power_data[:ANOMALY_SCAN_SAMPLES] if len(power_data.shape) > 2 else power_data[:, :]
+                    block = np.ma.filled(np.ma.asarray(block, dtype=np.float64), np.nan)
+                    flags = np.atleast_1d(anomaly_flags(block, units))
+                    clean = np.flatnonzero(flags.ravel() == 0)
+                    if clean.size == 0:
+                        print(f"❌ All {flags.size} DDMs checked in {file_path.name} are anomalous "
+                              f"({describe_flags(np.bitwise_or.reduce(flags, axis=None))})")
+                        continue
+                    index = np.unravel_index(clean[0], flags.shape) if block.ndim > 2 else ()
+                    raw_2d = block[index]
+                    sample_idx, channel_idx = (tuple(int(i) for i in index) + (0, 0))[:2]
                     
-                    print(f"📐 Selected DDM shape: {ddm_2d.shape}")
+                    print(f"📐 Selected DDM from time {sample_idx}, channel {channel_idx}: {raw_2d.shape}"
+                          + (f" ({clean[0]} anomalous DDMs skipped)" if clean[0] else ""))
+                    
+                    # Calibrate the whole DDM to dB from the variable's units;
+                    # missing and non-positive bins have no dB value and are skipped
+                    valid = valid_power(raw_2d, units)
+                    ddm_db = power_to_db(raw_2d, units)
                     
                     # Create DDM points
                     ddm_points = []
-                    rows, cols = ddm_2d.shape
+                    rows, cols = raw_2d.shape
                     
                     for i in range(rows):
                         for j in range(cols):
                             try:
-                                power_val = ddm_2d[i, j]
-                                if not np.isnan(power_val) and not np.isinf(power_val):
+                                if valid[i, j]:
                                     # Use real coordinates if available, otherwise generate
                                     if delay_coord is not None and i < len(delay_coord):
                                         delay = float(delay_coord[i])
@@ -243,11 +223,7 @@ def process_real_netcdf_files(file_paths):
                                     else:
                                         doppler = (j - cols//2) * 50  # CYGNSS typical resolution
                                     
-                                    power_db = float(power_val)
-                                    
-                                    # Convert to dB if needed
-                                    if power_db > 1000:  # Likely linear scale
-                                        power_db = 10 * np.log10(max(power_db, 1e-10))
+                                    power_db = float(ddm_db[i, j])
                                     
                                     ddm_points.append({
                                         "delay": delay,
@@ -267,6 +243,10 @@ def process_real_netcdf_files(file_paths):
                             "doppler_bins": cols,
                             "total_points": len(ddm_points),
                             "power_variable": power_var_name,
+                            "power_units": db_units_label(units),
+                            "sample_index": sample_idx,
+                            "channel_index": channel_idx,
+                            "anomaly": "ok",
                             "source": "Real NASA CYGNSS data"
                         }
                         
@@ -282,121 +262,51 @@ def process_real_netcdf_files(file_paths):
             continue
     
     return all_ddm_data
-    
-    # Real CYGNSS DDM characteristics
-    delay_bins = 17    # 0 to 8 chips
-    doppler_bins = 11  # ±250 Hz
-    
-    ddm_points = []
-    
-    # Generate realistic DDM based on ocean surface scattering physics
-    for i in range(delay_bins):
-        for j in range(doppler_bins):
-            delay_chips = i * 0.5  # CYGNSS delay resolution
-            doppler_hz = (j - 5) * 50  # CYGNSS doppler resolution
-            
-            # Ocean surface scattering model
-            # Specular peak at ~2-3 chips delay, 0 Hz doppler
-            delay_center = 2.5
-            doppler_center = 0
-            
-            # Distance from specular point
-            delay_dist = abs(delay_chips - delay_center)
-            doppler_dist = abs(doppler_hz - doppler_center)
-            
-            # Power calculation (typical CYGNSS values)
-            if delay_dist < 1.0 and doppler_dist < 75:
-                # Strong specular reflection
-                base_power = 35 - delay_dist * 10 - doppler_dist / 10
-            elif delay_dist < 2.0 and doppler_dist < 150:
-                # Moderate scattered signal
-                base_power = 25 - delay_dist * 5 - doppler_dist / 15
-            else:
-                # Weak scattered/noise
-                base_power = 15 - delay_dist * 2 - doppler_dist / 25
-            
-            # Add realistic noise (reproducible)
-            noise_seed = (i * doppler_bins + j) * 7919
-            np.random.seed(noise_seed)
-            noise = np.random.normal(0, 1.5)
-            
-            final_power = max(5, base_power + noise)  # Minimum 5 dB
-            
-            ddm_points.append({
-                "delay": delay_chips,
-                "doppler": doppler_hz,
-                "power": final_power
-            })
-    
-    # Create complete CYGNSS data structure
-    cygnss_data = {
-        "status": "success",
-        "data_source": "nasa_cygnss_realistic",
-        "processed_at": datetime.now(timezone.utc).isoformat(),
-        "total_files": 1,
-        "processed_files": 1,
-        "message": "Realistic CYGNSS DDM data structure for development and testing",
-        "sample_ddm": {
-            "ddm_data": ddm_points,
-            "metadata": {
-                "file": "cyg01.ddmi.s20180805-120000-e20180805-125959.l1.power-brcs.a30.d31.nc",
-                "timestamp": "2018-08-05T12:30:00Z",
-                "satellite": "CYGNSS-01",
-                "level": "L1",
-                "delay_bins": delay_bins,
-                "doppler_bins": doppler_bins,
-                "total_points": len(ddm_points),
-                "gps_prn": 23,
-                "specular_lat": 25.7,
-                "specular_lon": -80.3,
-                "surface_type": "ocean",
-                "quality": "good",
-                "note": "Realistic structure based on CYGNSS Level 1 data format"
-            }
-        }
-    }
-    
-    # Save for Next.js app
-    output_path = Path("./public/cygnss_data.json")
-    output_path.parent.mkdir(exist_ok=True)
-    
-    with open(output_path, 'w') as f:
-        json.dump(cygnss_data, f, indent=2)
-    
-    print(f"✅ CYGNSS data created: {output_path}")
-    print(f"📊 Generated {len(ddm_points)} DDM data points")
-    print("🎯 This matches real CYGNSS data structure and physics")
-    
-    return True
 
 def main():
+    parser = argparse.ArgumentParser(description="Download real CYGNSS data or create development data")
+    parser.add_argument("--check", action="store_true",
+                        help="Report dependencies and local granules, then exit")
+    parser.add_argument("--dev", action="store_true",
+                        help="Create development data without prompting (option 2)")
+    args = parser.parse_args()
+    
     print("🛰️  Simple NASA CYGNSS Data Access")
     print("=" * 45)
     print()
     
-    # Option 1: Try to access real NASA data
-    print("Choose an option:")
-    print("1. Download real CYGNSS data (requires NASA account)")
-    print("2. Create realistic CYGNSS data structure (immediate)")
-    print()
+    if args.check:
+        from cygnss_preflight import preflight, print_report
+        print_report(preflight())
+        nc_files = list(Path("./data").glob("**/*.nc"))
+        print(f"📁 {len(nc_files)} NetCDF files in ./data")
+        return
     
-    choice = input("Enter choice (1 or 2): ").strip()
+    if args.dev:
+        choice = "2"
+    else:
+        # Option 1: Try to access real NASA data
+        print("Choose an option:")
+        print("1. Download real CYGNSS data (requires NASA account)")
+        print("2. Create realistic CYGNSS data structure (immediate)")
+        print()
+        
+        choice = input("Enter choice (1 or 2): ").strip()
     
     if choice == "1":
         print("\n🔐 Attempting NASA data access...")
         
-        token, username, password = get_nasa_token()
+        session = get_nasa_session()
         
-        if token:
-            # Search for data
-            granules = search_cygnss_data_cmr(username, password)
+        if session:
+            # One session (and connection pool) for the search and every download
+            with session:
+                granules = search_cygnss_data_cmr(session)
+                downloaded_files = download_real_cygnss_files(granules, session) if granules else []
             
             if granules:
                 print(f"\n✅ Found {len(granules)} real CYGNSS files")
                 
-                # Download the actual files
-                downloaded_files = download_real_cygnss_files(granules, username, password)
-                
                 if downloaded_files:
                     print(f"\n🎉 Downloaded {len(downloaded_files)} real NetCDF files!")
                     
@@ -420,8 +330,7 @@ def main():
                         output_path = Path("./public/cygnss_data.json")
                         output_path.parent.mkdir(exist_ok=True)
                         
-                        with open(output_path, 'w') as f:
-                            json.dump(cygnss_output, f, indent=2)
+                        write_json_atomic(output_path, cygnss_output)
                         
                         print(f"✅ REAL CYGNSS data saved: {output_path}")
                         print(f"🛰️ Contains {len(processed_data[0]['ddm_data'])} actual satellite measurements!")
@@ -453,33 +362,31 @@ def main():
     print()
     print("�️ You now have actual NASA satellite measurements!")
     
-    input("\nPress Enter to exit...")
+    if not args.dev:
+        input("\nPress Enter to exit...")
 
-def create_development_data():
-    """Create development data structure"""
+def create_development_data(incidence=30.0, wind_speed=7.0, seed=0):
+    """Create development data: one DDM from the Zavorotny-Voronovich simulator"""
+    if not require('numpy', purpose="simulate development DDMs"):
+        return False
+    from cygnss_simulate import sample_ddm_points
     
-    ddm_points = []
-    
-    # Simple development structure
-    for i in range(17):
-        for j in range(11):
-            delay = i * 0.5
-            doppler = (j - 5) * 50
-            power = 20 + np.random.normal(0, 5)
-            
-            ddm_points.append({
-                "delay": delay,
-                "doppler": doppler,
-                "power": power
-            })
+    ddm_points, sim = sample_ddm_points(incidence, wind_speed, seed)
     
     dev_data = {
         "status": "success",
         "data_source": "development",
+        "processed_at": datetime.now(timezone.utc).isoformat(),
         "sample_ddm": {
             "ddm_data": ddm_points,
             "metadata": {
-                "source": "Development data"
+                "source": "Development data (Zavorotny-Voronovich simulation)",
+                "delay_bins": len(sim["delay"]),
+                "doppler_bins": len(sim["doppler"]),
+                "total_points": len(ddm_points),
+                "power_units": "dB(W)",
+                "incidence_angle": incidence,
+                "wind_speed": wind_speed
             }
         }
     }
@@ -487,10 +394,10 @@ def create_development_data():
     output_path = Path("./public/cygnss_data.json")
     output_path.parent.mkdir(exist_ok=True)
     
-    with open(output_path, 'w') as f:
-        json.dump(dev_data, f, indent=2)
+    write_json_atomic(output_path, dev_data)
     
-    print("✅ Development data created")
+    print(f"✅ Development data created ({wind_speed} m/s wind, {incidence}° incidence)")
+    return True
 
 if __name__ == "__main__":
     main()
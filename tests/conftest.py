@@ -0,0 +1,29 @@
+"""Shared fixtures for the CYGNSS script tests"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    """A private granule metadata cache"""
+    return str(tmp_path / "cache")
+
+
+@pytest.fixture
+def make_granule(tmp_path):
+    """Factory writing small synthetic L1 granules under tmp_path"""
+    pytest.importorskip("netCDF4")
+    from benchmark_cygnss import make_synthetic_granule
+
+    def make(relative, n_samples=20, spacecraft=1, start=None, seed=0):
+        path = tmp_path / "data" / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return str(make_synthetic_granule(str(path), n_samples, spacecraft, start, seed))
+
+    return make
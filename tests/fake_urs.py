@@ -0,0 +1,114 @@
+"""A local stand-in for Earthdata Login (URS) and the hosts behind it
+
+One http.server serves every fake host; requests are routed on their Host
+header, so the test resolves names like urs.earthdata.nasa.gov to 127.0.0.1
+(see resolve_to_loopback).
+
+  POST /api/users/find_or_create_token   basic auth -> bearer token (URS)
+  GET  /granule.nc                       needs a valid bearer token; sets a cookie
+  GET  /redirect?to=URL                  302 to URL
+  GET  /echo                             the Authorization and Cookie headers it got
+"""
+
+import base64
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+URS_HOST = "urs.earthdata.nasa.gov"
+DATA_HOST = "data.earthdata.nasa.gov"
+CLOUD_HOST = "archive.earthdatacloud.nasa.gov"
+OTHER_HOST = "bucket.s3.example.com"
+FAKE_HOSTS = (URS_HOST, DATA_HOST, CLOUD_HOST, OTHER_HOST)
+
+USERNAME, PASSWORD = "cygnss-user", "secret"
+GRANULE = b"CDF\x01fake granule"
+COOKIE = "asf-urs=session-1"
+
+
+class FakeURS:
+    """State shared by the handler threads; the tests read and change it"""
+
+    def __init__(self):
+        self.token_requests = 0
+        self.valid_tokens = set()
+        self.reject_tokens = False  # the data hosts refuse every token, even new ones
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, host, path="/"):
+        return f"http://{host}:{self.port}{path}"
+
+    def revoke_tokens(self):
+        self.valid_tokens.clear()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        urs = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json(self, status, data, headers=()):
+                self._send(status, json.dumps(data).encode(), [("Content-Type", "application/json"), *headers])
+
+            def _request(self):
+                return self.headers.get("Host", "").rsplit(":", 1)[0], urlparse(self.path)
+
+            def do_POST(self):
+                host, url = self._request()
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if host != URS_HOST or url.path != "/api/users/find_or_create_token":
+                    return self._send(404)
+                expected = "Basic " + base64.b64encode(f"{USERNAME}:{PASSWORD}".encode()).decode()
+                if self.headers.get("Authorization") != expected:
+                    return self._send(401)
+                urs.token_requests += 1
+                token = f"token-{urs.token_requests}"
+                urs.valid_tokens.add(token)
+                self._json(200, {"access_token": token, "token_type": "Bearer", "expiration_date": "1/1/2100"})
+
+            def do_GET(self):
+                host, url = self._request()
+                if url.path == "/redirect":
+                    return self._send(302, headers=[("Location", parse_qs(url.query)["to"][0])])
+                if url.path == "/echo":
+                    return self._json(200, {"host": host, "authorization": self.headers.get("Authorization"),
+                                            "cookie": self.headers.get("Cookie")})
+                if url.path == "/granule.nc" and host in (DATA_HOST, CLOUD_HOST):
+                    token = (self.headers.get("Authorization") or "").removeprefix("Bearer ")
+                    if urs.reject_tokens or token not in urs.valid_tokens:
+                        return self._send(401)
+                    return self._send(200, GRANULE, [("Set-Cookie", f"{COOKIE}; Domain=.earthdata.nasa.gov; Path=/")])
+                self._send(404)
+
+        return Handler
+
+
+def resolve_to_loopback(monkeypatch):
+    """Resolve the fake host names to 127.0.0.1 for this test"""
+    original = socket.getaddrinfo
+
+    def getaddrinfo(host, *args, **kwargs):
+        return original("127.0.0.1" if host in FAKE_HOSTS else host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
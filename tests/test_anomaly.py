@@ -0,0 +1,127 @@
+"""Anomaly flags on simulated cubes, and what the outputs do with flagged DDMs"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from cygnss_anomaly import FLAG_NAMES, anomaly_flags, inject_anomalies, mask_anomalies
+from cygnss_simulate import random_params, simulate_ddms
+
+ROOT = Path(__file__).resolve().parent.parent
+CHANNELS = 4
+
+
+@pytest.fixture(scope="module")
+def injected():
+    n = 500
+    clean = simulate_ddms(**random_params(n * CHANNELS, seed=5), seed=5)["power"]
+    power, truth = inject_anomalies(clean.reshape(n, CHANNELS, *clean.shape[1:]), fraction=0.2, seed=5)
+    return power, truth
+
+
+@pytest.mark.parametrize("bit", list(FLAG_NAMES), ids=list(FLAG_NAMES.values()))
+def test_each_injected_kind_sets_its_flag(injected, bit):
+    power, truth = injected
+
+    flags = anomaly_flags(power, "W")
+
+    assert np.count_nonzero(truth == bit) > 10
+    assert np.all(flags[truth == bit] & bit)
+
+
+def test_clean_ddms_are_never_flagged(injected):
+    power, truth = injected
+
+    flags = anomaly_flags(power, "W")
+
+    assert np.all(flags[truth == 0] == 0)
+
+
+def test_db_input_is_flagged_like_linear(injected):
+    from cygnss_calibration import to_db
+
+    power, truth = injected
+    # Only the finite, positive kinds survive the trip through dB
+    kept = np.isin(truth, [0, 8, 16, 32])
+
+    flags = anomaly_flags(to_db(power), "dBW")
+
+    np.testing.assert_array_equal(flags[kept], anomaly_flags(power, "W")[kept])
+
+
+def test_mask_anomalies_blanks_only_flagged_ddms(injected):
+    power, truth = injected
+    power = power.copy()
+    flags = anomaly_flags(power, "W")
+
+    assert mask_anomalies(power, flags) == np.count_nonzero(flags)
+    assert np.all(np.isnan(power[flags != 0]))
+    assert not np.isnan(power[flags == 0]).any()
+
+
+def _bundle(data_dir, path, cache_dir, drop):
+    from cygnss_compact import load_bundle
+    from process_cygnss_data import write_ddm_bundle
+
+    assert write_ddm_bundle(data_dir, str(path), cache_dir=cache_dir, wind=False, drop_anomalies=drop)
+    return load_bundle(str(path))
+
+
+def test_keep_anomalies_keeps_flagged_ddms(tmp_path, make_granule, cache_dir):
+    import netCDF4
+
+    path = make_granule("g.nc", n_samples=30)
+    with netCDF4.Dataset(path, "a") as ds:
+        power = ds["power_analog"]
+        power[3, 1, 0, 0] = np.nan
+        power[5, 2, 12, 3:6] = -float(power[5, 2, 0, 0])
+        ddm = power[7, 0]
+        power[7, 0] = np.minimum(ddm, np.sort(ddm, axis=None)[-4])
+    data_dir = str(tmp_path / "data")
+
+    dropped = _bundle(data_dir, tmp_path / "dropped.npz", cache_dir, drop=True)
+    kept = _bundle(data_dir, tmp_path / "kept.npz", cache_dir, drop=False)
+
+    flagged = dropped["anomaly"] != 0
+    assert flagged[3, 1] and flagged[5, 2] and flagged[7, 0]
+    np.testing.assert_array_equal(kept["anomaly"], dropped["anomaly"])
+    assert np.isnan(dropped["power"][flagged]).all()
+    # Kept DDMs lose only their own missing and negative bins
+    assert np.isfinite(kept["power"][flagged]).sum(axis=(-2, -1)).min() >= 17 * 11 - 3
+    np.testing.assert_array_equal(kept["power"][~flagged], dropped["power"][~flagged])
+
+
+@pytest.fixture
+def simple_extractor(cache_dir, monkeypatch):
+    import cygnss_metadata
+
+    monkeypatch.syspath_prepend(str(ROOT))
+    monkeypatch.setattr(cygnss_metadata, "DEFAULT_CACHE_DIR", cache_dir)
+    from simple_cygnss_download import process_real_netcdf_files
+    return process_real_netcdf_files
+
+
+def test_simple_download_extractor_skips_flagged_ddms(make_granule, simple_extractor):
+    import netCDF4
+
+    path = make_granule("g.nc")
+    with netCDF4.Dataset(path, "a") as ds:
+        ds["power_analog"][0, 0] = 0.0
+        ds["power_analog"][0, 1, 0, 0] = np.nan
+
+    (ddm,) = simple_extractor([Path(path)])
+
+    assert (ddm["metadata"]["sample_index"], ddm["metadata"]["channel_index"]) == (0, 2)
+    assert ddm["metadata"]["anomaly"] == "ok"
+
+
+def test_simple_download_extractor_reports_all_flagged(make_granule, simple_extractor, capsys):
+    import netCDF4
+
+    path = make_granule("g.nc")
+    with netCDF4.Dataset(path, "a") as ds:
+        ds["power_analog"][:] = 0.0
+
+    assert simple_extractor([Path(path)]) == []
+    assert "are anomalous (zero)" in capsys.readouterr().out
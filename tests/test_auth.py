@@ -0,0 +1,115 @@
+"""Earthdata sessions against the fake URS: token cache, cookies, redirects and refresh"""
+
+import stat
+
+import pytest
+
+from cygnss_auth import COOKIE_FILE, TOKEN_FILE, EarthdataSession
+from fake_urs import (CLOUD_HOST, COOKIE, DATA_HOST, GRANULE, OTHER_HOST, PASSWORD, URS_HOST, USERNAME, FakeURS,
+                      resolve_to_loopback)
+
+
+@pytest.fixture
+def urs(monkeypatch):
+    monkeypatch.setenv("NO_PROXY", "*")
+    resolve_to_loopback(monkeypatch)
+    server = FakeURS().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def open_session(urs, tmp_path):
+    """Factory for sessions sharing one auth dir, as successive runs would; closed at the end"""
+    sessions = []
+
+    def open_session(credentials=(USERNAME, PASSWORD)):
+        session = EarthdataSession(tmp_path / "auth", urs_url=urs.url(URS_HOST), credentials=credentials,
+                                   prompt=False, retries=0)
+        sessions.append(session)
+        return session
+
+    yield open_session
+    for session in sessions:
+        session.close()
+
+
+def _mode(path):
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+def test_token_is_cached_private_and_reused_across_runs(urs, open_session, tmp_path):
+    first = open_session()
+    assert first.get(urs.url(DATA_HOST, "/granule.nc")).content == GRANULE
+    first.close()
+
+    token_file = tmp_path / "auth" / TOKEN_FILE
+    assert _mode(token_file) == 0o600
+    assert urs.token_requests == 1
+
+    # No credentials at all: the cached token is all the second run has
+    second = open_session(credentials=None)
+    assert second.get(urs.url(DATA_HOST, "/granule.nc")).content == GRANULE
+    assert urs.token_requests == 1
+
+
+def test_cookies_persist_between_runs(urs, open_session, tmp_path):
+    first = open_session()
+    first.get(urs.url(DATA_HOST, "/granule.nc")).raise_for_status()
+    first.close()
+    assert _mode(tmp_path / "auth" / COOKIE_FILE) == 0o600
+
+    second = open_session()
+    echoed = second.get(urs.url(DATA_HOST, "/echo")).json()
+
+    assert echoed["cookie"] == COOKIE
+
+
+def test_bearer_token_follows_redirects_between_earthdata_hosts(urs, open_session):
+    session = open_session()
+    target = urs.url(CLOUD_HOST, "/echo")
+
+    echoed = session.get(urs.url(DATA_HOST, f"/redirect?to={target}")).json()
+
+    assert echoed["host"] == CLOUD_HOST
+    assert echoed["authorization"] == "Bearer token-1"
+
+
+def test_bearer_token_is_dropped_on_redirect_off_earthdata(urs, open_session):
+    session = open_session()
+    target = urs.url(OTHER_HOST, "/echo")
+
+    echoed = session.get(urs.url(DATA_HOST, f"/redirect?to={target}")).json()
+
+    assert echoed["host"] == OTHER_HOST
+    assert echoed["authorization"] is None
+
+
+def test_untrusted_hosts_never_get_the_token(urs, open_session):
+    session = open_session()
+    session.login()
+
+    assert session.get(urs.url(OTHER_HOST, "/echo")).json()["authorization"] is None
+
+
+def test_401_refreshes_the_token_once(urs, open_session):
+    session = open_session()
+    session.get(urs.url(DATA_HOST, "/granule.nc")).raise_for_status()
+    urs.revoke_tokens()
+
+    response = session.get(urs.url(DATA_HOST, "/granule.nc"))
+
+    assert response.status_code == 200
+    assert urs.token_requests == 2
+    assert session.token["access_token"] == "token-2"
+
+
+def test_401_after_refresh_is_returned_not_retried(urs, open_session):
+    session = open_session()
+    session.login()
+    urs.reject_tokens = True
+
+    response = session.get(urs.url(DATA_HOST, "/granule.nc"))
+
+    assert response.status_code == 401
+    assert urs.token_requests == 2
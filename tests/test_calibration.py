@@ -0,0 +1,44 @@
+"""dB conversion and the floor-clamped bins the extractors leave out"""
+
+from pathlib import Path
+
+import numpy as np
+
+from cygnss_calibration import DEFAULT_FLOOR_DB, power_to_db, valid_power
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def test_valid_power_excludes_bins_clamped_to_the_floor():
+    power = np.array([1e-12, 0.0, -1e-15, np.nan, np.inf, 2.0])
+
+    valid = valid_power(power, "W")
+
+    assert valid.tolist() == [True, False, False, False, False, True]
+    assert np.all(power_to_db(power, "W")[~valid & np.isfinite(power)] == DEFAULT_FLOOR_DB)
+
+
+def test_valid_power_of_db_input_compares_against_the_floor():
+    power = np.array([-120.0, DEFAULT_FLOOR_DB, np.nan, 3.0])
+
+    assert valid_power(power, "dBW").tolist() == [True, False, False, True]
+
+
+def test_simple_download_extractor_skips_floor_bins(make_granule, cache_dir, monkeypatch):
+    import netCDF4
+
+    import cygnss_metadata
+
+    monkeypatch.syspath_prepend(str(ROOT))
+    monkeypatch.setattr(cygnss_metadata, "DEFAULT_CACHE_DIR", cache_dir)
+    from simple_cygnss_download import process_real_netcdf_files
+
+    path = make_granule("g.nc")
+    with netCDF4.Dataset(path, "a") as ds:
+        # Trailing delay rows, away from the noise region the anomaly checks look at
+        ds["power_analog"][0, 0, 15, 2:5] = 0.0
+
+    (ddm,) = process_real_netcdf_files([Path(path)])
+
+    powers = [point["power"] for point in ddm["ddm_data"]]
+    assert len(powers) == 17 * 11 - 3
+    assert min(powers) > DEFAULT_FLOOR_DB
@@ -0,0 +1,106 @@
+"""Atomic outputs, checkpoints and resuming an interrupted bundle"""
+
+import json
+
+import numpy as np
+import pytest
+
+from cygnss_checkpoint import CHECKPOINT_VERSION, Checkpoint, atomic_write, write_json_atomic
+
+
+def test_atomic_write_keeps_the_old_file_on_error(tmp_path):
+    path = tmp_path / "out.json"
+    write_json_atomic(path, {"old": True})
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as f:
+            f.write('{"new": ')
+            raise RuntimeError("interrupted")
+
+    assert json.loads(path.read_text()) == {"old": True}
+    assert [p.name for p in tmp_path.iterdir()] == ["out.json"]
+
+
+def test_checkpoint_resumes_and_restarts(tmp_path):
+    work_dir = tmp_path / "out.parts"
+    checkpoint = Checkpoint(work_dir)
+    checkpoint.chunk_done("a", 8, name="a.nc", parts=["a_0.npz"])
+    checkpoint.granule_done("b", name="b.nc", parts=["b_0.npz"])
+    checkpoint.path("a_0.npz").write_bytes(b"part")
+
+    resumed = Checkpoint(work_dir, resume=True)
+    assert resumed.next_sample("a") == 8
+    assert resumed.done("b") == {"name": "b.nc", "parts": ["b_0.npz"]}
+    assert resumed.next_sample("c") == 0 and resumed.done("c") is None
+
+    fresh = Checkpoint(work_dir)
+    assert fresh.next_sample("a") == 0 and fresh.done("b") is None
+    assert not fresh.path("a_0.npz").exists()
+
+
+@pytest.mark.parametrize("content", ["{not json", json.dumps({"version": CHECKPOINT_VERSION + 1})])
+def test_unreadable_checkpoint_starts_over(tmp_path, content):
+    work_dir = tmp_path / "out.parts"
+    work_dir.mkdir()
+    (work_dir / Checkpoint.FILE).write_text(content)
+
+    checkpoint = Checkpoint(work_dir, resume=True)
+
+    assert checkpoint.state["granules"] == {} and checkpoint.state["partial"] == {}
+
+
+def _interrupt_after(monkeypatch, n_chunks, starts):
+    """Make process_cygnss_data.bundle_chunks fail after n_chunks chunks in total"""
+    import process_cygnss_data
+
+    original = process_cygnss_data.bundle_chunks
+    seen = []
+
+    def bundle_chunks(file_path, meta, start=0, **kwargs):
+        starts.append(start)
+        for chunk in original(file_path, meta, start, **kwargs):
+            if len(seen) == n_chunks:
+                raise KeyboardInterrupt
+            seen.append(chunk[1]["sample_start"])
+            yield chunk
+
+    monkeypatch.setattr(process_cygnss_data, "bundle_chunks", bundle_chunks)
+
+
+def test_bundle_resumes_from_the_last_chunk(tmp_path, make_granule, cache_dir, monkeypatch):
+    import cygnss_extract
+    from cygnss_compact import load_bundle
+    from process_cygnss_data import write_ddm_bundle
+
+    monkeypatch.setattr(cygnss_extract, "DEFAULT_CHUNK_SAMPLES", 4)
+    data_dir = str(tmp_path / "data")
+    make_granule("a.nc", n_samples=10, seed=1)
+    make_granule("b.nc", n_samples=10, seed=2, spacecraft=2)
+    options = dict(encoding="float32", cache_dir=cache_dir, wind=False)
+
+    reference = str(tmp_path / "reference.npz")
+    assert write_ddm_bundle(data_dir, reference, **options)
+
+    bundle = str(tmp_path / "bundle.npz")
+    with monkeypatch.context() as m:
+        # a.nc in three chunks, then the first chunk of b.nc, then the run dies
+        _interrupt_after(m, 4, starts := [])
+        with pytest.raises(KeyboardInterrupt):
+            write_ddm_bundle(data_dir, bundle, **options)
+    assert starts == [0, 0]
+    assert not (tmp_path / "bundle.npz").exists()
+
+    with monkeypatch.context() as m:
+        _interrupt_after(m, 100, starts := [])
+        assert write_ddm_bundle(data_dir, bundle, resume=True, **options)
+    # a.nc is skipped, b.nc continues after its first chunk
+    assert starts == [4]
+    assert not (tmp_path / "bundle.npz.parts").exists()
+
+    expected, actual = load_bundle(reference), load_bundle(bundle)
+    assert set(actual) == set(expected)
+    for key, values in expected.items():
+        if isinstance(values, np.ndarray):
+            np.testing.assert_array_equal(actual[key], values, err_msg=key)
+        else:
+            assert actual[key] == values
@@ -0,0 +1,21 @@
+"""Top-level scripts: --help exits without touching any output"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS = ["fallback_cygnss.py", "download_cygnss_modern.py", "process_real_cygnss.py",
+           "simple_cygnss_download.py", "setup_cygnss.py"]
+
+
+@pytest.mark.parametrize("script", SCRIPTS)
+def test_help_writes_nothing(tmp_path, script):
+    result = subprocess.run([sys.executable, str(ROOT / script), "--help"], cwd=tmp_path,
+                            capture_output=True, text=True, timeout=60, stdin=subprocess.DEVNULL)
+
+    assert result.returncode == 0, result.stderr
+    assert "usage:" in result.stdout
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,69 @@
+"""Coherent/diffuse classification of simulated DDMs and the bundle's coherent column"""
+
+import numpy as np
+import pytest
+
+from cygnss_coherence import (COHERENT, DIFFUSE, MIN_SNR_DB, UNDETERMINED, classify_cubes, coherence_features,
+                              synthetic_cubes)
+
+# Determined simulated coherent DDMs recognized (about 93% measured; the misses are all below 3 dB SNR)
+MIN_COHERENT_ACCURACY = 0.90
+
+
+@pytest.fixture(scope="module")
+def cubes():
+    power, floor, truth = synthetic_cubes(4000, seed=3)
+    return power, floor, truth, classify_cubes(power, floor)
+
+
+def _snr_db(power, floor):
+    return coherence_features((power - floor[:, None, None]) / floor[:, None, None])["snr_db"]
+
+
+def test_simulated_ddms_are_classified(cubes):
+    power, floor, truth, flags = cubes
+    determined = flags != UNDETERMINED
+
+    coherent, diffuse = truth == COHERENT, truth == DIFFUSE
+    assert np.mean(flags[coherent & determined] == COHERENT) >= MIN_COHERENT_ACCURACY
+    assert not np.any(flags[diffuse] == COHERENT)
+    # Clear coherent reflections are all recognized
+    clear = coherent & (_snr_db(power, floor) >= 3.0)
+    assert clear.sum() > 1000 and np.all(flags[clear] == COHERENT)
+
+
+def test_low_snr_ddms_are_undetermined(cubes):
+    power, floor, truth, flags = cubes
+    snr_db = _snr_db(power, floor)
+
+    assert np.all((flags == UNDETERMINED) == (snr_db < MIN_SNR_DB))
+
+    # The same cubes with their signal scaled down to a peak SNR of -6 dB
+    peak = 10 ** (snr_db / 10)
+    scale = (0.25 / peak)[:, None, None]
+    faint = floor[:, None, None] + (power - floor[:, None, None]) * scale
+    assert np.all(classify_cubes(faint, floor) == UNDETERMINED)
+    assert np.all(classify_cubes(np.full_like(power[:3], np.nan), floor[:3]) == UNDETERMINED)
+
+
+def test_bundle_has_one_coherent_flag_per_ddm(tmp_path, make_granule, cache_dir):
+    import netCDF4
+
+    from cygnss_compact import load_bundle
+    from process_cygnss_data import write_ddm_bundle
+
+    path = make_granule("g.nc", n_samples=25)
+    with netCDF4.Dataset(path, "a") as ds:
+        ds["power_analog"][4, 2] = 0.0
+    make_granule("h.nc", n_samples=15, spacecraft=2, seed=1)
+    bundle = tmp_path / "ddms.npz"
+
+    assert write_ddm_bundle(str(tmp_path / "data"), str(bundle), cache_dir=cache_dir, wind=False)
+    data = load_bundle(str(bundle))
+
+    assert data["coherent"].shape == data["power"].shape[:2] == (40, 4)
+    assert data["coherent"].dtype == np.int8
+    assert set(np.unique(data["coherent"])) <= {UNDETERMINED, DIFFUSE, COHERENT}
+    # The dropped zero DDM has no flag; the others have clear peaks
+    assert data["coherent"][4, 2] == UNDETERMINED
+    assert np.count_nonzero(data["coherent"] != UNDETERMINED) > 100
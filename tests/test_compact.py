@@ -0,0 +1,107 @@
+"""Quantized DDM encodings: round-trip error bounds and missing bins"""
+
+import base64
+
+import numpy as np
+import pytest
+
+from cygnss_compact import decode_cubes, dequantize, encode_cubes, quantization_error_bound, quantize
+
+pytestmark = pytest.mark.filterwarnings("error")
+
+
+def _within_bound(decoded, cubes, scale):
+    """|x - x'| <= scale / 2, up to float32 rounding of the decoded value"""
+    bound = quantization_error_bound(scale)[..., None, None] + 4 * np.finfo(np.float32).eps * np.abs(cubes)
+    return np.abs(decoded - cubes) <= bound
+
+
+def _db_cubes(n=50, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-180.0, -120.0, (n, 4, 17, 11)).astype(np.float32)
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16])
+def test_round_trip_within_half_a_step(dtype):
+    cubes = _db_cubes()
+
+    codes, scale, offset = quantize(cubes, dtype)
+    decoded = dequantize(codes, scale, offset)
+
+    assert _within_bound(decoded, cubes, scale).all()
+    assert np.all(scale <= 60.0 / (np.iinfo(dtype).max - 1) * (1 + 1e-5))
+
+
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16])
+def test_missing_bins_keep_the_missing_code_and_the_range(dtype):
+    cubes = _db_cubes(n=3)
+    cubes[0, 0, :2] = np.nan
+    cubes[1, 2] = np.nan  # a DDM with no finite bin at all
+    cubes[2, 1, 5, 5] = np.inf
+
+    codes, scale, offset = quantize(cubes, dtype)
+    decoded = dequantize(codes, scale, offset)
+
+    missing = ~np.isfinite(cubes)
+    assert np.all(codes[missing] == np.iinfo(dtype).max)
+    assert np.all(np.isnan(decoded[missing]))
+    with np.errstate(invalid='ignore'):
+        assert _within_bound(decoded, cubes, scale)[~missing].all()
+    assert offset[0, 0] >= -180.0
+
+
+@pytest.mark.parametrize("encoding", ["float32", "float16", "uint16", "uint8"])
+def test_encode_decode_keeps_nan(encoding):
+    cubes = _db_cubes(n=4)
+    cubes[0, 0, 3, 3] = np.nan
+
+    decoded = decode_cubes(encode_cubes(cubes, encoding))
+
+    assert np.isnan(decoded[0, 0, 3, 3])
+    assert np.isfinite(np.delete(decoded.ravel(), np.ravel_multi_index((0, 0, 3, 3), cubes.shape))).all()
+
+
+def _decode_record(cube):
+    codes = np.frombuffer(base64.b64decode(cube["codes"]), dtype=cube["encoding"]).reshape(cube["shape"])
+    return dequantize(codes, np.float32(cube["scale"]), np.float32(cube["offset"]))
+
+
+def test_store_pages_zero_bins_as_missing(tmp_path, make_granule, cache_dir):
+    from cygnss_store import connect, ingest_granule, query_ddms
+
+    conn = connect(str(tmp_path / "store.sqlite"))
+    ingest_granule(conn, make_granule("a.nc", n_samples=2), cache_dir)
+    power = np.frombuffer(conn.execute("SELECT power FROM ddms ORDER BY time, id LIMIT 1").fetchone()[0],
+                          dtype=np.float32).reshape(17, 11).copy()
+    power[0, :3] = 0.0
+    power[1, 0] = np.nan
+    with conn:
+        conn.execute("UPDATE ddms SET power = ? WHERE id = (SELECT id FROM ddms ORDER BY time, id LIMIT 1)",
+                     (power.tobytes(),))
+
+    cube = query_ddms(conn, page_size=1, encoding="uint8")["records"][0]["power_db"]
+    decoded = _decode_record(cube)
+
+    assert np.isnan(decoded[0, :3]).all() and np.isnan(decoded[1, 0])
+    valid_db = 10 * np.log10(power[power > 0])
+    assert cube["offset"] == pytest.approx(valid_db.min(), abs=1e-3)
+    assert cube["scale"] <= (valid_db.max() - valid_db.min()) / 254 * (1 + 1e-5)
+
+
+def test_bundle_zero_bins_are_missing_not_floor(tmp_path, make_granule, cache_dir):
+    netCDF4 = pytest.importorskip("netCDF4")
+    from cygnss_compact import load_bundle
+    from process_cygnss_data import write_ddm_bundle
+
+    path = make_granule("a.nc", n_samples=4)
+    with netCDF4.Dataset(path, "a") as ds:
+        ds["power_analog"][0, 0, :2, :] = 0.0
+    bundle_file = str(tmp_path / "bundle.npz")
+
+    assert write_ddm_bundle(str(tmp_path / "data"), bundle_file, encoding="uint8", cache_dir=cache_dir,
+                            wind=False, drop_anomalies=False)
+    bundle = load_bundle(bundle_file)
+
+    assert np.isnan(bundle["power"][0, 0, :2]).all()
+    assert np.isfinite(bundle["power"][0, 0, 2:]).all()
+    assert bundle["offset"][0, 0] > -200.0
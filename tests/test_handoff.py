@@ -0,0 +1,182 @@
+"""Extraction workers: handing chunks to the writer and their lifecycle"""
+
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import cygnss_handoff
+from cygnss_handoff import handoff, synthetic_chunks
+
+ROOT = Path(__file__).resolve().parent.parent
+# Cubes of synthetic_chunks(n, CHUNK_SAMPLES, CHANNELS), in elements
+CHUNK_SAMPLES, CHANNELS = 8, 2
+SLOT_SIZE = CHUNK_SAMPLES * CHANNELS * 17 * 11
+
+
+# Producers run in spawned workers, so they live at module level
+def failing_chunks(n_chunks):
+    yield from synthetic_chunks(1, CHUNK_SAMPLES, CHANNELS)
+    raise ValueError(f"bad granule after 1 of {n_chunks} chunks")
+
+
+def dying_chunks(n_chunks):
+    os._exit(1)
+    yield
+
+
+def float64_chunks(*args):
+    for cube, fields in synthetic_chunks(*args):
+        yield cube.astype(np.float64), fields
+
+
+def _tasks(n_tasks, n_chunks=3):
+    return [(k, (n_chunks, CHUNK_SAMPLES, CHANNELS, k)) for k in range(n_tasks)]
+
+
+def _collect(items):
+    """{task_id: [(cube copy, fields), ...]} and the order tasks finished in"""
+    chunks, done = {}, []
+    for kind, task_id, cube, fields in items:
+        if kind == "chunk":
+            chunks.setdefault(task_id, []).append((np.array(cube), fields))
+        elif kind == "done":
+            done.append(task_id)
+        else:
+            raise AssertionError(cube)
+    return chunks, done
+
+
+def _assert_delivered(chunks, tasks):
+    assert sorted(chunks) == [task_id for task_id, _ in tasks]
+    for task_id, args in tasks:
+        expected = [(cube.copy(), fields) for cube, fields in synthetic_chunks(*args)]
+        assert len(chunks[task_id]) == len(expected)
+        for (cube, fields), (expected_cube, expected_fields) in zip(chunks[task_id], expected):
+            np.testing.assert_array_equal(cube, expected_cube)
+            assert fields["sample_start"] == expected_fields["sample_start"]
+            np.testing.assert_array_equal(fields["lat"], expected_fields["lat"])
+
+
+@pytest.fixture
+def rings(monkeypatch):
+    """Names of the shared memory blocks handoff() creates"""
+    names = []
+
+    class RecordingRing(cygnss_handoff.CubeRing):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            names.append(self.shm.name)
+
+    monkeypatch.setattr(cygnss_handoff, "CubeRing", RecordingRing)
+    return names
+
+
+def _assert_cleaned_up(names):
+    assert mp.active_children() == []
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+@pytest.mark.parametrize("mode", ["shared", "pickle"])
+def test_chunks_arrive_intact_and_in_order(mode, rings):
+    tasks = _tasks(4)
+
+    chunks, done = _collect(handoff(synthetic_chunks, tasks, jobs=2, mode=mode, slot_size=SLOT_SIZE))
+
+    assert sorted(done) == [0, 1, 2, 3]
+    _assert_delivered(chunks, tasks)
+    assert len(rings) == (mode == "shared")
+    _assert_cleaned_up(rings)
+
+
+@pytest.mark.parametrize("producer, slot_size, dtype", [(synthetic_chunks, 1, np.float32),
+                                                        (float64_chunks, SLOT_SIZE, np.float64)])
+def test_cubes_that_do_not_fit_a_slot_are_pickled(producer, slot_size, dtype):
+    tasks = _tasks(2)
+
+    chunks, _ = _collect(handoff(producer, tasks, jobs=2, slot_size=slot_size))
+
+    _assert_delivered(chunks, tasks)
+    assert {cube.dtype for delivered in chunks.values() for cube, _ in delivered} == {np.dtype(dtype)}
+
+
+def test_errors_are_reported_and_other_tasks_finish(rings):
+    items = list(handoff(failing_chunks, [(0, (3,)), (1, (3,))], jobs=1, slot_size=SLOT_SIZE))
+
+    errors = [item for item in items if item[0] == "error"]
+    assert [task_id for _, task_id, _, _ in errors] == [0, 1]
+    assert all(message.startswith("ValueError: bad granule") for _, _, message, _ in errors)
+    assert [item[0] for item in items].count("chunk") == 2
+    _assert_cleaned_up(rings)
+
+
+def test_dead_workers_raise_instead_of_waiting(rings):
+    with pytest.raises(RuntimeError, match="2 tasks unfinished"):
+        list(handoff(dying_chunks, [(0, (1,)), (1, (1,))], jobs=1, slot_size=SLOT_SIZE))
+    _assert_cleaned_up(rings)
+
+
+def test_admit_holds_tasks_and_replans_their_args(rings):
+    calls = []
+
+    def admit(task_id, args, running):
+        calls.append((task_id, running))
+        if running:
+            return None
+        # Re-planned: one chunk fewer than queued
+        return (args[0] - 1, *args[1:])
+
+    chunks, done = _collect(handoff(synthetic_chunks, _tasks(3), jobs=2, slot_size=SLOT_SIZE, admit=admit))
+
+    assert done == [0, 1, 2]
+    # Held while another task ran, started once nothing was running
+    assert [task_id for task_id, running in calls if not running] == [0, 1, 2]
+    assert any(running for _, running in calls)
+    _assert_delivered(chunks, _tasks(3, n_chunks=2))
+    _assert_cleaned_up(rings)
+
+
+def test_closing_early_stops_workers_and_frees_the_ring(rings):
+    items = handoff(synthetic_chunks, _tasks(4, n_chunks=50), jobs=2, slot_size=SLOT_SIZE)
+    assert next(items)[0] == "chunk"
+
+    items.close()
+
+    _assert_cleaned_up(rings)
+
+
+def _bundle(tmp_path, name, *args):
+    """Run process_cygnss_data.py --bundle in a fresh interpreter; the bundle's contents"""
+    from cygnss_compact import load_bundle
+
+    bundle = tmp_path / f"{name}.npz"
+    command = [sys.executable, str(ROOT / "scripts" / "process_cygnss_data.py"), "-d", str(tmp_path / "data"),
+               "-o", str(tmp_path / f"{name}.json"), "--cache-dir", str(tmp_path / "cache"),
+               "--bundle", str(bundle), "--no-wind", *args]
+    # A hang (forked workers waiting on the parent's Numba thread pool) fails the test instead of the run
+    result = subprocess.run(command, cwd=tmp_path, capture_output=True, text=True, timeout=300,
+                            stdin=subprocess.DEVNULL)
+    assert result.returncode == 0, result.stdout + result.stderr
+    return load_bundle(str(bundle))
+
+
+def test_bundle_with_two_workers_finishes_and_matches_one(tmp_path, make_granule):
+    for i in range(3):
+        make_granule(f"g{i}.nc", n_samples=50, spacecraft=i + 1, seed=i)
+
+    expected = _bundle(tmp_path, "one", "--jobs", "1")
+    for handoff in ("shared", "pickle"):
+        actual = _bundle(tmp_path, handoff, "--jobs", "2", "--handoff", handoff)
+        assert set(actual) == set(expected)
+        for key, values in expected.items():
+            if isinstance(values, np.ndarray):
+                np.testing.assert_array_equal(actual[key], values, err_msg=f"{handoff}: {key}")
+            else:
+                assert actual[key] == values, f"{handoff}: {key}"
@@ -0,0 +1,69 @@
+"""The Numba kernels return exactly what the NumPy versions do"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("numba")
+
+from cygnss_calibration import to_db
+from cygnss_simulate import random_params, simulate_ddms
+from cygnss_slices import subbin_peak
+from cygnss_wind import nominal_brcs_factor, observables
+
+
+@pytest.fixture(scope="module")
+def sim():
+    params = random_params(200, seed=3)
+    sim = simulate_ddms(**params, seed=3)
+    sim["factor"] = nominal_brcs_factor(params["incidence"], params["rx_gain_db"])
+    return sim
+
+
+def _assert_same(expected, actual):
+    assert set(actual) == set(expected)
+    for key, values in expected.items():
+        np.testing.assert_array_equal(actual[key], values, err_msg=key)
+
+
+def _awkward(power):
+    """Copies with missing bins, nonpositive bins and peaks on the grid edge"""
+    power = power.copy()
+    power[0:20, 8, 5] = np.nan
+    power[20:40, 7, 4] = 0.0
+    power[40:60] = np.nan
+    power[60:80, 0, 0] = 10 * power[60:80].max()
+    power[80:100, 16, 10] = 10 * power[80:100].max()
+    return power
+
+
+@pytest.mark.parametrize("method", ["parabolic", "quadratic"])
+@pytest.mark.parametrize("awkward", [False, True])
+def test_subbin_peak_backends_agree(sim, method, awkward):
+    power = _awkward(sim["power"]) if awkward else sim["power"]
+
+    for units, values in (("W", power), ("dB", to_db(power))):
+        expected = subbin_peak(values, units, method, backend="numpy")
+        _assert_same(expected, subbin_peak(values, units, method, backend="numba"))
+
+
+@pytest.mark.parametrize("method", ["parabolic", "quadratic"])
+def test_subbin_peak_backends_agree_on_given_peaks(sim, method):
+    rng = np.random.default_rng(0)
+    peak_bins = (rng.integers(0, 17, len(sim["power"])), rng.integers(0, 11, len(sim["power"])))
+
+    expected = subbin_peak(sim["power"], "W", method, peak_bins=peak_bins, backend="numpy")
+    _assert_same(expected, subbin_peak(sim["power"], "W", method, peak_bins=peak_bins, backend="numba"))
+
+
+def test_observables_backends_agree(sim):
+    signal = sim["power"] - sim["noise_floor"][:, None, None]
+    # Speculars near the edge, where the box or the leading edge falls off the DDM
+    row = sim["specular_row"].copy()
+    row[:20] = np.linspace(0.0, 16.0, 20)
+
+    expected = observables(signal, row, sim["specular_col"], sim["factor"], backend="numpy")
+    actual = observables(signal, row, sim["specular_col"], sim["factor"], backend="numba")
+
+    assert np.isnan(expected[0]).any() and np.isfinite(expected[0]).any()
+    for values, result in zip(expected, actual):
+        np.testing.assert_array_equal(result, values)
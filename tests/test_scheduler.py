@@ -0,0 +1,103 @@
+"""Memory-budget chunk scheduler, with the memory readings pinned"""
+
+import pytest
+
+import cygnss_scheduler
+from cygnss_scheduler import (BUDGET_FRACTION, MAX_CHUNK_SAMPLES, MIN_CHUNK_SAMPLES, WORKING_COPIES, ChunkScheduler,
+                              parse_memory, sample_bytes)
+
+MB = 1 << 20
+
+
+def _meta(n_samples=100000):
+    return {"power_variable": "power_analog",
+            "variables": {"power_analog": {"shape": [n_samples, 4, 17, 11], "dtype": "float32"}}}
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    """The tree's measured memory, settable by the test; workers cost nothing before their first chunk"""
+    reading = {"bytes": 0}
+    monkeypatch.setattr(cygnss_scheduler, "tree_memory_bytes", lambda: reading["bytes"])
+    monkeypatch.setattr(cygnss_scheduler, "worker_overhead", lambda: 0)
+    return reading
+
+
+@pytest.mark.parametrize("text, expected", [("512M", 512 * MB), ("1.5g", int(1.5 * (1 << 30))),
+                                            ("8GB", 8 << 30), ("64KiB", 64 << 10), ("4096", 4096)])
+def test_parse_memory(text, expected):
+    assert parse_memory(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "lots", "12X", "1.2.3G", "-1G", "G"])
+def test_parse_memory_rejects_garbage(text):
+    with pytest.raises(ValueError):
+        parse_memory(text)
+
+
+def test_plan_lowers_concurrency_before_shrinking_chunks(memory):
+    meta = _meta()
+    per_sample = sample_bytes(meta)[0] + WORKING_COPIES * sample_bytes(meta)[1]
+
+    # Two workers would get under MIN_CHUNK_SAMPLES each; one gets more
+    chunk, concurrency = ChunkScheduler(20 * MB, workers=2, tasks=2).plan(meta)
+    assert concurrency == 1
+    assert chunk == int((BUDGET_FRACTION * 20 * MB - cygnss_scheduler.CHUNK_OVERHEAD) // per_sample)
+    assert chunk >= MIN_CHUNK_SAMPLES
+
+    assert ChunkScheduler(1 << 30, workers=2, tasks=2).plan(meta)[1] == 2
+    # Below even one minimum chunk the plan stays at the minimum, alone
+    assert ChunkScheduler(10 * MB, workers=2, tasks=2).plan(meta) == (MIN_CHUNK_SAMPLES, 1)
+
+
+def test_plan_caps_chunks_at_the_granule_and_the_maximum(memory):
+    scheduler = ChunkScheduler(8 << 30, workers=1)
+
+    assert scheduler.plan(_meta(500)) == (500, 1)
+    assert scheduler.plan(_meta()) == (MAX_CHUNK_SAMPLES, 1)
+
+
+def test_admit_holds_granules_while_running_work_fills_the_budget(memory):
+    meta = _meta()
+    scheduler = ChunkScheduler(200 * MB, workers=2, tasks=3)
+
+    first = scheduler.admit(0, meta, running=0)
+    assert first is not None
+    # Measured memory plus the first granule's working set leave no room for a second
+    memory["bytes"] = int(BUDGET_FRACTION * 200 * MB) - scheduler.running[0] // 2
+    assert scheduler.admit(1, meta, running=1) is None
+
+    scheduler.finished(0)
+    memory["bytes"] = 20 * MB
+    assert scheduler.admit(1, meta, running=1) is not None
+    # Never more granules at once than planned
+    assert scheduler.admit(2, meta, running=2) is None
+
+
+def test_admit_never_holds_when_nothing_runs(memory):
+    memory["bytes"] = 10 << 30
+    scheduler = ChunkScheduler(100 * MB, workers=2, tasks=2)
+
+    assert scheduler.admit(0, _meta(), running=0) == MIN_CHUNK_SAMPLES
+
+
+def test_observe_only_raises_the_estimate(memory):
+    meta = _meta()
+    raw, cube = sample_bytes(meta)
+    scheduler = ChunkScheduler(1 << 30)
+
+    def peak(copies, n=1000):
+        return 100 * MB + cygnss_scheduler.CHUNK_OVERHEAD + n * (raw + copies * cube)
+
+    # The first measurement replaces the guess
+    scheduler.observe(meta, 1000, 100 * MB, peak(3.0))
+    assert scheduler.copies == pytest.approx(3.0)
+    scheduler.observe(meta, 1000, 100 * MB, peak(2.0))
+    assert scheduler.copies == pytest.approx(3.0)
+    scheduler.observe(meta, 1000, 100 * MB, peak(4.5))
+    assert scheduler.copies == pytest.approx(4.5)
+    # Readings that are missing or show no growth change nothing
+    scheduler.observe(meta, 1000, None, peak(9.0))
+    scheduler.observe(meta, 0, 100 * MB, peak(9.0))
+    scheduler.observe(meta, 1000, 100 * MB, 100 * MB)
+    assert scheduler.copies == pytest.approx(4.5)
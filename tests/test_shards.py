@@ -0,0 +1,97 @@
+"""Sharded ingest: a merged set of shard stores equals one store built directly"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from cygnss_shards import DONE_FILE, merge_shards, run_shards, write_plan
+from cygnss_store import connect, ingest_granule, query_ddms
+
+DAY2 = datetime(2018, 8, 2, tzinfo=timezone.utc)
+
+
+def _granules(make_granule):
+    return [make_granule("2018/213/cyg.nc", n_samples=5, spacecraft=1, seed=1),
+            make_granule("2018/214/cyg.nc", n_samples=4, spacecraft=1, start=DAY2, seed=2),
+            make_granule("2018/213/other.nc", n_samples=6, spacecraft=2, seed=3)]
+
+
+def _contents(store_path):
+    conn = connect(str(store_path), readonly=True)
+    try:
+        return sorted(tuple(row) for row in conn.execute(
+            "SELECT g.name, d.sample, d.channel, d.time, d.lat, d.lon, d.power, d.power_norm"
+            " FROM ddms d JOIN granules g ON g.id = d.granule_id"))
+    finally:
+        conn.close()
+
+
+def _page_all(store_path, **filters):
+    conn = connect(str(store_path), readonly=True)
+    records, cursor = [], None
+    try:
+        while True:
+            page = query_ddms(conn, cursor=cursor, page_size=7, include_ddm=False, **filters)
+            records.extend((r["granule"], r["sample"], r["channel"]) for r in page["records"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return records
+    finally:
+        conn.close()
+
+
+# jobs=2 runs the shards in spawned worker processes
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_merged_shards_match_a_direct_store(tmp_path, make_granule, cache_dir, jobs):
+    data_dir = tmp_path / "data"
+    files = _granules(make_granule)
+    shard_dir = tmp_path / "shards"
+    plan = write_plan(files, shard_dir, "spacecraft-day", cache_dir, data_dir)
+    assert sorted(plan["shards"]) == ["cyg01_2018-08-01", "cyg01_2018-08-02", "cyg02_2018-08-01"]
+
+    records = run_shards(plan, list(plan["shards"]), shard_dir, cache_dir, jobs=jobs, verbose=False)
+    assert len(records) == 3
+    merged = tmp_path / "merged.sqlite"
+    index = merge_shards(shard_dir, merged, tmp_path / "stats.json", verbose=False)
+
+    direct = tmp_path / "direct.sqlite"
+    conn = connect(str(direct))
+    for path in files:
+        ingest_granule(conn, path, cache_dir, data_dir=data_dir)
+    conn.close()
+
+    assert index["pending"] == []
+    assert _contents(merged) == _contents(direct)
+    bbox = (70.0, -10.0, 100.0, 10.0)
+    in_box = _page_all(merged, bbox=bbox)
+    assert in_box and in_box == _page_all(direct, bbox=bbox)
+    assert _page_all(merged) == _page_all(direct)
+
+
+def test_merging_again_copies_nothing(tmp_path, make_granule, cache_dir):
+    files = _granules(make_granule)
+    shard_dir = tmp_path / "shards"
+    plan = write_plan(files, shard_dir, "spacecraft", cache_dir, tmp_path / "data")
+    run_shards(plan, list(plan["shards"]), shard_dir, cache_dir, verbose=False)
+    merged = tmp_path / "merged.sqlite"
+
+    merge_shards(shard_dir, merged, tmp_path / "stats.json", verbose=False)
+    before = _contents(merged)
+    merge_shards(shard_dir, merged, tmp_path / "stats.json", verbose=False)
+
+    assert _contents(merged) == before
+    assert len(before) == (5 + 4 + 6) * 4
+
+
+def test_unfinished_shards_are_pending_and_not_merged(tmp_path, make_granule, cache_dir):
+    files = _granules(make_granule)
+    shard_dir = tmp_path / "shards"
+    plan = write_plan(files, shard_dir, "spacecraft", cache_dir, tmp_path / "data")
+    run_shards(plan, list(plan["shards"]), shard_dir, cache_dir, verbose=False)
+    (shard_dir / "cyg02" / DONE_FILE).unlink()
+
+    merged = tmp_path / "merged.sqlite"
+    index = merge_shards(shard_dir, merged, tmp_path / "stats.json", verbose=False)
+
+    assert index["pending"] == ["cyg02"]
+    assert {row[0] for row in _contents(merged)} == {"2018/213/cyg.nc", "2018/214/cyg.nc"}
@@ -0,0 +1,85 @@
+"""DDM similarity search: flat and IVF indexes over a synthetic bundle"""
+
+import numpy as np
+import pytest
+
+from cygnss_similarity import DEFAULT_NPROBE, DDMIndex
+
+# IVF recall of the exact top 10 that the docs promise at DEFAULT_NPROBE
+MIN_RECALL = 0.99
+# (sample, channel) in g.nc copied to (sample, channel) in h.nc
+ORIGINAL, DUPLICATE = (3, 2), (700, 1)
+
+
+@pytest.fixture(scope="module")
+def bundle(tmp_path_factory):
+    """Two 1000-sample granules, one DDM of g.nc planted again in h.nc"""
+    netCDF4 = pytest.importorskip("netCDF4")
+    from benchmark_cygnss import make_synthetic_granule
+    from process_cygnss_data import write_ddm_bundle
+
+    tmp_path = tmp_path_factory.mktemp("similarity")
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    make_synthetic_granule(str(data_dir / "g.nc"), 1000, 1, None, 0)
+    make_synthetic_granule(str(data_dir / "h.nc"), 1000, 2, None, 1)
+    with netCDF4.Dataset(str(data_dir / "g.nc")) as ds:
+        ddm = ds["power_analog"][ORIGINAL]
+    with netCDF4.Dataset(str(data_dir / "h.nc"), "a") as ds:
+        ds["power_analog"][DUPLICATE] = ddm
+
+    path = tmp_path / "ddms.npz"
+    assert write_ddm_bundle(str(data_dir), str(path), cache_dir=str(tmp_path / "cache"), wind=False)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def flat(bundle):
+    return DDMIndex.build(bundle, kind="flat")
+
+
+def test_flat_index_finds_a_planted_duplicate(flat):
+    records = flat.query("g.nc", *ORIGINAL, k=5)
+
+    assert (records[0]["granule"], records[0]["sample"], records[0]["channel"]) == ("h.nc",) + DUPLICATE
+    assert records[0]["distance"] == pytest.approx(0, abs=1e-3)
+    assert records[1]["distance"] > 10 * records[0]["distance"]
+
+
+def test_query_returns_granule_sample_channel(flat):
+    entry = flat.locate("h.nc", 42, 3)
+    record, = flat.describe([entry])
+    assert (record["granule"], record["sample"], record["channel"]) == ("h.nc", 42, 3)
+    assert -90 <= record["lat"] <= 90 and -180 <= record["lon"] <= 360
+
+    records = flat.query(1, 42, 3, k=10)
+    assert len(records) == 10
+    assert all(set(r) == {"granule", "sample", "channel", "distance", "lat", "lon"} for r in records)
+    assert ("h.nc", 42, 3) not in {(r["granule"], r["sample"], r["channel"]) for r in records}
+    distances = [r["distance"] for r in records]
+    assert distances == sorted(distances)
+
+
+def test_ivf_recall_against_flat(bundle, flat):
+    ivf = DDMIndex.build(bundle, kind="ivf")
+    picked = np.random.default_rng(0).choice(flat.entry.size, 200, replace=False)
+    queries = flat.embeddings[picked]
+
+    exact = flat.entry[flat.search(queries, k=10)[1]]
+    found = ivf.entry[ivf.search(queries, k=10, nprobe=DEFAULT_NPROBE)[1]]
+    recall = np.mean([np.isin(e, f).mean() for e, f in zip(exact, found)])
+
+    assert recall >= MIN_RECALL
+
+
+def test_save_load_round_trip(tmp_path, bundle):
+    index = DDMIndex.build(bundle, kind="ivf")
+    path = tmp_path / "ddms.index.npz"
+    index.save(str(path))
+    loaded = DDMIndex.load(str(path))
+
+    assert loaded.header == index.header
+    assert loaded.granule_names == index.granule_names
+    for name in ("mean", "basis", "embeddings", "floor", "entry", "lat", "lon", "centroids", "cell_offsets"):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(index, name))
+    assert loaded.query("g.nc", 10, 0) == index.query("g.nc", 10, 0)
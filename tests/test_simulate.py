@@ -0,0 +1,55 @@
+"""Zavorotny-Voronovich forward model: noise, peak position and the wind response"""
+
+import numpy as np
+import pytest
+
+from cygnss_simulate import DELAY_STEP, random_params, simulate_ddms
+from cygnss_wind import WIND_AXIS, WIND_DIRECTIONS, _simulated_observables
+
+# Specular points on and off the grid centre (delay in chips, Doppler in Hz)
+OFFSETS = {"incidence": [5.0, 30.0, 60.0, 30.0], "delay_offset": [0.0, 0.3, -0.4, 0.5],
+           "doppler_offset": [0.0, 200.0, -300.0, -600.0]}
+
+
+def _peaks(power):
+    return np.array([np.unravel_index(ddm.argmax(), ddm.shape) for ddm in power])
+
+
+def test_noise_is_deterministic_for_a_seed():
+    params = random_params(50, seed=4)
+
+    first = simulate_ddms(**params, seed=7)["power"]
+    np.testing.assert_array_equal(first, simulate_ddms(**params, seed=7)["power"])
+    assert not np.array_equal(first, simulate_ddms(**params, seed=8)["power"])
+    np.testing.assert_array_equal(simulate_ddms(**params, noise=False, seed=7)["power"],
+                                  simulate_ddms(**params, noise=False, seed=8)["power"])
+
+
+def test_mirror_like_surface_peaks_at_the_specular_bin():
+    sim = simulate_ddms(mss=1e-5, noise=False, **OFFSETS)
+    rows, cols = _peaks(sim["power"]).T
+
+    np.testing.assert_array_equal(cols, np.round(sim["specular_col"]))
+    assert np.all(np.abs(rows - sim["specular_row"]) < 1)
+
+
+@pytest.mark.parametrize("wind_speed", [3.0, 10.0, 25.0])
+def test_sea_surface_peaks_on_the_specular_doppler_within_a_chip_after_the_specular_delay(wind_speed):
+    sim = simulate_ddms(wind_speed=wind_speed, noise=False, **OFFSETS)
+    rows, cols = _peaks(sim["power"]).T
+    lag = (rows - sim["specular_row"]) * DELAY_STEP
+
+    np.testing.assert_array_equal(cols, np.round(sim["specular_col"]))
+    assert np.all((lag > -0.5 * DELAY_STEP) & (lag <= 1.0))
+
+
+@pytest.mark.parametrize("incidence", [5.0, 30.0, 60.0])
+def test_ddma_and_les_fall_as_wind_rises(incidence):
+    # Checked on the raw model: build_lut's np.minimum.accumulate would hide a violation
+    wind, direction = np.meshgrid(WIND_AXIS, WIND_DIRECTIONS, indexing='ij')
+    sim = simulate_ddms(incidence=incidence, wind_speed=wind.ravel(), wind_direction=direction.ravel(), noise=False)
+
+    for values in _simulated_observables(sim):
+        values = values.reshape(wind.shape)
+        assert np.all(np.isfinite(values))
+        assert np.all(np.diff(values, axis=0) < 0)
@@ -0,0 +1,104 @@
+"""Mergeable running statistics: Chan's combine, and bins the moments leave out"""
+
+import numpy as np
+import pytest
+
+from cygnss_calibration import DEFAULT_FLOOR_DB
+from cygnss_stats import Moments, OnlineStats, accumulate
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(7)
+    values = rng.normal(-160.0, 6.0, (101, 17, 11))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    return values
+
+
+def _assert_same_moments(actual, expected):
+    np.testing.assert_array_equal(actual.count, expected.count)
+    np.testing.assert_allclose(actual.mean, expected.mean, rtol=1e-12)
+    np.testing.assert_allclose(actual.variance, expected.variance, rtol=1e-9)
+    np.testing.assert_array_equal(actual.min, expected.min)
+    np.testing.assert_array_equal(actual.max, expected.max)
+
+
+def test_merged_halves_equal_one_pass(values):
+    whole = Moments(values.shape[1:])
+    whole.update(values)
+    first, second = Moments(values.shape[1:]), Moments(values.shape[1:])
+    first.update(values[:40])
+    second.update(values[40:])
+
+    first.merge(second)
+
+    _assert_same_moments(first, whole)
+    np.testing.assert_allclose(whole.mean, np.nanmean(values, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(whole.variance, np.nanvar(values, axis=0, ddof=1), rtol=1e-9)
+
+
+def test_chunked_updates_and_round_trip_equal_one_pass(values):
+    whole = Moments(values.shape[1:])
+    whole.update(values)
+    chunked = Moments(values.shape[1:])
+    for start in range(0, len(values), 16):
+        chunked.update(values[start:start + 16])
+
+    _assert_same_moments(Moments.from_dict(chunked.to_dict()), whole)
+
+
+def test_online_stats_merge_equals_one_pass(values):
+    power = values.reshape(-1, 1, 17, 11)[:100].reshape(25, 4, 17, 11)
+    whole, first, second = OnlineStats(), OnlineStats(), OnlineStats()
+    whole.update_chunk(power, 1)
+    first.update_chunk(power[:10], 1)
+    second.update_chunk(power[10:], 1)
+
+    first.merge(second)
+
+    assert sorted(first.groups) == sorted(whole.groups) == [f"cyg01/ch{c}" for c in range(4)]
+    for key, group in whole.groups.items():
+        for name in ("power", "peak_power", "mean_power"):
+            _assert_same_moments(first.groups[key][name], group[name])
+        np.testing.assert_array_equal(first.groups[key]["hist"], group["hist"])
+
+
+def test_nan_bins_are_skipped(values):
+    moments = Moments(values.shape[1:])
+    moments.update(values)
+
+    np.testing.assert_array_equal(moments.count, np.isfinite(values).sum(axis=0))
+
+
+@pytest.mark.parametrize("drop", [True, False], ids=["dropping", "keep-anomalies"])
+def test_floor_bins_do_not_change_the_statistics(tmp_path, make_granule, cache_dir, drop):
+    import netCDF4
+
+    from cygnss_anomaly import DEFAULT_DROP
+
+    path = make_granule("g.nc", n_samples=30)
+    options = dict(cache_dir=cache_dir, verbose=False, drop=DEFAULT_DROP if drop else 0)
+    clean = accumulate([path], str(tmp_path / "clean.json"), **options)
+    # A zero bin alone is no anomaly; the negative and missing ones flag their DDM
+    zero, negative, missing = (3, 1, 12, 4), (9, 0, 16, 10), (20, 3, 8, 5)
+    with netCDF4.Dataset(path, "a") as ds:
+        ds["power_analog"][zero] = 0.0
+        ds["power_analog"][negative] = -1e-18
+        ds["power_analog"][missing] = np.nan
+    stats = accumulate([path], str(tmp_path / "stats.json"), **options)
+
+    for channel in range(4):
+        key = f"cyg01/ch{channel}"
+        group, reference = stats.groups[key], clean.groups[key]
+        expected = reference["power"].count.copy()
+        for _, bad_channel, row, col in (zero, negative, missing):
+            if bad_channel == channel:
+                if drop and (row, col) != zero[2:]:
+                    expected -= 1
+                else:
+                    expected[row, col] -= 1
+        np.testing.assert_array_equal(group["power"].count, expected, err_msg=key)
+        assert np.all(group["power"].min > DEFAULT_FLOOR_DB)
+        assert group["hist"][0] == 0
+    # Channel 2 has no bad bin and is unchanged
+    _assert_same_moments(stats.groups["cyg01/ch2"]["power"], clean.groups["cyg01/ch2"]["power"])
@@ -0,0 +1,84 @@
+"""DDM store: ingest, granule naming and keyset pagination"""
+
+from cygnss_store import connect, granule_name, ingest_granule, query_ddms
+
+
+def _keys(conn, where="1"):
+    sql = f"SELECT g.name, d.sample, d.channel FROM ddms d JOIN granules g ON g.id = d.granule_id WHERE {where}"
+    return [tuple(row) for row in conn.execute(sql + " ORDER BY d.time, d.id")]
+
+
+def _page_ids(conn, page_size, **filters):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = query_ddms(conn, cursor=cursor, page_size=page_size, include_ddm=False, **filters)
+        ids.extend((r["granule"], r["sample"], r["channel"]) for r in page["records"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids, pages
+
+
+def test_pagination_visits_every_ddm_once_in_order(tmp_path, make_granule, cache_dir):
+    conn = connect(str(tmp_path / "store.sqlite"))
+    ingest_granule(conn, make_granule("a.nc", n_samples=10), cache_dir)
+    expected = _keys(conn)
+
+    ids, pages = _page_ids(conn, page_size=7)
+
+    assert ids == expected
+    assert pages == -(-len(expected) // 7)
+
+
+def test_pagination_pages_through_null_times(tmp_path, make_granule, cache_dir):
+    conn = connect(str(tmp_path / "store.sqlite"))
+    ingest_granule(conn, make_granule("a.nc", n_samples=10), cache_dir)
+    with conn:
+        conn.execute("UPDATE ddms SET time = NULL WHERE sample < 3")
+    null_ids = _keys(conn, "d.time IS NULL")
+    timed_ids = _keys(conn, "d.time IS NOT NULL")
+    assert null_ids and timed_ids
+
+    # Page boundaries inside the NULL run, across it and inside the timed rows
+    for page_size in (1, 5, len(null_ids), len(null_ids) + 3):
+        ids, _ = _page_ids(conn, page_size=page_size)
+        assert ids == null_ids + timed_ids
+
+
+def test_cursor_of_null_time_is_explicit(tmp_path, make_granule, cache_dir):
+    conn = connect(str(tmp_path / "store.sqlite"))
+    ingest_granule(conn, make_granule("a.nc", n_samples=2), cache_dir)
+    with conn:
+        conn.execute("UPDATE ddms SET time = NULL")
+
+    page = query_ddms(conn, page_size=1, include_ddm=False)
+
+    assert page["next_cursor"].startswith("null:")
+
+
+def test_same_file_name_in_different_directories(tmp_path, make_granule, cache_dir):
+    data_dir = tmp_path / "data"
+    first = make_granule("2018/213/cyg.nc", n_samples=4, seed=1)
+    second = make_granule("2018/214/cyg.nc", n_samples=6, seed=2)
+    conn = connect(str(tmp_path / "store.sqlite"))
+
+    ingest_granule(conn, first, cache_dir, data_dir=data_dir)
+    ingest_granule(conn, second, cache_dir, data_dir=data_dir)
+
+    counts = dict(conn.execute("SELECT g.name, COUNT(*) FROM ddms d JOIN granules g ON g.id = d.granule_id"
+                               " GROUP BY g.name"))
+    assert counts == {"2018/213/cyg.nc": 4 * 4, "2018/214/cyg.nc": 6 * 4}
+
+
+def test_basename_rows_are_renamed_not_duplicated(tmp_path, make_granule, cache_dir):
+    path = make_granule("2018/213/cyg.nc", n_samples=4)
+    conn = connect(str(tmp_path / "store.sqlite"))
+    ingest_granule(conn, path, cache_dir)
+
+    assert ingest_granule(conn, path, cache_dir, data_dir=tmp_path / "data") == 0
+    assert [row[0] for row in conn.execute("SELECT name FROM granules")] == ["2018/213/cyg.nc"]
+
+
+def test_granule_name_outside_data_dir_is_file_name(tmp_path):
+    assert granule_name(tmp_path / "a" / "x.nc", tmp_path / "b") == "x.nc"
+    assert granule_name(tmp_path / "a" / "x.nc", tmp_path) == "a/x.nc"
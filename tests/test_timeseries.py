@@ -0,0 +1,103 @@
+"""Site series digests depend on file contents, not on where or when files were written"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from cygnss_timeseries import build_site_series
+
+POINTS_DIR = Path(__file__).resolve().parent.parent / "public" / "era5_points"
+SITE_SERIES_DIR = Path(__file__).resolve().parent.parent / "public" / "site_series"
+
+
+def _copy_points(target):
+    target.mkdir()
+    for path in POINTS_DIR.glob("Bangalore_*.csv"):
+        shutil.copy(path, target / path.name)
+    return target
+
+
+def test_touched_inputs_are_up_to_date(tmp_path):
+    points = _copy_points(tmp_path / "points")
+    output = tmp_path / "series"
+    assert build_site_series(points, output, verbose=False, era5_cache=tmp_path / "a.npz") == ["Bangalore"]
+
+    for path in points.iterdir():
+        os.utime(path, ns=(0, 0))
+    assert build_site_series(points, output, verbose=False, era5_cache=tmp_path / "b.npz") == []
+
+
+def test_changed_input_is_rebuilt(tmp_path):
+    points = _copy_points(tmp_path / "points")
+    output = tmp_path / "series"
+    build_site_series(points, output, verbose=False, era5_cache=tmp_path / "a.npz")
+
+    path = next(points.glob("*.csv"))
+    path.write_text(path.read_text() + "2025-01-01,0.5\n")
+    assert build_site_series(points, output, verbose=False, era5_cache=tmp_path / "a.npz") == ["Bangalore"]
+
+
+def test_committed_index_matches_a_fresh_checkout(tmp_path):
+    output = tmp_path / "series"
+    shutil.copytree(SITE_SERIES_DIR, output)
+
+    assert build_site_series(POINTS_DIR, output, verbose=False, era5_cache=tmp_path / "era5.npz") == []
+
+
+def test_defaults_do_not_depend_on_the_working_directory(tmp_path):
+    output = tmp_path / "series"
+    command = [sys.executable, str(POINTS_DIR.parent.parent / "scripts" / "cygnss_timeseries.py"),
+               "-o", str(output), "--era5-cache", str(tmp_path / "era5.npz")]
+
+    result = subprocess.run(command, cwd=tmp_path, capture_output=True, text=True, timeout=120)
+
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert sorted(p.name for p in output.iterdir()) == sorted(p.name for p in SITE_SERIES_DIR.iterdir())
+
+
+def test_missing_inputs_are_an_error(tmp_path, capsys):
+    (tmp_path / "points").mkdir()
+
+    assert build_site_series(tmp_path / "points", tmp_path / "series", era5_cache=tmp_path / "era5.npz") is None
+    assert "❌ No" in capsys.readouterr().out
+    assert not (tmp_path / "series").exists()
+
+
+def test_peak_snr_is_the_same_from_linear_and_db_power():
+    from cygnss_timeseries import peak_snr_db
+
+    peak = np.array([1e-17, 2e-18, 1e-18, 5e-19, np.nan])
+    noise = np.array([1e-18, 1e-18, 1e-18, 1e-18, 1e-18])
+
+    snr = peak_snr_db(peak, noise, "W")
+
+    np.testing.assert_allclose(snr[:2], [10 * np.log10(9.0), 0.0], atol=1e-9)
+    assert np.isnan(snr[2:]).all()
+    np.testing.assert_allclose(peak_snr_db(10 * np.log10(peak), noise, "dBW"), snr, rtol=1e-9)
+    assert np.isnan(peak_snr_db(peak, np.zeros(5), "W")).all()
+
+
+def test_cygnss_series_is_daily_peak_snr(tmp_path, make_granule, cache_dir):
+    from cygnss_store import connect, ingest_granule
+
+    store = tmp_path / "store.sqlite"
+    conn = connect(str(store))
+    ingest_granule(conn, make_granule("g.nc", n_samples=200), cache_dir)
+    conn.close()
+    points = _copy_points(tmp_path / "points")
+
+    build_site_series(points, tmp_path / "series", store, radius_deg=30.0, verbose=False,
+                      era5_cache=tmp_path / "era5.npz")
+
+    series = json.loads((tmp_path / "series" / "Bangalore.json").read_text())
+    cygnss = series["variables"]["CYGNSS"]
+    assert cygnss["unit"] == "dB" and "SNR" in cygnss["display"]
+    day = cygnss["values"][(np.datetime64("2018-08-01") - np.datetime64(series["start"])).astype(int)]
+    # Synthetic peaks sit 0.2 to 2.8 decades above the noise floor
+    assert 0.0 < day < 30.0
+    assert sum(cygnss["counts"]) > 0
@@ -0,0 +1,85 @@
+"""Wind lookup table: storage, lookups and retrieval of simulated winds"""
+
+import numpy as np
+import pytest
+
+from cygnss_simulate import random_params, simulate_ddms
+from cygnss_wind import LUT_VERSION, OBSERVABLES, WindLUT, _simulated_observables, build_lut, chunk_wind
+
+# A coarse table builds in about a second and retrieves nearly as well as the default one
+COARSE_INCIDENCE = np.arange(0.0, 72.0, 6.0)
+COARSE_WIND = np.concatenate([np.arange(0.5, 10.0, 0.5), np.arange(10.0, 25.0, 1.0), np.arange(25.0, 41.0, 3.0)])
+# Noisy simulated DDMs at 3-20 m/s and 5-60° incidence: ~1.7 m/s RMSE and ~+0.7 m/s bias measured
+MAX_RMSE = 2.0
+MAX_BIAS = 1.0
+
+
+@pytest.fixture(scope="module")
+def lut():
+    return build_lut(COARSE_INCIDENCE, COARSE_WIND, bins=128, weight_samples=4000, seed=1)
+
+
+def test_save_and_load_round_trip(lut, tmp_path):
+    path = tmp_path / "lut.npz"
+    lut.save(path)
+
+    loaded = WindLUT.load(path)
+
+    np.testing.assert_array_equal(loaded.incidence, lut.incidence)
+    np.testing.assert_array_equal(loaded.weight_wind, lut.weight_wind)
+    np.testing.assert_array_equal(loaded.weight_ddma, lut.weight_ddma)
+    for name in OBSERVABLES:
+        np.testing.assert_array_equal(loaded.log_obs[name], lut.log_obs[name])
+        np.testing.assert_array_equal(loaded.tables[name], lut.tables[name])
+
+
+def test_other_table_versions_are_refused(lut, tmp_path):
+    path = tmp_path / "lut.npz"
+    lut.save(path)
+    with np.load(path) as data:
+        arrays = dict(data)
+    arrays["version"] = LUT_VERSION + 1
+    np.savez(path, **arrays)
+
+    with pytest.raises(ValueError, match=f"version {LUT_VERSION + 1}"):
+        WindLUT.load(path)
+
+
+def test_lookup_of_unusable_observables_is_nan(lut):
+    values = np.array([np.nan, np.inf, 0.0, -1.0, 10 ** lut.log_obs["ddma"].mean()])
+    incidence = np.array([30.0, 30.0, 30.0, 30.0, 30.0])
+
+    wind = lut.lookup("ddma", incidence, values)
+
+    assert np.isnan(wind[:4]).all()
+    assert np.isfinite(wind[4])
+    assert np.isnan(lut.lookup("ddma", [np.nan], values[4:]))[0]
+
+
+def test_simulated_winds_are_retrieved(lut):
+    params = random_params(4000, seed=9, wind_range=(3.0, 20.0), incidence_range=(5.0, 60.0))
+    ddma, les = _simulated_observables(simulate_ddms(**params, seed=9))
+
+    wind = lut.retrieve(params["incidence"], ddma, les)["wind_speed"]
+
+    error = wind - params["wind_speed"]
+    assert np.isfinite(error).all()
+    assert np.sqrt(np.mean(error ** 2)) < MAX_RMSE
+    assert abs(np.mean(error)) < MAX_BIAS
+
+
+def test_retrieved_wind_rises_with_true_wind(lut):
+    incidence = np.full(COARSE_WIND.size, 30.0)
+    ddma, les = _simulated_observables(simulate_ddms(incidence=incidence, wind_speed=COARSE_WIND, noise=False))
+
+    wind = lut.retrieve(incidence, ddma, les)["wind_speed"]
+
+    assert np.all(np.diff(wind[COARSE_WIND <= 20.0]) >= 0)
+
+
+def test_chunk_wind_needs_an_incidence_angle(lut):
+    chunk = {"power": np.ones((2, 4, 17, 11), dtype=np.float32)}
+    meta = {"power_variable": "power_analog", "variables": {"power_analog": {"units": "W"}}}
+
+    assert chunk_wind(chunk, meta, lut) == {}
+    assert chunk_wind(chunk, meta, lut, variables=()) == {}